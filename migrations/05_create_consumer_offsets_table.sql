@@ -0,0 +1,16 @@
+-- Unique event id carried by every ledger event, used to deduplicate projections
+ALTER TABLE ledger_events ADD COLUMN IF NOT EXISTS event_id VARCHAR(100);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_ledger_events_event_id ON ledger_events(event_id);
+
+-- Create consumer offsets table
+-- Offsets are committed in the same transaction as the projected rows, so a
+-- crash between the insert and the offset commit can no longer replay events
+CREATE TABLE IF NOT EXISTS consumer_offsets (
+    group_id VARCHAR(100) NOT NULL,
+    topic VARCHAR(255) NOT NULL,
+    partition_id INTEGER NOT NULL,
+    committed_offset BIGINT NOT NULL,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (group_id, topic, partition_id)
+);
@@ -0,0 +1,19 @@
+-- Keyset index used by the backfill tool to walk the ledger one account range at a time
+CREATE INDEX IF NOT EXISTS idx_ledger_account_id_id ON ledger(account_id, id);
+
+-- Create backfill checkpoints table
+-- One row per account-id range of a backfill run; a restarted run resumes
+-- each range after the last ledger entry it loaded
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    run_id VARCHAR(100) NOT NULL,
+    range_start INTEGER NOT NULL,
+    range_end INTEGER NOT NULL,
+    last_account_id INTEGER,
+    last_ledger_id INTEGER,
+    rows_read BIGINT DEFAULT 0,
+    rows_written BIGINT DEFAULT 0,
+    cleared BOOLEAN DEFAULT FALSE,
+    completed_at TIMESTAMP WITH TIME ZONE,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_id, range_start)
+);
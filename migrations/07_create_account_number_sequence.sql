@@ -0,0 +1,8 @@
+-- Collision-free account numbers: ACC followed by a 12-digit sequence value
+-- The width keeps generated numbers apart from the shorter seeded and legacy ones
+CREATE SEQUENCE IF NOT EXISTS account_number_seq;
+
+CREATE OR REPLACE FUNCTION next_account_number()
+RETURNS VARCHAR AS $$
+    SELECT 'ACC' || lpad(nextval('account_number_seq')::text, 12, '0');
+$$ LANGUAGE sql;
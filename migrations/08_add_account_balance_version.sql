@@ -0,0 +1,19 @@
+-- Balance version, bumped on every balance change
+-- Cached balances carry it so a stale write can never replace a newer one
+ALTER TABLE accounts ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_account_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF NEW.balance IS DISTINCT FROM OLD.balance THEN
+        NEW.version = OLD.version + 1;
+    END IF;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS bump_accounts_version ON accounts;
+CREATE TRIGGER bump_accounts_version
+    BEFORE UPDATE ON accounts
+    FOR EACH ROW
+    EXECUTE FUNCTION bump_account_version();
@@ -0,0 +1,19 @@
+-- Notify services when an account is created, deleted or changes owner
+-- Services cache the account -> user mapping for authorization and drop the
+-- entry on notification
+CREATE OR REPLACE FUNCTION notify_account_owner_change()
+RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'UPDATE' AND NEW.user_id IS NOT DISTINCT FROM OLD.user_id THEN
+        RETURN NULL;
+    END IF;
+    PERFORM pg_notify('account_owner_changed', COALESCE(NEW.id, OLD.id)::text);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS notify_accounts_owner_change ON accounts;
+CREATE TRIGGER notify_accounts_owner_change
+    AFTER INSERT OR DELETE OR UPDATE OF user_id ON accounts
+    FOR EACH ROW
+    EXECUTE FUNCTION notify_account_owner_change();
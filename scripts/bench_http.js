@@ -0,0 +1,100 @@
+const http = require('http');
+
+// Measures request latency and throughput of a service endpoint, to compare
+// an instance with the metrics middleware against one started with
+// METRICS_ENABLED=false. Run both on the same host and pass both URLs; both
+// are warmed up, then measured in alternating rounds through the same number
+// of concurrent keep-alive connections, and the median round is reported.
+//
+// Usage: node bench_http.js --url http://localhost:3002/ [--baseline http://localhost:3012/]
+//                           [--requests N] [--concurrency N] [--rounds N] [--token JWT]
+
+function option(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index !== -1 ? process.argv[index + 1] : fallback;
+}
+
+const REQUESTS = parseInt(option('requests', '20000'), 10);
+const CONCURRENCY = parseInt(option('concurrency', '32'), 10);
+const ROUNDS = parseInt(option('rounds', '5'), 10);
+const WARMUP = Math.min(5000, REQUESTS);
+const TOKEN = option('token');
+
+function request(agent, url) {
+  return new Promise((resolve, reject) => {
+    const startedAt = process.hrtime.bigint();
+    const headers = TOKEN ? { Authorization: `Bearer ${TOKEN}` } : {};
+    http.get(url, { agent, headers }, (res) => {
+      res.resume();
+      res.on('end', () => resolve(Number(process.hrtime.bigint() - startedAt) / 1e6));
+    }).on('error', reject);
+  });
+}
+
+async function run(url, count, concurrency = CONCURRENCY) {
+  const agent = new http.Agent({ keepAlive: true, maxSockets: concurrency });
+  const latencies = [];
+  let issued = 0;
+  const startedAt = process.hrtime.bigint();
+
+  await Promise.all(Array.from({ length: concurrency }, async () => {
+    while (issued < count) {
+      issued += 1;
+      latencies.push(await request(agent, url));
+    }
+  }));
+
+  const seconds = Number(process.hrtime.bigint() - startedAt) / 1e9;
+  agent.destroy();
+  latencies.sort((a, b) => a - b);
+  const at = (p) => latencies[Math.min(latencies.length - 1, Math.floor(latencies.length * p))];
+  return { throughput: count / seconds, p50: at(0.5), p99: at(0.99) };
+}
+
+function report(label, result) {
+  console.log(
+    `${label.padEnd(10)} ${result.throughput.toFixed(0).padStart(8)} req/s ` +
+    `p50 ${result.p50.toFixed(2).padStart(7)}ms  p99 ${result.p99.toFixed(2).padStart(7)}ms`
+  );
+}
+
+const median = (results) => results.sort((a, b) => a.throughput - b.throughput)[Math.floor(results.length / 2)];
+
+async function benchHttp() {
+  const url = option('url');
+  if (!url) {
+    throw new Error('Pass the endpoint to measure with --url');
+  }
+  const baselineUrl = option('baseline');
+
+  const targets = baselineUrl ? [url, baselineUrl] : [url];
+  for (const target of targets) {
+    await run(target, WARMUP);
+  }
+
+  console.log(`${ROUNDS} rounds of ${REQUESTS} requests, ${CONCURRENCY} concurrent connections`);
+  const rounds = targets.map(() => []);
+  for (let round = 0; round < ROUNDS; round++) {
+    for (let i = 0; i < targets.length; i++) {
+      rounds[i].push(await run(targets[i], REQUESTS));
+    }
+  }
+
+  const measured = median(rounds[0]);
+  report('metrics', measured);
+  if (baselineUrl) {
+    const baseline = median(rounds[1]);
+    report('baseline', baseline);
+    console.log(`overhead: ${(((baseline.throughput - measured.throughput) / baseline.throughput) * 100).toFixed(1)}% throughput, ` +
+      `${(measured.p50 - baseline.p50).toFixed(3)}ms p50`);
+  }
+}
+
+if (require.main === module) {
+  benchHttp().catch((error) => {
+    console.error('Benchmark failed:', error);
+    process.exitCode = 1;
+  });
+}
+
+module.exports = { run };
@@ -0,0 +1,145 @@
+const { Pool } = require('pg');
+require('dotenv').config();
+
+// Compares the old multi-statement withdrawal (BEGIN, SELECT ... FOR UPDATE,
+// UPDATE, two INSERTs, COMMIT) with the single-statement CTE used by the
+// accounts service, against one hot account.
+//
+// Usage: node bench_posting.js [--operations N] [--concurrency N]
+
+function option(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index !== -1 ? parseInt(process.argv[index + 1], 10) : fallback;
+}
+
+const OPERATIONS = option('operations', 2000);
+const CONCURRENCY = option('concurrency', 16);
+
+// Database configuration
+const pool = new Pool({
+  host: process.env.DB_HOST || 'localhost',
+  port: parseInt(process.env.DB_PORT) || 5432,
+  database: process.env.DB_NAME || 'fintech',
+  user: process.env.DB_USER || 'postgres',
+  password: process.env.DB_PASSWORD || 'postgres',
+  max: CONCURRENCY
+});
+
+const WITHDRAWAL_STATEMENT = `
+  WITH updated AS (
+    UPDATE accounts SET balance = balance - $2::numeric
+    WHERE id = $1 AND balance >= $2::numeric
+    RETURNING id, balance, currency, version
+  ), recorded AS (
+    INSERT INTO transactions (account_id, transaction_type, amount, description, status)
+    SELECT id, 'withdrawal', $2::numeric, $3::text, 'completed' FROM updated
+    RETURNING id, account_id, created_at
+  ), posted AS (
+    INSERT INTO ledger (transaction_id, account_id, entry_type, amount, balance_after, description)
+    SELECT recorded.id, updated.id, 'debit', $2::numeric, updated.balance, $3::text
+    FROM recorded JOIN updated ON updated.id = recorded.account_id
+  )
+  SELECT EXISTS (SELECT 1 FROM accounts WHERE id = $1) AS account_exists,
+         updated.balance, recorded.id AS transaction_id
+  FROM (SELECT 1) AS input
+  LEFT JOIN updated ON true
+  LEFT JOIN recorded ON true`;
+
+// Returns how long the account row was locked
+async function legacyWithdrawal(accountId, amount) {
+  const client = await pool.connect();
+  try {
+    await client.query('BEGIN');
+    const account = await client.query('SELECT balance FROM accounts WHERE id = $1 FOR UPDATE', [accountId]);
+    const lockedAt = process.hrtime.bigint();
+    const newBalance = parseFloat(account.rows[0].balance) - amount;
+    await client.query('UPDATE accounts SET balance = $1 WHERE id = $2', [newBalance, accountId]);
+    const transaction = await client.query(
+      `INSERT INTO transactions (account_id, transaction_type, amount, description, status)
+       VALUES ($1, $2, $3, $4, $5) RETURNING id, created_at`,
+      [accountId, 'withdrawal', amount, 'Benchmark', 'completed']
+    );
+    await client.query(
+      `INSERT INTO ledger (transaction_id, account_id, entry_type, amount, balance_after, description)
+       VALUES ($1, $2, $3, $4, $5, $6)`,
+      [transaction.rows[0].id, accountId, 'debit', amount, newBalance, 'Benchmark']
+    );
+    await client.query('COMMIT');
+    return Number(process.hrtime.bigint() - lockedAt) / 1e6;
+  } catch (error) {
+    await client.query('ROLLBACK');
+    throw error;
+  } finally {
+    client.release();
+  }
+}
+
+// The lock is taken and released within the statement, so its duration is an upper bound
+async function cteWithdrawal(accountId, amount) {
+  const startedAt = process.hrtime.bigint();
+  await pool.query(WITHDRAWAL_STATEMENT, [accountId, amount, 'Benchmark']);
+  return Number(process.hrtime.bigint() - startedAt) / 1e6;
+}
+
+function percentile(sorted, p) {
+  return sorted[Math.min(sorted.length - 1, Math.floor(sorted.length * p))];
+}
+
+async function run(name, withdraw, accountId) {
+  const latencies = [];
+  const lockHolds = [];
+  let next = 0;
+
+  async function worker() {
+    while (next < OPERATIONS) {
+      next++;
+      const startedAt = process.hrtime.bigint();
+      lockHolds.push(await withdraw(accountId, 1));
+      latencies.push(Number(process.hrtime.bigint() - startedAt) / 1e6);
+    }
+  }
+
+  const startedAt = Date.now();
+  await Promise.all(Array.from({ length: CONCURRENCY }, () => worker()));
+  const seconds = (Date.now() - startedAt) / 1000;
+
+  latencies.sort((a, b) => a - b);
+  lockHolds.sort((a, b) => a - b);
+  console.log(
+    `${name.padEnd(8)} ${(OPERATIONS / seconds).toFixed(0).padStart(7)} ops/s  ` +
+    `latency p50 ${percentile(latencies, 0.5).toFixed(2)}ms p99 ${percentile(latencies, 0.99).toFixed(2)}ms  ` +
+    `lock held p50 ${percentile(lockHolds, 0.5).toFixed(2)}ms p99 ${percentile(lockHolds, 0.99).toFixed(2)}ms`
+  );
+}
+
+async function benchPosting() {
+  const email = `bench-posting-${Date.now()}@example.com`;
+  const user = await pool.query(
+    'INSERT INTO users (email, password_hash) VALUES ($1, $2) RETURNING id',
+    [email, 'benchmark']
+  );
+  const account = await pool.query(
+    `INSERT INTO accounts (user_id, account_number, balance)
+     VALUES ($1, next_account_number(), $2) RETURNING id`,
+    [user.rows[0].id, OPERATIONS * 4]
+  );
+  const accountId = account.rows[0].id;
+
+  try {
+    console.log(`${OPERATIONS} withdrawals from one account, ${CONCURRENCY} concurrent`);
+    // Warm up connections and plans before measuring
+    await run('warmup', cteWithdrawal, accountId);
+    await run('legacy', legacyWithdrawal, accountId);
+    await run('cte', cteWithdrawal, accountId);
+  } finally {
+    // Accounts, transactions and ledger entries cascade from the user
+    await pool.query('DELETE FROM users WHERE id = $1', [user.rows[0].id]);
+  }
+}
+
+benchPosting()
+  .catch((error) => {
+    console.error('Benchmark failed:', error);
+    process.exitCode = 1;
+  })
+  .finally(() => pool.end());
@@ -0,0 +1,88 @@
+const { Client } = require('pg');
+require('dotenv').config();
+
+// Runs the hot read statements of the accounts and ledger services as unnamed
+// queries, which Postgres parses and plans on every execution, and as named
+// prepared statements, which are parsed once per connection.
+//
+// Usage: node bench_prepared.js [--iterations N] [--account ID]
+
+function option(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index !== -1 ? process.argv[index + 1] : fallback;
+}
+
+const ITERATIONS = parseInt(option('iterations', '5000'), 10);
+
+const STATEMENTS = {
+  'accounts.balance_by_id': {
+    text: 'SELECT balance, currency, version FROM accounts WHERE id = $1',
+    values: (accountId) => [accountId]
+  },
+  'ownership.owner_by_account': {
+    text: 'SELECT user_id FROM accounts WHERE id = $1',
+    values: (accountId) => [accountId]
+  },
+  'ledger.entries_page': {
+    text: `SELECT l.id, l.transaction_id, l.account_id, l.entry_type, l.amount, l.currency, l.balance_after,
+                  l.description, l.created_at, t.transaction_type, t.description as transaction_description
+           FROM ledger l
+           JOIN transactions t ON l.transaction_id = t.id
+           WHERE l.account_id = $1
+           ORDER BY l.created_at DESC
+           LIMIT $2 OFFSET $3`,
+    values: (accountId) => [accountId, 10, 0]
+  },
+  'ledger.entries_count': {
+    text: 'SELECT COUNT(*) FROM ledger WHERE account_id = $1',
+    values: (accountId) => [accountId]
+  }
+};
+
+async function time(client, query) {
+  const startedAt = process.hrtime.bigint();
+  for (let i = 0; i < ITERATIONS; i++) {
+    await client.query(query());
+  }
+  return Number(process.hrtime.bigint() - startedAt) / 1000 / ITERATIONS;
+}
+
+async function benchPrepared() {
+  const client = new Client({
+    host: process.env.DB_HOST || 'localhost',
+    port: parseInt(process.env.DB_PORT) || 5432,
+    database: process.env.DB_NAME || 'fintech',
+    user: process.env.DB_USER || 'postgres',
+    password: process.env.DB_PASSWORD || 'postgres'
+  });
+  await client.connect();
+
+  try {
+    // The account with the most ledger entries makes the listing representative
+    const accountId = option('account') || (await client.query(
+      'SELECT account_id FROM ledger GROUP BY account_id ORDER BY COUNT(*) DESC LIMIT 1'
+    )).rows[0]?.account_id;
+    if (!accountId) {
+      throw new Error('No ledger entries found; seed the database or pass --account');
+    }
+
+    console.log(`${ITERATIONS} executions per statement against account ${accountId}`);
+    console.log(`${'statement'.padEnd(28)} ${'unnamed'.padStart(10)} ${'prepared'.padStart(10)}  saved`);
+    for (const [name, statement] of Object.entries(STATEMENTS)) {
+      const values = statement.values(accountId);
+      const unnamed = await time(client, () => ({ text: statement.text, values }));
+      const named = await time(client, () => ({ name, text: statement.text, values }));
+      console.log(
+        `${name.padEnd(28)} ${unnamed.toFixed(1).padStart(8)}µs ${named.toFixed(1).padStart(8)}µs  ` +
+        `${(((unnamed - named) / unnamed) * 100).toFixed(1)}%`
+      );
+    }
+  } finally {
+    await client.end();
+  }
+}
+
+benchPrepared().catch((error) => {
+  console.error('Benchmark failed:', error);
+  process.exitCode = 1;
+});
@@ -0,0 +1,111 @@
+const { spawn, fork } = require('child_process');
+const http = require('http');
+const os = require('os');
+const path = require('path');
+const { run } = require('./bench_http');
+
+// Measures how a service's throughput scales with WEB_CONCURRENCY. For each
+// worker count the built service (dist/index.js) is started, warmed up and
+// driven by several load generator processes, so the generator is not the
+// bottleneck. Generators share the host with the service: on an N-core host,
+// expect near-linear scaling up to about N minus the cores the generators use.
+//
+// Usage: node bench_scaling.js --service ../services/auth [--path /] [--port 3101]
+//                              [--workers 1,2,4,8] [--clients N] [--concurrency N] [--requests N]
+
+function option(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index !== -1 ? process.argv[index + 1] : fallback;
+}
+
+const CORES = typeof os.availableParallelism === 'function' ? os.availableParallelism() : os.cpus().length;
+const REQUESTS = parseInt(option('requests', '20000'), 10);
+const CONCURRENCY = parseInt(option('concurrency', '32'), 10);
+
+const SERVICE_DIR = path.resolve(option('service', '../services/auth'));
+const PORT = parseInt(option('port', '3101'), 10);
+const URL = `http://localhost:${PORT}${option('path', '/')}`;
+const CLIENTS = parseInt(option('clients', String(Math.max(1, Math.floor(CORES / 4)))), 10);
+const WORKERS = option('workers', '')
+  ? option('workers').split(',').map((count) => parseInt(count, 10))
+  : [1, 2, 4, 8, 16, 32, 64].filter((count) => count <= CORES);
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+function ready() {
+  return new Promise((resolve) => {
+    http.get(URL, (res) => {
+      res.resume();
+      resolve(true);
+    }).on('error', () => resolve(false));
+  });
+}
+
+async function startService(workers) {
+  const service = spawn(process.execPath, ['dist/index.js'], {
+    cwd: SERVICE_DIR,
+    env: { ...process.env, PORT: String(PORT), WEB_CONCURRENCY: String(workers), TRACE_EXPORTER: 'none' },
+    stdio: 'ignore'
+  });
+  for (let attempt = 0; attempt < 100; attempt++) {
+    if (await ready()) {
+      // Let every worker finish starting before measuring
+      await sleep(1000);
+      return service;
+    }
+    await sleep(100);
+  }
+  service.kill('SIGTERM');
+  throw new Error(`Service in ${SERVICE_DIR} did not answer on ${URL}`);
+}
+
+function load() {
+  return Promise.all(Array.from({ length: CLIENTS }, () => new Promise((resolve, reject) => {
+    const child = fork(__filename, [
+      '--load', URL, '--requests', String(REQUESTS), '--concurrency', String(CONCURRENCY)
+    ]);
+    child.once('message', resolve);
+    child.once('exit', (code) => code !== 0 && reject(new Error(`Load generator exited with ${code}`)));
+  })));
+}
+
+async function benchScaling() {
+  console.log(`${URL} on ${CORES} cores, ${CLIENTS} load generators x ${CONCURRENCY} connections`);
+  console.log(`${'workers'.padEnd(8)} ${'req/s'.padStart(10)} ${'p99'.padStart(9)} ${'speedup'.padStart(8)} ${'efficiency'.padStart(11)}`);
+
+  let baseline = 0;
+  for (const workers of WORKERS) {
+    const service = await startService(workers);
+    try {
+      await load();
+      const results = await load();
+      const throughput = results.reduce((total, result) => total + result.throughput, 0);
+      const p99 = Math.max(...results.map((result) => result.p99));
+      baseline = baseline || throughput / workers;
+      const speedup = throughput / baseline;
+      console.log(
+        `${String(workers).padEnd(8)} ${throughput.toFixed(0).padStart(10)} ${p99.toFixed(2).padStart(7)}ms ` +
+        `${speedup.toFixed(2).padStart(7)}x ${((speedup / workers) * 100).toFixed(0).padStart(10)}%`
+      );
+    } finally {
+      service.kill('SIGTERM');
+      await new Promise((resolve) => service.once('exit', resolve));
+    }
+  }
+}
+
+if (option('load')) {
+  // Load generator mode: run one share of the load and report it to the parent
+  run(option('load'), REQUESTS, CONCURRENCY).then((result) => {
+    process.send(result);
+    process.exit(0);
+  }, (error) => {
+    console.error('Load generator failed:', error);
+    process.exit(1);
+  });
+} else {
+  benchScaling().catch((error) => {
+    console.error('Benchmark failed:', error);
+    process.exitCode = 1;
+  });
+}
@@ -15,7 +15,7 @@ DB_PASSWORD=${DB_PASSWORD:-postgres}
 export PGPASSWORD=$DB_PASSWORD
 
 # Check if required tables exist
-TABLES=("users" "accounts" "transactions" "ledger" "transfers" "ledger_events" "audit_logs" "documents")
+TABLES=("users" "accounts" "transactions" "ledger" "transfers" "ledger_events" "audit_logs" "documents" "consumer_offsets" "backfill_checkpoints")
 
 echo "Checking for required tables..."
 for TABLE in "${TABLES[@]}"; do
@@ -0,0 +1,419 @@
+const fs = require('fs');
+const path = require('path');
+const yaml = require('js-yaml');
+
+// Generates request validators and response serializers from
+// openapi/openapi.yaml, one module per service (src/generated/openapi.ts),
+// so the spec is the single source of truth for request and response shapes.
+//
+// Validators are straight-line checks specialized to each request body schema,
+// in the manner of ajv's standalone code. Serializers write the JSON of each
+// success response directly, in the manner of fast-json-stringify: only the
+// properties the schema lists are written, in schema order, and values of an
+// unexpected type fall back to JSON.stringify, so the output is always the
+// JSON that res.json would have produced for the listed properties.
+//
+// Usage: node generate_openapi.js [--spec ../openapi/openapi.yaml] [--check]
+//   --check  exit with an error when a generated module is out of date
+
+function option(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index !== -1 ? process.argv[index + 1] : fallback;
+}
+
+const SPEC = path.resolve(__dirname, option('spec', '../openapi/openapi.yaml'));
+const SERVICES_DIR = path.resolve(__dirname, '../services');
+// Services that own each top-level path segment
+const SERVICES = { auth: 'auth', accounts: 'accounts', transfer: 'transfer' };
+
+const capitalize = (name) => name.charAt(0).toUpperCase() + name.slice(1);
+
+/**
+ * Emits TypeScript for the services, or plain JavaScript for benchmarks
+ */
+class Emitter {
+  constructor(spec, typescript) {
+    this.spec = spec;
+    this.typescript = typescript;
+    this.lines = [];
+    this.variables = 0;
+  }
+
+  // Type annotation, dropped when emitting JavaScript
+  t(annotation) {
+    return this.typescript ? annotation : '';
+  }
+
+  line(indent, text) {
+    this.lines.push(`${'  '.repeat(indent)}${text}`);
+  }
+
+  variable(prefix) {
+    this.variables += 1;
+    return `${prefix}${this.variables}`;
+  }
+
+  resolve(schema) {
+    let resolved = schema;
+    for (let depth = 0; resolved && resolved.$ref; depth++) {
+      if (depth > 16) {
+        throw new Error(`Unresolvable $ref ${schema.$ref}`);
+      }
+      const name = resolved.$ref.replace('#/components/schemas/', '');
+      resolved = this.spec.components.schemas[name];
+      if (!resolved) {
+        throw new Error(`Unknown schema ${name}`);
+      }
+    }
+    return resolved;
+  }
+
+  // TypeScript type of a schema; component schemas are referred to by name
+  typeOf(schema, serialized) {
+    if (schema.$ref) {
+      return schema.$ref.replace('#/components/schemas/', '');
+    }
+    let type;
+    switch (schema.type) {
+      case 'object': {
+        const required = new Set(schema.required || []);
+        const properties = Object.entries(schema.properties || {})
+          .map(([name, property]) => `${name}${required.has(name) ? '' : '?'}: ${this.typeOf(property, serialized)}`);
+        type = `{ ${properties.join('; ')} }`;
+        break;
+      }
+      case 'array':
+        type = `Array<${this.typeOf(schema.items || {}, serialized)}>`;
+        break;
+      case 'integer':
+      case 'number':
+        type = 'number';
+        break;
+      case 'string':
+        // Timestamps are serialized from the Date objects pg returns
+        type = serialized && schema.format === 'date-time' ? 'string | Date' : 'string';
+        break;
+      case 'boolean':
+        type = 'boolean';
+        break;
+      default:
+        type = 'unknown';
+    }
+    return schema.nullable ? `${type} | null` : type;
+  }
+
+  // Checks that return false from the enclosing validator when value does not match
+  validate(schema, value, indent) {
+    schema = this.resolve(schema);
+    if (schema.nullable) {
+      this.line(indent, `if (${value} !== null) {`);
+      this.validateType(schema, value, indent + 1);
+      this.line(indent, '}');
+      return;
+    }
+    this.validateType(schema, value, indent);
+  }
+
+  validateType(schema, value, indent) {
+    const fail = (condition) => this.line(indent, `if (${condition}) return false;`);
+    switch (schema.type) {
+      case 'object': {
+        fail(`typeof ${value} !== 'object' || ${value} === null || Array.isArray(${value})`);
+        const object = this.variable('o');
+        this.line(indent, `const ${object} = ${value}${this.t(' as Record<string, unknown>')};`);
+        const required = new Set(schema.required || []);
+        for (const [name, property] of Object.entries(schema.properties || {})) {
+          const field = this.variable('v');
+          this.line(indent, `const ${field} = ${object}[${JSON.stringify(name)}];`);
+          if (required.has(name)) {
+            fail(`${field} === undefined`);
+            this.validate(property, field, indent);
+          } else {
+            this.line(indent, `if (${field} !== undefined) {`);
+            this.validate(property, field, indent + 1);
+            this.line(indent, '}');
+          }
+        }
+        break;
+      }
+      case 'array': {
+        fail(`!Array.isArray(${value})`);
+        if (schema.minItems !== undefined) fail(`${value}.length < ${schema.minItems}`);
+        if (schema.maxItems !== undefined) fail(`${value}.length > ${schema.maxItems}`);
+        const index = this.variable('i');
+        this.line(indent, `for (let ${index} = 0; ${index} < ${value}.length; ${index}++) {`);
+        const item = this.variable('v');
+        this.line(indent + 1, `const ${item} = ${value}[${index}];`);
+        this.validate(schema.items || {}, item, indent + 1);
+        this.line(indent, '}');
+        break;
+      }
+      case 'integer':
+      case 'number':
+        fail(schema.type === 'integer'
+          ? `typeof ${value} !== 'number' || !Number.isInteger(${value})`
+          : `typeof ${value} !== 'number' || !Number.isFinite(${value})`);
+        if (schema.minimum !== undefined) fail(`${value} ${schema.exclusiveMinimum ? '<=' : '<'} ${schema.minimum}`);
+        if (schema.maximum !== undefined) fail(`${value} ${schema.exclusiveMaximum ? '>=' : '>'} ${schema.maximum}`);
+        break;
+      case 'string':
+        fail(`typeof ${value} !== 'string'`);
+        if (schema.minLength !== undefined) fail(`${value}.length < ${schema.minLength}`);
+        if (schema.maxLength !== undefined) fail(`${value}.length > ${schema.maxLength}`);
+        if (schema.pattern !== undefined) fail(`!/${schema.pattern.replace(/\//g, '\\/')}/.test(${value})`);
+        break;
+      case 'boolean':
+        fail(`typeof ${value} !== 'boolean'`);
+        break;
+      default:
+        // No type: anything is accepted
+    }
+  }
+
+  // Appends the JSON of value to json
+  serialize(schema, value, json, indent) {
+    schema = this.resolve(schema);
+    switch (schema.type) {
+      case 'object': {
+        this.line(indent, `if (${value} !== null && typeof ${value} === 'object') {`);
+        const object = this.variable('o');
+        const separator = this.variable('s');
+        this.line(indent + 1, `const ${object} = ${value}${this.t(' as Record<string, unknown>')};`);
+        this.line(indent + 1, `let ${separator} = '{';`);
+        for (const [name, property] of Object.entries(schema.properties || {})) {
+          const field = this.variable('v');
+          this.line(indent + 1, `const ${field} = ${object}[${JSON.stringify(name)}];`);
+          this.line(indent + 1, `if (${field} !== undefined) {`);
+          this.line(indent + 2, `${json} += ${separator} + ${JSON.stringify(`${JSON.stringify(name)}:`)};`);
+          this.line(indent + 2, `${separator} = ',';`);
+          this.serialize(property, field, json, indent + 2);
+          this.line(indent + 1, '}');
+        }
+        this.line(indent + 1, `${json} += ${separator} === '{' ? '{}' : '}';`);
+        this.line(indent, '} else {');
+        this.line(indent + 1, `${json} += fallback(${value});`);
+        this.line(indent, '}');
+        break;
+      }
+      case 'array': {
+        this.line(indent, `if (Array.isArray(${value})) {`);
+        const index = this.variable('i');
+        this.line(indent + 1, `${json} += '[';`);
+        this.line(indent + 1, `for (let ${index} = 0; ${index} < ${value}.length; ${index}++) {`);
+        this.line(indent + 2, `if (${index} > 0) ${json} += ',';`);
+        const item = this.variable('v');
+        this.line(indent + 2, `const ${item} = ${value}[${index}];`);
+        this.serialize(schema.items || {}, item, json, indent + 2);
+        this.line(indent + 1, '}');
+        this.line(indent + 1, `${json} += ']';`);
+        this.line(indent, '} else {');
+        this.line(indent + 1, `${json} += fallback(${value});`);
+        this.line(indent, '}');
+        break;
+      }
+      case 'integer':
+      case 'number':
+        this.line(indent, `${json} += asNumber(${value});`);
+        break;
+      case 'string':
+        this.line(indent, `${json} += ${schema.format === 'date-time' ? 'asDateTime' : 'asString'}(${value});`);
+        break;
+      case 'boolean':
+        this.line(indent, `${json} += typeof ${value} === 'boolean' ? String(${value}) : fallback(${value});`);
+        break;
+      default:
+        this.line(indent, `${json} += fallback(${value});`);
+    }
+  }
+
+  validator(name, schema) {
+    this.variables = 0;
+    this.line(0, '/**');
+    this.line(0, ` * Whether a request body matches ${name}`);
+    this.line(0, ' */');
+    this.line(0, `${this.typescript ? 'export ' : ''}function validate${name}(data${this.t(': unknown')})${this.t(`: data is ${name}`)} {`);
+    this.validate(schema, 'data', 1);
+    this.line(1, 'return true;');
+    this.line(0, '}');
+    this.line(0, '');
+  }
+
+  serializer(name, schema) {
+    this.variables = 0;
+    this.line(0, '/**');
+    this.line(0, ` * Response body of type ${name} as JSON`);
+    this.line(0, ' */');
+    this.line(0, `${this.typescript ? 'export ' : ''}function serialize${name}(value${this.t(`: ${name}`)})${this.t(': string')} {`);
+    this.line(1, `let json = '';`);
+    this.serialize(schema, 'value', 'json', 1);
+    this.line(1, 'return json;');
+    this.line(0, '}');
+    this.line(0, '');
+  }
+}
+
+// Runtime helpers shared by every serializer
+const HELPERS = (t) => `// Strings without characters JSON must escape are written as they are
+const PLAIN_STRING = /^[\\x20\\x21\\x23-\\x5b\\x5d-\\x7e]*$/;
+
+function fallback(value${t(': unknown')})${t(': string')} {
+  const json = JSON.stringify(value);
+  return json === undefined ? 'null' : json;
+}
+
+function asString(value${t(': unknown')})${t(': string')} {
+  if (typeof value !== 'string') {
+    return fallback(value);
+  }
+  return value.length < 256 && PLAIN_STRING.test(value) ? '"' + value + '"' : JSON.stringify(value);
+}
+
+function asNumber(value${t(': unknown')})${t(': string')} {
+  return typeof value === 'number' && Number.isFinite(value) ? String(value) : fallback(value);
+}
+
+function asDateTime(value${t(': unknown')})${t(': string')} {
+  if (value instanceof Date && !Number.isNaN(value.getTime())) {
+    return '"' + value.toISOString() + '"';
+  }
+  return asString(value);
+}
+`;
+
+/**
+ * Operations per service: request body and success response schemas by name
+ */
+function operations(spec) {
+  const byService = {};
+  for (const [route, methods] of Object.entries(spec.paths || {})) {
+    const service = SERVICES[route.split('/')[1]];
+    if (!service) {
+      continue;
+    }
+    for (const operation of Object.values(methods)) {
+      if (!operation.operationId) {
+        throw new Error(`Operation on ${route} has no operationId`);
+      }
+      const name = capitalize(operation.operationId);
+      const entry = { name, route, request: null, responses: [] };
+
+      const body = operation.requestBody && operation.requestBody.content && operation.requestBody.content['application/json'];
+      if (body && body.schema) {
+        entry.request = { name: `${name}Request`, schema: body.schema };
+      }
+      const successes = Object.entries(operation.responses || {})
+        .filter(([status, response]) => /^2\d\d$/.test(status) && response.content && response.content['application/json']);
+      for (const [status, response] of successes) {
+        entry.responses.push({
+          name: successes.length > 1 ? `${name}Response${status}` : `${name}Response`,
+          schema: response.content['application/json'].schema
+        });
+      }
+      (byService[service] = byService[service] || []).push(entry);
+    }
+  }
+  return byService;
+}
+
+/**
+ * Source of a service's generated module
+ * @param typescript false to emit CommonJS JavaScript, as the benchmark loads it
+ */
+function generateModule(spec, service, typescript = true) {
+  const emitter = new Emitter(spec, typescript);
+  const entries = operations(spec)[service] || [];
+  const exported = [];
+
+  emitter.line(0, `// Generated by scripts/generate_openapi.js from openapi/openapi.yaml; do not edit.`);
+  emitter.line(0, `// Run \`npm run generate-openapi\` in scripts after changing the spec.`);
+  emitter.line(0, '');
+
+  if (typescript) {
+    // Component schemas used by this service's operations, then each operation's own types
+    const components = new Set();
+    const collect = (schema) => {
+      if (!schema || typeof schema !== 'object') return;
+      if (schema.$ref) {
+        const name = schema.$ref.replace('#/components/schemas/', '');
+        if (!components.has(name)) {
+          components.add(name);
+          collect(spec.components.schemas[name]);
+        }
+        return;
+      }
+      Object.values(schema.properties || {}).forEach(collect);
+      collect(schema.items);
+    };
+    for (const entry of entries) {
+      collect(entry.request && entry.request.schema);
+      entry.responses.forEach((response) => collect(response.schema));
+    }
+    for (const name of components) {
+      emitter.line(0, `export type ${name} = ${emitter.typeOf(spec.components.schemas[name], true)};`);
+    }
+    for (const entry of entries) {
+      if (entry.request) {
+        emitter.line(0, `export type ${entry.request.name} = ${emitter.typeOf(entry.request.schema, false)};`);
+      }
+      for (const response of entry.responses) {
+        emitter.line(0, `export type ${response.name} = ${emitter.typeOf(response.schema, true)};`);
+      }
+    }
+    emitter.line(0, '');
+  }
+
+  emitter.lines.push(...HELPERS(emitter.t.bind(emitter)).split('\n'));
+  for (const entry of entries) {
+    if (entry.request) {
+      emitter.validator(entry.request.name, entry.request.schema);
+      exported.push(`validate${entry.request.name}`);
+    }
+    for (const response of entry.responses) {
+      emitter.serializer(response.name, response.schema);
+      exported.push(`serialize${response.name}`);
+    }
+  }
+
+  if (!typescript) {
+    emitter.line(0, `module.exports = { ${exported.join(', ')} };`);
+  }
+  return emitter.lines.join('\n').replace(/\n+$/, '\n');
+}
+
+function loadSpec() {
+  return yaml.load(fs.readFileSync(SPEC, 'utf8'));
+}
+
+function main() {
+  const spec = loadSpec();
+  const check = process.argv.includes('--check');
+  let stale = 0;
+
+  for (const service of Object.keys(operations(spec))) {
+    const file = path.join(SERVICES_DIR, service, 'src', 'generated', 'openapi.ts');
+    const source = generateModule(spec, service);
+    const current = fs.existsSync(file) ? fs.readFileSync(file, 'utf8') : null;
+    if (current === source) {
+      continue;
+    }
+    if (check) {
+      console.error(`${path.relative(process.cwd(), file)} is out of date`);
+      stale += 1;
+      continue;
+    }
+    fs.mkdirSync(path.dirname(file), { recursive: true });
+    fs.writeFileSync(file, source);
+    console.log(`Wrote ${path.relative(process.cwd(), file)}`);
+  }
+
+  if (stale > 0) {
+    console.error('Run npm run generate-openapi to regenerate');
+    process.exitCode = 1;
+  }
+}
+
+if (require.main === module) {
+  main();
+}
+
+module.exports = { generateModule, loadSpec };
@@ -0,0 +1,110 @@
+const http = require('http');
+const fs = require('fs');
+
+// Stand-in for an OpenTelemetry collector during local development. Accepts
+// OTLP/HTTP JSON exports on /v1/traces (services started with
+// TRACE_EXPORTER=otlp), appends every span to a JSON lines file and prints a
+// one-line summary per trace once its spans stop arriving.
+//
+// Usage: node trace_collector.js [--port 4318] [--file traces.jsonl] [--settle-ms 2000]
+
+function option(name, fallback) {
+  const index = process.argv.indexOf(`--${name}`);
+  return index !== -1 ? process.argv[index + 1] : fallback;
+}
+
+const PORT = parseInt(option('port', '4318'), 10);
+const FILE = option('file', 'traces.jsonl');
+const SETTLE_MS = parseInt(option('settle-ms', '2000'), 10);
+
+const output = fs.createWriteStream(FILE, { flags: 'a' });
+// Spans per trace id, printed once no span has arrived for SETTLE_MS
+const traces = new Map();
+
+function attributeValue(value) {
+  if ('stringValue' in value) return value.stringValue;
+  if ('intValue' in value) return Number(value.intValue);
+  if ('doubleValue' in value) return value.doubleValue;
+  if ('boolValue' in value) return value.boolValue;
+  return null;
+}
+
+function attributes(list = []) {
+  return Object.fromEntries(list.map(({ key, value }) => [key, attributeValue(value)]));
+}
+
+function record(service, span) {
+  const startMs = Number(BigInt(span.startTimeUnixNano) / 1000n) / 1000;
+  const endMs = Number(BigInt(span.endTimeUnixNano) / 1000n) / 1000;
+  const flat = {
+    service,
+    traceId: span.traceId,
+    spanId: span.spanId,
+    parentSpanId: span.parentSpanId,
+    name: span.name,
+    startTime: new Date(startMs).toISOString(),
+    durationMs: Math.round((endMs - startMs) * 1000) / 1000,
+    status: span.status && span.status.code === 2 ? 'error' : 'ok',
+    attributes: attributes(span.attributes)
+  };
+  output.write(JSON.stringify(flat) + '\n');
+
+  let trace = traces.get(span.traceId);
+  if (!trace) {
+    trace = { spans: [] };
+    traces.set(span.traceId, trace);
+  }
+  trace.spans.push({ ...flat, startMs, endMs });
+  clearTimeout(trace.timer);
+  trace.timer = setTimeout(() => summarize(span.traceId), SETTLE_MS);
+}
+
+function summarize(traceId) {
+  const { spans } = traces.get(traceId);
+  traces.delete(traceId);
+
+  const start = Math.min(...spans.map((span) => span.startMs));
+  const end = Math.max(...spans.map((span) => span.endMs));
+  const services = [...new Set(spans.map((span) => span.service))].join(',');
+  const failed = spans.filter((span) => span.status === 'error').length;
+  const slowest = spans
+    .filter((span) => span.parentSpanId)
+    .sort((a, b) => b.durationMs - a.durationMs)
+    .slice(0, 3)
+    .map((span) => `${span.service}:${span.name} ${span.durationMs.toFixed(1)}ms`);
+  console.log(
+    `${traceId} ${(end - start).toFixed(1)}ms ${spans.length} spans [${services}]` +
+    `${failed > 0 ? ` ${failed} failed` : ''} slowest: ${slowest.join(', ')}`
+  );
+}
+
+const server = http.createServer((req, res) => {
+  if (req.method !== 'POST' || req.url !== '/v1/traces') {
+    res.writeHead(404).end();
+    return;
+  }
+
+  const chunks = [];
+  req.on('data', (chunk) => chunks.push(chunk));
+  req.on('end', () => {
+    try {
+      const body = JSON.parse(Buffer.concat(chunks).toString());
+      for (const resourceSpans of body.resourceSpans || []) {
+        const service = attributes(resourceSpans.resource && resourceSpans.resource.attributes)['service.name'];
+        for (const scopeSpans of resourceSpans.scopeSpans || []) {
+          for (const span of scopeSpans.spans || []) {
+            record(service, span);
+          }
+        }
+      }
+      res.writeHead(200, { 'Content-Type': 'application/json' }).end('{}');
+    } catch (error) {
+      console.error('Invalid export:', error.message);
+      res.writeHead(400).end();
+    }
+  });
+});
+
+server.listen(PORT, () => {
+  console.log(`Trace collector listening on :${PORT}/v1/traces, writing ${FILE}`);
+});
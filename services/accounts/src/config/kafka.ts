@@ -0,0 +1,17 @@
+import { Kafka } from 'kafkajs';
+import dotenv from 'dotenv';
+
+dotenv.config();
+
+const LEDGER_EVENTS_TOPIC = process.env.LEDGER_EVENTS_TOPIC || 'ledger-events';
+const BALANCE_CACHE_GROUP_ID = process.env.BALANCE_CACHE_GROUP_ID || 'accounts-balance-cache';
+
+const kafka = new Kafka({
+  clientId: 'accounts-service',
+  brokers: [process.env.KAFKA_BROKER || 'localhost:9092'],
+});
+
+// Keeps cached balances in step with postings made by other services
+const balanceConsumer = kafka.consumer({ groupId: BALANCE_CACHE_GROUP_ID });
+
+export { kafka, balanceConsumer, LEDGER_EVENTS_TOPIC, BALANCE_CACHE_GROUP_ID };
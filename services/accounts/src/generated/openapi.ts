@@ -0,0 +1,347 @@
+// Generated by scripts/generate_openapi.js from openapi/openapi.yaml; do not edit.
+// Run `npm run generate-openapi` in scripts after changing the spec.
+
+export type Account = { id: number; account_number: string; account_type: string; balance: Decimal; currency: string; status: string; created_at: string | Date };
+export type Decimal = string;
+export type ListAccountsResponse = { accounts?: Array<Account> };
+export type GetAccountBalancesRequest = { accountIds: Array<number> };
+export type GetAccountBalancesResponse = { balances?: Array<{ id?: number; balance?: Decimal; currency?: string }>; notFound?: Array<number> };
+export type GetAccountBalanceResponse = { balance?: Decimal; currency?: string };
+export type DepositFundsRequest = { amount: number; description?: string };
+export type DepositFundsResponse = { message?: string; transactionId?: number; newBalance?: Decimal; createdAt?: string | Date };
+export type WithdrawFundsRequest = { amount: number; description?: string };
+export type WithdrawFundsResponse = { message?: string; transactionId?: number; newBalance?: Decimal; createdAt?: string | Date };
+
+// Strings without characters JSON must escape are written as they are
+const PLAIN_STRING = /^[\x20\x21\x23-\x5b\x5d-\x7e]*$/;
+
+function fallback(value: unknown): string {
+  const json = JSON.stringify(value);
+  return json === undefined ? 'null' : json;
+}
+
+function asString(value: unknown): string {
+  if (typeof value !== 'string') {
+    return fallback(value);
+  }
+  return value.length < 256 && PLAIN_STRING.test(value) ? '"' + value + '"' : JSON.stringify(value);
+}
+
+function asNumber(value: unknown): string {
+  return typeof value === 'number' && Number.isFinite(value) ? String(value) : fallback(value);
+}
+
+function asDateTime(value: unknown): string {
+  if (value instanceof Date && !Number.isNaN(value.getTime())) {
+    return '"' + value.toISOString() + '"';
+  }
+  return asString(value);
+}
+
+/**
+ * Response body of type ListAccountsResponse as JSON
+ */
+export function serializeListAccountsResponse(value: ListAccountsResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["accounts"];
+    if (v3 !== undefined) {
+      json += s2 + "\"accounts\":";
+      s2 = ',';
+      if (Array.isArray(v3)) {
+        json += '[';
+        for (let i4 = 0; i4 < v3.length; i4++) {
+          if (i4 > 0) json += ',';
+          const v5 = v3[i4];
+          if (v5 !== null && typeof v5 === 'object') {
+            const o6 = v5 as Record<string, unknown>;
+            let s7 = '{';
+            const v8 = o6["id"];
+            if (v8 !== undefined) {
+              json += s7 + "\"id\":";
+              s7 = ',';
+              json += asNumber(v8);
+            }
+            const v9 = o6["account_number"];
+            if (v9 !== undefined) {
+              json += s7 + "\"account_number\":";
+              s7 = ',';
+              json += asString(v9);
+            }
+            const v10 = o6["account_type"];
+            if (v10 !== undefined) {
+              json += s7 + "\"account_type\":";
+              s7 = ',';
+              json += asString(v10);
+            }
+            const v11 = o6["balance"];
+            if (v11 !== undefined) {
+              json += s7 + "\"balance\":";
+              s7 = ',';
+              json += asString(v11);
+            }
+            const v12 = o6["currency"];
+            if (v12 !== undefined) {
+              json += s7 + "\"currency\":";
+              s7 = ',';
+              json += asString(v12);
+            }
+            const v13 = o6["status"];
+            if (v13 !== undefined) {
+              json += s7 + "\"status\":";
+              s7 = ',';
+              json += asString(v13);
+            }
+            const v14 = o6["created_at"];
+            if (v14 !== undefined) {
+              json += s7 + "\"created_at\":";
+              s7 = ',';
+              json += asDateTime(v14);
+            }
+            json += s7 === '{' ? '{}' : '}';
+          } else {
+            json += fallback(v5);
+          }
+        }
+        json += ']';
+      } else {
+        json += fallback(v3);
+      }
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
+
+/**
+ * Whether a request body matches GetAccountBalancesRequest
+ */
+export function validateGetAccountBalancesRequest(data: unknown): data is GetAccountBalancesRequest {
+  if (typeof data !== 'object' || data === null || Array.isArray(data)) return false;
+  const o1 = data as Record<string, unknown>;
+  const v2 = o1["accountIds"];
+  if (v2 === undefined) return false;
+  if (!Array.isArray(v2)) return false;
+  if (v2.length < 1) return false;
+  for (let i3 = 0; i3 < v2.length; i3++) {
+    const v4 = v2[i3];
+    if (typeof v4 !== 'number' || !Number.isInteger(v4)) return false;
+    if (v4 < 1) return false;
+    if (v4 > 2147483647) return false;
+  }
+  return true;
+}
+
+/**
+ * Response body of type GetAccountBalancesResponse as JSON
+ */
+export function serializeGetAccountBalancesResponse(value: GetAccountBalancesResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["balances"];
+    if (v3 !== undefined) {
+      json += s2 + "\"balances\":";
+      s2 = ',';
+      if (Array.isArray(v3)) {
+        json += '[';
+        for (let i4 = 0; i4 < v3.length; i4++) {
+          if (i4 > 0) json += ',';
+          const v5 = v3[i4];
+          if (v5 !== null && typeof v5 === 'object') {
+            const o6 = v5 as Record<string, unknown>;
+            let s7 = '{';
+            const v8 = o6["id"];
+            if (v8 !== undefined) {
+              json += s7 + "\"id\":";
+              s7 = ',';
+              json += asNumber(v8);
+            }
+            const v9 = o6["balance"];
+            if (v9 !== undefined) {
+              json += s7 + "\"balance\":";
+              s7 = ',';
+              json += asString(v9);
+            }
+            const v10 = o6["currency"];
+            if (v10 !== undefined) {
+              json += s7 + "\"currency\":";
+              s7 = ',';
+              json += asString(v10);
+            }
+            json += s7 === '{' ? '{}' : '}';
+          } else {
+            json += fallback(v5);
+          }
+        }
+        json += ']';
+      } else {
+        json += fallback(v3);
+      }
+    }
+    const v11 = o1["notFound"];
+    if (v11 !== undefined) {
+      json += s2 + "\"notFound\":";
+      s2 = ',';
+      if (Array.isArray(v11)) {
+        json += '[';
+        for (let i12 = 0; i12 < v11.length; i12++) {
+          if (i12 > 0) json += ',';
+          const v13 = v11[i12];
+          json += asNumber(v13);
+        }
+        json += ']';
+      } else {
+        json += fallback(v11);
+      }
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
+
+/**
+ * Response body of type GetAccountBalanceResponse as JSON
+ */
+export function serializeGetAccountBalanceResponse(value: GetAccountBalanceResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["balance"];
+    if (v3 !== undefined) {
+      json += s2 + "\"balance\":";
+      s2 = ',';
+      json += asString(v3);
+    }
+    const v4 = o1["currency"];
+    if (v4 !== undefined) {
+      json += s2 + "\"currency\":";
+      s2 = ',';
+      json += asString(v4);
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
+
+/**
+ * Whether a request body matches DepositFundsRequest
+ */
+export function validateDepositFundsRequest(data: unknown): data is DepositFundsRequest {
+  if (typeof data !== 'object' || data === null || Array.isArray(data)) return false;
+  const o1 = data as Record<string, unknown>;
+  const v2 = o1["amount"];
+  if (v2 === undefined) return false;
+  if (typeof v2 !== 'number' || !Number.isFinite(v2)) return false;
+  if (v2 <= 0) return false;
+  const v3 = o1["description"];
+  if (v3 !== undefined) {
+    if (typeof v3 !== 'string') return false;
+  }
+  return true;
+}
+
+/**
+ * Response body of type DepositFundsResponse as JSON
+ */
+export function serializeDepositFundsResponse(value: DepositFundsResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["message"];
+    if (v3 !== undefined) {
+      json += s2 + "\"message\":";
+      s2 = ',';
+      json += asString(v3);
+    }
+    const v4 = o1["transactionId"];
+    if (v4 !== undefined) {
+      json += s2 + "\"transactionId\":";
+      s2 = ',';
+      json += asNumber(v4);
+    }
+    const v5 = o1["newBalance"];
+    if (v5 !== undefined) {
+      json += s2 + "\"newBalance\":";
+      s2 = ',';
+      json += asString(v5);
+    }
+    const v6 = o1["createdAt"];
+    if (v6 !== undefined) {
+      json += s2 + "\"createdAt\":";
+      s2 = ',';
+      json += asDateTime(v6);
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
+
+/**
+ * Whether a request body matches WithdrawFundsRequest
+ */
+export function validateWithdrawFundsRequest(data: unknown): data is WithdrawFundsRequest {
+  if (typeof data !== 'object' || data === null || Array.isArray(data)) return false;
+  const o1 = data as Record<string, unknown>;
+  const v2 = o1["amount"];
+  if (v2 === undefined) return false;
+  if (typeof v2 !== 'number' || !Number.isFinite(v2)) return false;
+  if (v2 <= 0) return false;
+  const v3 = o1["description"];
+  if (v3 !== undefined) {
+    if (typeof v3 !== 'string') return false;
+  }
+  return true;
+}
+
+/**
+ * Response body of type WithdrawFundsResponse as JSON
+ */
+export function serializeWithdrawFundsResponse(value: WithdrawFundsResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["message"];
+    if (v3 !== undefined) {
+      json += s2 + "\"message\":";
+      s2 = ',';
+      json += asString(v3);
+    }
+    const v4 = o1["transactionId"];
+    if (v4 !== undefined) {
+      json += s2 + "\"transactionId\":";
+      s2 = ',';
+      json += asNumber(v4);
+    }
+    const v5 = o1["newBalance"];
+    if (v5 !== undefined) {
+      json += s2 + "\"newBalance\":";
+      s2 = ',';
+      json += asString(v5);
+    }
+    const v6 = o1["createdAt"];
+    if (v6 !== undefined) {
+      json += s2 + "\"createdAt\":";
+      s2 = ',';
+      json += asDateTime(v6);
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
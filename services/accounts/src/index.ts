@@ -5,26 +5,67 @@ import dotenv from 'dotenv';
 import { accountsRouter } from './routes/accounts';
 import { healthRouter } from './routes/health';
 import { authenticateToken } from './middleware/auth';
+import { redisClient } from './config/redis';
+import { startBalanceEventListener } from './utils/balance-events';
+import { startOwnershipListener } from './utils/account-ownership';
+import { httpMetrics, metricsHandler } from './utils/http-metrics';
+import { startRuntimeMetrics } from './utils/runtime-metrics';
+import { requestTracing } from './utils/request-tracing';
+import { initTracing } from './utils/tracing';
+import { runClustered } from './utils/cluster';
+import { requestDeadline } from './utils/request-deadline';
+import { admissionControl } from './utils/admission-control';
+import { startHealthMonitor } from './utils/health-monitor';
 
 dotenv.config();
 
-const app = express();
-const PORT = process.env.PORT || 3002;
+// Each worker, or the only process when WEB_CONCURRENCY is 1, runs the whole app
+function startWorker(): void {
+  const app = express();
+  const PORT = process.env.PORT || 3002;
 
-// Middleware
-app.use(helmet());
-app.use(cors());
-app.use(express.json());
+  // Connect to Redis for the balance cache
+  redisClient.connect().catch(console.error);
 
-// Routes
-app.use('/accounts', authenticateToken, accountsRouter);
-app.use('/health', healthRouter);
+  // Follow account ownership changes for the authorization cache
+  startOwnershipListener().catch(console.error);
 
-// Root endpoint
-app.get('/', (req, res) => {
-  res.json({ message: 'Accounts Service is running' });
-});
+  // Keep cached balances in step with postings from other services
+  startBalanceEventListener().catch((error) => {
+    console.error('Error starting balance event listener:', error);
+  });
 
-app.listen(PORT, () => {
-  console.log(`Accounts service running on port ${PORT}`);
-});
\ No newline at end of file
+  // Event-loop, GC, memory and pool metrics for /metrics
+  startRuntimeMetrics();
+
+  // Check dependencies in the background; /health serves the last results
+  startHealthMonitor();
+
+  // Export tail-sampled traces under the service name
+  initTracing('accounts-service');
+
+  // Middleware
+  app.use(httpMetrics);
+  app.use(requestTracing);
+  app.use(requestDeadline);
+  app.use(admissionControl);
+  app.use(helmet());
+  app.use(cors());
+  app.use(express.json());
+
+  // Routes
+  app.use('/accounts', authenticateToken, accountsRouter);
+  app.use('/health', healthRouter);
+  app.get('/metrics', metricsHandler);
+
+  // Root endpoint
+  app.get('/', (req, res) => {
+    res.json({ message: 'Accounts Service is running' });
+  });
+
+  app.listen(PORT, () => {
+    console.log(`Accounts service running on port ${PORT}`);
+  });
+}
+
+runClustered('accounts-service', startWorker);
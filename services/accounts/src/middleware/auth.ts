@@ -1,5 +1,98 @@
 import { Request, Response, NextFunction } from 'express';
 import * as jwt from 'jsonwebtoken';
+import dotenv from 'dotenv';
+
+dotenv.config();
+
+const JWT_SECRET = process.env.JWT_SECRET || 'default_secret';
+const TOKEN_CACHE_SIZE = parseInt(process.env.TOKEN_CACHE_SIZE || '10000', 10);
+// Upper bound on how long a verified token is trusted without re-verification
+const TOKEN_CACHE_MAX_TTL_MS = parseInt(process.env.TOKEN_CACHE_MAX_TTL_SECONDS || '300', 10) * 1000;
+
+interface TokenClaims {
+  userId: number;
+  email: string;
+  roles: string[];
+  exp?: number;
+}
+
+interface CachedToken {
+  token: string;
+  claims: TokenClaims;
+  expiresAt: number;
+}
+
+/**
+ * Bounded LRU of verified tokens
+ * Entries are keyed by the token's signature segment, itself an HMAC digest of
+ * the token, and the full token is compared on lookup. A Map keeps insertion
+ * order, so re-inserting on hit makes its first key the least recently used.
+ */
+class TokenCache {
+  private entries = new Map<string, CachedToken>();
+  private hits = 0;
+  private misses = 0;
+  private evictions = 0;
+  private expirations = 0;
+
+  constructor(private maxSize: number) {}
+
+  get(key: string, token: string): TokenClaims | null {
+    const entry = this.entries.get(key);
+    if (!entry || entry.token !== token) {
+      this.misses += 1;
+      return null;
+    }
+
+    this.entries.delete(key);
+    if (entry.expiresAt <= Date.now()) {
+      this.expirations += 1;
+      this.misses += 1;
+      return null;
+    }
+
+    this.entries.set(key, entry);
+    this.hits += 1;
+    return entry.claims;
+  }
+
+  set(key: string, token: string, claims: TokenClaims): void {
+    if (this.maxSize <= 0) {
+      return;
+    }
+
+    const now = Date.now();
+    const expiresAt = Math.min(claims.exp ? claims.exp * 1000 : Infinity, now + TOKEN_CACHE_MAX_TTL_MS);
+    this.entries.delete(key);
+    this.entries.set(key, { token, claims, expiresAt });
+
+    if (this.entries.size > this.maxSize) {
+      const oldest = this.entries.keys().next().value as string;
+      this.entries.delete(oldest);
+      this.evictions += 1;
+    }
+  }
+
+  stats() {
+    return {
+      size: this.entries.size,
+      maxSize: this.maxSize,
+      hits: this.hits,
+      misses: this.misses,
+      evictions: this.evictions,
+      expirations: this.expirations
+    };
+  }
+}
+
+const tokenCache = new TokenCache(TOKEN_CACHE_SIZE);
+
+/**
+ * Hit, miss and eviction counts of the verified-token cache
+ */
+export function tokenCacheStats() {
+  return tokenCache.stats();
+}
 
 export const authenticateToken = (req: Request, res: Response, next: NextFunction): void => {
   const authHeader = req.headers['authorization'];
@@ -10,16 +103,21 @@ export const authenticateToken = (req: Request, res: Response, next: NextFunctio
     return;
   }
 
-  const jwtSecret = process.env.JWT_SECRET || 'default_secret';
+  const signature = token.slice(token.lastIndexOf('.') + 1);
+  let decoded = tokenCache.get(signature, token);
 
-  try {
-    const decoded = jwt.verify(token, jwtSecret) as { userId: number; email: string; roles: string[] };
-    (req as any).userId = decoded.userId;
-    (req as any).userEmail = decoded.email;
-    (req as any).userRoles = decoded.roles;
-    next();
-  } catch (error) {
-    res.status(403).json({ error: 'Invalid or expired token' });
-    return;
+  if (!decoded) {
+    try {
+      decoded = jwt.verify(token, JWT_SECRET) as TokenClaims;
+      tokenCache.set(signature, token, decoded);
+    } catch (error) {
+      res.status(403).json({ error: 'Invalid or expired token' });
+      return;
+    }
   }
-};
\ No newline at end of file
+
+  (req as any).userId = decoded.userId;
+  (req as any).userEmail = decoded.email;
+  (req as any).userRoles = decoded.roles;
+  next();
+};
@@ -1,8 +1,37 @@
 import { Router, Request, Response } from 'express';
-import { pool } from '../config/database';
+import { pool, prepare, prepared } from '../config/database';
+import { cacheBalance, getCachedBalance } from '../utils/balance-cache';
+import { postDeposit, postWithdrawal } from '../utils/account-posting';
+import { requireAccountOwner } from '../utils/account-ownership';
+import { notModified, weakEtag } from '../utils/etag';
+import { singleFlight } from '../utils/single-flight';
+import {
+  validateDepositFundsRequest,
+  validateWithdrawFundsRequest,
+  validateGetAccountBalancesRequest,
+  serializeListAccountsResponse,
+  serializeGetAccountBalancesResponse,
+  serializeGetAccountBalanceResponse,
+  serializeDepositFundsResponse,
+  serializeWithdrawFundsResponse
+} from '../generated/openapi';
 
 const router = Router();
 
+const BALANCE_BY_ID = prepare('accounts.balance_by_id', 'SELECT balance, currency, version FROM accounts WHERE id = $1');
+const BALANCES_BY_IDS = prepare(
+  'accounts.balances_by_ids',
+  'SELECT id, balance, currency, version FROM accounts WHERE id = ANY($1) AND user_id = $2'
+);
+
+// Largest id list accepted by POST /accounts/balances
+const BALANCE_BATCH_MAX_ACCOUNTS = parseInt(process.env.BALANCE_BATCH_MAX_ACCOUNTS || '100', 10);
+
+// The listing changes when an account is added or removed, its balance
+// version moves, or any other column is updated (updated_at)
+const accountsEtag = (userId: number, count: number, versions: number, updatedMs: number) =>
+  weakEtag('accounts', userId, count, versions, updatedMs);
+
 // Get user accounts
 router.get('/', async (req: Request, res: Response) => {
   try {
@@ -11,24 +40,94 @@ router.get('/', async (req: Request, res: Response) => {
     
     console.log(`Fetching accounts for user ID: ${userId}`);
     
-    const result = await pool.query(
-      `SELECT id, account_number, account_type, balance, currency, status, created_at 
-       FROM accounts 
-       WHERE user_id = $1`,
-      [userId]
-    );
+    // Revalidation only needs the listing's fingerprint, not the rows
+    if (req.headers['if-none-match']) {
+      const fingerprint = await pool.query(
+        `SELECT COUNT(*) AS count, COALESCE(SUM(version), 0) AS versions,
+                COALESCE(MAX(floor(extract(epoch FROM updated_at) * 1000)), 0)::bigint AS updated_ms
+         FROM accounts 
+         WHERE user_id = $1`,
+        [userId]
+      );
+      const { count, versions, updated_ms } = fingerprint.rows[0];
+      if (notModified(req, res, 'GET /accounts', accountsEtag(userId, Number(count), Number(versions), Number(updated_ms)))) {
+        return res.status(304).end();
+      }
+    }
+    
+    // Concurrent listings for the same user share one query
+    const result = await singleFlight('GET /accounts', [userId], async () => {
+      const listing = await pool.query(
+        `SELECT id, account_number, account_type, balance, currency, status, created_at, version,
+                floor(extract(epoch FROM updated_at) * 1000)::bigint AS updated_ms 
+         FROM accounts 
+         WHERE user_id = $1`,
+        [userId]
+      );
+      
+      // Balance checks usually follow the account list, so warm the cache with it
+      await Promise.all(listing.rows.map((row) => cacheBalance(row.id, row)));
+      return listing;
+    });
     
     console.log(`Found ${result.rows.length} accounts for user ID ${userId}`);
     
-    return res.json({ accounts: result.rows });
+    const etag = accountsEtag(
+      userId,
+      result.rows.length,
+      result.rows.reduce((sum, row) => sum + Number(row.version), 0),
+      result.rows.reduce((latest, row) => Math.max(latest, Number(row.updated_ms)), 0)
+    );
+    // Checked again against the rows read, which may be newer than the fingerprint
+    if (notModified(req, res, 'GET /accounts', etag)) {
+      return res.status(304).end();
+    }
+    
+    // The serializer writes only the columns the Account schema lists, leaving out version and updated_ms
+    return res.type('json').send(serializeListAccountsResponse({ accounts: result.rows }));
   } catch (error) {
     console.error('Error fetching accounts:', error);
     return res.status(500).json({ error: 'Internal server error' });
   }
 });
 
+// Get the balances of several of the user's accounts in one request
+router.post('/balances', async (req: Request, res: Response) => {
+  try {
+    const userId = (req as any).userId;
+    
+    if (!validateGetAccountBalancesRequest(req.body)) {
+      return res.status(400).json({ error: 'accountIds must be a non-empty array of account IDs' });
+    }
+    
+    const ids = Array.from(new Set(req.body.accountIds));
+    if (ids.length > BALANCE_BATCH_MAX_ACCOUNTS) {
+      return res.status(400).json({ error: `At most ${BALANCE_BATCH_MAX_ACCOUNTS} accounts per request` });
+    }
+    
+    // One query resolves ownership and balances for the whole batch
+    const result = await pool.query(prepared(BALANCES_BY_IDS, [ids, userId]));
+    
+    await Promise.all(result.rows.map((row) => cacheBalance(row.id, row)));
+    
+    // Accounts that do not exist and accounts of other users are reported alike
+    const found = new Map<number, { balance: string; currency: string }>();
+    for (const row of result.rows) {
+      found.set(row.id, { balance: row.balance, currency: row.currency });
+    }
+    
+    return res.type('json').send(serializeGetAccountBalancesResponse({
+      balances: ids.filter((id) => found.has(id)).map((id) => ({ id, ...found.get(id) })),
+      notFound: ids.filter((id) => !found.has(id))
+    }));
+  } catch (error) {
+    console.error('Error fetching balances:', error);
+    return res.status(500).json({ error: 'Internal server error' });
+  }
+});
+
 // Get account balance
-router.get('/:id/balance', async (req: Request, res: Response) => {
+router.get('/:id/balance', requireAccountOwner('id'), async (req: Request, res: Response) => {
   try {
     const accountId = parseInt(req.params.id, 10);
     
@@ -36,16 +135,31 @@ router.get('/:id/balance', async (req: Request, res: Response) => {
       return res.status(400).json({ error: 'Invalid account ID' });
     }
     
-    const result = await pool.query(
-      'SELECT balance, currency FROM accounts WHERE id = $1',
-      [accountId]
-    );
+    // Concurrent reads of the same balance share one cache lookup and, on a miss, one query
+    const balance = await singleFlight('GET /accounts/:id/balance', [(req as any).userId, accountId], async () => {
+      const cached = await getCachedBalance(accountId);
+      if (cached) {
+        return cached;
+      }
+      
+      const result = await pool.query(prepared(BALANCE_BY_ID, [accountId]));
+      if (result.rows.length === 0) {
+        return null;
+      }
+      
+      await cacheBalance(accountId, result.rows[0]);
+      return result.rows[0] as { balance: string; currency: string; version: number };
+    });
     
-    if (result.rows.length === 0) {
+    if (!balance) {
       return res.status(404).json({ error: 'Account not found' });
     }
     
-    return res.json({ balance: result.rows[0].balance, currency: result.rows[0].currency });
+    if (notModified(req, res, 'GET /accounts/:id/balance', weakEtag('balance', accountId, balance.version))) {
+      return res.status(304).end();
+    }
+    
+    return res.type('json').send(serializeGetAccountBalanceResponse({ balance: balance.balance, currency: balance.currency }));
   } catch (error) {
     console.error('Error fetching balance:', error);
     return res.status(500).json({ error: 'Internal server error' });
@@ -53,64 +167,35 @@ router.get('/:id/balance', async (req: Request, res: Response) => {
 });
 
 // Deposit funds
-router.post('/:id/deposit', async (req: Request, res: Response) => {
+router.post('/:id/deposit', requireAccountOwner('id'), async (req: Request, res: Response) => {
   try {
     const accountId = parseInt(req.params.id, 10);
-    const { amount, description } = req.body;
     
     if (isNaN(accountId)) {
       return res.status(400).json({ error: 'Invalid account ID' });
     }
     
-    if (!amount || amount <= 0) {
+    if (!validateDepositFundsRequest(req.body)) {
       return res.status(400).json({ error: 'Valid amount is required' });
     }
+    const { amount, description } = req.body;
     
-    // Start transaction
-    const client = await pool.connect();
-    try {
-      await client.query('BEGIN');
-      
-      // Update account balance
-      const accountResult = await client.query(
-        'UPDATE accounts SET balance = balance + $1 WHERE id = $2 RETURNING balance',
-        [amount, accountId]
-      );
-      
-      if (accountResult.rows.length === 0) {
-        await client.query('ROLLBACK');
-        return res.status(404).json({ error: 'Account not found' });
-      }
-      
-      // Create transaction record
-      const transactionResult = await client.query(
-        `INSERT INTO transactions (account_id, transaction_type, amount, description, status) 
-         VALUES ($1, $2, $3, $4, $5) 
-         RETURNING id, created_at`,
-        [accountId, 'deposit', amount, description || 'Deposit', 'completed']
-      );
-      
-      // Create ledger entry (credit)
-      await client.query(
-        `INSERT INTO ledger (transaction_id, account_id, entry_type, amount, balance_after, description) 
-         VALUES ($1, $2, $3, $4, $5, $6)`,
-        [transactionResult.rows[0].id, accountId, 'credit', amount, accountResult.rows[0].balance, description || 'Deposit']
-      );
-      
-      await client.query('COMMIT');
-      
-      return res.status(201).json({
-        message: 'Deposit successful',
-        transactionId: transactionResult.rows[0].id,
-        newBalance: accountResult.rows[0].balance,
-        createdAt: transactionResult.rows[0].created_at
-      });
-    } catch (error) {
-      await client.query('ROLLBACK');
-      throw error;
-    } finally {
-      client.release();
+    // Balance update, transaction record and ledger entry (credit) in one statement
+    const result = await postDeposit(accountId, amount, description || 'Deposit');
+    
+    if (result.status !== 'posted') {
+      return res.status(404).json({ error: 'Account not found' });
     }
+    
+    // Write-through once committed, so the cache never holds an uncommitted balance
+    await cacheBalance(accountId, result);
+    
+    return res.status(201).type('json').send(serializeDepositFundsResponse({
+      message: 'Deposit successful',
+      transactionId: result.transactionId,
+      newBalance: result.balance,
+      createdAt: result.createdAt
+    }));
   } catch (error) {
     console.error('Error processing deposit:', error);
     return res.status(500).json({ error: 'Internal server error' });
@@ -118,77 +203,38 @@ router.post('/:id/deposit', async (req: Request, res: Response) => {
 });
 
 // Withdraw funds
-router.post('/:id/withdraw', async (req: Request, res: Response) => {
+router.post('/:id/withdraw', requireAccountOwner('id'), async (req: Request, res: Response) => {
   try {
     const accountId = parseInt(req.params.id, 10);
-    const { amount, description } = req.body;
     
     if (isNaN(accountId)) {
       return res.status(400).json({ error: 'Invalid account ID' });
     }
     
-    if (!amount || amount <= 0) {
+    if (!validateWithdrawFundsRequest(req.body)) {
       return res.status(400).json({ error: 'Valid amount is required' });
     }
+    const { amount, description } = req.body;
     
-    // Start transaction
-    const client = await pool.connect();
-    try {
-      await client.query('BEGIN');
-      
-      // Check current balance
-      const accountResult = await client.query(
-        'SELECT balance FROM accounts WHERE id = $1 FOR UPDATE',
-        [accountId]
-      );
-      
-      if (accountResult.rows.length === 0) {
-        await client.query('ROLLBACK');
-        return res.status(404).json({ error: 'Account not found' });
-      }
-      
-      const currentBalance = parseFloat(accountResult.rows[0].balance);
-      if (currentBalance < amount) {
-        await client.query('ROLLBACK');
-        return res.status(400).json({ error: 'Insufficient funds' });
-      }
-      
-      // Update account balance
-      const newBalance = currentBalance - amount;
-      await client.query(
-        'UPDATE accounts SET balance = $1 WHERE id = $2',
-        [newBalance, accountId]
-      );
-      
-      // Create transaction record
-      const transactionResult = await client.query(
-        `INSERT INTO transactions (account_id, transaction_type, amount, description, status) 
-         VALUES ($1, $2, $3, $4, $5) 
-         RETURNING id, created_at`,
-        [accountId, 'withdrawal', amount, description || 'Withdrawal', 'completed']
-      );
-      
-      // Create ledger entry (debit)
-      await client.query(
-        `INSERT INTO ledger (transaction_id, account_id, entry_type, amount, balance_after, description) 
-         VALUES ($1, $2, $3, $4, $5, $6)`,
-        [transactionResult.rows[0].id, accountId, 'debit', amount, newBalance, description || 'Withdrawal']
-      );
-      
-      await client.query('COMMIT');
-      
-      return res.status(201).json({
-        message: 'Withdrawal successful',
-        transactionId: transactionResult.rows[0].id,
-        newBalance: newBalance,
-        createdAt: transactionResult.rows[0].created_at
-      });
-    } catch (error) {
-      await client.query('ROLLBACK');
-      throw error;
-    } finally {
-      client.release();
+    // Funds check, balance update, transaction record and ledger entry (debit) in one statement
+    const result = await postWithdrawal(accountId, amount, description || 'Withdrawal');
+    
+    if (result.status === 'not_found') {
+      return res.status(404).json({ error: 'Account not found' });
     }
+    
+    if (result.status === 'insufficient_funds') {
+      return res.status(400).json({ error: 'Insufficient funds' });
+    }
+    
+    await cacheBalance(accountId, result);
+    
+    return res.status(201).type('json').send(serializeWithdrawFundsResponse({
+      message: 'Withdrawal successful',
+      transactionId: result.transactionId,
+      newBalance: result.balance,
+      createdAt: result.createdAt
+    }));
   } catch (error) {
     console.error('Error processing withdrawal:', error);
     return res.status(500).json({ error: 'Internal server error' });
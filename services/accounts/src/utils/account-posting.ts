@@ -0,0 +1,72 @@
+import { pool, prepare, prepared, PreparedStatement } from '../config/database';
+
+// Deposits and withdrawals each run as one statement: the balance update, the
+// transaction record and the ledger entry are chained CTEs, so the account row
+// is locked for a single round trip instead of a BEGIN ... COMMIT conversation.
+// The funds check is part of the UPDATE's WHERE clause and is re-evaluated on
+// the latest row version after waiting for a concurrent writer's lock.
+
+export type PostingResult =
+  | { status: 'posted'; balance: string; currency: string; version: string; transactionId: number; createdAt: Date }
+  | { status: 'not_found' }
+  | { status: 'insufficient_funds' };
+
+// The outer SELECT reads accounts from the statement's snapshot, so it tells a
+// missing account apart from one the UPDATE skipped for lack of funds
+const postingStatement = (balanceChange: string, entryType: string, transactionType: string) => `
+  WITH updated AS (
+    UPDATE accounts SET balance = ${balanceChange}
+    WHERE id = $1${entryType === 'debit' ? ' AND balance >= $2::numeric' : ''}
+    RETURNING id, balance, currency, version
+  ), recorded AS (
+    INSERT INTO transactions (account_id, transaction_type, amount, description, status)
+    SELECT id, '${transactionType}', $2::numeric, $3::text, 'completed' FROM updated
+    RETURNING id, account_id, created_at
+  ), posted AS (
+    INSERT INTO ledger (transaction_id, account_id, entry_type, amount, balance_after, description)
+    SELECT recorded.id, updated.id, '${entryType}', $2::numeric, updated.balance, $3::text
+    FROM recorded JOIN updated ON updated.id = recorded.account_id
+  )
+  SELECT EXISTS (SELECT 1 FROM accounts WHERE id = $1) AS account_exists,
+         updated.balance, updated.currency, updated.version,
+         recorded.id AS transaction_id, recorded.created_at
+  FROM (SELECT 1) AS input
+  LEFT JOIN updated ON true
+  LEFT JOIN recorded ON true`;
+
+const DEPOSIT_STATEMENT = prepare('accounts.post_deposit', postingStatement('balance + $2::numeric', 'credit', 'deposit'));
+const WITHDRAWAL_STATEMENT = prepare('accounts.post_withdrawal', postingStatement('balance - $2::numeric', 'debit', 'withdrawal'));
+
+async function post(statement: PreparedStatement, accountId: number, amount: number, description: string): Promise<PostingResult> {
+  const result = await pool.query(prepared(statement, [accountId, amount, description]));
+  const row = result.rows[0];
+
+  if (!row.account_exists) {
+    return { status: 'not_found' };
+  }
+  if (row.transaction_id === null) {
+    return { status: 'insufficient_funds' };
+  }
+  return {
+    status: 'posted',
+    balance: row.balance,
+    currency: row.currency,
+    version: row.version,
+    transactionId: row.transaction_id,
+    createdAt: row.created_at
+  };
+}
+
+/**
+ * Credit an account and record the deposit in one statement
+ */
+export function postDeposit(accountId: number, amount: number, description: string): Promise<PostingResult> {
+  return post(DEPOSIT_STATEMENT, accountId, amount, description);
+}
+
+/**
+ * Debit an account if it holds enough funds, recording the withdrawal in the same statement
+ */
+export function postWithdrawal(accountId: number, amount: number, description: string): Promise<PostingResult> {
+  return post(WITHDRAWAL_STATEMENT, accountId, amount, description);
+}
@@ -0,0 +1,151 @@
+import { redisClient } from '../config/redis';
+
+// Account balances cached in Redis, fronted by a short-lived in-process L1.
+// Every entry carries the account's balance version (accounts.version, bumped
+// by a trigger on each balance change) and writes only ever raise it, so a
+// slow writer holding an older balance cannot replace a newer one.
+// This file is kept identical in every service that posts to balances.
+
+const BALANCE_CACHE_TTL_SECONDS = parseInt(process.env.BALANCE_CACHE_TTL_SECONDS || '300', 10);
+// L1 entries are not invalidated across instances, so they live only briefly; 0 disables L1
+const BALANCE_L1_TTL_MS = parseInt(process.env.BALANCE_L1_TTL_MS || '1000', 10);
+const BALANCE_L1_SIZE = parseInt(process.env.BALANCE_L1_SIZE || '10000', 10);
+
+export interface CachedBalance {
+  balance: string;
+  currency: string;
+  version: number;
+}
+
+const balanceKey = (accountId: number) => `balance:${accountId}`;
+// Same text as pg returns for accounts.balance, DECIMAL(15,2), whatever the writer held
+const formatBalance = (balance: string | number) => Number(balance).toFixed(2);
+
+// Applies an entry only if it is newer than the cached one. With ARGV[4] set,
+// only existing entries are updated, for writers that do not know the currency.
+const SET_IF_NEWER_SCRIPT = `
+local current = redis.call('HGET', KEYS[1], 'version')
+if current and tonumber(current) >= tonumber(ARGV[1]) then
+  return 0
+end
+if not current and ARGV[4] == '1' then
+  return 0
+end
+redis.call('HSET', KEYS[1], 'version', ARGV[1], 'balance', ARGV[2])
+if ARGV[3] ~= '' then
+  redis.call('HSET', KEYS[1], 'currency', ARGV[3])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1`;
+
+const l1 = new Map<number, CachedBalance & { expiresAt: number }>();
+const stats = { l1Hits: 0, redisHits: 0, misses: 0, writes: 0, staleWritesRejected: 0, errors: 0 };
+
+function setL1(accountId: number, entry: CachedBalance): void {
+  if (BALANCE_L1_TTL_MS <= 0) {
+    return;
+  }
+  const current = l1.get(accountId);
+  if (current && current.version > entry.version) {
+    return;
+  }
+  l1.delete(accountId);
+  l1.set(accountId, { ...entry, expiresAt: Date.now() + BALANCE_L1_TTL_MS });
+  if (l1.size > BALANCE_L1_SIZE) {
+    l1.delete(l1.keys().next().value as number);
+  }
+}
+
+/**
+ * Cached balance of an account, or null on a miss
+ * Redis errors count as misses so callers fall back to the database.
+ */
+export async function getCachedBalance(accountId: number): Promise<CachedBalance | null> {
+  const local = l1.get(accountId);
+  if (local && local.expiresAt > Date.now()) {
+    stats.l1Hits += 1;
+    return { balance: local.balance, currency: local.currency, version: local.version };
+  }
+
+  if (redisClient.isReady) {
+    try {
+      const entry = await redisClient.hGetAll(balanceKey(accountId));
+      if (entry.version && entry.balance && entry.currency) {
+        const cached = { balance: entry.balance, currency: entry.currency, version: parseInt(entry.version, 10) };
+        setL1(accountId, cached);
+        stats.redisHits += 1;
+        return cached;
+      }
+    } catch (error) {
+      stats.errors += 1;
+      console.error('Balance cache read error:', error);
+    }
+  }
+
+  stats.misses += 1;
+  return null;
+}
+
+async function setIfNewer(accountId: number, version: number, balance: string, currency: string, updateOnly: boolean) {
+  if (!redisClient.isReady) {
+    return;
+  }
+  try {
+    const applied = Number(await redisClient.eval(SET_IF_NEWER_SCRIPT, {
+      keys: [balanceKey(accountId)],
+      arguments: [String(version), balance, currency, updateOnly ? '1' : '0', String(BALANCE_CACHE_TTL_SECONDS)]
+    }));
+    stats.writes += 1;
+    if (applied === 0 && !updateOnly) {
+      stats.staleWritesRejected += 1;
+    }
+  } catch (error) {
+    stats.errors += 1;
+    console.error('Balance cache write error:', error);
+  }
+}
+
+/**
+ * Store a balance read from or committed to the database
+ * Call after commit; the entry is ignored if a newer version is cached.
+ */
+export async function cacheBalance(accountId: number, entry: { balance: string | number; currency: string; version: string | number }): Promise<void> {
+  const normalized = { balance: formatBalance(entry.balance), currency: entry.currency, version: Number(entry.version) };
+  setL1(accountId, normalized);
+  await setIfNewer(accountId, normalized.version, normalized.balance, normalized.currency, false);
+}
+
+/**
+ * Drop an account's cached balance so the next read reloads it
+ */
+export async function invalidateBalance(accountId: number): Promise<void> {
+  l1.delete(accountId);
+  if (!redisClient.isReady) {
+    return;
+  }
+  try {
+    await redisClient.del(balanceKey(accountId));
+  } catch (error) {
+    stats.errors += 1;
+    console.error('Balance cache write error:', error);
+  }
+}
+
+/**
+ * Apply a balance change observed elsewhere, such as on ledger-events
+ * Only accounts already cached are updated, and only to a newer version.
+ */
+export async function applyBalanceChange(accountId: number, balance: string | number, version: number): Promise<void> {
+  const local = l1.get(accountId);
+  if (local && local.version < version) {
+    setL1(accountId, { balance: formatBalance(balance), currency: local.currency, version });
+  }
+  await setIfNewer(accountId, version, formatBalance(balance), '', true);
+}
+
+/**
+ * Hit rates and write outcomes of the balance cache
+ */
+export function balanceCacheStats() {
+  return { l1Size: l1.size, ...stats };
+}
@@ -0,0 +1,64 @@
+import { KafkaMessage } from 'kafkajs';
+import { balanceConsumer, LEDGER_EVENTS_TOPIC } from '../config/kafka';
+import { AVRO_CONTENT_TYPE, CODEC_HEADERS, decodeEvent } from './event-codec';
+import { applyBalanceChange, invalidateBalance } from './balance-cache';
+import { parseTraceparent, traceAsync } from './tracing';
+
+interface BalanceEvent {
+  accountId: number;
+  balanceAfter?: number;
+  version?: number;
+}
+
+function headerValue(message: KafkaMessage, name: string): string | undefined {
+  const value = message.headers?.[name];
+  return value === undefined ? undefined : value.toString();
+}
+
+function decodeBalanceEvent(message: KafkaMessage): BalanceEvent | null {
+  if (!message.value) {
+    return null;
+  }
+
+  try {
+    if (headerValue(message, CODEC_HEADERS.contentType) === AVRO_CONTENT_TYPE) {
+      const subject = headerValue(message, CODEC_HEADERS.subject) || 'ledger-event';
+      const version = parseInt(headerValue(message, CODEC_HEADERS.version) || '', 10);
+      return decodeEvent(subject, version, message.value) as unknown as BalanceEvent;
+    }
+    return JSON.parse(message.value.toString());
+  } catch (error) {
+    return null;
+  }
+}
+
+/**
+ * Follow ledger-events and apply each posted balance to the cache
+ * Postings are written through by the service that made them; this catches
+ * the ones whose write-through was lost. Events without a balance version,
+ * from producers predating it, drop the cached entry instead.
+ */
+export async function startBalanceEventListener(): Promise<void> {
+  await balanceConsumer.connect();
+  await balanceConsumer.subscribe({ topic: LEDGER_EVENTS_TOPIC, fromBeginning: false });
+
+  await balanceConsumer.run({
+    // Each event continues the trace of the transfer that published it
+    eachMessage: ({ message, partition }) => traceAsync(`kafka process ${LEDGER_EVENTS_TOPIC}`, {
+      kind: 'consumer',
+      parent: parseTraceparent(message.headers?.traceparent),
+      attributes: { 'messaging.system': 'kafka', 'messaging.source': LEDGER_EVENTS_TOPIC, 'messaging.kafka.partition': partition }
+    }, async () => {
+      const event = decodeBalanceEvent(message);
+      if (!event || !event.accountId) {
+        return;
+      }
+
+      if (event.balanceAfter !== undefined && event.version !== undefined) {
+        await applyBalanceChange(event.accountId, event.balanceAfter, event.version);
+      } else {
+        await invalidateBalance(event.accountId);
+      }
+    })
+  });
+}
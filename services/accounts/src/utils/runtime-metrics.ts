@@ -0,0 +1,80 @@
+import { monitorEventLoopDelay, PerformanceObserver, constants } from 'perf_hooks';
+import { Gauge, Histogram, registry } from './metrics';
+import { poolTelemetry } from './pool-telemetry';
+
+// Process-level metrics for the registry: event-loop lag, GC pauses, memory
+// and database pool occupancy. Lag is sampled by a histogram timer inside
+// libuv and GC pauses come from performance entries, so neither adds work to
+// request handling; gauges are refreshed when /metrics is scraped.
+// This file is kept identical in every service.
+
+const EVENT_LOOP_RESOLUTION_MS = 10;
+
+const eventLoopLag = new Gauge('nodejs_eventloop_lag_seconds', 'Event-loop delay since the previous scrape, by quantile');
+const gcDuration = new Histogram(
+  'nodejs_gc_duration_seconds',
+  'Garbage collection pauses, by kind',
+  [0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1]
+);
+const heapUsed = new Gauge('nodejs_heap_used_bytes', 'V8 heap in use');
+const heapTotal = new Gauge('nodejs_heap_total_bytes', 'V8 heap allocated');
+const externalMemory = new Gauge('nodejs_external_memory_bytes', 'Memory held by C++ objects bound to JavaScript objects');
+const residentMemory = new Gauge('process_resident_memory_bytes', 'Resident set size');
+const poolClients = new Gauge('db_pool_clients', 'Database pool clients, by state');
+
+const GC_KINDS: Record<number, string> = {
+  [constants.NODE_PERFORMANCE_GC_MAJOR]: 'major',
+  [constants.NODE_PERFORMANCE_GC_MINOR]: 'minor',
+  [constants.NODE_PERFORMANCE_GC_INCREMENTAL]: 'incremental',
+  [constants.NODE_PERFORMANCE_GC_WEAKCB]: 'weakcb'
+};
+
+let started = false;
+
+/**
+ * Start sampling event-loop lag and GC pauses into the metrics registry
+ */
+export function startRuntimeMetrics(): void {
+  if (started) {
+    return;
+  }
+  started = true;
+
+  const lag = monitorEventLoopDelay({ resolution: EVENT_LOOP_RESOLUTION_MS });
+  lag.enable();
+
+  const gcSeries = new Map<string, { observe(value: number): void }>();
+  const observer = new PerformanceObserver((list) => {
+    for (const entry of list.getEntries()) {
+      const kind = GC_KINDS[(entry as any).detail?.kind] || 'other';
+      let series = gcSeries.get(kind);
+      if (!series) {
+        series = gcDuration.labels({ kind });
+        gcSeries.set(kind, series);
+      }
+      series.observe(entry.duration / 1000);
+    }
+  });
+  observer.observe({ entryTypes: ['gc'] });
+
+  registry.onCollect(() => {
+    // The delay histogram reports nanoseconds and includes the sampling resolution
+    const overshoot = (value: number) => Math.max(0, value / 1e9 - EVENT_LOOP_RESOLUTION_MS / 1000);
+    eventLoopLag.set(overshoot(lag.percentile(50)), { quantile: '0.5' });
+    eventLoopLag.set(overshoot(lag.percentile(99)), { quantile: '0.99' });
+    eventLoopLag.set(overshoot(lag.max), { quantile: '1' });
+    lag.reset();
+
+    const memory = process.memoryUsage();
+    heapUsed.set(memory.heapUsed);
+    heapTotal.set(memory.heapTotal);
+    externalMemory.set(memory.external);
+    residentMemory.set(memory.rss);
+
+    const pool = poolTelemetry();
+    poolClients.set(pool.totalCount, { state: 'total' });
+    poolClients.set(pool.idleCount, { state: 'idle' });
+    poolClients.set(pool.waitingCount, { state: 'waiting' });
+    poolClients.set(pool.heldCount, { state: 'held' });
+  });
+}
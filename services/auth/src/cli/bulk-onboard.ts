@@ -0,0 +1,249 @@
+import fs from 'fs';
+import os from 'os';
+import readline from 'readline';
+import * as dotenv from 'dotenv';
+import { pool } from '../config/database';
+import { hashPassword } from '../utils/password-hasher';
+
+dotenv.config();
+
+const USAGE = `Usage:
+  npm run onboard -- <users.csv> [--report FILE] [--chunk-size N] [--concurrency N]
+
+  users.csv       Header row with email and password columns, optionally roles (separated by ;)
+  --report        Per-row results as JSON lines (default: <users.csv>.report.jsonl)
+  --chunk-size    Users inserted per statement (default: 1000)
+  --concurrency   Passwords hashed at once on the worker pool (default: 2 per core)`;
+
+// Length of users.email
+const MAX_EMAIL_LENGTH = 255;
+const EMAIL_PATTERN = /^[^\s@]+@[^\s@]+\.[^\s@]+$/;
+
+interface OnboardRow {
+  line: number;
+  email: string;
+  password: string;
+  roles: string[];
+}
+
+interface RowResult {
+  line: number;
+  email: string;
+  status: 'created' | 'error';
+  userId?: number;
+  accountNumber?: string;
+  error?: string;
+}
+
+function option(name: string): string | undefined {
+  const index = process.argv.indexOf(`--${name}`);
+  return index !== -1 ? process.argv[index + 1] : undefined;
+}
+
+/**
+ * Split a CSV line into fields, honouring double-quoted fields and "" escapes
+ */
+function parseCsvLine(line: string): string[] {
+  const fields: string[] = [];
+  let field = '';
+  let quoted = false;
+
+  for (let i = 0; i < line.length; i++) {
+    const char = line[i];
+    if (quoted) {
+      if (char === '"' && line[i + 1] === '"') {
+        field += '"';
+        i++;
+      } else if (char === '"') {
+        quoted = false;
+      } else {
+        field += char;
+      }
+    } else if (char === '"') {
+      quoted = true;
+    } else if (char === ',') {
+      fields.push(field);
+      field = '';
+    } else {
+      field += char;
+    }
+  }
+  fields.push(field);
+  return fields;
+}
+
+/**
+ * Run a task for every item with at most `limit` running at once
+ */
+async function mapWithConcurrency<T, R>(items: T[], limit: number, task: (item: T) => Promise<R>): Promise<R[]> {
+  const results: R[] = new Array(items.length);
+  let next = 0;
+
+  async function worker() {
+    while (next < items.length) {
+      const index = next++;
+      results[index] = await task(items[index]);
+    }
+  }
+
+  await Promise.all(Array.from({ length: Math.min(limit, items.length) }, () => worker()));
+  return results;
+}
+
+/**
+ * Insert users and their default accounts in one statement
+ * Emails that already exist are skipped by the user insert and reported as
+ * errors; every inserted user gets a checking account numbered from the
+ * account number sequence.
+ */
+async function insertUsers(rows: OnboardRow[], hashes: string[]): Promise<RowResult[]> {
+  const result = await pool.query(
+    `WITH input AS (
+       SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::text[]) AS i(email, password_hash, roles)
+     ), inserted_users AS (
+       INSERT INTO users (email, password_hash, roles)
+       SELECT email, password_hash, string_to_array(roles, ';') FROM input
+       ON CONFLICT (email) DO NOTHING
+       RETURNING id, email
+     ), inserted_accounts AS (
+       INSERT INTO accounts (user_id, account_number, account_type, balance, currency)
+       SELECT id, next_account_number(), 'checking', 0.00, 'USD' FROM inserted_users
+       RETURNING user_id, account_number
+     )
+     SELECT u.email, u.id AS user_id, a.account_number
+     FROM inserted_users u
+     JOIN inserted_accounts a ON a.user_id = u.id`,
+    [rows.map((row) => row.email), hashes, rows.map((row) => row.roles.join(';'))]
+  );
+
+  const created = new Map<string, { user_id: number; account_number: string }>();
+  for (const row of result.rows) {
+    created.set(row.email, row);
+  }
+  return rows.map((row): RowResult => {
+    const inserted = created.get(row.email);
+    return inserted
+      ? { line: row.line, email: row.email, status: 'created', userId: inserted.user_id, accountNumber: inserted.account_number }
+      : { line: row.line, email: row.email, status: 'error', error: 'User already exists' };
+  });
+}
+
+/**
+ * Hash and insert one chunk, isolating the failing rows if the chunk as a whole fails
+ */
+async function onboardChunk(rows: OnboardRow[], concurrency: number): Promise<RowResult[]> {
+  const hashes = await mapWithConcurrency(rows, concurrency, (row) => hashPassword(row.password));
+
+  try {
+    return await insertUsers(rows, hashes);
+  } catch (error) {
+    console.error(`Chunk starting at line ${rows[0].line} failed, inserting rows individually:`, error);
+    const results: RowResult[] = [];
+    for (let i = 0; i < rows.length; i++) {
+      try {
+        results.push(...(await insertUsers([rows[i]], [hashes[i]])));
+      } catch (rowError) {
+        results.push({
+          line: rows[i].line,
+          email: rows[i].email,
+          status: 'error',
+          error: rowError instanceof Error ? rowError.message : 'Insert failed'
+        });
+      }
+    }
+    return results;
+  }
+}
+
+async function main() {
+  const inputFile = process.argv[2];
+  if (!inputFile || inputFile.startsWith('--') || !fs.existsSync(inputFile)) {
+    console.log(USAGE);
+    process.exitCode = 1;
+    return;
+  }
+
+  const reportFile = option('report') || `${inputFile}.report.jsonl`;
+  const chunkSize = parseInt(option('chunk-size') || '1000', 10);
+  const concurrency = parseInt(option('concurrency') || String(os.cpus().length * 2), 10);
+  const report = fs.createWriteStream(reportFile);
+
+  const counts = { created: 0, error: 0 };
+  const record = (result: RowResult) => {
+    counts[result.status] += 1;
+    report.write(JSON.stringify(result) + '\n');
+  };
+
+  const lines = readline.createInterface({ input: fs.createReadStream(inputFile), crlfDelay: Infinity });
+  const seen = new Set<string>();
+  let columns: string[] | null = null;
+  let chunk: OnboardRow[] = [];
+  let lineNumber = 0;
+  const startedAt = Date.now();
+
+  for await (const line of lines) {
+    lineNumber += 1;
+    if (line.trim() === '') {
+      continue;
+    }
+
+    const fields = parseCsvLine(line);
+    if (!columns) {
+      columns = fields.map((name) => name.trim().toLowerCase());
+      if (!columns.includes('email') || !columns.includes('password')) {
+        throw new Error('Input must have a header row with email and password columns');
+      }
+      continue;
+    }
+
+    const header = columns;
+    const field = (name: string) => (header.indexOf(name) !== -1 ? fields[header.indexOf(name)] || '' : '');
+    const email = field('email').trim();
+    // Passwords are taken verbatim, surrounding spaces included
+    const password = field('password');
+    const roles = field('roles').split(';').map((role) => role.trim()).filter(Boolean);
+
+    // Rows that could never be inserted are reported without reaching the database
+    let error: string | null = null;
+    if (!email || !password) {
+      error = 'Email and password are required';
+    } else if (email.length > MAX_EMAIL_LENGTH || !EMAIL_PATTERN.test(email)) {
+      error = 'Invalid email';
+    } else if (seen.has(email)) {
+      error = 'Duplicate email in input';
+    }
+    if (error) {
+      record({ line: lineNumber, email, status: 'error', error });
+      continue;
+    }
+
+    seen.add(email);
+    chunk.push({ line: lineNumber, email, password, roles: roles.length > 0 ? roles : ['user'] });
+    if (chunk.length >= chunkSize) {
+      (await onboardChunk(chunk, concurrency)).forEach(record);
+      chunk = [];
+      console.log(`Processed ${counts.created + counts.error} rows (${counts.created} created)`);
+    }
+  }
+
+  if (chunk.length > 0) {
+    (await onboardChunk(chunk, concurrency)).forEach(record);
+  }
+
+  await new Promise((resolve) => report.end(resolve));
+  const seconds = (Date.now() - startedAt) / 1000;
+  console.log(
+    `Onboarding complete in ${seconds.toFixed(1)}s: ${counts.created} users created, ` +
+    `${counts.error} rows failed. Per-row results in ${reportFile}`
+  );
+  if (counts.error > 0) {
+    process.exitCode = 2;
+  }
+}
+
+main()
+  .catch((error) => {
+    console.error('Bulk onboarding failed:', error);
+    process.exitCode = 1;
+  })
+  .finally(() => pool.end());
@@ -0,0 +1,332 @@
+// Generated by scripts/generate_openapi.js from openapi/openapi.yaml; do not edit.
+// Run `npm run generate-openapi` in scripts after changing the spec.
+
+export type User = { id: number; email: string; roles: Array<string> };
+export type Account = { id: number; account_number: string; account_type: string; balance: Decimal; currency: string; status: string; created_at: string | Date };
+export type Decimal = string;
+export type RegisterUserRequest = { email: string; password: string; roles?: Array<string> };
+export type RegisterUserResponse = { user?: User; account?: Account };
+export type LoginUserRequest = { email: string; password: string };
+export type LoginUserResponse = { accessToken?: string; refreshToken?: string; user?: User };
+export type RefreshTokenRequest = { refreshToken: string };
+export type RefreshTokenResponse = { accessToken?: string; refreshToken?: string };
+export type LogoutUserRequest = { refreshToken: string };
+export type LogoutUserResponse = { message?: string };
+
+// Strings without characters JSON must escape are written as they are
+const PLAIN_STRING = /^[\x20\x21\x23-\x5b\x5d-\x7e]*$/;
+
+function fallback(value: unknown): string {
+  const json = JSON.stringify(value);
+  return json === undefined ? 'null' : json;
+}
+
+function asString(value: unknown): string {
+  if (typeof value !== 'string') {
+    return fallback(value);
+  }
+  return value.length < 256 && PLAIN_STRING.test(value) ? '"' + value + '"' : JSON.stringify(value);
+}
+
+function asNumber(value: unknown): string {
+  return typeof value === 'number' && Number.isFinite(value) ? String(value) : fallback(value);
+}
+
+function asDateTime(value: unknown): string {
+  if (value instanceof Date && !Number.isNaN(value.getTime())) {
+    return '"' + value.toISOString() + '"';
+  }
+  return asString(value);
+}
+
+/**
+ * Whether a request body matches RegisterUserRequest
+ */
+export function validateRegisterUserRequest(data: unknown): data is RegisterUserRequest {
+  if (typeof data !== 'object' || data === null || Array.isArray(data)) return false;
+  const o1 = data as Record<string, unknown>;
+  const v2 = o1["email"];
+  if (v2 === undefined) return false;
+  if (typeof v2 !== 'string') return false;
+  if (v2.length < 1) return false;
+  const v3 = o1["password"];
+  if (v3 === undefined) return false;
+  if (typeof v3 !== 'string') return false;
+  if (v3.length < 1) return false;
+  const v4 = o1["roles"];
+  if (v4 !== undefined) {
+    if (!Array.isArray(v4)) return false;
+    for (let i5 = 0; i5 < v4.length; i5++) {
+      const v6 = v4[i5];
+      if (typeof v6 !== 'string') return false;
+    }
+  }
+  return true;
+}
+
+/**
+ * Response body of type RegisterUserResponse as JSON
+ */
+export function serializeRegisterUserResponse(value: RegisterUserResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["user"];
+    if (v3 !== undefined) {
+      json += s2 + "\"user\":";
+      s2 = ',';
+      if (v3 !== null && typeof v3 === 'object') {
+        const o4 = v3 as Record<string, unknown>;
+        let s5 = '{';
+        const v6 = o4["id"];
+        if (v6 !== undefined) {
+          json += s5 + "\"id\":";
+          s5 = ',';
+          json += asNumber(v6);
+        }
+        const v7 = o4["email"];
+        if (v7 !== undefined) {
+          json += s5 + "\"email\":";
+          s5 = ',';
+          json += asString(v7);
+        }
+        const v8 = o4["roles"];
+        if (v8 !== undefined) {
+          json += s5 + "\"roles\":";
+          s5 = ',';
+          if (Array.isArray(v8)) {
+            json += '[';
+            for (let i9 = 0; i9 < v8.length; i9++) {
+              if (i9 > 0) json += ',';
+              const v10 = v8[i9];
+              json += asString(v10);
+            }
+            json += ']';
+          } else {
+            json += fallback(v8);
+          }
+        }
+        json += s5 === '{' ? '{}' : '}';
+      } else {
+        json += fallback(v3);
+      }
+    }
+    const v11 = o1["account"];
+    if (v11 !== undefined) {
+      json += s2 + "\"account\":";
+      s2 = ',';
+      if (v11 !== null && typeof v11 === 'object') {
+        const o12 = v11 as Record<string, unknown>;
+        let s13 = '{';
+        const v14 = o12["id"];
+        if (v14 !== undefined) {
+          json += s13 + "\"id\":";
+          s13 = ',';
+          json += asNumber(v14);
+        }
+        const v15 = o12["account_number"];
+        if (v15 !== undefined) {
+          json += s13 + "\"account_number\":";
+          s13 = ',';
+          json += asString(v15);
+        }
+        const v16 = o12["account_type"];
+        if (v16 !== undefined) {
+          json += s13 + "\"account_type\":";
+          s13 = ',';
+          json += asString(v16);
+        }
+        const v17 = o12["balance"];
+        if (v17 !== undefined) {
+          json += s13 + "\"balance\":";
+          s13 = ',';
+          json += asString(v17);
+        }
+        const v18 = o12["currency"];
+        if (v18 !== undefined) {
+          json += s13 + "\"currency\":";
+          s13 = ',';
+          json += asString(v18);
+        }
+        const v19 = o12["status"];
+        if (v19 !== undefined) {
+          json += s13 + "\"status\":";
+          s13 = ',';
+          json += asString(v19);
+        }
+        const v20 = o12["created_at"];
+        if (v20 !== undefined) {
+          json += s13 + "\"created_at\":";
+          s13 = ',';
+          json += asDateTime(v20);
+        }
+        json += s13 === '{' ? '{}' : '}';
+      } else {
+        json += fallback(v11);
+      }
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
+
+/**
+ * Whether a request body matches LoginUserRequest
+ */
+export function validateLoginUserRequest(data: unknown): data is LoginUserRequest {
+  if (typeof data !== 'object' || data === null || Array.isArray(data)) return false;
+  const o1 = data as Record<string, unknown>;
+  const v2 = o1["email"];
+  if (v2 === undefined) return false;
+  if (typeof v2 !== 'string') return false;
+  if (v2.length < 1) return false;
+  const v3 = o1["password"];
+  if (v3 === undefined) return false;
+  if (typeof v3 !== 'string') return false;
+  if (v3.length < 1) return false;
+  return true;
+}
+
+/**
+ * Response body of type LoginUserResponse as JSON
+ */
+export function serializeLoginUserResponse(value: LoginUserResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["accessToken"];
+    if (v3 !== undefined) {
+      json += s2 + "\"accessToken\":";
+      s2 = ',';
+      json += asString(v3);
+    }
+    const v4 = o1["refreshToken"];
+    if (v4 !== undefined) {
+      json += s2 + "\"refreshToken\":";
+      s2 = ',';
+      json += asString(v4);
+    }
+    const v5 = o1["user"];
+    if (v5 !== undefined) {
+      json += s2 + "\"user\":";
+      s2 = ',';
+      if (v5 !== null && typeof v5 === 'object') {
+        const o6 = v5 as Record<string, unknown>;
+        let s7 = '{';
+        const v8 = o6["id"];
+        if (v8 !== undefined) {
+          json += s7 + "\"id\":";
+          s7 = ',';
+          json += asNumber(v8);
+        }
+        const v9 = o6["email"];
+        if (v9 !== undefined) {
+          json += s7 + "\"email\":";
+          s7 = ',';
+          json += asString(v9);
+        }
+        const v10 = o6["roles"];
+        if (v10 !== undefined) {
+          json += s7 + "\"roles\":";
+          s7 = ',';
+          if (Array.isArray(v10)) {
+            json += '[';
+            for (let i11 = 0; i11 < v10.length; i11++) {
+              if (i11 > 0) json += ',';
+              const v12 = v10[i11];
+              json += asString(v12);
+            }
+            json += ']';
+          } else {
+            json += fallback(v10);
+          }
+        }
+        json += s7 === '{' ? '{}' : '}';
+      } else {
+        json += fallback(v5);
+      }
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
+
+/**
+ * Whether a request body matches RefreshTokenRequest
+ */
+export function validateRefreshTokenRequest(data: unknown): data is RefreshTokenRequest {
+  if (typeof data !== 'object' || data === null || Array.isArray(data)) return false;
+  const o1 = data as Record<string, unknown>;
+  const v2 = o1["refreshToken"];
+  if (v2 === undefined) return false;
+  if (typeof v2 !== 'string') return false;
+  if (v2.length < 1) return false;
+  return true;
+}
+
+/**
+ * Response body of type RefreshTokenResponse as JSON
+ */
+export function serializeRefreshTokenResponse(value: RefreshTokenResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["accessToken"];
+    if (v3 !== undefined) {
+      json += s2 + "\"accessToken\":";
+      s2 = ',';
+      json += asString(v3);
+    }
+    const v4 = o1["refreshToken"];
+    if (v4 !== undefined) {
+      json += s2 + "\"refreshToken\":";
+      s2 = ',';
+      json += asString(v4);
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
+
+/**
+ * Whether a request body matches LogoutUserRequest
+ */
+export function validateLogoutUserRequest(data: unknown): data is LogoutUserRequest {
+  if (typeof data !== 'object' || data === null || Array.isArray(data)) return false;
+  const o1 = data as Record<string, unknown>;
+  const v2 = o1["refreshToken"];
+  if (v2 === undefined) return false;
+  if (typeof v2 !== 'string') return false;
+  if (v2.length < 1) return false;
+  return true;
+}
+
+/**
+ * Response body of type LogoutUserResponse as JSON
+ */
+export function serializeLogoutUserResponse(value: LogoutUserResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["message"];
+    if (v3 !== undefined) {
+      json += s2 + "\"message\":";
+      s2 = ',';
+      json += asString(v3);
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
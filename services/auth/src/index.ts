@@ -4,26 +4,75 @@ import helmet = require('helmet');
 import dotenv = require('dotenv');
 import { authRouter } from './routes/auth';
 import { healthRouter } from './routes/health';
+import { redisClient } from './config/redis';
+import { startRevocationListener } from './utils/session-store';
+import { httpMetrics, metricsHandler } from './utils/http-metrics';
+import { startRuntimeMetrics } from './utils/runtime-metrics';
+import { requestTracing } from './utils/request-tracing';
+import { initTracing } from './utils/tracing';
+import { runClustered } from './utils/cluster';
+import { requestDeadline } from './utils/request-deadline';
+import { admissionControl } from './utils/admission-control';
+import { startHealthMonitor } from './utils/health-monitor';
 
 dotenv.config();
 
-const app: express.Application = express();
-const PORT = process.env.PORT || 3001;
+// TRUST_PROXY as Express's "trust proxy": a hop count, "true", or the
+// addresses and subnets of the proxies in front, e.g. "loopback, 10.0.0.0/8"
+function trustProxy(value: string | undefined): boolean | number | string {
+  if (!value || value === 'false') {
+    return false;
+  }
+  if (value === 'true') {
+    return true;
+  }
+  return /^\d+$/.test(value) ? parseInt(value, 10) : value;
+}
 
-// Middleware
-app.use(helmet.default());
-app.use(cors());
-app.use(express.json());
+// Each worker, or the only process when WEB_CONCURRENCY is 1, runs the whole app
+function startWorker(): void {
+  const app: express.Application = express();
+  const PORT = process.env.PORT || 3001;
 
-// Routes
-app.use('/auth', authRouter);
-app.use('/health', healthRouter);
+  // Connect to Redis, then follow refresh-token revocations from other instances
+  redisClient.connect()
+    .then(() => startRevocationListener())
+    .catch(console.error);
 
-// Root endpoint
-app.get('/', (req: express.Request, res: express.Response) => {
-  res.json({ message: 'Auth Service is running' });
-});
+  // Event-loop, GC, memory and pool metrics for /metrics
+  startRuntimeMetrics();
 
-app.listen(PORT, () => {
-  console.log(`Auth service running on port ${PORT}`);
-});
\ No newline at end of file
+  // Check dependencies in the background; /health serves the last results
+  startHealthMonitor();
+
+  // Export tail-sampled traces under the service name
+  initTracing('auth-service');
+
+  // Behind a load balancer, take req.ip from X-Forwarded-For so login limits key on the client
+  app.set('trust proxy', trustProxy(process.env.TRUST_PROXY));
+
+  // Middleware
+  app.use(httpMetrics);
+  app.use(requestTracing);
+  app.use(requestDeadline);
+  app.use(admissionControl);
+  app.use(helmet.default());
+  app.use(cors());
+  app.use(express.json());
+
+  // Routes
+  app.use('/auth', authRouter);
+  app.use('/health', healthRouter);
+  app.get('/metrics', metricsHandler);
+
+  // Root endpoint
+  app.get('/', (req: express.Request, res: express.Response) => {
+    res.json({ message: 'Auth Service is running' });
+  });
+
+  app.listen(PORT, () => {
+    console.log(`Auth service running on port ${PORT}`);
+  });
+}
+
+runClustered('auth-service', startWorker);
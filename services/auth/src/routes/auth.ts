@@ -1,20 +1,79 @@
 import { Router, Request, Response } from 'express';
-import * as bcrypt from 'bcryptjs';
 import * as jwt from 'jsonwebtoken';
-import { pool } from '../config/database';
+import { pool, prepare, prepared } from '../config/database';
+import { hashPassword, verifyPassword, needsRehash, HasherBusyError } from '../utils/password-hasher';
+import { checkLoginAttempts, recordLoginFailure, resetLoginAttempts, hashConcurrency } from '../utils/login-admission';
+import {
+  createFamily,
+  isFamilyRevoked,
+  rotateToken,
+  revokeFamily,
+  SessionStoreUnavailableError
+} from '../utils/session-store';
+import {
+  validateRegisterUserRequest,
+  validateLoginUserRequest,
+  validateRefreshTokenRequest,
+  validateLogoutUserRequest,
+  serializeRegisterUserResponse,
+  serializeLoginUserResponse,
+  serializeRefreshTokenResponse,
+  serializeLogoutUserResponse
+} from '../generated/openapi';
 
 const router = Router();
 
+const USER_BY_EMAIL = prepare(
+  'auth.user_by_email',
+  'SELECT id, email, password_hash, roles FROM users WHERE email = $1'
+);
+
+// Shed load when the hashing pool is saturated instead of queueing without bound
+function hasherBusy(res: Response) {
+  res.set('Retry-After', '1');
+  return res.status(503).json({ error: 'Service busy, please retry' });
+}
+
+// Failed logins count against the client's address; successful ones do not
+function invalidCredentials(res: Response, clientIp: string) {
+  recordLoginFailure(clientIp).catch((error) => {
+    console.error('Login failure counter error:', error);
+  });
+  return res.status(401).json({ error: 'Invalid credentials' });
+}
+
+// Refresh tokens cannot be issued or rotated without the session store
+function sessionStoreUnavailable(res: Response) {
+  res.set('Retry-After', '1');
+  return res.status(503).json({ error: 'Session store unavailable, please retry' });
+}
+
+interface RefreshTokenClaims {
+  userId: number;
+  email: string;
+  fid?: string;
+  jti?: string;
+}
+
+// Upgrade a hash produced with an outdated algorithm or cost, off the request path
+async function rehashPassword(userId: number, password: string, currentHash: string) {
+  const newHash = await hashPassword(password);
+  // Skip the update if the password changed since it was verified
+  await pool.query(
+    'UPDATE users SET password_hash = $1 WHERE id = $2 AND password_hash = $3',
+    [newHash, userId, currentHash]
+  );
+}
+
 // Register a new user
 router.post('/register', async (req: Request, res: Response) => {
   const client = await pool.connect();
   try {
-    const { email, password, roles = ['user'] } = req.body;
-
-    // Validate input
-    if (!email || !password) {
+    // Validate input against the request schema in openapi.yaml
+    if (!validateRegisterUserRequest(req.body)) {
       return res.status(400).json({ error: 'Email and password are required' });
     }
+    const { email, password, roles = ['user'] } = req.body;
 
     // Check if user already exists
     const existingUser = await client.query(
@@ -26,9 +85,8 @@ router.post('/register', async (req: Request, res: Response) => {
       return res.status(409).json({ error: 'User already exists' });
     }
 
-    // Hash password
-    const saltRounds = 10;
-    const hashedPassword = await bcrypt.hash(password, saltRounds);
+    // Hash password on the worker pool
+    const hashedPassword = await hashPassword(password);
 
     // Start transaction
     await client.query('BEGIN');
@@ -42,27 +100,27 @@ router.post('/register', async (req: Request, res: Response) => {
     const user = userResult.rows[0];
     const userId = user.id;
 
-    // Generate a unique account number
-    const accountNumber = `ACC${String(userId).padStart(3, '0')}${Math.floor(Math.random() * 1000)}`;
-
-    // Create a default checking account for the user
+    // Create a default checking account for the user, numbered from the account number sequence
     const accountResult = await client.query(
       `INSERT INTO accounts (user_id, account_number, account_type, balance, currency) 
-       VALUES ($1, $2, $3, $4, $5) 
+       VALUES ($1, next_account_number(), $2, $3, $4) 
        RETURNING id, account_number, account_type, balance, currency, status, created_at`,
-      [userId, accountNumber, 'checking', 0.00, 'USD']
+      [userId, 'checking', 0.00, 'USD']
     );
 
     const account = accountResult.rows[0];
 
     await client.query('COMMIT');
 
-    return res.status(201).json({ 
+    return res.status(201).type('json').send(serializeRegisterUserResponse({ 
       user,
       account
-    });
+    }));
   } catch (error) {
     await client.query('ROLLBACK');
+    if (error instanceof HasherBusyError) {
+      return hasherBusy(res);
+    }
     console.error('Registration error:', error);
     return res.status(500).json({ error: 'Internal server error' });
   } finally {
@@ -73,29 +131,53 @@ router.post('/register', async (req: Request, res: Response) => {
 // Login user
 router.post('/login', async (req: Request, res: Response) => {
   try {
+    // Validate input against the request schema in openapi.yaml
+    if (!validateLoginUserRequest(req.body)) {
+      return res.status(400).json({ error: 'Email and password are required' });
+    }
     const { email, password } = req.body;
 
-    // Validate input
-    if (!email || !password) {
-      return res.status(400).json({ error: 'Email and password are required' });
+    // Reject repeated attempts for the same email or from the same client before any work.
+    // req.ip is the client's address when TRUST_PROXY describes the proxies in front
+    const clientIp = req.ip || req.socket.remoteAddress || 'unknown';
+    const attempts = await checkLoginAttempts(email, clientIp);
+    if (!attempts.allowed) {
+      res.set('Retry-After', String(attempts.retryAfterSeconds));
+      return res.status(429).json({ error: 'Too many login attempts, please retry later' });
     }
 
     // Find user
-    const result = await pool.query(
-      'SELECT id, email, password_hash, roles FROM users WHERE email = $1',
-      [email]
-    );
+    const result = await pool.query(prepared(USER_BY_EMAIL, [email]));
 
     if (result.rows.length === 0) {
-      return res.status(401).json({ error: 'Invalid credentials' });
+      return invalidCredentials(res, clientIp);
     }
 
     const user = result.rows[0];
     
-    // Verify password
-    const isValidPassword = await bcrypt.compare(password, user.password_hash);
+    // Verify password on the worker pool, within the adaptive cap on concurrent checks
+    if (!hashConcurrency.tryAcquire()) {
+      return hasherBusy(res);
+    }
+    const verifyStartedAt = Date.now();
+    let isValidPassword: boolean;
+    try {
+      isValidPassword = await verifyPassword(password, user.password_hash);
+    } finally {
+      hashConcurrency.release(Date.now() - verifyStartedAt);
+    }
     if (!isValidPassword) {
-      return res.status(401).json({ error: 'Invalid credentials' });
+      return invalidCredentials(res, clientIp);
+    }
+
+    resetLoginAttempts(email).catch((error) => {
+      console.error('Login attempt reset error:', error);
+    });
+
+    if (needsRehash(user.password_hash)) {
+      rehashPassword(user.id, password, user.password_hash).catch((error) => {
+        console.error('Password rehash error:', error);
+      });
     }
 
     // Generate tokens
@@ -114,13 +196,15 @@ router.post('/login', async (req: Request, res: Response) => {
       { expiresIn: accessTokenExpiresIn } as jwt.SignOptions
     );
 
+    // Each login starts a new refresh-token family
+    const { familyId, tokenId } = await createFamily(user.id);
     const refreshToken = jwt.sign(
-      { userId: user.id, email: user.email },
+      { userId: user.id, email: user.email, fid: familyId, jti: tokenId },
       refreshTokenSecret,
       { expiresIn: refreshTokenExpiresIn } as jwt.SignOptions
     );
 
-    return res.json({
+    return res.type('json').send(serializeLoginUserResponse({
       accessToken,
       refreshToken,
       user: {
@@ -128,29 +212,50 @@ router.post('/login', async (req: Request, res: Response) => {
         email: user.email,
         roles: user.roles
       }
-    });
+    }));
   } catch (error) {
+    if (error instanceof HasherBusyError) {
+      return hasherBusy(res);
+    }
+    if (error instanceof SessionStoreUnavailableError) {
+      return sessionStoreUnavailable(res);
+    }
     console.error('Login error:', error);
     return res.status(500).json({ error: 'Internal server error' });
   }
 });
 
 // Refresh token
-router.post('/refresh', (req: Request, res: Response) => {
+// Rotates the refresh token: the presented one stops working and a new one is returned
+router.post('/refresh', async (req: Request, res: Response) => {
   try {
-    const { refreshToken } = req.body;
-
-    if (!refreshToken) {
+    if (!validateRefreshTokenRequest(req.body)) {
       return res.status(400).json({ error: 'Refresh token is required' });
     }
+    const { refreshToken } = req.body;
 
     const refreshTokenSecret = process.env.REFRESH_TOKEN_SECRET || 'default_refresh_secret';
-    
+
     // Verify refresh token
-    const decoded = jwt.verify(
-      refreshToken,
-      refreshTokenSecret
-    ) as { userId: string; email: string };
+    let decoded: RefreshTokenClaims;
+    try {
+      decoded = jwt.verify(refreshToken, refreshTokenSecret) as RefreshTokenClaims;
+    } catch (error) {
+      return res.status(401).json({ error: 'Invalid refresh token' });
+    }
+
+    // Tokens issued before rotation was introduced carry no family and must log in again
+    if (!decoded.fid || !decoded.jti || await isFamilyRevoked(decoded.fid)) {
+      return res.status(401).json({ error: 'Invalid refresh token' });
+    }
+
+    const rotation = await rotateToken(decoded.fid, decoded.jti);
+    if (rotation.result === 'reused') {
+      console.warn(`Refresh token reuse detected for user ${decoded.userId}, family ${decoded.fid} revoked`);
+    }
+    if (rotation.result !== 'rotated') {
+      return res.status(401).json({ error: 'Invalid refresh token' });
+    }
 
     // Generate new access token
     const jwtSecret = process.env.JWT_SECRET || 'default_secret';
@@ -158,6 +263,8 @@ router.post('/refresh', (req: Request, res: Response) => {
     // Convert expiresIn to number of seconds
     const newAccessTokenExpiresIn = process.env.JWT_EXPIRES_IN ? 
       parseInt(process.env.JWT_EXPIRES_IN) : 3600; // 1 hour default
+    const refreshTokenExpiresIn = process.env.REFRESH_TOKEN_EXPIRES_IN ? 
+      parseInt(process.env.REFRESH_TOKEN_EXPIRES_IN) : 86400; // 24 hours default
 
     const newAccessToken = jwt.sign(
       { userId: decoded.userId, email: decoded.email },
@@ -165,10 +272,52 @@ router.post('/refresh', (req: Request, res: Response) => {
       { expiresIn: newAccessTokenExpiresIn } as jwt.SignOptions
     );
 
-    return res.json({ accessToken: newAccessToken });
+    const newRefreshToken = jwt.sign(
+      { userId: decoded.userId, email: decoded.email, fid: decoded.fid, jti: rotation.tokenId },
+      refreshTokenSecret,
+      { expiresIn: refreshTokenExpiresIn } as jwt.SignOptions
+    );
+
+    return res.type('json').send(serializeRefreshTokenResponse({ accessToken: newAccessToken, refreshToken: newRefreshToken }));
   } catch (error) {
+    if (error instanceof SessionStoreUnavailableError) {
+      return sessionStoreUnavailable(res);
+    }
     console.error('Token refresh error:', error);
-    return res.status(401).json({ error: 'Invalid refresh token' });
+    return res.status(500).json({ error: 'Internal server error' });
+  }
+});
+
+// Logout
+// Revokes the refresh token's whole family, on every auth instance
+router.post('/logout', async (req: Request, res: Response) => {
+  try {
+    if (!validateLogoutUserRequest(req.body)) {
+      return res.status(400).json({ error: 'Refresh token is required' });
+    }
+    const { refreshToken } = req.body;
+
+    const refreshTokenSecret = process.env.REFRESH_TOKEN_SECRET || 'default_refresh_secret';
+
+    let decoded: RefreshTokenClaims;
+    try {
+      // An expired token may still be used to end its session
+      decoded = jwt.verify(refreshToken, refreshTokenSecret, { ignoreExpiration: true }) as RefreshTokenClaims;
+    } catch (error) {
+      return res.status(401).json({ error: 'Invalid refresh token' });
+    }
+
+    if (decoded.fid) {
+      await revokeFamily(decoded.fid);
+    }
+
+    return res.type('json').send(serializeLogoutUserResponse({ message: 'Logged out successfully' }));
+  } catch (error) {
+    if (error instanceof SessionStoreUnavailableError) {
+      return sessionStoreUnavailable(res);
+    }
+    console.error('Logout error:', error);
+    return res.status(500).json({ error: 'Internal server error' });
   }
 });
 
@@ -0,0 +1,185 @@
+import { Request, Response, NextFunction } from 'express';
+import { monitorEventLoopDelay } from 'perf_hooks';
+import { pool } from '../config/database';
+import { Counter, Gauge, registry } from './metrics';
+
+// Admission control for the whole service. The number of requests in flight
+// is capped by a limit adapted from measured latency, in the style of
+// TCP Vegas and Netflix's gradient limiter: every window, the average latency
+// is compared with the latency seen without load, and the limit shrinks in
+// proportion as latency grows beyond ADMISSION_LATENCY_TOLERANCE times it
+// (requests queueing, by Little's law) and grows by a small headroom otherwise. A saturated event
+// loop or a pool wait queue longer than the pool also shrink the limit.
+//
+// Requests beyond the limit are rejected at once with 503 and Retry-After,
+// instead of queueing on the pool until its connection timeout. Priority
+// classes share the limit unevenly: background work is shed first, then
+// reads, and postings only when the whole limit is in use.
+// This file is kept identical in every Express service.
+
+const ADMISSION_ENABLED = process.env.ADMISSION_ENABLED !== 'false';
+const ADMISSION_MIN_LIMIT = parseInt(process.env.ADMISSION_MIN_LIMIT || '4', 10);
+const ADMISSION_MAX_LIMIT = parseInt(process.env.ADMISSION_MAX_LIMIT || '1000', 10);
+const ADMISSION_INITIAL_LIMIT = parseInt(process.env.ADMISSION_INITIAL_LIMIT || '50', 10);
+// Latency may rise this far above the long-run average before the limit shrinks
+const ADMISSION_LATENCY_TOLERANCE = parseFloat(process.env.ADMISSION_LATENCY_TOLERANCE || '1.5');
+const ADMISSION_MAX_EVENT_LOOP_LAG_MS = parseInt(process.env.ADMISSION_MAX_EVENT_LOOP_LAG_MS || '100', 10);
+const ADMISSION_RETRY_AFTER_SECONDS = process.env.ADMISSION_RETRY_AFTER_SECONDS || '1';
+const WINDOW_MS = 250;
+const WINDOW_MIN_SAMPLES = 10;
+// How fast the no-load latency follows lightly loaded windows
+const BASELINE_WEIGHT = 0.1;
+const SMOOTHING = 0.2;
+
+export type Priority = 'critical' | 'standard' | 'background';
+
+// Share of the limit each class may fill
+const PRIORITY_SHARE: Record<Priority, number> = { critical: 1, standard: 0.9, background: 0.5 };
+
+const limitGauge = new Gauge('admission_concurrency_limit', 'Requests allowed in flight by the adaptive limiter');
+const inFlightGauge = new Gauge('admission_in_flight', 'Requests in flight counted against the limit');
+const shedTotal = new Counter('admission_shed_total', 'Requests rejected with 503 by admission control, by priority');
+
+class GradientLimiter {
+  private limit = Math.min(ADMISSION_MAX_LIMIT, Math.max(ADMISSION_MIN_LIMIT, ADMISSION_INITIAL_LIMIT));
+  private inFlight = 0;
+  private baselineRttMs = 0;
+  private windowStart = Date.now();
+  private windowSamples = 0;
+  private windowSumMs = 0;
+  private windowMaxInFlight = 0;
+  private lag = monitorEventLoopDelay({ resolution: 10 });
+  private counts = { admitted: 0, shed: 0, overloadSignals: 0 };
+
+  constructor() {
+    this.lag.enable();
+  }
+
+  tryAcquire(priority: Priority): boolean {
+    if (this.inFlight >= Math.max(1, Math.floor(this.limit * PRIORITY_SHARE[priority]))) {
+      this.counts.shed += 1;
+      return false;
+    }
+    this.inFlight += 1;
+    this.counts.admitted += 1;
+    this.windowMaxInFlight = Math.max(this.windowMaxInFlight, this.inFlight);
+    return true;
+  }
+
+  release(latencyMs: number): void {
+    this.inFlight -= 1;
+    this.windowSamples += 1;
+    this.windowSumMs += latencyMs;
+    if (this.windowSamples >= WINDOW_MIN_SAMPLES && Date.now() - this.windowStart >= WINDOW_MS) {
+      this.update();
+    }
+  }
+
+  private update(): void {
+    const shortRttMs = this.windowSumMs / this.windowSamples;
+    const maxInFlight = this.windowMaxInFlight;
+    this.windowStart = Date.now();
+    this.windowSamples = 0;
+    this.windowSumMs = 0;
+    this.windowMaxInFlight = this.inFlight;
+
+    // The delay histogram includes its 10ms sampling resolution
+    const lagMs = this.lag.percentile(99) / 1e6 - 10;
+    this.lag.reset();
+    const poolOverloaded = pool.waitingCount > (pool.options.max || 10);
+    if (lagMs > ADMISSION_MAX_EVENT_LOOP_LAG_MS || poolOverloaded) {
+      this.counts.overloadSignals += 1;
+      this.setLimit(this.limit * 0.9);
+      return;
+    }
+
+    // The no-load latency only rises in windows where the limit was not the
+    // constraint; under saturation it can only fall, so queueing delay never
+    // becomes the baseline
+    const constrained = maxInFlight >= this.limit / 2;
+    if (this.baselineRttMs === 0 || shortRttMs < this.baselineRttMs) {
+      this.baselineRttMs = shortRttMs;
+    } else if (!constrained) {
+      this.baselineRttMs = this.baselineRttMs * (1 - BASELINE_WEIGHT) + shortRttMs * BASELINE_WEIGHT;
+    }
+
+    // An idle service learns nothing about capacity
+    if (!constrained) {
+      return;
+    }
+    const gradient = Math.max(0.5, Math.min(1, (ADMISSION_LATENCY_TOLERANCE * this.baselineRttMs) / shortRttMs));
+    const headroom = Math.sqrt(this.limit);
+    this.setLimit(this.limit * (1 - SMOOTHING) + (this.limit * gradient + headroom) * SMOOTHING);
+  }
+
+  private setLimit(limit: number): void {
+    this.limit = Math.min(ADMISSION_MAX_LIMIT, Math.max(ADMISSION_MIN_LIMIT, limit));
+  }
+
+  stats() {
+    return {
+      limit: Math.floor(this.limit),
+      inFlight: this.inFlight,
+      baselineRttMs: Math.round(this.baselineRttMs * 100) / 100,
+      ...this.counts
+    };
+  }
+}
+
+const limiter = new GradientLimiter();
+
+registry.onCollect(() => {
+  const stats = limiter.stats();
+  limitGauge.set(stats.limit);
+  inFlightGauge.set(stats.inFlight);
+});
+
+/**
+ * Priority of a request: postings above reads above admin work
+ * Health checks and metrics scrapes are never shed.
+ */
+export function requestPriority(req: Request): Priority | null {
+  if (req.path === '/metrics' || req.path.startsWith('/health')) {
+    return null;
+  }
+  if (req.path.startsWith('/admin')) {
+    return 'background';
+  }
+  return req.method === 'GET' || req.method === 'HEAD' ? 'standard' : 'critical';
+}
+
+/**
+ * Admit requests within the adaptive limit, rejecting the rest with 503
+ */
+export function admissionControl(req: Request, res: Response, next: NextFunction): void {
+  const priority = requestPriority(req);
+  if (!ADMISSION_ENABLED || priority === null) {
+    return next();
+  }
+
+  if (!limiter.tryAcquire(priority)) {
+    shedTotal.inc(1, { priority });
+    res.set('Retry-After', ADMISSION_RETRY_AFTER_SECONDS);
+    res.status(503).json({ error: 'Service overloaded, please retry' });
+    return;
+  }
+
+  const startedAt = process.hrtime.bigint();
+  let released = false;
+  const release = () => {
+    if (!released) {
+      released = true;
+      limiter.release(Number(process.hrtime.bigint() - startedAt) / 1e6);
+    }
+  };
+  res.once('finish', release);
+  res.once('close', release);
+  next();
+}
+
+/**
+ * Current limit, requests in flight and how many were admitted and shed
+ */
+export function admissionStats() {
+  return limiter.stats();
+}
@@ -0,0 +1,67 @@
+/**
+ * Fixed-size Bloom filter over strings
+ * Positions come from two 32-bit FNV-1a hashes combined by double hashing,
+ * so a lookup is a few multiplications and bit tests with no allocation.
+ */
+export class BloomFilter {
+  private bits: Uint32Array;
+  private size: number;
+  private count = 0;
+
+  constructor(sizeInBits: number, private hashes: number) {
+    this.size = Math.max(32, sizeInBits);
+    this.bits = new Uint32Array(Math.ceil(this.size / 32));
+  }
+
+  /**
+   * Size a filter for an expected number of entries and false positive rate
+   */
+  static forCapacity(entries: number, falsePositiveRate: number): BloomFilter {
+    const bits = Math.ceil((-entries * Math.log(falsePositiveRate)) / (Math.LN2 * Math.LN2));
+    const hashes = Math.max(1, Math.round((bits / entries) * Math.LN2));
+    return new BloomFilter(bits, hashes);
+  }
+
+  private hash(value: string, seed: number): number {
+    let hash = 0x811c9dc5 ^ seed;
+    for (let i = 0; i < value.length; i++) {
+      hash ^= value.charCodeAt(i);
+      hash = Math.imul(hash, 0x01000193);
+    }
+    return hash >>> 0;
+  }
+
+  add(value: string): void {
+    const first = this.hash(value, 0);
+    const second = this.hash(value, 0x5bd1e995) | 1;
+    for (let i = 0; i < this.hashes; i++) {
+      const position = ((first + Math.imul(i, second)) >>> 0) % this.size;
+      this.bits[position >>> 5] |= 1 << (position & 31);
+    }
+    this.count += 1;
+  }
+
+  /**
+   * False means the value was never added; true means it probably was
+   */
+  mightContain(value: string): boolean {
+    const first = this.hash(value, 0);
+    const second = this.hash(value, 0x5bd1e995) | 1;
+    for (let i = 0; i < this.hashes; i++) {
+      const position = ((first + Math.imul(i, second)) >>> 0) % this.size;
+      if ((this.bits[position >>> 5] & (1 << (position & 31))) === 0) {
+        return false;
+      }
+    }
+    return true;
+  }
+
+  clear(): void {
+    this.bits.fill(0);
+    this.count = 0;
+  }
+
+  get entries(): number {
+    return this.count;
+  }
+}
@@ -0,0 +1,85 @@
+import { Request, Response, NextFunction } from 'express';
+import { Counter, Histogram } from './metrics';
+import { renderMetrics } from './cluster';
+
+// Request count, error count and latency per route template and status,
+// served with the runtime metrics on /metrics. Routes are labelled with the
+// matched Express path (e.g. /accounts/:id/balance), never the raw URL, and
+// requests no route matched share one label, so series stay bounded.
+// This file is kept identical in every Express service.
+
+// Set to false to drop the middleware, e.g. to measure its overhead
+const METRICS_ENABLED = process.env.METRICS_ENABLED !== 'false';
+
+const requestsTotal = new Counter('http_requests_total', 'HTTP requests, by method, route and status');
+const errorsTotal = new Counter('http_request_errors_total', 'HTTP requests answered with a 5xx status, by method, route and status');
+const requestDuration = new Histogram(
+  'http_request_duration_seconds',
+  'HTTP request latency from arrival to the last byte written, by method, route and status',
+  [0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10]
+);
+
+interface RouteSeries {
+  requests: { inc(value?: number): void };
+  errors: { inc(value?: number): void } | null;
+  duration: { observe(value: number): void };
+}
+
+// Label handles per method, route and status, so recording a request is two map lookups
+const seriesCache = new Map<string, RouteSeries>();
+
+function routeSeries(method: string, route: string, status: number): RouteSeries {
+  const cacheKey = `${method} ${status} ${route}`;
+  let series = seriesCache.get(cacheKey);
+  if (!series) {
+    const labels = { method, route, status };
+    series = {
+      requests: requestsTotal.labels(labels),
+      errors: status >= 500 ? errorsTotal.labels(labels) : null,
+      duration: requestDuration.labels(labels)
+    };
+    seriesCache.set(cacheKey, series);
+  }
+  return series;
+}
+
+/**
+ * Route template a request matched, or 'unmatched'
+ * Read when the response finishes, after routing has set req.route.
+ */
+export function routeTemplate(req: Request): string {
+  return req.route ? `${req.baseUrl}${req.route.path}` : 'unmatched';
+}
+
+/**
+ * Record the latency and outcome of every request
+ */
+export function httpMetrics(req: Request, res: Response, next: NextFunction): void {
+  if (!METRICS_ENABLED) {
+    return next();
+  }
+  const startedAt = process.hrtime.bigint();
+  res.once('finish', () => {
+    const series = routeSeries(req.method, routeTemplate(req), res.statusCode);
+    series.requests.inc();
+    if (series.errors) {
+      series.errors.inc();
+    }
+    series.duration.observe(Number(process.hrtime.bigint() - startedAt) / 1e9);
+  });
+  next();
+}
+
+/**
+ * Serve the registry in the Prometheus text exposition format, merged across cluster workers
+ */
+export function metricsHandler(req: Request, res: Response): void {
+  renderMetrics()
+    .then((text) => {
+      res.type('text/plain; version=0.0.4').send(text);
+    })
+    .catch((error) => {
+      console.error('Metrics error:', error);
+      res.status(500).json({ error: 'Internal server error' });
+    });
+}
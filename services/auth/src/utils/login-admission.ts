@@ -0,0 +1,159 @@
+import { redisClient } from '../config/redis';
+
+// Attempts per email, and failed attempts per client IP, allowed per window
+// before further logins are rejected with 429
+const LOGIN_ATTEMPT_WINDOW_SECONDS = parseInt(process.env.LOGIN_ATTEMPT_WINDOW_SECONDS || '300', 10);
+const LOGIN_MAX_ATTEMPTS_PER_EMAIL = parseInt(process.env.LOGIN_MAX_ATTEMPTS_PER_EMAIL || '10', 10);
+const LOGIN_MAX_FAILURES_PER_IP = parseInt(process.env.LOGIN_MAX_FAILURES_PER_IP || '100', 10);
+// Counters are skipped rather than delaying the login when Redis is slow
+const REDIS_TIMEOUT_MS = parseInt(process.env.LOGIN_ATTEMPT_REDIS_TIMEOUT_MS || '50', 10);
+
+// Password checks take longer than this under overload; the concurrency cap shrinks until they don't
+const HASH_LATENCY_TARGET_MS = parseInt(process.env.LOGIN_HASH_LATENCY_TARGET_MS || '250', 10);
+const HASH_CONCURRENCY_MIN = parseInt(process.env.LOGIN_HASH_CONCURRENCY_MIN || '2', 10);
+const HASH_CONCURRENCY_MAX = parseInt(process.env.LOGIN_HASH_CONCURRENCY_MAX || '256', 10);
+
+export interface AdmissionDecision {
+  allowed: boolean;
+  retryAfterSeconds: number;
+}
+
+function withTimeout<T>(promise: Promise<T>, ms: number): Promise<T> {
+  return new Promise((resolve, reject) => {
+    const timer = setTimeout(() => reject(new Error('Redis timeout')), ms);
+    promise.then(
+      (value) => {
+        clearTimeout(timer);
+        resolve(value);
+      },
+      (error) => {
+        clearTimeout(timer);
+        reject(error);
+      }
+    );
+  });
+}
+
+function emailKey(email: string) {
+  return `login:attempts:email:${email.trim().toLowerCase()}`;
+}
+
+function ipKey(ip: string) {
+  return `login:failures:ip:${ip}`;
+}
+
+/**
+ * Count a login attempt against its email and check the client IP's failures
+ * Only failed logins count against the IP, so many users behind one address,
+ * e.g. a corporate NAT, are not locked out by each other's successful logins.
+ * Both counters are read in one round trip and expire with the window.
+ * Fails open when Redis is unavailable so an outage does not lock users out.
+ */
+export async function checkLoginAttempts(email: string, ip: string): Promise<AdmissionDecision> {
+  if (!redisClient.isReady) {
+    return { allowed: true, retryAfterSeconds: 0 };
+  }
+
+  try {
+    const replies = await withTimeout(
+      redisClient.multi()
+        .incr(emailKey(email))
+        .expire(emailKey(email), LOGIN_ATTEMPT_WINDOW_SECONDS, 'NX')
+        .ttl(emailKey(email))
+        .get(ipKey(ip))
+        .ttl(ipKey(ip))
+        .exec(),
+      REDIS_TIMEOUT_MS
+    );
+    const [emailAttempts, , emailTtl, ipFailures, ipTtl] = replies.map((reply) => Number(reply));
+
+    const retryAfterSeconds = Math.max(
+      emailAttempts > LOGIN_MAX_ATTEMPTS_PER_EMAIL ? emailTtl : 0,
+      ipFailures >= LOGIN_MAX_FAILURES_PER_IP ? ipTtl : 0
+    );
+    return { allowed: retryAfterSeconds === 0, retryAfterSeconds };
+  } catch (error) {
+    console.error('Login attempt counter error:', error);
+    return { allowed: true, retryAfterSeconds: 0 };
+  }
+}
+
+/**
+ * Count a failed login against its client IP
+ */
+export async function recordLoginFailure(ip: string): Promise<void> {
+  if (redisClient.isReady) {
+    await redisClient.multi()
+      .incr(ipKey(ip))
+      .expire(ipKey(ip), LOGIN_ATTEMPT_WINDOW_SECONDS, 'NX')
+      .exec();
+  }
+}
+
+/**
+ * Clear the per-email counter after a successful login
+ */
+export async function resetLoginAttempts(email: string): Promise<void> {
+  if (redisClient.isReady) {
+    await redisClient.del(emailKey(email));
+  }
+}
+
+/**
+ * Concurrency cap on in-flight password checks, adjusted from their latency
+ * The cap grows by one per cap's worth of fast checks and shrinks by 10% on
+ * each check slower than the target, so admitted logins keep a bounded
+ * latency while the excess is rejected up front.
+ */
+class AdaptiveConcurrencyLimit {
+  private limit: number;
+  private inFlight = 0;
+  private admitted = 0;
+  private rejected = 0;
+  private latencyMs = 0;
+
+  constructor(initial: number, private min: number, private max: number, private targetMs: number) {
+    this.limit = Math.min(max, Math.max(min, initial));
+  }
+
+  tryAcquire(): boolean {
+    if (this.inFlight >= Math.floor(this.limit)) {
+      this.rejected += 1;
+      return false;
+    }
+    this.inFlight += 1;
+    this.admitted += 1;
+    return true;
+  }
+
+  release(latencyMs: number): void {
+    this.inFlight -= 1;
+    // Exponentially weighted, reported for observability
+    this.latencyMs = this.latencyMs === 0 ? latencyMs : this.latencyMs * 0.9 + latencyMs * 0.1;
+
+    if (latencyMs > this.targetMs) {
+      this.limit = Math.max(this.min, this.limit * 0.9);
+    } else if (this.inFlight + 1 >= Math.floor(this.limit)) {
+      // Only grow while the cap is actually the constraint
+      this.limit = Math.min(this.max, this.limit + 1 / this.limit);
+    }
+  }
+
+  stats() {
+    return {
+      limit: Math.floor(this.limit),
+      inFlight: this.inFlight,
+      admitted: this.admitted,
+      rejected: this.rejected,
+      avgLatencyMs: Math.round(this.latencyMs),
+      targetLatencyMs: this.targetMs
+    };
+  }
+}
+
+export const hashConcurrency = new AdaptiveConcurrencyLimit(
+  parseInt(process.env.LOGIN_HASH_CONCURRENCY_INITIAL || '16', 10),
+  HASH_CONCURRENCY_MIN,
+  HASH_CONCURRENCY_MAX,
+  HASH_LATENCY_TARGET_MS
+);
@@ -0,0 +1,193 @@
+import os from 'os';
+import path from 'path';
+import { Worker } from 'worker_threads';
+import type { HashOptions, HashTask } from '../workers/hash-worker';
+
+const HASH_OPTIONS: HashOptions = {
+  algorithm: process.env.PASSWORD_HASH_ALGORITHM === 'bcrypt' ? 'bcrypt' : 'scrypt',
+  bcryptRounds: parseInt(process.env.BCRYPT_ROUNDS || '10', 10),
+  scryptCost: parseInt(process.env.SCRYPT_COST || '16384', 10),
+  scryptBlockSize: parseInt(process.env.SCRYPT_BLOCK_SIZE || '8', 10),
+  scryptParallelization: parseInt(process.env.SCRYPT_PARALLELIZATION || '1', 10)
+};
+
+// Cluster workers share the cores, so each gets its share of hashing threads
+const CLUSTER_WORKERS = parseInt(process.env.CLUSTER_WORKERS || '1', 10);
+const POOL_SIZE = parseInt(
+  process.env.PASSWORD_HASH_WORKERS || String(Math.max(1, Math.floor(os.cpus().length / CLUSTER_WORKERS))),
+  10
+);
+// Tasks waiting for a free worker before new ones are rejected
+const QUEUE_LIMIT = parseInt(process.env.PASSWORD_HASH_QUEUE_LIMIT || '256', 10);
+
+// The worker is compiled alongside this module; under ts-node it needs the ts-node hook
+const WORKER_FILE = path.join(__dirname, '..', 'workers', `hash-worker${path.extname(__filename)}`);
+const WORKER_EXEC_ARGV = path.extname(__filename) === '.ts' ? ['-r', 'ts-node/register'] : [];
+
+/**
+ * Raised when the hashing queue is full; callers should shed the request
+ */
+export class HasherBusyError extends Error {
+  constructor() {
+    super('Password hashing queue is full');
+    this.name = 'HasherBusyError';
+  }
+}
+
+interface PendingTask {
+  task: HashTask;
+  enqueuedAt: number;
+  resolve: (result: string | boolean) => void;
+  reject: (error: Error) => void;
+}
+
+interface PoolWorker {
+  worker: Worker;
+  current: PendingTask | null;
+}
+
+class HashPool {
+  private workers: PoolWorker[] = [];
+  private queue: PendingTask[] = [];
+  private nextId = 1;
+  private completed = 0;
+  private failed = 0;
+  private rejected = 0;
+  private dispatched = 0;
+  private totalWaitMs = 0;
+  private maxQueueDepth = 0;
+
+  constructor(private size: number, private queueLimit: number) {}
+
+  private spawn(): PoolWorker {
+    const entry: PoolWorker = {
+      worker: new Worker(WORKER_FILE, { execArgv: WORKER_EXEC_ARGV }),
+      current: null
+    };
+
+    entry.worker.on('message', (message: { id: number; result?: string | boolean; error?: string }) => {
+      const pending = entry.current;
+      entry.current = null;
+      entry.worker.unref();
+      if (pending && pending.task.id === message.id) {
+        if (message.error !== undefined) {
+          this.failed += 1;
+          pending.reject(new Error(message.error));
+        } else {
+          this.completed += 1;
+          pending.resolve(message.result as string | boolean);
+        }
+      }
+      this.dispatch();
+    });
+
+    // A crashed worker fails its task and is replaced
+    entry.worker.on('error', (error) => {
+      console.error('Password hash worker error:', error);
+    });
+    entry.worker.on('exit', () => {
+      this.workers = this.workers.filter((candidate) => candidate !== entry);
+      if (entry.current) {
+        this.failed += 1;
+        entry.current.reject(new Error('Password hash worker exited'));
+        entry.current = null;
+      }
+      this.dispatch();
+    });
+
+    // Idle workers do not keep the process alive; busy ones do until they answer
+    entry.worker.unref();
+    this.workers.push(entry);
+    return entry;
+  }
+
+  private dispatch(): void {
+    while (this.queue.length > 0) {
+      let idle = this.workers.find((entry) => entry.current === null);
+      if (!idle && this.workers.length < this.size) {
+        idle = this.spawn();
+      }
+      if (!idle) {
+        return;
+      }
+
+      const pending = this.queue.shift() as PendingTask;
+      this.dispatched += 1;
+      this.totalWaitMs += Date.now() - pending.enqueuedAt;
+      idle.current = pending;
+      idle.worker.ref();
+      idle.worker.postMessage(pending.task);
+    }
+  }
+
+  run(op: HashTask['op'], password: string, hash?: string): Promise<string | boolean> {
+    if (this.queue.length >= this.queueLimit) {
+      this.rejected += 1;
+      return Promise.reject(new HasherBusyError());
+    }
+
+    return new Promise((resolve, reject) => {
+      this.queue.push({
+        task: { id: this.nextId++, op, password, hash, options: HASH_OPTIONS },
+        enqueuedAt: Date.now(),
+        resolve,
+        reject
+      });
+      this.maxQueueDepth = Math.max(this.maxQueueDepth, this.queue.length);
+      this.dispatch();
+    });
+  }
+
+  stats() {
+    return {
+      workers: this.workers.length,
+      maxWorkers: this.size,
+      active: this.workers.filter((entry) => entry.current !== null).length,
+      queueDepth: this.queue.length,
+      maxQueueDepth: this.maxQueueDepth,
+      queueLimit: this.queueLimit,
+      completed: this.completed,
+      failed: this.failed,
+      rejected: this.rejected,
+      avgQueueWaitMs: this.dispatched > 0 ? Math.round(this.totalWaitMs / this.dispatched) : 0
+    };
+  }
+}
+
+const hashPool = new HashPool(POOL_SIZE, QUEUE_LIMIT);
+
+/**
+ * Hash a password on the worker pool with the configured algorithm
+ * @throws HasherBusyError when the queue is full
+ */
+export async function hashPassword(password: string): Promise<string> {
+  return (await hashPool.run('hash', password)) as string;
+}
+
+/**
+ * Check a password against a stored bcrypt or scrypt hash on the worker pool
+ * @throws HasherBusyError when the queue is full
+ */
+export async function verifyPassword(password: string, hash: string): Promise<boolean> {
+  return (await hashPool.run('verify', password, hash)) as boolean;
+}
+
+/**
+ * Whether a stored hash uses another algorithm or cost than the configured one
+ */
+export function needsRehash(hash: string): boolean {
+  if (HASH_OPTIONS.algorithm === 'scrypt') {
+    const { scryptCost: N, scryptBlockSize: r, scryptParallelization: p } = HASH_OPTIONS;
+    return !hash.startsWith(`$scrypt$N=${N},r=${r},p=${p}$`);
+  }
+
+  const match = /^\$2[aby]\$(\d{2})\$/.exec(hash);
+  return !match || parseInt(match[1], 10) !== HASH_OPTIONS.bcryptRounds;
+}
+
+/**
+ * Queue depth and throughput of the hashing pool
+ */
+export function hasherStats() {
+  return { algorithm: HASH_OPTIONS.algorithm, ...hashPool.stats() };
+}
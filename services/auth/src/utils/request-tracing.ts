@@ -0,0 +1,41 @@
+import { Request, Response, NextFunction } from 'express';
+import { parseTraceparent, runInSpan, Span, tracingEnabled } from './tracing';
+import { routeTemplate } from './http-metrics';
+
+// Server span for every request, continuing the caller's trace when it sends
+// a traceparent header. Handlers run with the span active, so their database,
+// Redis, Kafka and outgoing HTTP calls become its children.
+// This file is kept identical in every Express service.
+
+/**
+ * Trace every request as a server span named by method and route template
+ */
+export function requestTracing(req: Request, res: Response, next: NextFunction): void {
+  if (!tracingEnabled()) {
+    return next();
+  }
+
+  const span = new Span(req.method, {
+    kind: 'server',
+    parent: parseTraceparent(req.headers.traceparent),
+    attributes: { 'http.method': req.method, 'http.target': req.path }
+  });
+
+  const finish = () => {
+    if (span.endTime) {
+      return;
+    }
+    span.name = `${req.method} ${routeTemplate(req)}`;
+    span.setAttribute('http.status_code', res.statusCode);
+    if (!res.writableFinished) {
+      span.recordError('Connection closed before the response was sent');
+    } else if (res.statusCode >= 500) {
+      span.recordError(`HTTP ${res.statusCode}`);
+    }
+    span.end();
+  };
+  res.once('finish', finish);
+  res.once('close', finish);
+
+  runInSpan(span, next);
+}
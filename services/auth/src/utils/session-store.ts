@@ -0,0 +1,166 @@
+import { randomUUID } from 'crypto';
+import { redisClient } from '../config/redis';
+import { BloomFilter } from './bloom-filter';
+
+// Refresh tokens belong to a family started at login. Redis holds the id of
+// the family's current token; each refresh rotates it, and presenting an
+// already-rotated token revokes the whole family, since it means the token
+// was copied. Revoked family ids are broadcast to every auth instance and kept
+// in a local Bloom filter so the common, non-revoked case never asks Redis.
+
+const REFRESH_TOKEN_TTL_SECONDS = process.env.REFRESH_TOKEN_EXPIRES_IN
+  ? parseInt(process.env.REFRESH_TOKEN_EXPIRES_IN, 10)
+  : 86400;
+const REVOCATION_CHANNEL = 'auth:refresh:revocations';
+const REVOCATION_BLOOM_CAPACITY = parseInt(process.env.REVOCATION_BLOOM_CAPACITY || '1000000', 10);
+
+const familyKey = (familyId: string) => `refresh:family:${familyId}`;
+const revokedKey = (familyId: string) => `refresh:revoked:${familyId}`;
+
+// 1: rotated, 0: family unknown, expired or revoked, -1: token reused and family revoked
+const ROTATE_SCRIPT = `
+local current = redis.call('HGET', KEYS[1], 'current')
+if not current then
+  return 0
+end
+if current ~= ARGV[1] then
+  redis.call('DEL', KEYS[1])
+  return -1
+end
+redis.call('HSET', KEYS[1], 'current', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1`;
+
+export type RotationResult = 'rotated' | 'revoked' | 'reused';
+
+/**
+ * Raised when the session store is unreachable; refresh tokens cannot be issued or rotated
+ */
+export class SessionStoreUnavailableError extends Error {
+  constructor() {
+    super('Session store unavailable');
+    this.name = 'SessionStoreUnavailableError';
+  }
+}
+
+let revokedFamilies = BloomFilter.forCapacity(REVOCATION_BLOOM_CAPACITY, 0.001);
+let bloomSkips = 0;
+let bloomChecks = 0;
+
+function ensureReady(): void {
+  if (!redisClient.isReady) {
+    throw new SessionStoreUnavailableError();
+  }
+}
+
+/**
+ * Start a refresh-token family for a new login
+ * @returns Family id and the id of its first token
+ */
+export async function createFamily(userId: number): Promise<{ familyId: string; tokenId: string }> {
+  ensureReady();
+  const familyId = randomUUID();
+  const tokenId = randomUUID();
+  await redisClient.multi()
+    .hSet(familyKey(familyId), { current: tokenId, userId: String(userId) })
+    .expire(familyKey(familyId), REFRESH_TOKEN_TTL_SECONDS)
+    .exec();
+  return { familyId, tokenId };
+}
+
+/**
+ * Whether a family may have been revoked
+ * Answered locally when the Bloom filter has never seen the family; otherwise
+ * confirmed in Redis, so a false positive costs one lookup, never a logout.
+ */
+export async function isFamilyRevoked(familyId: string): Promise<boolean> {
+  bloomChecks += 1;
+  if (!revokedFamilies.mightContain(familyId)) {
+    bloomSkips += 1;
+    return false;
+  }
+  ensureReady();
+  return (await redisClient.exists(revokedKey(familyId))) === 1;
+}
+
+/**
+ * Replace the family's current token with a new one
+ * A single Lua script checks and swaps the current id, so two concurrent
+ * refreshes with the same token cannot both succeed.
+ */
+export async function rotateToken(familyId: string, tokenId: string): Promise<{ result: RotationResult; tokenId: string }> {
+  ensureReady();
+  const nextTokenId = randomUUID();
+  const outcome = Number(await redisClient.eval(ROTATE_SCRIPT, {
+    keys: [familyKey(familyId)],
+    arguments: [tokenId, nextTokenId, String(REFRESH_TOKEN_TTL_SECONDS)]
+  }));
+
+  if (outcome === 1) {
+    return { result: 'rotated', tokenId: nextTokenId };
+  }
+  if (outcome === -1) {
+    await revokeFamily(familyId);
+    return { result: 'reused', tokenId: nextTokenId };
+  }
+  return { result: 'revoked', tokenId: nextTokenId };
+}
+
+/**
+ * Revoke every token of a family and notify the other auth instances
+ */
+export async function revokeFamily(familyId: string): Promise<void> {
+  ensureReady();
+  revokedFamilies.add(familyId);
+  await redisClient.multi()
+    .del(familyKey(familyId))
+    .set(revokedKey(familyId), '1', { EX: REFRESH_TOKEN_TTL_SECONDS })
+    .publish(REVOCATION_CHANNEL, familyId)
+    .exec();
+}
+
+// Revocation markers expire with the tokens they cover, so the filter is
+// rebuilt from the live markers once per token lifetime to shed stale entries
+async function loadRevocations(): Promise<void> {
+  const rebuilt = BloomFilter.forCapacity(REVOCATION_BLOOM_CAPACITY, 0.001);
+  for await (const key of redisClient.scanIterator({ MATCH: revokedKey('*'), COUNT: 1000 })) {
+    rebuilt.add(key.slice(revokedKey('').length));
+  }
+  revokedFamilies = rebuilt;
+}
+
+/**
+ * Load revoked families and subscribe to revocations from other instances
+ * Call once the Redis client is connected.
+ */
+export async function startRevocationListener(): Promise<void> {
+  const subscriber = redisClient.duplicate();
+  subscriber.on('error', (error) => {
+    console.error('Revocation subscriber error:', error);
+  });
+  await subscriber.connect();
+  await subscriber.subscribe(REVOCATION_CHANNEL, (familyId) => {
+    revokedFamilies.add(familyId);
+  });
+  await loadRevocations();
+
+  // A family missed by the filter is still rejected by the rotation script,
+  // which finds its key deleted; the filter only saves the round trip
+  const timer = setInterval(() => {
+    loadRevocations().catch((error) => {
+      console.error('Error reloading revoked refresh tokens:', error);
+    });
+  }, REFRESH_TOKEN_TTL_SECONDS * 1000);
+  timer.unref();
+}
+
+/**
+ * Share of revocation checks answered without Redis
+ */
+export function sessionStoreStats() {
+  return {
+    revokedFamilies: revokedFamilies.entries,
+    revocationChecks: bloomChecks,
+    answeredLocally: bloomSkips
+  };
+}
@@ -0,0 +1,66 @@
+import { parentPort } from 'worker_threads';
+import { randomBytes, scryptSync, timingSafeEqual } from 'crypto';
+import * as bcrypt from 'bcryptjs';
+
+// Runs password hashing off the main event loop; one task at a time per worker
+
+export interface HashOptions {
+  algorithm: 'bcrypt' | 'scrypt';
+  bcryptRounds: number;
+  scryptCost: number;
+  scryptBlockSize: number;
+  scryptParallelization: number;
+}
+
+export interface HashTask {
+  id: number;
+  op: 'hash' | 'verify';
+  password: string;
+  hash?: string;
+  options: HashOptions;
+}
+
+const SCRYPT_KEY_LENGTH = 64;
+
+// Format: $scrypt$N=16384,r=8,p=1$<salt>$<key>, salt and key in base64
+function scryptHash(password: string, options: HashOptions): string {
+  const { scryptCost: N, scryptBlockSize: r, scryptParallelization: p } = options;
+  const salt = randomBytes(16);
+  const key = scryptSync(password, salt, SCRYPT_KEY_LENGTH, { N, r, p, maxmem: 256 * N * r });
+  return `$scrypt$N=${N},r=${r},p=${p}$${salt.toString('base64')}$${key.toString('base64')}`;
+}
+
+function scryptVerify(password: string, hash: string): boolean {
+  const [, , params, salt, key] = hash.split('$');
+  const values = Object.fromEntries(params.split(',').map((pair) => pair.split('=')));
+  const N = parseInt(values.N, 10);
+  const r = parseInt(values.r, 10);
+  const p = parseInt(values.p, 10);
+  const expected = Buffer.from(key, 'base64');
+  const actual = scryptSync(password, Buffer.from(salt, 'base64'), expected.length, { N, r, p, maxmem: 256 * N * r });
+  return timingSafeEqual(actual, expected);
+}
+
+function run(task: HashTask): string | boolean {
+  if (task.op === 'hash') {
+    return task.options.algorithm === 'scrypt'
+      ? scryptHash(task.password, task.options)
+      : bcrypt.hashSync(task.password, task.options.bcryptRounds);
+  }
+
+  const hash = task.hash || '';
+  return hash.startsWith('$scrypt$')
+    ? scryptVerify(task.password, hash)
+    : bcrypt.compareSync(task.password, hash);
+}
+
+if (parentPort) {
+  const port = parentPort;
+  port.on('message', (task: HashTask) => {
+    try {
+      port.postMessage({ id: task.id, result: run(task) });
+    } catch (error) {
+      port.postMessage({ id: task.id, error: error instanceof Error ? error.message : 'Hashing failed' });
+    }
+  });
+}
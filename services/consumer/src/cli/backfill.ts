@@ -0,0 +1,276 @@
+import dotenv from 'dotenv';
+import { pool } from '../config/database';
+
+dotenv.config();
+
+const USAGE = `Usage:
+  npm run backfill -- [--run NAME] [--workers N] [--range-size N] [--chunk-size N]
+                      [--max-rows-per-second N] [--replace] [--reset]
+
+  --run                  Checkpoint name; rerunning the same name resumes it (default: default)
+  --workers              Account ranges loaded in parallel (default: 4)
+  --range-size           Account ids per range (default: 1000)
+  --chunk-size           Ledger entries loaded per statement (default: 5000)
+  --max-rows-per-second  Throttle across all workers, 0 for unlimited (default: 0)
+  --replace              Delete existing projected events of each range before loading it
+  --reset                Discard the checkpoints of the run and start over`;
+
+interface BackfillRange {
+  rangeStart: number;
+  rangeEnd: number;
+  lastAccountId: number | null;
+  lastLedgerId: number | null;
+  cleared: boolean;
+}
+
+function option(name: string): string | undefined {
+  const index = process.argv.indexOf(`--${name}`);
+  return index !== -1 ? process.argv[index + 1] : undefined;
+}
+
+function flag(name: string): boolean {
+  return process.argv.includes(`--${name}`);
+}
+
+function sleep(ms: number): Promise<void> {
+  return new Promise((resolve) => setTimeout(resolve, ms));
+}
+
+/**
+ * Paces all workers to a shared rows-per-second budget
+ */
+class Throttle {
+  private nextAt = Date.now();
+
+  constructor(private rowsPerSecond: number) {}
+
+  async consume(rows: number): Promise<void> {
+    if (this.rowsPerSecond <= 0 || rows === 0) {
+      return;
+    }
+    const now = Date.now();
+    this.nextAt = Math.max(this.nextAt, now) + (rows * 1000) / this.rowsPerSecond;
+    await sleep(this.nextAt - now);
+  }
+}
+
+/**
+ * Load the unfinished ranges of a run, splitting the ledger into ranges on its first start
+ */
+async function planRanges(runId: string, rangeSize: number): Promise<BackfillRange[]> {
+  const existing = await pool.query('SELECT 1 FROM backfill_checkpoints WHERE run_id = $1 LIMIT 1', [runId]);
+
+  if (existing.rowCount === 0) {
+    const bounds = await pool.query('SELECT MIN(account_id) AS min_id, MAX(account_id) AS max_id FROM ledger');
+    const { min_id: minId, max_id: maxId } = bounds.rows[0];
+    if (minId === null) {
+      return [];
+    }
+
+    // Ranges are generated server-side so planning a large ledger is a single statement
+    await pool.query(
+      `INSERT INTO backfill_checkpoints (run_id, range_start, range_end)
+       SELECT $1, range_start, LEAST(range_start + $4 - 1, $3)
+       FROM generate_series($2::int, $3::int, $4::int) AS range_start
+       ON CONFLICT (run_id, range_start) DO NOTHING`,
+      [runId, minId, maxId, rangeSize]
+    );
+  }
+
+  const result = await pool.query(
+    `SELECT range_start, range_end, last_account_id, last_ledger_id, cleared
+     FROM backfill_checkpoints
+     WHERE run_id = $1 AND completed_at IS NULL
+     ORDER BY range_start`,
+    [runId]
+  );
+
+  return result.rows.map((row) => ({
+    rangeStart: row.range_start,
+    rangeEnd: row.range_end,
+    lastAccountId: row.last_account_id,
+    lastLedgerId: row.last_ledger_id,
+    cleared: row.cleared
+  }));
+}
+
+/**
+ * Delete the events previously projected for the accounts of a range
+ * Runs once per range, in the same transaction that records it as cleared.
+ */
+async function clearRange(runId: string, range: BackfillRange): Promise<void> {
+  const client = await pool.connect();
+  try {
+    await client.query('BEGIN');
+    await client.query(
+      `DELETE FROM audit_logs
+       WHERE service_name = 'consumer-service'
+         AND action = 'ledger_event_processed'
+         AND resource_id IN (SELECT transaction_id FROM ledger_events WHERE account_id BETWEEN $1 AND $2)`,
+      [range.rangeStart, range.rangeEnd]
+    );
+    await client.query(
+      'DELETE FROM ledger_events WHERE account_id BETWEEN $1 AND $2',
+      [range.rangeStart, range.rangeEnd]
+    );
+    await client.query(
+      `UPDATE backfill_checkpoints SET cleared = TRUE, updated_at = CURRENT_TIMESTAMP
+       WHERE run_id = $1 AND range_start = $2`,
+      [runId, range.rangeStart]
+    );
+    await client.query('COMMIT');
+    range.cleared = true;
+  } catch (error) {
+    await client.query('ROLLBACK');
+    throw error;
+  } finally {
+    client.release();
+  }
+}
+
+/**
+ * Regenerate and load the events of the next chunk of a range
+ * The chunk is read, transformed and inserted by one server-side statement, so
+ * rows never travel to the client; the checkpoint advances in the same transaction.
+ * @returns Number of ledger entries read and events newly written
+ */
+async function loadChunk(runId: string, range: BackfillRange, chunkSize: number) {
+  const client = await pool.connect();
+  try {
+    await client.query('BEGIN');
+    const result = await client.query(
+      `WITH chunk AS (
+         SELECT l.id, l.account_id, l.transaction_id, l.entry_type, l.amount, l.currency,
+                l.balance_after, l.created_at, t.transaction_type
+         FROM ledger l
+         LEFT JOIN transactions t ON t.id = l.transaction_id
+         WHERE l.account_id BETWEEN $1 AND $2
+           AND (l.account_id, l.id) > ($3::int, $4::int)
+         ORDER BY l.account_id, l.id
+         LIMIT $5
+       ), events AS (
+         SELECT 'ledger:' || id AS event_id, account_id, transaction_id, currency,
+                CASE WHEN entry_type = 'debit' THEN -amount ELSE amount END AS amount,
+                jsonb_build_object(
+                  'balanceAfter', balance_after,
+                  'timestamp', created_at,
+                  'transactionType', transaction_type,
+                  'source', 'backfill'
+                ) AS metadata
+         FROM chunk
+       ), inserted AS (
+         INSERT INTO ledger_events (event_id, event_type, account_id, transaction_id, amount, currency, status, metadata)
+         SELECT event_id, 'LEDGER_UPDATED', account_id, transaction_id, amount, COALESCE(currency, 'USD'), 'processed', metadata
+         FROM events
+         ON CONFLICT (event_id) DO NOTHING
+         RETURNING event_id, transaction_id
+       ), audited AS (
+         INSERT INTO audit_logs (service_name, action, resource_type, resource_id, metadata)
+         SELECT 'consumer-service', 'ledger_event_processed', 'ledger_event', transaction_id, jsonb_build_object('eventId', event_id)
+         FROM inserted
+       ), last_entry AS (
+         SELECT account_id, id FROM chunk ORDER BY account_id DESC, id DESC LIMIT 1
+       )
+       SELECT (SELECT COUNT(*) FROM chunk) AS rows_read,
+              (SELECT COUNT(*) FROM inserted) AS rows_written,
+              (SELECT account_id FROM last_entry) AS last_account_id,
+              (SELECT id FROM last_entry) AS last_ledger_id`,
+      [range.rangeStart, range.rangeEnd, range.lastAccountId ?? range.rangeStart - 1, range.lastLedgerId ?? 0, chunkSize]
+    );
+
+    const row = result.rows[0];
+    const rowsRead = parseInt(row.rows_read, 10);
+    const rowsWritten = parseInt(row.rows_written, 10);
+    const done = rowsRead < chunkSize;
+
+    await client.query(
+      `UPDATE backfill_checkpoints
+       SET last_account_id = COALESCE($3, last_account_id),
+           last_ledger_id = COALESCE($4, last_ledger_id),
+           rows_read = rows_read + $5,
+           rows_written = rows_written + $6,
+           completed_at = CASE WHEN $7::boolean THEN CURRENT_TIMESTAMP ELSE NULL END,
+           updated_at = CURRENT_TIMESTAMP
+       WHERE run_id = $1 AND range_start = $2`,
+      [runId, range.rangeStart, row.last_account_id, row.last_ledger_id, rowsRead, rowsWritten, done]
+    );
+    await client.query('COMMIT');
+
+    if (row.last_account_id !== null) {
+      range.lastAccountId = row.last_account_id;
+      range.lastLedgerId = row.last_ledger_id;
+    }
+    return { rowsRead, rowsWritten, done };
+  } catch (error) {
+    await client.query('ROLLBACK');
+    throw error;
+  } finally {
+    client.release();
+  }
+}
+
+async function main() {
+  if (flag('help')) {
+    console.log(USAGE);
+    return;
+  }
+
+  const runId = option('run') || 'default';
+  const workers = parseInt(option('workers') || '4', 10);
+  const rangeSize = parseInt(option('range-size') || '1000', 10);
+  const chunkSize = parseInt(option('chunk-size') || '5000', 10);
+  const throttle = new Throttle(parseInt(option('max-rows-per-second') || '0', 10));
+  const replace = flag('replace');
+
+  if ([workers, rangeSize, chunkSize].some((value) => isNaN(value) || value < 1)) {
+    console.log(USAGE);
+    process.exitCode = 1;
+    return;
+  }
+
+  if (flag('reset')) {
+    await pool.query('DELETE FROM backfill_checkpoints WHERE run_id = $1', [runId]);
+  }
+
+  const ranges = await planRanges(runId, rangeSize);
+  console.log(`Backfill ${runId}: ${ranges.length} account ranges to load with ${workers} workers`);
+
+  const startedAt = Date.now();
+  let totalRead = 0;
+  let totalWritten = 0;
+  let next = 0;
+
+  async function worker() {
+    while (next < ranges.length) {
+      const range = ranges[next++];
+      if (replace && !range.cleared && range.lastAccountId === null) {
+        await clearRange(runId, range);
+      }
+
+      let done = false;
+      while (!done) {
+        const chunk = await loadChunk(runId, range, chunkSize);
+        totalRead += chunk.rowsRead;
+        totalWritten += chunk.rowsWritten;
+        done = chunk.done;
+        await throttle.consume(chunk.rowsRead);
+      }
+      console.log(`Loaded accounts ${range.rangeStart}-${range.rangeEnd} (${totalRead} entries read so far)`);
+    }
+  }
+
+  await Promise.all(Array.from({ length: Math.min(workers, ranges.length) }, () => worker()));
+
+  const seconds = (Date.now() - startedAt) / 1000;
+  console.log(
+    `Backfill ${runId} complete: ${totalRead} ledger entries read, ${totalWritten} events written ` +
+    `in ${seconds.toFixed(1)}s (${Math.round(totalRead / Math.max(seconds, 0.001))} rows/s)`
+  );
+}
+
+main()
+  .catch((error) => {
+    console.error('Backfill failed:', error);
+    process.exitCode = 1;
+  })
+  .finally(() => pool.end());
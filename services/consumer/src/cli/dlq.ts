@@ -0,0 +1,191 @@
+import dotenv from 'dotenv';
+import { KafkaMessage } from 'kafkajs';
+import { kafka, producer, DLQ_TOPIC } from '../config/kafka';
+import { decodeLedgerPayload, headerValue } from '../utils/ledger-projection';
+import { replayMessage } from '../utils/retry-pipeline';
+
+dotenv.config();
+
+// Committed group remembering which dead letters were already replayed
+const REPLAY_GROUP_ID = `${DLQ_TOPIC}-replay`;
+// Reading stops after this long even if a partition never delivers up to its end
+const DLQ_READ_TIMEOUT_MS = parseInt(process.env.DLQ_READ_TIMEOUT_MS || '30000', 10);
+
+const USAGE = `Usage:
+  npm run dlq -- list [--limit N]
+  npm run dlq -- replay [--partition P --offset O]`;
+
+function option(name: string): string | undefined {
+  const index = process.argv.indexOf(`--${name}`);
+  return index !== -1 ? process.argv[index + 1] : undefined;
+}
+
+// Groups that commit nothing are only used for one run
+async function deleteGroup(groupId: string): Promise<void> {
+  const admin = kafka.admin();
+  await admin.connect();
+  try {
+    await admin.deleteGroups([groupId]);
+  } catch (error) {
+    console.error(`Error deleting consumer group ${groupId}:`, error);
+  } finally {
+    await admin.disconnect();
+  }
+}
+
+/**
+ * Read the dead-letter topic up to its current end
+ * Gives up after DLQ_READ_TIMEOUT_MS, e.g. when the last offsets of a
+ * partition are transaction markers that are never delivered.
+ * @param groupId Consumer group used for reading
+ * @param commit Whether read offsets are committed, so the next run starts
+ *   after them; a group that commits nothing is deleted afterwards
+ * @param onMessage Called for each dead letter, returns false to stop reading
+ */
+async function readDeadLetters(
+  groupId: string,
+  commit: boolean,
+  onMessage: (partition: number, message: KafkaMessage) => Promise<boolean>
+): Promise<void> {
+  const admin = kafka.admin();
+  await admin.connect();
+  const topicOffsets = await admin.fetchTopicOffsets(DLQ_TOPIC);
+  const committed = commit ? await admin.fetchOffsets({ groupId, topics: [DLQ_TOPIC] }) : [];
+  await admin.disconnect();
+
+  // End of each partition at the time of the call; later dead letters are left for the next run
+  const ends = new Map<number, bigint>();
+  for (const { partition, low, high } of topicOffsets) {
+    const committedOffset = committed.length > 0
+      ? committed[0].partitions.find((entry) => entry.partition === partition)?.offset
+      : undefined;
+    const start = committedOffset && BigInt(committedOffset) >= 0n ? BigInt(committedOffset) : BigInt(low);
+    if (start < BigInt(high)) {
+      ends.set(partition, BigInt(high));
+    }
+  }
+  if (ends.size === 0) {
+    return;
+  }
+
+  const reader = kafka.consumer({ groupId });
+  await reader.connect();
+  try {
+    await reader.subscribe({ topic: DLQ_TOPIC, fromBeginning: true });
+
+    await new Promise<void>((resolve, reject) => {
+      let stopped = false;
+      const timer = setTimeout(() => {
+        stopped = true;
+        console.error(`Stopped reading ${DLQ_TOPIC} after ${DLQ_READ_TIMEOUT_MS}ms; partitions ${Array.from(ends.keys()).join(', ')} did not reach their end`);
+        resolve();
+      }, DLQ_READ_TIMEOUT_MS);
+
+      reader.run({
+        autoCommit: commit,
+        eachBatchAutoResolve: false,
+        eachBatch: async ({ batch, resolveOffset, heartbeat }) => {
+          const end = ends.get(batch.partition);
+          for (const message of batch.messages) {
+            if (stopped || end === undefined || BigInt(message.offset) >= end) {
+              break;
+            }
+            if (!(await onMessage(batch.partition, message))) {
+              stopped = true;
+              break;
+            }
+            resolveOffset(message.offset);
+            if (BigInt(message.offset) + 1n >= end) {
+              ends.delete(batch.partition);
+            }
+          }
+          await heartbeat();
+          if (stopped || ends.size === 0) {
+            clearTimeout(timer);
+            resolve();
+          }
+        },
+      }).catch((error) => {
+        clearTimeout(timer);
+        reject(error);
+      });
+    });
+  } finally {
+    await reader.disconnect();
+    if (!commit) {
+      await deleteGroup(groupId);
+    }
+  }
+}
+
+function describe(partition: number, message: KafkaMessage) {
+  return {
+    partition,
+    offset: message.offset,
+    eventId: headerValue(message, 'event-id') || null,
+    attempts: parseInt(headerValue(message, 'retry-attempt') || '0', 10),
+    originalTopic: headerValue(message, 'original-topic') || null,
+    originalPartition: headerValue(message, 'original-partition') || null,
+    originalOffset: headerValue(message, 'original-offset') || null,
+    error: headerValue(message, 'error-message') || null,
+    failedAt: headerValue(message, 'failed-at') || null,
+    contentType: headerValue(message, 'content-type') || null,
+    schemaVersion: headerValue(message, 'schema-version') || null,
+    event: decodeLedgerPayload(message),
+    // Raw payload for events that cannot be decoded
+    value: message.value ? message.value.toString('base64') : null
+  };
+}
+
+async function listDeadLetters(limit: number) {
+  let count = 0;
+  await readDeadLetters(`${DLQ_TOPIC}-inspect-${process.pid}-${Date.now()}`, false, async (partition, message) => {
+    console.log(JSON.stringify(describe(partition, message)));
+    count += 1;
+    return count < limit;
+  });
+  console.log(`Listed ${count} dead-lettered events`);
+}
+
+async function replayDeadLetters(partition?: number, offset?: string) {
+  const single = partition !== undefined && offset !== undefined;
+  const groupId = single ? `${DLQ_TOPIC}-inspect-${process.pid}-${Date.now()}` : REPLAY_GROUP_ID;
+  let count = 0;
+
+  await producer.connect();
+  try {
+    await readDeadLetters(groupId, !single, async (messagePartition, message) => {
+      if (single && (messagePartition !== partition || message.offset !== offset)) {
+        return true;
+      }
+
+      const { topic, ...replayed } = replayMessage(message);
+      await producer.send({ topic, messages: [replayed] });
+      console.log(`Replayed ${messagePartition}@${message.offset} to ${topic}`);
+      count += 1;
+      return !single;
+    });
+  } finally {
+    await producer.disconnect();
+  }
+  console.log(`Replayed ${count} dead-lettered events`);
+}
+
+async function main() {
+  const command = process.argv[2];
+
+  if (command === 'list') {
+    await listDeadLetters(parseInt(option('limit') || '100', 10));
+  } else if (command === 'replay') {
+    const partition = option('partition');
+    await replayDeadLetters(partition !== undefined ? parseInt(partition, 10) : undefined, option('offset'));
+  } else {
+    console.log(USAGE);
+    process.exitCode = 1;
+  }
+}
+
+main().catch((error) => {
+  console.error('DLQ command failed:', error);
+  process.exit(1);
+});
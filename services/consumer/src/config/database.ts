@@ -1,17 +1,62 @@
-import { Pool } from 'pg';
+import { Pool, QueryConfig } from 'pg';
 import dotenv from 'dotenv';
+import { instrumentPool } from '../utils/pool-telemetry';
 
 dotenv.config();
 
+// Pool sizing comes from the environment; the pools of every service instance
+// together must stay below Postgres' max_connections. DB_POOL_MAX is the
+// budget of an instance, shared by its cluster workers.
+const CLUSTER_WORKERS = parseInt(process.env.CLUSTER_WORKERS || '1', 10);
+
 const pool = new Pool({
   host: process.env.DB_HOST || 'localhost',
   port: parseInt(process.env.DB_PORT || '5432', 10),
   database: process.env.DB_NAME || 'fintech',
   user: process.env.DB_USER || 'postgres',
   password: process.env.DB_PASSWORD || 'postgres',
-  max: 20,
-  idleTimeoutMillis: 30000,
-  connectionTimeoutMillis: 2000,
+  max: Math.max(1, Math.floor(parseInt(process.env.DB_POOL_MAX || '20', 10) / CLUSTER_WORKERS)),
+  idleTimeoutMillis: parseInt(process.env.DB_POOL_IDLE_TIMEOUT_MS || '30000', 10),
+  connectionTimeoutMillis: parseInt(process.env.DB_POOL_CONNECTION_TIMEOUT_MS || '2000', 10),
 });
 
-export { pool };
\ No newline at end of file
+instrumentPool(pool);
+
+export interface PreparedStatement {
+  name: string;
+  text: string;
+}
+
+const statements = new Map<string, string>();
+
+/**
+ * Register a hot statement to run as a named prepared statement
+ * Each connection parses and plans it once, on first use, and afterwards only
+ * binds and executes it. Names are shared by every statement on a connection,
+ * so they are prefixed with the owning module.
+ * @throws When the name is already registered with different text
+ */
+export function prepare(name: string, text: string): PreparedStatement {
+  const registered = statements.get(name);
+  if (registered !== undefined && registered !== text) {
+    throw new Error(`Prepared statement ${name} is already registered with different text`);
+  }
+  statements.set(name, text);
+  return { name, text };
+}
+
+/**
+ * Query config executing a registered statement with the given values
+ */
+export function prepared(statement: PreparedStatement, values: unknown[]): QueryConfig {
+  return { name: statement.name, text: statement.text, values };
+}
+
+/**
+ * Names of the statements registered as prepared statements
+ */
+export function preparedStatements(): string[] {
+  return Array.from(statements.keys());
+}
+
+export { pool };
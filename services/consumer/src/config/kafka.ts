@@ -3,11 +3,40 @@ import dotenv from 'dotenv';
 
 dotenv.config();
 
+const LEDGER_EVENTS_TOPIC = process.env.LEDGER_EVENTS_TOPIC || 'ledger-events';
+const CONSUMER_GROUP_ID = process.env.CONSUMER_GROUP_ID || 'ledger-events-group';
+const RETRY_GROUP_ID = `${CONSUMER_GROUP_ID}-retry`;
+
+// Delay before each retry tier, e.g. "5000,30000,300000" for three tiers
+const RETRY_DELAYS_MS = (process.env.RETRY_DELAYS_MS || '5000,30000,300000')
+  .split(',')
+  .map((delay) => parseInt(delay, 10))
+  .filter((delay) => !isNaN(delay) && delay >= 0);
+
+const RETRY_TOPICS = RETRY_DELAYS_MS.map((_, index) => `${LEDGER_EVENTS_TOPIC}.retry.${index + 1}`);
+const DLQ_TOPIC = `${LEDGER_EVENTS_TOPIC}.dlq`;
+
 const kafka = new Kafka({
   clientId: 'consumer-service',
   brokers: [process.env.KAFKA_BROKER || 'localhost:9092'],
 });
 
-const consumer = kafka.consumer({ groupId: 'ledger-events-group' });
+const consumer = kafka.consumer({ groupId: CONSUMER_GROUP_ID });
+
+// Failed events are retried out of band so the main partitions keep flowing
+const retryConsumer = kafka.consumer({ groupId: RETRY_GROUP_ID });
+
+const producer = kafka.producer();
 
-export { kafka, consumer };
\ No newline at end of file
+export {
+  kafka,
+  consumer,
+  retryConsumer,
+  producer,
+  LEDGER_EVENTS_TOPIC,
+  CONSUMER_GROUP_ID,
+  RETRY_GROUP_ID,
+  RETRY_DELAYS_MS,
+  RETRY_TOPICS,
+  DLQ_TOPIC
+};
@@ -1,67 +1,67 @@
 import dotenv from 'dotenv';
-import { consumer } from './config/kafka';
+import {
+  consumer,
+  retryConsumer,
+  producer,
+  LEDGER_EVENTS_TOPIC,
+  CONSUMER_GROUP_ID,
+  RETRY_GROUP_ID,
+  RETRY_TOPICS
+} from './config/kafka';
 import { pool } from './config/database';
+import { createLedgerEventHandler } from './utils/event-processor';
+import { ensureRetryTopics } from './utils/retry-pipeline';
+import { startScalingMonitor, trackConsumer } from './utils/consumer-metrics';
+import { startServer } from './server';
+import { initTracing } from './utils/tracing';
 
 dotenv.config();
 
+const PORT = process.env.PORT || 3005;
+
 async function startConsumer() {
+  initTracing('consumer-service');
+
+  // Metrics and health stay reachable while Kafka or the database are unavailable
+  startServer(PORT);
+  trackConsumer(consumer, CONSUMER_GROUP_ID);
+  trackConsumer(retryConsumer, RETRY_GROUP_ID);
+
   try {
     // Connect to Kafka
+    await producer.connect();
+    await ensureRetryTopics().catch((error) => {
+      console.error('Error creating retry topics:', error);
+    });
+
     await consumer.connect();
-    await consumer.subscribe({ topic: 'ledger-events', fromBeginning: true });
-    
+    await consumer.subscribe({ topic: LEDGER_EVENTS_TOPIC, fromBeginning: true });
+
     // Connect to database
     await pool.query('SELECT 1');
     console.log('Connected to database');
-    
+
     // Start consuming messages
     await consumer.run({
-      eachMessage: async ({ topic, partition, message }) => {
-        try {
-          if (message.value) {
-            const eventData = JSON.parse(message.value.toString());
-            console.log('Received event:', eventData);
-            
-            // Insert into ledger_events table
-            await pool.query(
-              `INSERT INTO ledger_events (event_type, account_id, transaction_id, amount, currency, status, metadata) 
-               VALUES ($1, $2, $3, $4, $5, $6, $7)`,
-              [
-                eventData.eventType,
-                eventData.accountId,
-                eventData.transactionId,
-                eventData.amount,
-                eventData.currency || 'USD',
-                'processed',
-                JSON.stringify(eventData)
-              ]
-            );
-            
-            // Insert into audit_logs table
-            await pool.query(
-              `INSERT INTO audit_logs (service_name, action, resource_type, resource_id, metadata) 
-               VALUES ($1, $2, $3, $4, $5)`,
-              [
-                'consumer-service',
-                'ledger_event_processed',
-                'ledger_event',
-                eventData.transactionId,
-                JSON.stringify(eventData)
-              ]
-            );
-            
-            console.log('Event processed successfully');
-          }
-        } catch (error) {
-          console.error('Error processing event:', error);
-        }
-      },
+      eachBatchAutoResolve: false,
+      eachBatch: createLedgerEventHandler(consumer, CONSUMER_GROUP_ID),
     });
-    
+    startScalingMonitor(consumer, CONSUMER_GROUP_ID);
+
+    // Failed events are retried from their own topics without holding back the main partitions
+    if (RETRY_TOPICS.length > 0) {
+      await retryConsumer.connect();
+      await retryConsumer.subscribe({ topics: RETRY_TOPICS, fromBeginning: true });
+      await retryConsumer.run({
+        eachBatchAutoResolve: false,
+        eachBatch: createLedgerEventHandler(retryConsumer, RETRY_GROUP_ID),
+      });
+    }
+
     console.log('Consumer service started and listening for ledger events');
   } catch (error) {
     console.error('Error starting consumer:', error);
   }
 }
 
-startConsumer().catch(console.error);
\ No newline at end of file
+startConsumer().catch(console.error);
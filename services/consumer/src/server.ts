@@ -0,0 +1,91 @@
+import http from 'http';
+import { pool } from './config/database';
+import { registry } from './utils/metrics';
+import { consumerStatus, scalingSignal } from './utils/consumer-metrics';
+import { poolTelemetry } from './utils/pool-telemetry';
+import { startRuntimeMetrics } from './utils/runtime-metrics';
+import { tracingStats } from './utils/tracing';
+import { registerDependency, healthReport, livenessReport, startHealthMonitor } from './utils/health-monitor';
+
+function sendJson(res: http.ServerResponse, status: number, body: unknown) {
+  res.writeHead(status, { 'Content-Type': 'application/json' });
+  res.end(JSON.stringify(body));
+}
+
+// Checked in the background by the health monitor; requests read the last results
+registerDependency({ name: 'database', required: true, check: () => pool.query('SELECT 1') });
+registerDependency({
+  name: 'kafka',
+  required: true,
+  check: async () => {
+    const consumers = Object.values(consumerStatus());
+    if (consumers.length === 0 || consumers.some((status) => status !== 'OK')) {
+      throw new Error('Kafka consumers are not connected');
+    }
+  }
+});
+
+function health(res: http.ServerResponse) {
+  const { ready, services, dependencies } = healthReport();
+  sendJson(res, ready ? 200 : 503, {
+    status: ready ? 'UP' : 'DOWN',
+    timestamp: new Date().toISOString(),
+    services,
+    dependencies,
+    consumers: consumerStatus(),
+    databasePool: poolTelemetry(),
+    tracing: tracingStats()
+  });
+}
+
+function readiness(res: http.ServerResponse) {
+  const { ready, dependencies } = healthReport();
+  sendJson(res, ready ? 200 : 503, {
+    status: ready ? 'READY' : 'NOT_READY',
+    timestamp: new Date().toISOString(),
+    dependencies
+  });
+}
+
+/**
+ * HTTP surface of the consumer service
+ * GET /health       - Database and Kafka status from the background checks, with their latency
+ * GET /health/live  - Whether the process is running
+ * GET /health/ready - Whether the database and Kafka passed their last checks
+ * GET /metrics      - Prometheus metrics: lag, throughput, DB latency, projection latency, runtime
+ * GET /scaling      - Desired replica count derived from lag growth
+ */
+export function startServer(port: number | string): http.Server {
+  startRuntimeMetrics();
+  startHealthMonitor();
+
+  const server = http.createServer((req, res) => {
+    const path = (req.url || '/').split('?')[0];
+
+    if (req.method !== 'GET') {
+      sendJson(res, 405, { error: 'Method not allowed' });
+    } else if (path === '/health') {
+      health(res);
+    } else if (path === '/health/live') {
+      sendJson(res, 200, livenessReport());
+    } else if (path === '/health/ready') {
+      readiness(res);
+    } else if (path === '/metrics') {
+      res.writeHead(200, { 'Content-Type': 'text/plain; version=0.0.4' });
+      res.end(registry.render());
+    } else if (path === '/scaling') {
+      const signal = scalingSignal();
+      sendJson(res, signal ? 200 : 503, signal || { error: 'Scaling signal not sampled yet' });
+    } else if (path === '/') {
+      sendJson(res, 200, { message: 'Consumer Service is running' });
+    } else {
+      sendJson(res, 404, { error: 'Not found' });
+    }
+  });
+
+  server.listen(port, () => {
+    console.log(`Consumer metrics and health server running on port ${port}`);
+  });
+
+  return server;
+}
@@ -0,0 +1,244 @@
+import { Admin, Consumer } from 'kafkajs';
+import { kafka, LEDGER_EVENTS_TOPIC } from '../config/kafka';
+import { Counter, Gauge, Histogram, RateMeter, registry } from './metrics';
+import { LedgerEvent } from './ledger-projection';
+import { loadOffsets } from './offset-store';
+
+const SCALING_INTERVAL_MS = parseInt(process.env.SCALING_INTERVAL_MS || '15000', 10);
+// Time within which the current lag should be drained
+const SCALING_DRAIN_TARGET_SECONDS = parseFloat(process.env.SCALING_DRAIN_TARGET_SECONDS || '60');
+// Fraction of a replica's capacity it should be busy at steady state
+const SCALING_TARGET_UTILIZATION = parseFloat(process.env.SCALING_TARGET_UTILIZATION || '0.7');
+const MIN_REPLICAS = parseInt(process.env.MIN_REPLICAS || '1', 10);
+const MAX_REPLICAS = parseInt(process.env.MAX_REPLICAS || '16', 10);
+
+const eventsProcessed = new Counter('consumer_events_processed_total', 'Ledger events projected, by consumer group');
+const eventsFailed = new Counter('consumer_events_failed_total', 'Ledger events forwarded to a retry tier or the dead-letter topic');
+const eventsPerSecond = new Gauge('consumer_events_per_second', 'Ledger events projected per second over the last 10 seconds');
+const partitionLag = new Gauge('consumer_partition_lag', 'Messages between the high watermark and the last projected offset');
+const batchDbDuration = new Histogram('consumer_batch_db_duration_seconds', 'Duration of the database transaction projecting a batch');
+const projectionLatency = new Histogram(
+  'consumer_event_projection_latency_seconds',
+  'Time from event creation to projection',
+  [0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300]
+);
+const groupMembers = new Gauge('consumer_group_members', 'Members of the main consumer group');
+const desiredReplicas = new Gauge('consumer_desired_replicas', 'Replica count needed to keep up with the ledger-events topic');
+
+const processedRate = new RateMeter(10);
+
+// Partitions assigned to this member, keyed by group, then topic
+const assignmentByGroup = new Map<string, Record<string, number[]>>();
+// Lag of every assigned partition, keyed by group, then topic:partition
+const lagByGroup = new Map<string, Map<string, { topic: string; partition: number; lag: number }>>();
+const connectionStatus = new Map<string, 'OK' | 'ERROR'>();
+// Time spent handling batches since the last scaling sample, keyed by group
+const busyMsByGroup = new Map<string, number>();
+
+registry.onCollect(() => {
+  eventsPerSecond.set(processedRate.rate());
+});
+
+// Replace the lag of a group's partitions, dropping partitions no longer reported
+function replaceLag(groupId: string, lags: Map<string, { topic: string; partition: number; lag: number }>) {
+  for (const [key, { topic, partition }] of lagByGroup.get(groupId) || []) {
+    if (!lags.has(key)) {
+      partitionLag.delete({ group: groupId, topic, partition });
+    }
+  }
+  for (const { topic, partition, lag } of lags.values()) {
+    partitionLag.set(lag, { group: groupId, topic, partition });
+  }
+  lagByGroup.set(groupId, lags);
+}
+
+/**
+ * Track the assignment and connection state of a consumer from its instrumentation events
+ */
+export function trackConsumer(consumer: Consumer, groupId: string): void {
+  const { GROUP_JOIN, CONNECT, DISCONNECT, CRASH } = consumer.events;
+
+  consumer.on(GROUP_JOIN, ({ payload }) => {
+    // Revoked partitions are another member's lag now
+    assignmentByGroup.set(groupId, payload.memberAssignment);
+    replaceLag(groupId, new Map());
+  });
+  consumer.on(CONNECT, () => connectionStatus.set(groupId, 'OK'));
+  consumer.on(DISCONNECT, () => connectionStatus.set(groupId, 'ERROR'));
+  consumer.on(CRASH, () => connectionStatus.set(groupId, 'ERROR'));
+}
+
+/**
+ * Kafka status of every tracked consumer group
+ */
+export function consumerStatus(): Record<string, 'OK' | 'ERROR'> {
+  return Object.fromEntries(connectionStatus);
+}
+
+/**
+ * Record a projected batch
+ * @param groupId Consumer group that projected the batch
+ * @param events Events in the batch
+ * @param dbMs Duration of the database transaction
+ */
+export function recordProjection(groupId: string, events: LedgerEvent[], dbMs: number): void {
+  const now = Date.now();
+  batchDbDuration.observe(dbMs / 1000, { group: groupId });
+  eventsProcessed.inc(events.length, { group: groupId });
+  processedRate.mark(events.length);
+
+  for (const event of events) {
+    const createdAt = event.timestamp ? Date.parse(event.timestamp) : NaN;
+    if (!isNaN(createdAt)) {
+      projectionLatency.observe(Math.max(0, now - createdAt) / 1000, { group: groupId });
+    }
+  }
+}
+
+export function recordFailure(groupId: string, targetTopic: string): void {
+  eventsFailed.inc(1, { group: groupId, target: targetTopic });
+}
+
+/**
+ * Record time spent handling a batch, used to estimate per-replica capacity
+ */
+export function recordBusyTime(groupId: string, ms: number): void {
+  busyMsByGroup.set(groupId, (busyMsByGroup.get(groupId) || 0) + ms);
+}
+
+/**
+ * Sample the lag of every partition assigned to a group
+ * Lag is the high watermark minus the offset last projected into Postgres, so
+ * it keeps growing while the consumer is stalled and no batch completes.
+ * @returns Total lag of the group's assigned partitions
+ */
+export async function sampleLag(admin: Admin, groupId: string): Promise<number> {
+  const assignment = assignmentByGroup.get(groupId) || {};
+  const [watermarks, projected] = await Promise.all([
+    Promise.all(Object.keys(assignment).map(async (topic) => ({ topic, offsets: await admin.fetchTopicOffsets(topic) }))),
+    loadOffsets(groupId, assignment)
+  ]);
+  const projectedOffsets = new Map(projected.map(({ topic, partition, offset }) => [`${topic}:${partition}`, BigInt(offset)]));
+
+  const lags = new Map<string, { topic: string; partition: number; lag: number }>();
+  for (const { topic, offsets } of watermarks) {
+    for (const { partition, high, low } of offsets) {
+      if (!assignment[topic].includes(partition)) {
+        continue;
+      }
+      const key = `${topic}:${partition}`;
+      const last = projectedOffsets.get(key);
+      // Nothing projected yet: every retained message is pending
+      const next = last === undefined ? BigInt(low) : last + 1n;
+      const lag = BigInt(high) > next ? Number(BigInt(high) - next) : 0;
+      lags.set(key, { topic, partition, lag });
+    }
+  }
+
+  // A rebalance during the sample makes it stale
+  if (assignmentByGroup.get(groupId) === assignment) {
+    replaceLag(groupId, lags);
+  }
+  return Array.from(lags.values()).reduce((total, { lag }) => total + lag, 0);
+}
+
+export interface ScalingSample {
+  members: number;
+  partitions: number;
+  lag: number;
+  lagGrowthPerSecond: number;
+  processedPerSecond: number;
+  busyFraction: number;
+}
+
+/**
+ * Replica count needed to absorb incoming events and drain the current lag
+ * Rates are measured on this replica's partitions and assumed representative
+ * of the group; the result is capped by the partition count since extra
+ * members would sit idle.
+ */
+export function computeDesiredReplicas(sample: ScalingSample): number {
+  const members = Math.max(1, sample.members);
+  const ingestPerSecond = Math.max(0, sample.processedPerSecond + sample.lagGrowthPerSecond);
+  const requiredPerSecond = ingestPerSecond + sample.lag / SCALING_DRAIN_TARGET_SECONDS;
+  const capacityPerSecond = sample.busyFraction > 0 ? sample.processedPerSecond / sample.busyFraction : 0;
+
+  let desired: number;
+  if (requiredPerSecond === 0) {
+    desired = MIN_REPLICAS;
+  } else if (capacityPerSecond === 0) {
+    // Nothing processed yet while work is pending
+    desired = members + 1;
+  } else {
+    desired = Math.ceil((members * requiredPerSecond) / (capacityPerSecond * SCALING_TARGET_UTILIZATION));
+  }
+
+  const ceiling = Math.min(MAX_REPLICAS, sample.partitions > 0 ? sample.partitions : MAX_REPLICAS);
+  return Math.max(MIN_REPLICAS, Math.min(ceiling, desired));
+}
+
+let lastScaling: (ScalingSample & { desiredReplicas: number; sampledAt: string }) | null = null;
+
+/**
+ * Latest autoscaling signal, for the orchestrator
+ */
+export function scalingSignal() {
+  return lastScaling;
+}
+
+/**
+ * Periodically sample lag growth and throughput of the main consumer group,
+ * and the lag of every tracked group
+ */
+export function startScalingMonitor(consumer: Consumer, groupId: string): NodeJS.Timeout {
+  const admin = kafka.admin();
+  let previousLag: number | null = null;
+  let previousProcessed = eventsProcessed.get({ group: groupId });
+  let previousAt = Date.now();
+  let connected = false;
+
+  const timer = setInterval(async () => {
+    try {
+      if (!connected) {
+        await admin.connect();
+        connected = true;
+      }
+      // Other tracked groups, e.g. the retry tiers, only report their lag
+      const otherGroups = Array.from(assignmentByGroup.keys()).filter((group) => group !== groupId);
+      const [description, offsets, lag] = await Promise.all([
+        consumer.describeGroup(),
+        admin.fetchTopicOffsets(LEDGER_EVENTS_TOPIC),
+        sampleLag(admin, groupId),
+        ...otherGroups.map((group) => sampleLag(admin, group))
+      ]);
+
+      const now = Date.now();
+      const elapsedSeconds = Math.max((now - previousAt) / 1000, 0.001);
+      const processed = eventsProcessed.get({ group: groupId });
+
+      const sample: ScalingSample = {
+        members: description.members.length,
+        partitions: offsets.length,
+        lag,
+        lagGrowthPerSecond: previousLag === null ? 0 : (lag - previousLag) / elapsedSeconds,
+        processedPerSecond: (processed - previousProcessed) / elapsedSeconds,
+        busyFraction: Math.min(1, (busyMsByGroup.get(groupId) || 0) / (now - previousAt || 1))
+      };
+      const desired = computeDesiredReplicas(sample);
+
+      groupMembers.set(sample.members);
+      desiredReplicas.set(desired);
+      lastScaling = { ...sample, desiredReplicas: desired, sampledAt: new Date(now).toISOString() };
+
+      previousLag = lag;
+      previousProcessed = processed;
+      previousAt = now;
+      busyMsByGroup.set(groupId, 0);
+    } catch (error) {
+      console.error('Error sampling consumer scaling signal:', error);
+    }
+  }, SCALING_INTERVAL_MS);
+
+  timer.unref();
+  return timer;
+}
@@ -0,0 +1,307 @@
+import fs from 'fs';
+import path from 'path';
+
+// Compact binary event encoding following the Avro binary format, with schemas
+// read from a local file-backed registry: schemas/<subject>/v<version>.json.
+// This file is kept identical in every service that produces or consumes events.
+
+export const AVRO_CONTENT_TYPE = 'application/vnd.fintech.avro';
+export const JSON_CONTENT_TYPE = 'application/json';
+
+// Headers carrying the encoding negotiated between producer and consumer
+export const CODEC_HEADERS = {
+  contentType: 'content-type',
+  subject: 'schema-subject',
+  version: 'schema-version'
+};
+
+const SCHEMA_REGISTRY_DIR = process.env.SCHEMA_REGISTRY_DIR || path.join(__dirname, '../../schemas');
+
+type PrimitiveType = 'null' | 'boolean' | 'int' | 'long' | 'double' | 'string';
+type LogicalType = { type: 'long'; logicalType: 'timestamp-millis' };
+export type FieldType = PrimitiveType | LogicalType | FieldType[];
+
+export interface SchemaField {
+  name: string;
+  type: FieldType;
+  default?: unknown;
+}
+
+export interface Schema {
+  subject: string;
+  version: number;
+  fields: SchemaField[];
+}
+
+type EventRecord = Record<string, unknown>;
+
+const schemas = new Map<string, Schema>();
+const latestVersions = new Map<string, number>();
+
+/**
+ * Look up a schema in the registry, loading it from disk on first use
+ * @throws When the subject or version is not registered
+ */
+export function getSchema(subject: string, version: number): Schema {
+  const key = `${subject}:${version}`;
+  let schema = schemas.get(key);
+  if (!schema) {
+    const file = path.join(SCHEMA_REGISTRY_DIR, subject, `v${version}.json`);
+    if (!/^[a-z0-9-]+$/.test(subject) || !Number.isInteger(version) || !fs.existsSync(file)) {
+      throw new Error(`Unknown schema ${subject} v${version}`);
+    }
+    schema = { subject, version, fields: JSON.parse(fs.readFileSync(file, 'utf8')).fields };
+    schemas.set(key, schema);
+  }
+  return schema;
+}
+
+/**
+ * Highest version registered for a subject
+ */
+export function latestVersion(subject: string): number {
+  let version = latestVersions.get(subject);
+  if (version === undefined) {
+    const dir = path.join(SCHEMA_REGISTRY_DIR, subject);
+    const versions = fs.existsSync(dir)
+      ? fs.readdirSync(dir)
+          .map((file) => /^v(\d+)\.json$/.exec(file))
+          .filter((match): match is RegExpExecArray => match !== null)
+          .map((match) => parseInt(match[1], 10))
+      : [];
+    if (versions.length === 0) {
+      throw new Error(`No schemas registered for ${subject}`);
+    }
+    version = Math.max(...versions);
+    latestVersions.set(subject, version);
+  }
+  return version;
+}
+
+class Writer {
+  private buffer = Buffer.allocUnsafe(128);
+  private position = 0;
+
+  private reserve(size: number): void {
+    if (this.position + size > this.buffer.length) {
+      const grown = Buffer.allocUnsafe(Math.max(this.buffer.length * 2, this.position + size));
+      this.buffer.copy(grown, 0, 0, this.position);
+      this.buffer = grown;
+    }
+  }
+
+  // Zigzag varint; arithmetic rather than bitwise so longs beyond 32 bits stay exact
+  long(value: number): void {
+    let zigzag = value >= 0 ? value * 2 : -value * 2 - 1;
+    this.reserve(10);
+    while (zigzag >= 0x80) {
+      this.buffer[this.position++] = (zigzag % 0x80) | 0x80;
+      zigzag = Math.floor(zigzag / 0x80);
+    }
+    this.buffer[this.position++] = zigzag;
+  }
+
+  double(value: number): void {
+    this.reserve(8);
+    this.buffer.writeDoubleLE(value, this.position);
+    this.position += 8;
+  }
+
+  boolean(value: boolean): void {
+    this.reserve(1);
+    this.buffer[this.position++] = value ? 1 : 0;
+  }
+
+  string(value: string): void {
+    const length = Buffer.byteLength(value);
+    this.long(length);
+    this.reserve(length);
+    this.buffer.write(value, this.position, length, 'utf8');
+    this.position += length;
+  }
+
+  finish(): Buffer {
+    return this.buffer.subarray(0, this.position);
+  }
+}
+
+class Reader {
+  private position = 0;
+
+  constructor(private buffer: Buffer) {}
+
+  private ensure(size: number): void {
+    if (this.position + size > this.buffer.length) {
+      throw new Error('Truncated event payload');
+    }
+  }
+
+  long(): number {
+    let value = 0;
+    let multiplier = 1;
+    let byte: number;
+    do {
+      this.ensure(1);
+      byte = this.buffer[this.position++];
+      value += (byte & 0x7f) * multiplier;
+      multiplier *= 0x80;
+    } while (byte & 0x80);
+    return value % 2 === 0 ? value / 2 : -(value + 1) / 2;
+  }
+
+  double(): number {
+    this.ensure(8);
+    const value = this.buffer.readDoubleLE(this.position);
+    this.position += 8;
+    return value;
+  }
+
+  boolean(): boolean {
+    this.ensure(1);
+    return this.buffer[this.position++] !== 0;
+  }
+
+  string(): string {
+    const length = this.long();
+    this.ensure(length);
+    const value = this.buffer.toString('utf8', this.position, this.position + length);
+    this.position += length;
+    return value;
+  }
+
+  done(): boolean {
+    return this.position === this.buffer.length;
+  }
+}
+
+function matchesType(type: FieldType, value: unknown): boolean {
+  if (Array.isArray(type)) {
+    return type.some((member) => matchesType(member, value));
+  }
+  if (typeof type === 'object') {
+    return typeof value === 'string' || typeof value === 'number' || value instanceof Date;
+  }
+  switch (type) {
+    case 'null':
+      return value === null || value === undefined;
+    case 'boolean':
+      return typeof value === 'boolean';
+    case 'string':
+      return typeof value === 'string';
+    default:
+      // Numeric columns from pg arrive as strings
+      return value !== null && value !== undefined && value !== '' && !isNaN(Number(value));
+  }
+}
+
+function writeValue(writer: Writer, type: FieldType, value: unknown, field: string): void {
+  if (Array.isArray(type)) {
+    const index = type.findIndex((member) => matchesType(member, value));
+    if (index === -1) {
+      throw new Error(`Invalid value for ${field}`);
+    }
+    writer.long(index);
+    writeValue(writer, type[index], value, field);
+    return;
+  }
+  if (typeof type === 'object') {
+    // timestamp-millis
+    const millis = value instanceof Date ? value.getTime() : typeof value === 'number' ? value : Date.parse(String(value));
+    if (isNaN(millis)) {
+      throw new Error(`Invalid timestamp for ${field}`);
+    }
+    writer.long(millis);
+    return;
+  }
+  if (!matchesType(type, value)) {
+    throw new Error(`Invalid value for ${field}`);
+  }
+  switch (type) {
+    case 'null':
+      return;
+    case 'boolean':
+      writer.boolean(value as boolean);
+      return;
+    case 'int':
+    case 'long':
+      writer.long(Math.trunc(Number(value)));
+      return;
+    case 'double':
+      writer.double(Number(value));
+      return;
+    case 'string':
+      writer.string(value as string);
+      return;
+  }
+}
+
+function readValue(reader: Reader, type: FieldType): unknown {
+  if (Array.isArray(type)) {
+    const index = reader.long();
+    if (index < 0 || index >= type.length) {
+      throw new Error('Invalid union branch in event payload');
+    }
+    return readValue(reader, type[index]);
+  }
+  if (typeof type === 'object') {
+    return new Date(reader.long()).toISOString();
+  }
+  switch (type) {
+    case 'null':
+      return null;
+    case 'boolean':
+      return reader.boolean();
+    case 'int':
+    case 'long':
+      return reader.long();
+    case 'double':
+      return reader.double();
+    case 'string':
+      return reader.string();
+  }
+}
+
+/**
+ * Encode an event with a registered schema
+ * Fields are written in schema order without names; fields the schema does not
+ * declare are dropped, and missing ones fall back to the schema default.
+ * @param version Schema version, the latest registered one by default
+ * @returns The payload and the headers a consumer needs to decode it
+ */
+export function encodeEvent(subject: string, record: EventRecord, version = latestVersion(subject)) {
+  const schema = getSchema(subject, version);
+  const writer = new Writer();
+  for (const field of schema.fields) {
+    const value = record[field.name] !== undefined ? record[field.name] : field.default;
+    writeValue(writer, field.type, value, field.name);
+  }
+
+  return {
+    value: writer.finish(),
+    headers: {
+      [CODEC_HEADERS.contentType]: AVRO_CONTENT_TYPE,
+      [CODEC_HEADERS.subject]: subject,
+      [CODEC_HEADERS.version]: String(version)
+    }
+  };
+}
+
+/**
+ * Decode an event written with the given schema version
+ * @throws When the schema is unknown or the payload does not match it
+ */
+export function decodeEvent(subject: string, version: number, value: Buffer): EventRecord {
+  const schema = getSchema(subject, version);
+  const reader = new Reader(value);
+  const record: EventRecord = {};
+  for (const field of schema.fields) {
+    const fieldValue = readValue(reader, field.type);
+    if (fieldValue !== null) {
+      record[field.name] = fieldValue;
+    }
+  }
+  if (!reader.done()) {
+    throw new Error(`Trailing bytes after ${subject} v${version} payload`);
+  }
+  return record;
+}
@@ -0,0 +1,202 @@
+import { Consumer, EachBatchHandler, KafkaMessage } from 'kafkajs';
+import { pool } from '../config/database';
+import { loadOffsets, storeOffset } from './offset-store';
+import { LedgerEvent, parseLedgerEvent, projectEvents } from './ledger-projection';
+import { forwardFailedEvent, retryDelayRemaining } from './retry-pipeline';
+import { recordBusyTime, recordFailure, recordProjection } from './consumer-metrics';
+import { AttributeValue, parseTraceparent, Span, SpanContext, traceAsync } from './tracing';
+
+function messagingAttributes(topic: string, partition: number, count: number): Record<string, AttributeValue> {
+  return { 'messaging.system': 'kafka', 'messaging.source': topic, 'messaging.kafka.partition': partition, 'messaging.batch.message_count': count };
+}
+
+/**
+ * Run a batch projection in a consumer span that continues the producers' traces
+ * A batch of one continues its producer's trace directly. A larger batch gets
+ * its own trace, linked to each producer span, and every producing trace gets
+ * a consumer span covering the batch its event was projected in.
+ */
+async function traceBatch<T>(topic: string, partition: number, messages: KafkaMessage[], project: () => Promise<T>): Promise<T> {
+  const attributes = messagingAttributes(topic, partition, messages.length);
+  const parents = messages
+    .map((message) => parseTraceparent(message.headers?.traceparent))
+    .filter((parent): parent is SpanContext => parent !== null);
+
+  if (messages.length === 1) {
+    return traceAsync(`kafka process ${topic}`, { kind: 'consumer', parent: parents[0] || null, attributes }, project);
+  }
+
+  return traceAsync(`kafka process ${topic}`, { kind: 'consumer', parent: null, links: parents, attributes }, async (batchSpan) => {
+    const messageSpans = parents.map((parent) => new Span(`kafka process ${topic}`, {
+      kind: 'consumer',
+      parent,
+      links: [batchSpan],
+      attributes
+    }));
+    try {
+      return await project();
+    } catch (error) {
+      messageSpans.forEach((span) => span.recordError(error));
+      throw error;
+    } finally {
+      messageSpans.forEach((span) => span.end());
+    }
+  });
+}
+
+/**
+ * Create the eachBatch handler that projects ledger events for a consumer group
+ * Each batch is projected in one transaction together with its offset. When
+ * that fails, events are projected one by one and the ones that still fail are
+ * forwarded to the retry tiers, so a poison event never stalls its partition.
+ * @param consumer Consumer the handler runs on
+ * @param groupId Consumer group the stored offsets belong to
+ */
+export function createLedgerEventHandler(consumer: Consumer, groupId: string): EachBatchHandler {
+  // Last offset projected into Postgres, keyed by topic:partition
+  const projectedOffsets = new Map<string, bigint>();
+  // Retry partitions waiting for their next event to become due
+  const pausedUntil = new Map<string, number>();
+  let offsetsRestored: Promise<void> = Promise.resolve();
+
+  // Resume every assigned partition from the offset stored alongside the projected rows
+  async function restoreOffsets(assignment: Record<string, number[]>) {
+    const offsets = await loadOffsets(groupId, assignment);
+    for (const { topic, partition, offset } of offsets) {
+      projectedOffsets.set(`${topic}:${partition}`, BigInt(offset));
+      consumer.seek({ topic, partition, offset: (BigInt(offset) + 1n).toString() });
+    }
+    console.log(`Restored ${offsets.length} partition offsets for ${groupId}`);
+  }
+
+  consumer.on(consumer.events.GROUP_JOIN, ({ payload }) => {
+    offsetsRestored = restoreOffsets(payload.memberAssignment).catch((error) => {
+      // Projection stays exactly-once through event id deduplication
+      console.error(`Error restoring offsets for ${groupId}:`, error);
+    });
+  });
+
+  async function projectBatch(topic: string, partition: number, messages: KafkaMessage[]): Promise<number> {
+    const events: LedgerEvent[] = [];
+    for (const message of messages) {
+      const eventData = parseLedgerEvent(topic, partition, message);
+      if (!eventData) {
+        throw new Error(`Undecodable ledger event at offset ${message.offset}`);
+      }
+      events.push(eventData);
+    }
+
+    const lastOffset = messages[messages.length - 1].offset;
+    const client = await pool.connect();
+    try {
+      const startedAt = Date.now();
+      await client.query('BEGIN');
+      const projectedCount = await projectEvents(client, events);
+      await storeOffset(client, groupId, topic, partition, lastOffset);
+      await client.query('COMMIT');
+
+      projectedOffsets.set(`${topic}:${partition}`, BigInt(lastOffset));
+      recordProjection(groupId, events, Date.now() - startedAt);
+      return projectedCount;
+    } catch (error) {
+      await client.query('ROLLBACK');
+      throw error;
+    } finally {
+      client.release();
+    }
+  }
+
+  async function projectMessage(topic: string, partition: number, message: KafkaMessage): Promise<void> {
+    const eventData = parseLedgerEvent(topic, partition, message);
+    let failure: unknown = new Error('Undecodable ledger event');
+
+    const client = await pool.connect();
+    try {
+      if (eventData) {
+        try {
+          const startedAt = Date.now();
+          await client.query('BEGIN');
+          await projectEvents(client, [eventData]);
+          await storeOffset(client, groupId, topic, partition, message.offset);
+          await client.query('COMMIT');
+
+          projectedOffsets.set(`${topic}:${partition}`, BigInt(message.offset));
+          recordProjection(groupId, [eventData], Date.now() - startedAt);
+          return;
+        } catch (error) {
+          await client.query('ROLLBACK');
+          failure = error;
+        }
+      }
+
+      const targetTopic = await forwardFailedEvent(topic, partition, message, failure, { poison: !eventData });
+      console.error(`Event at ${topic}:${partition}@${message.offset} failed, forwarded to ${targetTopic}:`, failure);
+      recordFailure(groupId, targetTopic);
+
+      await storeOffset(client, groupId, topic, partition, message.offset);
+      projectedOffsets.set(`${topic}:${partition}`, BigInt(message.offset));
+    } finally {
+      client.release();
+    }
+  }
+
+  return async ({ batch, resolveOffset, heartbeat, commitOffsetsIfNecessary, isRunning, isStale, pause }) => {
+    await offsetsRestored;
+    if (!isRunning() || isStale()) {
+      return;
+    }
+
+    const partitionKey = `${batch.topic}:${batch.partition}`;
+    if ((pausedUntil.get(partitionKey) || 0) > Date.now()) {
+      return;
+    }
+
+    const projected = projectedOffsets.get(partitionKey);
+    let messages = batch.messages.filter(
+      (message) => projected === undefined || BigInt(message.offset) > projected
+    );
+
+    // Retried events wait in their tier until due; stop at the first one that is not
+    let resumeAt = 0;
+    const waitingIndex = messages.findIndex((message) => retryDelayRemaining(message) > 0);
+    if (waitingIndex !== -1) {
+      resumeAt = Date.now() + retryDelayRemaining(messages[waitingIndex]);
+      messages = messages.slice(0, waitingIndex);
+    }
+
+    if (messages.length > 0) {
+      const startedAt = Date.now();
+      try {
+        const projectedCount = await traceBatch(
+          batch.topic, batch.partition, messages, () => projectBatch(batch.topic, batch.partition, messages)
+        );
+        console.log(`Processed ${messages.length} events from ${partitionKey} (${projectedCount} new)`);
+      } catch (error) {
+        console.error(`Batch from ${partitionKey} failed, processing events individually:`, error);
+        for (const message of messages) {
+          if (!isRunning() || isStale()) {
+            return;
+          }
+          await traceBatch(batch.topic, batch.partition, [message], () => projectMessage(batch.topic, batch.partition, message));
+          await heartbeat();
+        }
+      }
+      resolveOffset(messages[messages.length - 1].offset);
+      recordBusyTime(groupId, Date.now() - startedAt);
+    }
+
+    if (resumeAt > 0) {
+      pausedUntil.set(partitionKey, resumeAt);
+      const resume = pause();
+      setTimeout(() => {
+        pausedUntil.delete(partitionKey);
+        resume();
+      }, resumeAt - Date.now());
+    } else {
+      resolveOffset(batch.lastOffset());
+    }
+
+    await commitOffsetsIfNecessary();
+    await heartbeat();
+  };
+}
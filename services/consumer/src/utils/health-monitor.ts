@@ -0,0 +1,177 @@
+import { Gauge, Histogram, registry } from './metrics';
+import { withTimeout } from './deadline';
+
+// Dependency health checked in the background. Every HEALTH_CHECK_INTERVAL_MS
+// each registered dependency is probed once, e.g. SELECT 1 or a Redis PING,
+// and /health, /health/ready and /health/live answer from the last results,
+// so frequent probes from load balancers and the orchestrator add no load on
+// the dependencies and do not wait on them. Each dependency keeps the
+// latency of its recent checks, reported as percentiles.
+// This file is kept identical in every service.
+
+const HEALTH_CHECK_INTERVAL_MS = parseInt(process.env.HEALTH_CHECK_INTERVAL_MS || '5000', 10);
+const HEALTH_CHECK_TIMEOUT_MS = parseInt(process.env.HEALTH_CHECK_TIMEOUT_MS || '2000', 10);
+// Checks whose latency the percentiles are taken over
+const HEALTH_LATENCY_SAMPLES = parseInt(process.env.HEALTH_LATENCY_SAMPLES || '120', 10);
+// A result this old no longer counts, e.g. when checks hang or stopped running
+const STALE_AFTER_MS = HEALTH_CHECK_INTERVAL_MS * 3 + HEALTH_CHECK_TIMEOUT_MS;
+
+export type DependencyStatus = 'OK' | 'ERROR' | 'UNKNOWN';
+
+export interface Dependency {
+  name: string;
+  /** Resolves when the dependency is usable; rejects or resolves false when not */
+  check: () => Promise<unknown>;
+  /** Whether the service is not ready without it; optional dependencies only degrade it */
+  required: boolean;
+  /** State reported alongside the check results, e.g. a circuit breaker's */
+  details?: () => Record<string, unknown>;
+}
+
+interface DependencyState {
+  dependency: Dependency;
+  status: DependencyStatus;
+  checkedAt: number;
+  error: string | null;
+  consecutiveFailures: number;
+  latenciesMs: number[];
+  latencyMs: { p50: number; p95: number; p99: number; max: number } | null;
+  // The check still running, so a slow dependency never has two at once
+  pending: Promise<unknown> | null;
+}
+
+const upGauge = new Gauge('health_dependency_up', 'Whether the last background check of a dependency succeeded, by dependency');
+const checkDuration = new Histogram('health_check_duration_seconds', 'Duration of background dependency checks, by dependency');
+
+const dependencies = new Map<string, DependencyState>();
+const startedAt = Date.now();
+let timer: NodeJS.Timeout | null = null;
+
+/**
+ * Add a dependency to the background checks
+ */
+export function registerDependency(dependency: Dependency): void {
+  dependencies.set(dependency.name, {
+    dependency,
+    status: 'UNKNOWN',
+    checkedAt: 0,
+    error: null,
+    consecutiveFailures: 0,
+    latenciesMs: [],
+    latencyMs: null,
+    pending: null
+  });
+}
+
+function percentile(sorted: number[], p: number): number {
+  return sorted[Math.min(sorted.length - 1, Math.ceil((p / 100) * sorted.length) - 1)];
+}
+
+function record(state: DependencyState, ok: boolean, latencyMs: number, error: string | null): void {
+  state.status = ok ? 'OK' : 'ERROR';
+  state.checkedAt = Date.now();
+  state.error = error;
+  state.consecutiveFailures = ok ? 0 : state.consecutiveFailures + 1;
+
+  state.latenciesMs.push(latencyMs);
+  if (state.latenciesMs.length > HEALTH_LATENCY_SAMPLES) {
+    state.latenciesMs.shift();
+  }
+  // Computed here rather than per health request, which only reads it
+  const sorted = [...state.latenciesMs].sort((a, b) => a - b);
+  const round = (ms: number) => Math.round(ms * 100) / 100;
+  state.latencyMs = {
+    p50: round(percentile(sorted, 50)),
+    p95: round(percentile(sorted, 95)),
+    p99: round(percentile(sorted, 99)),
+    max: round(sorted[sorted.length - 1])
+  };
+
+  upGauge.set(ok ? 1 : 0, { dependency: state.dependency.name });
+  checkDuration.observe(latencyMs / 1000, { dependency: state.dependency.name });
+}
+
+async function checkDependency(state: DependencyState): Promise<void> {
+  if (state.pending) {
+    return;
+  }
+  const started = process.hrtime.bigint();
+  const elapsedMs = () => Number(process.hrtime.bigint() - started) / 1e6;
+  state.pending = state.dependency.check().finally(() => {
+    state.pending = null;
+  });
+  try {
+    const result = await withTimeout(`${state.dependency.name} health check`, HEALTH_CHECK_TIMEOUT_MS, () => state.pending!);
+    record(state, result !== false, elapsedMs(), result === false ? 'Check failed' : null);
+  } catch (error) {
+    record(state, false, elapsedMs(), error instanceof Error ? error.message : 'Unknown error');
+  }
+}
+
+/**
+ * Check every dependency now and then every HEALTH_CHECK_INTERVAL_MS
+ */
+export function startHealthMonitor(): void {
+  if (timer) {
+    return;
+  }
+  const checkAll = () => {
+    for (const state of dependencies.values()) {
+      checkDependency(state).catch((error) => {
+        console.error('Health check error:', error);
+      });
+    }
+  };
+  checkAll();
+  timer = setInterval(checkAll, HEALTH_CHECK_INTERVAL_MS);
+  timer.unref();
+}
+
+function currentStatus(state: DependencyState): DependencyStatus {
+  return state.status === 'OK' && Date.now() - state.checkedAt > STALE_AFTER_MS ? 'UNKNOWN' : state.status;
+}
+
+/**
+ * Last check results of every dependency, and whether the service is ready:
+ * every required dependency passed its last check
+ * services holds each dependency's status alone, as /health reported it before.
+ */
+export function healthReport() {
+  const services: Record<string, DependencyStatus> = {};
+  const report: Record<string, Record<string, unknown>> = {};
+  let ready = true;
+  for (const [name, state] of dependencies) {
+    const status = currentStatus(state);
+    if (state.dependency.required && status !== 'OK') {
+      ready = false;
+    }
+    services[name] = status;
+    report[name] = {
+      status,
+      required: state.dependency.required,
+      checkedAt: state.checkedAt ? new Date(state.checkedAt).toISOString() : null,
+      latencyMs: state.latencyMs,
+      consecutiveFailures: state.consecutiveFailures,
+      ...(state.error ? { error: state.error } : {}),
+      ...(state.dependency.details ? state.dependency.details() : {})
+    };
+  }
+  return { ready, services, dependencies: report };
+}
+
+/**
+ * Whether the process itself is running; no dependency is consulted
+ */
+export function livenessReport() {
+  return {
+    status: 'UP',
+    timestamp: new Date().toISOString(),
+    uptimeSeconds: Math.round((Date.now() - startedAt) / 1000)
+  };
+}
+
+registry.onCollect(() => {
+  for (const [name, state] of dependencies) {
+    upGauge.set(currentStatus(state) === 'OK' ? 1 : 0, { dependency: name });
+  }
+});
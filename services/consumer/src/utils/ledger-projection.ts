@@ -0,0 +1,126 @@
+import { PoolClient } from 'pg';
+import { prepare, prepared } from '../config/database';
+import { KafkaMessage } from 'kafkajs';
+import { AVRO_CONTENT_TYPE, CODEC_HEADERS, decodeEvent } from './event-codec';
+
+export interface LedgerEvent {
+  eventId: string;
+  eventType: string;
+  accountId: number;
+  transactionId: number;
+  amount: number;
+  currency?: string;
+  balanceAfter?: number;
+  timestamp?: string;
+  [key: string]: unknown;
+}
+
+/**
+ * Read a header value as a string
+ */
+export function headerValue(message: KafkaMessage, name: string): string | undefined {
+  const value = message.headers ? message.headers[name] : undefined;
+  if (value === undefined) {
+    return undefined;
+  }
+  return (Array.isArray(value) ? value[0] : value).toString();
+}
+
+/**
+ * Decode a ledger event payload according to its content-type header
+ * Events without the header predate binary encoding and are read as JSON.
+ * @returns The decoded event, or null when the payload cannot be decoded
+ */
+export function decodeLedgerPayload(message: KafkaMessage): LedgerEvent | null {
+  if (!message.value) {
+    return null;
+  }
+
+  try {
+    if (headerValue(message, CODEC_HEADERS.contentType) === AVRO_CONTENT_TYPE) {
+      const subject = headerValue(message, CODEC_HEADERS.subject) || 'ledger-event';
+      const version = parseInt(headerValue(message, CODEC_HEADERS.version) || '', 10);
+      return decodeEvent(subject, version, message.value) as LedgerEvent;
+    }
+    return JSON.parse(message.value.toString());
+  } catch (error) {
+    return null;
+  }
+}
+
+/**
+ * Decode a ledger event and resolve its unique event id
+ * Events published before ids were introduced fall back to their log
+ * position, which is stable across replays of the same topic.
+ * @returns The decoded event, or null when the payload cannot be decoded
+ */
+export function parseLedgerEvent(topic: string, partition: number, message: KafkaMessage): LedgerEvent | null {
+  const eventData = decodeLedgerPayload(message);
+  if (!eventData) {
+    return null;
+  }
+
+  eventData.eventId = eventData.eventId
+    || headerValue(message, 'event-id')
+    || `${topic}:${partition}:${message.offset}`;
+
+  return eventData;
+}
+
+// Event fields stored in their own ledger_events columns, left out of metadata
+const COLUMN_FIELDS = new Set(['eventId', 'eventType', 'accountId', 'transactionId', 'amount', 'currency']);
+
+/**
+ * Fields of an event that have no column of their own
+ */
+export function residualMetadata(event: LedgerEvent): Record<string, unknown> {
+  const metadata: Record<string, unknown> = {};
+  for (const [name, value] of Object.entries(event)) {
+    if (!COLUMN_FIELDS.has(name)) {
+      metadata[name] = value;
+    }
+  }
+  return metadata;
+}
+
+const PROJECT_EVENTS = prepare(
+  'consumer.project_events',
+  `WITH incoming AS (
+     SELECT * FROM unnest($1::varchar[], $2::varchar[], $3::int[], $4::int[], $5::numeric[], $6::varchar[], $7::jsonb[])
+       AS e(event_id, event_type, account_id, transaction_id, amount, currency, metadata)
+   ), inserted AS (
+     INSERT INTO ledger_events (event_id, event_type, account_id, transaction_id, amount, currency, status, metadata)
+     SELECT event_id, event_type, account_id, transaction_id, amount, currency, 'processed', metadata
+     FROM incoming
+     ON CONFLICT (event_id) DO NOTHING
+     RETURNING event_id, transaction_id
+   )
+   INSERT INTO audit_logs (service_name, action, resource_type, resource_id, metadata)
+   SELECT 'consumer-service', 'ledger_event_processed', 'ledger_event', transaction_id, jsonb_build_object('eventId', event_id)
+   FROM inserted`
+);
+
+/**
+ * Project a batch of ledger events into ledger_events and audit_logs
+ * Runs as a single statement: events whose id was already projected are
+ * skipped, and only newly inserted events produce an audit log entry, which
+ * references the event by id rather than repeating its payload.
+ * @returns Number of events that were not projected before
+ */
+export async function projectEvents(client: PoolClient, events: LedgerEvent[]): Promise<number> {
+  if (events.length === 0) {
+    return 0;
+  }
+
+  const result = await client.query(prepared(PROJECT_EVENTS, [
+    events.map((event) => event.eventId),
+    events.map((event) => event.eventType),
+    events.map((event) => event.accountId),
+    events.map((event) => event.transactionId),
+    events.map((event) => event.amount),
+    events.map((event) => event.currency || 'USD'),
+    events.map((event) => JSON.stringify(residualMetadata(event)))
+  ]));
+
+  return result.rowCount || 0;
+}
@@ -0,0 +1,64 @@
+import { PoolClient } from 'pg';
+import { pool, prepare, prepared } from '../config/database';
+
+export interface StoredOffset {
+  topic: string;
+  partition: number;
+  offset: string;
+}
+
+// Runs once per projected batch
+const STORE_OFFSET = prepare(
+  'consumer.store_offset',
+  `INSERT INTO consumer_offsets (group_id, topic, partition_id, committed_offset)
+   VALUES ($1, $2, $3, $4)
+   ON CONFLICT (group_id, topic, partition_id) DO UPDATE
+   SET committed_offset = EXCLUDED.committed_offset, updated_at = CURRENT_TIMESTAMP
+   WHERE consumer_offsets.committed_offset < EXCLUDED.committed_offset`
+);
+
+/**
+ * Load the last projected offset of every assigned partition
+ * @param groupId Consumer group the offsets belong to
+ * @param assignment Partitions assigned to this member, keyed by topic
+ * @returns Offsets of the last message projected into Postgres
+ */
+export async function loadOffsets(
+  groupId: string,
+  assignment: Record<string, number[]>
+): Promise<StoredOffset[]> {
+  const topics = Object.keys(assignment);
+  if (topics.length === 0) {
+    return [];
+  }
+
+  const result = await pool.query(
+    `SELECT topic, partition_id, committed_offset
+     FROM consumer_offsets
+     WHERE group_id = $1 AND topic = ANY($2)`,
+    [groupId, topics]
+  );
+
+  return result.rows
+    .filter((row) => (assignment[row.topic] || []).includes(row.partition_id))
+    .map((row) => ({
+      topic: row.topic,
+      partition: row.partition_id,
+      offset: String(row.committed_offset)
+    }));
+}
+
+/**
+ * Record the last projected offset of a partition
+ * Must run inside the transaction that wrote the projected rows. Offsets never
+ * move backwards, so a stale member finishing late cannot rewind the group.
+ */
+export async function storeOffset(
+  client: PoolClient,
+  groupId: string,
+  topic: string,
+  partition: number,
+  offset: string
+): Promise<void> {
+  await client.query(prepared(STORE_OFFSET, [groupId, topic, partition, offset]));
+}
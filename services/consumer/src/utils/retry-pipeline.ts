@@ -0,0 +1,106 @@
+import { IHeaders, KafkaMessage } from 'kafkajs';
+import { kafka, producer, LEDGER_EVENTS_TOPIC, RETRY_DELAYS_MS, RETRY_TOPICS, DLQ_TOPIC } from '../config/kafka';
+import { headerValue } from './ledger-projection';
+
+// Headers describing where a failed event came from and when it may be retried
+export const RETRY_HEADERS = [
+  'retry-attempt',
+  'retry-not-before',
+  'original-topic',
+  'original-partition',
+  'original-offset',
+  'error-message',
+  'failed-at'
+];
+
+/**
+ * Create the retry and dead-letter topics if the broker does not have them yet
+ */
+export async function ensureRetryTopics(): Promise<void> {
+  const admin = kafka.admin();
+  await admin.connect();
+  try {
+    await admin.createTopics({
+      topics: [...RETRY_TOPICS, DLQ_TOPIC].map((topic) => ({ topic })),
+    });
+  } finally {
+    await admin.disconnect();
+  }
+}
+
+/**
+ * Number of times an event has already been retried
+ */
+export function retryAttempt(message: KafkaMessage): number {
+  return parseInt(headerValue(message, 'retry-attempt') || '0', 10) || 0;
+}
+
+/**
+ * Milliseconds until a retried event is due, zero when it can run now
+ */
+export function retryDelayRemaining(message: KafkaMessage, now = Date.now()): number {
+  const notBefore = parseInt(headerValue(message, 'retry-not-before') || '0', 10) || 0;
+  return Math.max(0, notBefore - now);
+}
+
+// Copy the original headers, dropping the retry bookkeeping of previous attempts
+function baseHeaders(message: KafkaMessage): IHeaders {
+  const headers: IHeaders = {};
+  for (const [name, value] of Object.entries(message.headers || {})) {
+    if (value !== undefined && !RETRY_HEADERS.includes(name)) {
+      headers[name] = value;
+    }
+  }
+  return headers;
+}
+
+/**
+ * Forward an event that could not be projected to the next retry tier
+ * Events go to ledger-events.retry.N with an increasing delay, and to the
+ * dead-letter topic once every tier has been exhausted or when they can never
+ * succeed, such as payloads that are not valid JSON.
+ * @returns The topic the event was forwarded to
+ */
+export async function forwardFailedEvent(
+  topic: string,
+  partition: number,
+  message: KafkaMessage,
+  error: unknown,
+  options: { poison?: boolean } = {}
+): Promise<string> {
+  const attempt = retryAttempt(message) + 1;
+  const deadLetter = options.poison || attempt > RETRY_TOPICS.length;
+  const targetTopic = deadLetter ? DLQ_TOPIC : RETRY_TOPICS[attempt - 1];
+
+  const headers: IHeaders = {
+    ...baseHeaders(message),
+    'retry-attempt': String(attempt),
+    'original-topic': headerValue(message, 'original-topic') || topic,
+    'original-partition': headerValue(message, 'original-partition') || String(partition),
+    'original-offset': headerValue(message, 'original-offset') || message.offset,
+    'error-message': error instanceof Error ? error.message : String(error),
+    'failed-at': new Date().toISOString()
+  };
+  if (!deadLetter) {
+    headers['retry-not-before'] = String(Date.now() + RETRY_DELAYS_MS[attempt - 1]);
+  }
+
+  await producer.send({
+    topic: targetTopic,
+    messages: [{ key: message.key, value: message.value, headers }]
+  });
+
+  return targetTopic;
+}
+
+/**
+ * Build a message that republishes a dead-lettered event to its original topic
+ */
+export function replayMessage(message: KafkaMessage): { topic: string; key: Buffer | null; value: Buffer | null; headers: IHeaders } {
+  return {
+    topic: headerValue(message, 'original-topic') || LEDGER_EVENTS_TOPIC,
+    key: message.key,
+    value: message.value,
+    headers: baseHeaders(message)
+  };
+}
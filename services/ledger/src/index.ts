@@ -4,26 +4,62 @@ import helmet from 'helmet';
 import dotenv from 'dotenv';
 import { ledgerRouter } from './routes/ledger';
 import { healthRouter } from './routes/health';
+import { authenticateToken } from './middleware/auth';
+import { redisClient } from './config/redis';
+import { startOwnershipListener } from './utils/account-ownership';
+import { httpMetrics, metricsHandler } from './utils/http-metrics';
+import { startRuntimeMetrics } from './utils/runtime-metrics';
+import { requestTracing } from './utils/request-tracing';
+import { initTracing } from './utils/tracing';
+import { runClustered } from './utils/cluster';
+import { requestDeadline } from './utils/request-deadline';
+import { admissionControl } from './utils/admission-control';
+import { startHealthMonitor } from './utils/health-monitor';
 
 dotenv.config();
 
-const app = express();
-const PORT = process.env.PORT || 3004;
+// Each worker, or the only process when WEB_CONCURRENCY is 1, runs the whole app
+function startWorker(): void {
+  const app = express();
+  const PORT = process.env.PORT || 3004;
 
-// Middleware
-app.use(helmet());
-app.use(cors());
-app.use(express.json());
+  // Connect to Redis for the account ownership cache
+  redisClient.connect().catch(console.error);
 
-// Routes
-app.use('/ledger', ledgerRouter);
-app.use('/health', healthRouter);
+  // Follow account ownership changes for the authorization cache
+  startOwnershipListener().catch(console.error);
 
-// Root endpoint
-app.get('/', (req, res) => {
-  res.json({ message: 'Ledger Service is running' });
-});
+  // Event-loop, GC, memory and pool metrics for /metrics
+  startRuntimeMetrics();
 
-app.listen(PORT, () => {
-  console.log(`Ledger service running on port ${PORT}`);
-});
\ No newline at end of file
+  // Check dependencies in the background; /health serves the last results
+  startHealthMonitor();
+
+  // Export tail-sampled traces under the service name
+  initTracing('ledger-service');
+
+  // Middleware
+  app.use(httpMetrics);
+  app.use(requestTracing);
+  app.use(requestDeadline);
+  app.use(admissionControl);
+  app.use(helmet());
+  app.use(cors());
+  app.use(express.json());
+
+  // Routes
+  app.use('/ledger', authenticateToken, ledgerRouter);
+  app.use('/health', healthRouter);
+  app.get('/metrics', metricsHandler);
+
+  // Root endpoint
+  app.get('/', (req, res) => {
+    res.json({ message: 'Ledger Service is running' });
+  });
+
+  app.listen(PORT, () => {
+    console.log(`Ledger service running on port ${PORT}`);
+  });
+}
+
+runClustered('ledger-service', startWorker);
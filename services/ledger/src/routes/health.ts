@@ -1,31 +1,54 @@
 import { Router, Request, Response } from 'express';
 import { pool } from '../config/database';
+import { tokenCacheStats } from '../middleware/auth';
+import { ownershipCacheStats } from '../utils/account-ownership';
+import { conditionalGetStats } from '../utils/etag';
+import { singleFlightStats } from '../utils/single-flight';
+import { poolTelemetry } from '../utils/pool-telemetry';
+import { tracingStats } from '../utils/tracing';
+import { admissionStats } from '../utils/admission-control';
+import { deadlineStats } from '../utils/deadline';
+import { redisClient } from '../config/redis';
+import { registerDependency, healthReport, livenessReport } from '../utils/health-monitor';
 
 const router = Router();
 
-router.get('/', async (req: Request, res: Response) => {
-  try {
-    // Check database connection
-    const dbResult = await pool.query('SELECT 1');
-    const dbStatus = dbResult.rowCount !== null ? 'OK' : 'ERROR';
-    
-    return res.json({
-      status: 'UP',
-      timestamp: new Date().toISOString(),
-      services: {
-        database: dbStatus
-      }
-    });
-  } catch (error) {
-    return res.status(500).json({
-      status: 'DOWN',
-      timestamp: new Date().toISOString(),
-      services: {
-        database: 'ERROR'
-      },
-      error: error instanceof Error ? error.message : 'Unknown error'
-    });
-  }
+// Checked in the background by the health monitor; requests read the last results
+registerDependency({ name: 'database', required: true, check: () => pool.query('SELECT 1') });
+// Only the balance cache uses Redis; reads fall back to the database
+registerDependency({ name: 'redis', required: false, check: () => redisClient.ping() });
+
+// Liveness: the process is running and serving requests
+router.get('/live', (req: Request, res: Response) => {
+  return res.json(livenessReport());
+});
+
+// Readiness: every required dependency passed its last check
+router.get('/ready', (req: Request, res: Response) => {
+  const { ready, dependencies } = healthReport();
+  return res.status(ready ? 200 : 503).json({
+    status: ready ? 'READY' : 'NOT_READY',
+    timestamp: new Date().toISOString(),
+    dependencies
+  });
+});
+
+router.get('/', (req: Request, res: Response) => {
+  const { ready, services, dependencies } = healthReport();
+  return res.status(ready ? 200 : 503).json({
+    status: ready ? 'UP' : 'DOWN',
+    timestamp: new Date().toISOString(),
+    services,
+    dependencies,
+    tokenCache: tokenCacheStats(),
+    ownershipCache: ownershipCacheStats(),
+    conditionalGets: conditionalGetStats(),
+    singleFlight: singleFlightStats(),
+    databasePool: poolTelemetry(),
+    tracing: tracingStats(),
+    admission: admissionStats(),
+    deadlines: deadlineStats()
+  });
 });
 
 export { router as healthRouter };
\ No newline at end of file
@@ -1,10 +1,56 @@
 import { Router, Request, Response } from 'express';
-import { pool } from '../config/database';
+import { pool, prepare, prepared } from '../config/database';
+import { requireAccountOwner } from '../utils/account-ownership';
+import { cacheBalance, getCachedBalance } from '../utils/balance-cache';
+import { notModified, weakEtag } from '../utils/etag';
+import { singleFlight } from '../utils/single-flight';
 
 const router = Router();
 
+// Columns are listed rather than selected with *, since a prepared statement
+// fails once the shape of its result changes
+const ACCOUNT_VERSION = prepare('ledger.account_version', 'SELECT balance, currency, version FROM accounts WHERE id = $1');
+const LEDGER_PAGE = prepare(
+  'ledger.entries_page',
+  `SELECT l.id, l.transaction_id, l.account_id, l.entry_type, l.amount, l.currency, l.balance_after,
+          l.description, l.created_at, t.transaction_type, t.description as transaction_description
+   FROM ledger l
+   JOIN transactions t ON l.transaction_id = t.id
+   WHERE l.account_id = $1
+   ORDER BY l.created_at DESC
+   LIMIT $2 OFFSET $3`
+);
+const LEDGER_COUNT = prepare('ledger.entries_count', 'SELECT COUNT(*) FROM ledger WHERE account_id = $1');
+const TRANSACTIONS_PAGE = prepare(
+  'ledger.transactions_page',
+  `SELECT id, account_id, transaction_type, amount, currency, description, reference_id, status, created_at, updated_at
+   FROM transactions 
+   WHERE account_id = $1
+   ORDER BY created_at DESC
+   LIMIT $2 OFFSET $3`
+);
+const TRANSACTIONS_COUNT = prepare('ledger.transactions_count', 'SELECT COUNT(*) FROM transactions WHERE account_id = $1');
+
+/**
+ * Balance version of an account, which moves with every ledger entry posted to it
+ * Read from the balance cache when possible.
+ */
+async function accountVersion(accountId: number): Promise<number | null> {
+  const cached = await getCachedBalance(accountId);
+  if (cached) {
+    return cached.version;
+  }
+
+  const result = await pool.query(prepared(ACCOUNT_VERSION, [accountId]));
+  if (result.rows.length === 0) {
+    return null;
+  }
+  await cacheBalance(accountId, result.rows[0]);
+  return Number(result.rows[0].version);
+}
+
 // Get ledger entries for an account
-router.get('/accounts/:accountId', async (req: Request, res: Response) => {
+router.get('/accounts/:accountId', requireAccountOwner('accountId'), async (req: Request, res: Response) => {
   try {
     const accountId = parseInt(req.params.accountId, 10);
     const page = parseInt(req.query.page as string) || 1;
@@ -14,28 +60,26 @@ router.get('/accounts/:accountId', async (req: Request, res: Response) => {
       return res.status(400).json({ error: 'Invalid account ID' });
     }
     
-    const offset = (page - 1) * size;
+    const version = await accountVersion(accountId);
+    if (notModified(req, res, 'GET /ledger/accounts/:accountId', weakEtag('ledger', accountId, version ?? 0, page, size))) {
+      return res.status(304).end();
+    }
     
-    const result = await pool.query(
-      `SELECT l.*, t.transaction_type, t.description as transaction_description
-       FROM ledger l
-       JOIN transactions t ON l.transaction_id = t.id
-       WHERE l.account_id = $1
-       ORDER BY l.created_at DESC
-       LIMIT $2 OFFSET $3`,
-      [accountId, size, offset]
-    );
+    const offset = (page - 1) * size;
     
-    const countResult = await pool.query(
-      'SELECT COUNT(*) FROM ledger WHERE account_id = $1',
-      [accountId]
-    );
+    // Concurrent reads of the same page share its queries
+    const { rows, totalCount } = await singleFlight('GET /ledger/accounts/:accountId', [(req as any).userId, accountId, page, size], async () => {
+      const result = await pool.query(prepared(LEDGER_PAGE, [accountId, size, offset]));
+      
+      const countResult = await pool.query(prepared(LEDGER_COUNT, [accountId]));
+      
+      return { rows: result.rows, totalCount: parseInt(countResult.rows[0].count) };
+    });
     
-    const totalCount = parseInt(countResult.rows[0].count);
     const totalPages = Math.ceil(totalCount / size);
     
     return res.json({
-      entries: result.rows,
+      entries: rows,
       pagination: {
         page,
         size,
@@ -50,7 +94,7 @@ router.get('/accounts/:accountId', async (req: Request, res: Response) => {
 });
 
 // Get transactions for an account
-router.get('/accounts/:accountId/transactions', async (req: Request, res: Response) => {
+router.get('/accounts/:accountId/transactions', requireAccountOwner('accountId'), async (req: Request, res: Response) => {
   try {
     const accountId = parseInt(req.params.accountId, 10);
     const page = parseInt(req.query.page as string) || 1;
@@ -60,26 +104,26 @@ router.get('/accounts/:accountId/transactions', async (req: Request, res: Respon
       return res.status(400).json({ error: 'Invalid account ID' });
     }
     
-    const offset = (page - 1) * size;
+    const version = await accountVersion(accountId);
+    if (notModified(req, res, 'GET /ledger/accounts/:accountId/transactions', weakEtag('transactions', accountId, version ?? 0, page, size))) {
+      return res.status(304).end();
+    }
     
-    const result = await pool.query(
-      `SELECT * FROM transactions 
-       WHERE account_id = $1
-       ORDER BY created_at DESC
-       LIMIT $2 OFFSET $3`,
-      [accountId, size, offset]
-    );
+    const offset = (page - 1) * size;
     
-    const countResult = await pool.query(
-      'SELECT COUNT(*) FROM transactions WHERE account_id = $1',
-      [accountId]
-    );
+    // Concurrent reads of the same page share its queries
+    const { rows, totalCount } = await singleFlight('GET /ledger/accounts/:accountId/transactions', [(req as any).userId, accountId, page, size], async () => {
+      const result = await pool.query(prepared(TRANSACTIONS_PAGE, [accountId, size, offset]));
+      
+      const countResult = await pool.query(prepared(TRANSACTIONS_COUNT, [accountId]));
+      
+      return { rows: result.rows, totalCount: parseInt(countResult.rows[0].count) };
+    });
     
-    const totalCount = parseInt(countResult.rows[0].count);
     const totalPages = Math.ceil(totalCount / size);
     
     return res.json({
-      transactions: result.rows,
+      transactions: rows,
       pagination: {
         page,
         size,
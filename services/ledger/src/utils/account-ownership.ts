@@ -0,0 +1,232 @@
+import { Request, Response, NextFunction } from 'express';
+import { createDedicatedClient, pool, prepare, prepared } from '../config/database';
+import { redisClient } from '../config/redis';
+
+// Account -> owning user, cached in process and in Redis for authorization.
+// A trigger on accounts notifies 'account_owner_changed' with the account id
+// whenever an account is created, deleted or changes owner; every instance
+// listens and drops the entry from both tiers. Accounts that do not exist
+// are cached too, which is safe because their creation is notified.
+// Redis entries are kept under a generation taken each time an instance starts
+// listening or reconnects to Redis: a notification missed while nobody was
+// listening, or whose delete failed, only ever left stale entries in an older
+// generation, which are no longer read.
+// This file is kept identical in every service that authorizes account access.
+
+const OWNER_CHANNEL = 'account_owner_changed';
+const OWNERSHIP_L1_SIZE = parseInt(process.env.OWNERSHIP_L1_SIZE || '50000', 10);
+const OWNERSHIP_L1_TTL_MS = parseInt(process.env.OWNERSHIP_L1_TTL_MS || '60000', 10);
+const OWNERSHIP_CACHE_TTL_SECONDS = parseInt(process.env.OWNERSHIP_CACHE_TTL_SECONDS || '3600', 10);
+const LISTENER_RETRY_MS = 5000;
+
+// Redis value for an account that does not exist
+const NO_OWNER = '0';
+
+const GENERATION_KEY = 'account:owner:generation';
+const ownerKey = (generation: number, accountId: number) => `account:owner:${generation}:${accountId}`;
+
+const OWNER_BY_ACCOUNT = prepare('ownership.owner_by_account', 'SELECT user_id FROM accounts WHERE id = $1');
+
+const l1 = new Map<number, { userId: number | null; expiresAt: number }>();
+const stats = { l1Hits: 0, redisHits: 0, dbLookups: 0, invalidations: 0, errors: 0 };
+
+// Bumped by every notification; a lookup that overlaps one does not cache its
+// result, since it may have read the owner from before the change
+let invalidationEpoch = 0;
+// Both tiers are only trusted while notifications are being received
+let listening = false;
+// Redis generation of this instance, null while the Redis tier is not trusted
+let generation: number | null = null;
+let generationRequests = 0;
+
+function setL1(accountId: number, userId: number | null): void {
+  l1.delete(accountId);
+  l1.set(accountId, { userId, expiresAt: Date.now() + OWNERSHIP_L1_TTL_MS });
+  if (l1.size > OWNERSHIP_L1_SIZE) {
+    l1.delete(l1.keys().next().value as number);
+  }
+}
+
+/**
+ * Move this instance to a new Redis generation, leaving the Redis tier unused until it is set
+ */
+function renewGeneration(): void {
+  const request = ++generationRequests;
+  generation = null;
+  if (!listening || !redisClient.isReady) {
+    return;
+  }
+  redisClient.incr(GENERATION_KEY)
+    .then((value) => {
+      if (request === generationRequests) {
+        generation = value;
+      }
+    })
+    .catch((error) => {
+      stats.errors += 1;
+      console.error('Ownership cache generation error:', error);
+    });
+}
+
+// Redis may have lost or missed deletes while disconnected
+redisClient.on('ready', renewGeneration);
+
+async function invalidate(accountId: number): Promise<void> {
+  invalidationEpoch += 1;
+  stats.invalidations += 1;
+  l1.delete(accountId);
+  const current = generation;
+  if (current !== null && redisClient.isReady) {
+    try {
+      await redisClient.del(ownerKey(current, accountId));
+    } catch (error) {
+      // The entry may still be there
+      if (generation === current) {
+        renewGeneration();
+      }
+      throw error;
+    }
+  }
+}
+
+/**
+ * Id of the user owning an account, or null when the account does not exist
+ * Answered from the in-process cache when possible, then Redis, then the
+ * database; Redis errors fall through to the database.
+ */
+export async function resolveAccountOwner(accountId: number): Promise<number | null> {
+  if (listening) {
+    const local = l1.get(accountId);
+    if (local && local.expiresAt > Date.now()) {
+      stats.l1Hits += 1;
+      return local.userId;
+    }
+  }
+
+  const epoch = invalidationEpoch;
+  const tier = generation;
+
+  if (tier !== null && redisClient.isReady) {
+    try {
+      const cached = await redisClient.get(ownerKey(tier, accountId));
+      if (cached !== null) {
+        const userId = cached === NO_OWNER ? null : parseInt(cached, 10);
+        if (listening && epoch === invalidationEpoch) {
+          setL1(accountId, userId);
+        }
+        stats.redisHits += 1;
+        return userId;
+      }
+    } catch (error) {
+      stats.errors += 1;
+      console.error('Ownership cache read error:', error);
+    }
+  }
+
+  stats.dbLookups += 1;
+  const result = await pool.query(prepared(OWNER_BY_ACCOUNT, [accountId]));
+  const userId: number | null = result.rows.length > 0 ? result.rows[0].user_id : null;
+
+  if (epoch === invalidationEpoch) {
+    if (listening) {
+      setL1(accountId, userId);
+    }
+    if (tier !== null && tier === generation && redisClient.isReady) {
+      redisClient.set(ownerKey(tier, accountId), userId === null ? NO_OWNER : String(userId), { EX: OWNERSHIP_CACHE_TTL_SECONDS })
+        .catch((error) => {
+          stats.errors += 1;
+          console.error('Ownership cache write error:', error);
+        });
+    }
+  }
+  return userId;
+}
+
+/**
+ * Whether an account exists and belongs to the given user
+ */
+export async function isAccountOwner(accountId: number, userId: number): Promise<boolean> {
+  const owner = await resolveAccountOwner(accountId);
+  return owner !== null && owner === userId;
+}
+
+/**
+ * Reject requests for an account, named by a route parameter, that the authenticated user does not own
+ * Missing accounts and other users' accounts both get 404, so the response
+ * does not reveal which accounts exist.
+ */
+export function requireAccountOwner(param: string) {
+  return async (req: Request, res: Response, next: NextFunction): Promise<void> => {
+    const accountId = parseInt(req.params[param], 10);
+    if (isNaN(accountId)) {
+      res.status(400).json({ error: 'Invalid account ID' });
+      return;
+    }
+
+    try {
+      if (!(await isAccountOwner(accountId, (req as any).userId))) {
+        res.status(404).json({ error: 'Account not found' });
+        return;
+      }
+      next();
+    } catch (error) {
+      console.error('Account ownership check error:', error);
+      res.status(500).json({ error: 'Internal server error' });
+    }
+  };
+}
+
+/**
+ * Listen for ownership changes on a dedicated connection outside the pool
+ * Reconnects on failure; notifications missed while disconnected may have
+ * left either tier stale, so the in-process tier is cleared, and both are
+ * bypassed until the listener is back and has taken a new Redis generation.
+ */
+export async function startOwnershipListener(): Promise<void> {
+  const retry = () => {
+    setTimeout(() => {
+      startOwnershipListener().catch(console.error);
+    }, LISTENER_RETRY_MS).unref();
+  };
+
+  const client = createDedicatedClient();
+  let closed = false;
+  const restart = (error: Error) => {
+    if (closed) {
+      return;
+    }
+    closed = true;
+    console.error('Ownership listener error:', error);
+    listening = false;
+    renewGeneration();
+    l1.clear();
+    client.end().catch(() => undefined);
+    retry();
+  };
+  client.on('error', restart);
+  client.on('end', () => restart(new Error('Connection ended')));
+  client.on('notification', (message) => {
+    if (message.channel === OWNER_CHANNEL && message.payload) {
+      invalidate(parseInt(message.payload, 10)).catch((error) => {
+        stats.errors += 1;
+        console.error('Ownership cache invalidation error:', error);
+      });
+    }
+  });
+
+  try {
+    await client.connect();
+    await client.query(`LISTEN ${OWNER_CHANNEL}`);
+    listening = true;
+    renewGeneration();
+  } catch (error) {
+    restart(error as Error);
+  }
+}
+
+/**
+ * Hit rates of the ownership cache and whether invalidations are being received
+ */
+export function ownershipCacheStats() {
+  return { listening, generation, l1Size: l1.size, ...stats };
+}
@@ -0,0 +1,163 @@
+import { AsyncLocalStorage } from 'async_hooks';
+
+// Request deadlines. Each request gets a time budget, REQUEST_TIMEOUT_MS or
+// less when the caller sends an X-Request-Deadline header (Unix time in
+// milliseconds), and the deadline follows the request's async calls through
+// AsyncLocalStorage. Postgres, Redis and gateway calls size their timeouts
+// from the remaining budget, and once the deadline passes or the client
+// disconnects, further calls fail at once instead of doing work nobody waits for.
+// This file is kept identical in every service.
+
+const REQUEST_TIMEOUT_MS = parseInt(process.env.REQUEST_TIMEOUT_MS || '15000', 10);
+
+export type AbandonReason = 'expired' | 'disconnected';
+
+const MESSAGES: Record<AbandonReason, string> = {
+  expired: 'Request deadline exceeded',
+  disconnected: 'Client disconnected'
+};
+
+const stats = { expired: 0, disconnected: 0, refusedCalls: 0 };
+
+export class DeadlineExceededError extends Error {
+  constructor(message = MESSAGES.expired) {
+    super(message);
+    this.name = 'DeadlineExceededError';
+  }
+}
+
+export class Deadline {
+  private controller = new AbortController();
+  private reason: AbandonReason | null = null;
+  detached = false;
+
+  constructor(readonly expiresAt: number) {}
+
+  /** Aborted when the deadline passes or the client disconnects */
+  get signal(): AbortSignal {
+    return this.controller.signal;
+  }
+
+  remainingMs(): number {
+    return Math.max(0, this.expiresAt - Date.now());
+  }
+
+  get exceeded(): boolean {
+    return !this.detached && (this.reason !== null || Date.now() >= this.expiresAt);
+  }
+
+  abort(reason: AbandonReason): void {
+    if (this.detached || this.reason !== null) {
+      return;
+    }
+    this.reason = reason;
+    stats[reason] += 1;
+    this.controller.abort(new DeadlineExceededError(MESSAGES[reason]));
+  }
+
+  /**
+   * @throws {DeadlineExceededError} When the deadline has passed or the client is gone
+   */
+  check(): void {
+    if (this.exceeded) {
+      stats.refusedCalls += 1;
+      throw new DeadlineExceededError(MESSAGES[this.reason || 'expired']);
+    }
+  }
+}
+
+const storage = new AsyncLocalStorage<Deadline>();
+
+/**
+ * Deadline of a request from its X-Request-Deadline header
+ * A caller can shorten the budget but not extend it past REQUEST_TIMEOUT_MS.
+ */
+export function deadlineFromHeader(value: string | undefined, now = Date.now()): Deadline {
+  const requested = value ? parseInt(value, 10) : NaN;
+  const expiresAt = Number.isNaN(requested) ? now + REQUEST_TIMEOUT_MS : Math.min(requested, now + REQUEST_TIMEOUT_MS);
+  return new Deadline(expiresAt);
+}
+
+/**
+ * Deadline of the request being handled, if it still applies
+ */
+export function currentDeadline(): Deadline | undefined {
+  const deadline = storage.getStore();
+  return deadline && !deadline.detached ? deadline : undefined;
+}
+
+/**
+ * Run fn, and every async call it makes, under the deadline
+ */
+export function runWithDeadline<T>(deadline: Deadline, fn: () => T): T {
+  return storage.run(deadline, fn);
+}
+
+/**
+ * Time a call may take: limitMs, or less when the request's budget is shorter
+ * @throws {DeadlineExceededError} When no budget is left
+ */
+export function budgetMs(limitMs: number): number {
+  const deadline = currentDeadline();
+  if (!deadline) {
+    return limitMs;
+  }
+  deadline.check();
+  return Math.max(1, Math.min(limitMs, deadline.remainingMs()));
+}
+
+/**
+ * Let the rest of the request run to completion past its deadline
+ * For work that must not be left half done, e.g. once a payment is taken.
+ */
+export function detachDeadline(): void {
+  const deadline = storage.getStore();
+  if (deadline) {
+    deadline.detached = true;
+  }
+}
+
+/**
+ * Run a call that gives up after limitMs or when the request is abandoned
+ * The call receives a signal to stop work that has not started yet.
+ */
+export function withTimeout<T>(what: string, limitMs: number, call: (signal: AbortSignal) => Promise<T>): Promise<T> {
+  let timeoutMs: number;
+  try {
+    timeoutMs = budgetMs(limitMs);
+  } catch (error) {
+    return Promise.reject(error);
+  }
+
+  const controller = new AbortController();
+  const deadline = currentDeadline();
+  return new Promise<T>((resolve, reject) => {
+    const fail = (error: Error) => {
+      cleanup();
+      controller.abort(error);
+      reject(error);
+    };
+    const onAbandoned = () => fail(deadline!.signal.reason);
+    const timer = setTimeout(() => fail(new Error(`${what} timed out after ${timeoutMs}ms`)), timeoutMs);
+    const cleanup = () => {
+      clearTimeout(timer);
+      deadline?.signal.removeEventListener('abort', onAbandoned);
+    };
+    deadline?.signal.addEventListener('abort', onAbandoned, { once: true });
+
+    call(controller.signal).then((value) => {
+      cleanup();
+      resolve(value);
+    }, (error) => {
+      cleanup();
+      reject(error);
+    });
+  });
+}
+
+/**
+ * Default budget and how many requests were abandoned or refused further calls
+ */
+export function deadlineStats() {
+  return { requestTimeoutMs: REQUEST_TIMEOUT_MS, ...stats };
+}
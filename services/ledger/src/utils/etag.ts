@@ -0,0 +1,71 @@
+import { Request, Response } from 'express';
+
+// Weak ETags built from version counters the service already has, checked
+// before the response is built so an unchanged resource costs neither the
+// query nor the serialization. This file is kept identical in every service
+// that answers conditional GETs.
+
+interface RouteStats {
+  requests: number;
+  notModified: number;
+}
+
+const routes = new Map<string, RouteStats>();
+// A request checked twice, first against a cheap fingerprint and then against
+// the rows it ends up reading, is counted once
+const counted = new WeakSet<Request>();
+
+/**
+ * Weak ETag from the values that identify a version of a resource
+ */
+export function weakEtag(...parts: Array<string | number>): string {
+  return `W/"${parts.join('-')}"`;
+}
+
+// Weak comparison: W/ prefixes are ignored, as RFC 9110 specifies for If-None-Match
+function matches(ifNoneMatch: string, etag: string): boolean {
+  const opaque = etag.replace(/^W\//, '');
+  return ifNoneMatch.split(',').some((candidate) => {
+    const value = candidate.trim();
+    return value === '*' || value.replace(/^W\//, '') === opaque;
+  });
+}
+
+/**
+ * Set the ETag and check whether the client already holds this version
+ * @param route Name the request is counted under in the conditional GET stats
+ * @returns true when the handler should answer 304 instead of the resource
+ */
+export function notModified(req: Request, res: Response, route: string, etag: string): boolean {
+  let stats = routes.get(route);
+  if (!stats) {
+    stats = { requests: 0, notModified: 0 };
+    routes.set(route, stats);
+  }
+  if (!counted.has(req)) {
+    counted.add(req);
+    stats.requests += 1;
+  }
+
+  res.setHeader('ETag', etag);
+  const ifNoneMatch = req.headers['if-none-match'];
+  if (ifNoneMatch && matches(ifNoneMatch, etag)) {
+    stats.notModified += 1;
+    return true;
+  }
+  return false;
+}
+
+/**
+ * Per-route share of GETs answered with 304
+ */
+export function conditionalGetStats() {
+  const result: Record<string, RouteStats & { notModifiedRatio: number }> = {};
+  for (const [route, stats] of routes) {
+    result[route] = {
+      ...stats,
+      notModifiedRatio: stats.requests > 0 ? Math.round((stats.notModified / stats.requests) * 1000) / 1000 : 0
+    };
+  }
+  return result;
+}
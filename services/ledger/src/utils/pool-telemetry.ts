@@ -0,0 +1,359 @@
+import { AsyncResource } from 'async_hooks';
+import path from 'path';
+import { Connection, Pool, PoolClient } from 'pg';
+import { currentSpan, Span } from './tracing';
+import { currentDeadline } from './deadline';
+
+// Instruments a pg Pool to tell waiting for a client apart from waiting for
+// Postgres. Per call site it records how long acquiring a client took, how
+// long each query ran and how long the client was held, and it flags clients
+// held past DB_POOL_LEAK_THRESHOLD_MS. Call sites are the file and line that
+// asked for the client, or the statement name for prepared statements.
+// Within a traced operation, acquires and queries are also recorded as spans.
+// Within a request with a deadline, queries are refused once it has passed
+// (except ROLLBACK) and are bounded by the remaining budget: transactions get
+// SET LOCAL statement_timeout, other statements a client-side query_timeout.
+// COMMIT and ROLLBACK are never timed out, so a transaction's outcome is
+// always known. A statement that times out on the client is cancelled on the
+// server, and its client is destroyed on release rather than reused.
+// This file is kept identical in every service.
+
+const LEAK_THRESHOLD_MS = parseInt(process.env.DB_POOL_LEAK_THRESHOLD_MS || '5000', 10);
+// Resolving call sites captures a short stack trace per acquire; disable to save it
+const TRACK_CALL_SITES = process.env.DB_POOL_TRACK_CALL_SITES !== 'false';
+const SOURCE_ROOT = path.join(__dirname, '..');
+
+const BUCKETS_MS = [1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000];
+
+/**
+ * Fixed-bucket latency histogram; percentiles are reported as bucket upper bounds
+ */
+class LatencyHistogram {
+  private counts = new Array<number>(BUCKETS_MS.length + 1).fill(0);
+  private count = 0;
+  private sumMs = 0;
+  private maxMs = 0;
+
+  observe(ms: number): void {
+    let index = 0;
+    while (index < BUCKETS_MS.length && ms > BUCKETS_MS[index]) {
+      index++;
+    }
+    this.counts[index] += 1;
+    this.count += 1;
+    this.sumMs += ms;
+    this.maxMs = Math.max(this.maxMs, ms);
+  }
+
+  private percentile(p: number): number {
+    let seen = 0;
+    for (let i = 0; i < this.counts.length; i++) {
+      seen += this.counts[i];
+      if (seen >= this.count * p) {
+        return i < BUCKETS_MS.length ? BUCKETS_MS[i] : this.maxMs;
+      }
+    }
+    return this.maxMs;
+  }
+
+  snapshot() {
+    return {
+      count: this.count,
+      avgMs: this.count > 0 ? Math.round((this.sumMs / this.count) * 100) / 100 : 0,
+      p50Ms: this.percentile(0.5),
+      p99Ms: this.percentile(0.99),
+      maxMs: Math.round(this.maxMs * 100) / 100
+    };
+  }
+}
+
+interface SiteStats {
+  acquireWait: LatencyHistogram;
+  queryTime: LatencyHistogram;
+  holdTime: LatencyHistogram;
+  leaks: number;
+}
+
+interface Checkout {
+  site: string;
+  acquiredAt: number;
+  flagged: boolean;
+}
+
+const sites = new Map<string, SiteStats>();
+const checkouts = new Map<PoolClient, Checkout>();
+const instrumentedClients = new WeakSet<PoolClient>();
+const inTransaction = new WeakSet<PoolClient>();
+// Clients whose statement timed out; they may still be busy on the server
+const timedOut = new WeakSet<PoolClient>();
+let instrumentedPool: Pool | null = null;
+// Set while pool.query acquires its client, which pg-pool does synchronously
+let pendingSite: string | null = null;
+
+function siteStats(site: string): SiteStats {
+  let stats = sites.get(site);
+  if (!stats) {
+    stats = { acquireWait: new LatencyHistogram(), queryTime: new LatencyHistogram(), holdTime: new LatencyHistogram(), leaks: 0 };
+    sites.set(site, stats);
+  }
+  return stats;
+}
+
+// First stack frame outside this file and node_modules, relative to the source root
+function callSite(): string {
+  if (!TRACK_CALL_SITES) {
+    return 'pool';
+  }
+  const limit = Error.stackTraceLimit;
+  Error.stackTraceLimit = 12;
+  const stack = new Error().stack || '';
+  Error.stackTraceLimit = limit;
+
+  for (const line of stack.split('\n').slice(1)) {
+    if (line.includes('node_modules') || line.includes('pool-telemetry') || line.includes('node:')) {
+      continue;
+    }
+    const match = /([^\s(]+):(\d+):\d+\)?$/.exec(line.trim());
+    if (match) {
+      return `${path.relative(SOURCE_ROOT, match[1])}:${match[2]}`;
+    }
+  }
+  return 'unknown';
+}
+
+const elapsedMs = (startedAt: bigint) => Number(process.hrtime.bigint() - startedAt) / 1e6;
+
+// Times every query a client runs against the site that checked it out
+function instrumentClient(client: PoolClient): void {
+  if (instrumentedClients.has(client)) {
+    return;
+  }
+  instrumentedClients.add(client);
+
+  const query = client.query.bind(client) as (...args: any[]) => any;
+  (client as any).query = (...args: any[]) => {
+    // Cursors and other submittables report their own progress
+    if (args[0] && typeof args[0].submit === 'function') {
+      return query(...args);
+    }
+
+    const text = typeof args[0] === 'string' ? args[0] : '';
+    const ends = text === 'COMMIT' || text === 'ROLLBACK';
+    if (text === 'BEGIN') {
+      inTransaction.add(client);
+    } else if (ends) {
+      inTransaction.delete(client);
+    }
+    const deadline = currentDeadline();
+    let timeoutMs = 0;
+    if (deadline) {
+      try {
+        if (text !== 'ROLLBACK') {
+          deadline.check();
+        }
+      } catch (error) {
+        return refuse(args, error as Error);
+      }
+      if (text === 'BEGIN') {
+        args[0] = `BEGIN; SET LOCAL statement_timeout = ${Math.max(1, deadline.remainingMs())}`;
+      } else if (!ends && !inTransaction.has(client)) {
+        timeoutMs = Math.max(1, deadline.remainingMs());
+        args = withQueryTimeout(args, timeoutMs);
+      }
+    }
+
+    const checkout = checkouts.get(client);
+    const site = checkout ? checkout.site : 'unknown';
+    const stats = siteStats(site);
+    const span = currentSpan() ? querySpan(args[0], site) : null;
+    const startedAt = process.hrtime.bigint();
+    const done = (error?: Error) => {
+      stats.queryTime.observe(elapsedMs(startedAt));
+      if (timeoutMs > 0 && error && error.message === 'Query read timeout') {
+        timedOut.add(client);
+        cancelStatement(client);
+      }
+      if (span) {
+        if (error) {
+          span.recordError(error);
+        }
+        span.end();
+      }
+    };
+
+    const callback = args[args.length - 1];
+    if (typeof callback === 'function') {
+      args[args.length - 1] = (error: Error, result: unknown) => {
+        done(error);
+        callback(error, result);
+      };
+      return query(...args);
+    }
+
+    const result = query(...args);
+    result.then(() => done(), done);
+    return result;
+  };
+}
+
+// Fail a query without sending it, the way pg reports errors
+function refuse(args: any[], error: Error): unknown {
+  const callback = args[args.length - 1];
+  if (typeof callback === 'function') {
+    process.nextTick(callback, error);
+    return undefined;
+  }
+  return Promise.reject(error);
+}
+
+// pg stops waiting for a reply after a query config's query_timeout
+function withQueryTimeout(args: any[], timeoutMs: number): any[] {
+  if (typeof args[0] === 'string') {
+    const values = Array.isArray(args[1]) ? args[1] : undefined;
+    return [{ text: args[0], values, query_timeout: timeoutMs }, ...args.slice(values ? 2 : 1)];
+  }
+  return [{ ...args[0], query_timeout: timeoutMs }, ...args.slice(1)];
+}
+
+// pg's query_timeout only stops waiting for a statement; Postgres is asked to
+// cancel it over a connection of its own, as the protocol requires
+function cancelStatement(client: PoolClient): void {
+  const { host, port, processID, secretKey } = client as any;
+  const connection = new Connection() as any;
+  // Best effort: the statement is still bounded by the pool's statement_timeout
+  connection.on('error', () => undefined);
+  connection.on('connect', () => connection.cancel(processID, secretKey));
+  if (typeof host === 'string' && host.startsWith('/')) {
+    connection.connect(`${host}/.s.PGSQL.${port}`);
+  } else {
+    connection.connect(port, host);
+  }
+}
+
+// Statement names identify prepared statements; other statements are recorded
+// without their parameter values
+function querySpan(config: string | { name?: string; text?: string }, site: string): Span {
+  const text = typeof config === 'string' ? config : config.name || config.text || '';
+  return new Span('pg.query', {
+    kind: 'client',
+    attributes: { 'db.system': 'postgresql', 'db.statement': text.replace(/\s+/g, ' ').trim().slice(0, 200), 'db.call_site': site }
+  });
+}
+
+function acquired(site: string, startedAt: bigint, client: PoolClient): void {
+  siteStats(site).acquireWait.observe(elapsedMs(startedAt));
+  instrumentClient(client);
+  checkouts.set(client, { site, acquiredAt: Date.now(), flagged: false });
+
+  // pg-pool sets release on every checkout. Releasing with an error destroys
+  // the client, so one that may still be running a statement is not reused.
+  const release = client.release;
+  client.release = (error?: Error | boolean) => {
+    return release(error || (timedOut.has(client) ? new Error('Released after a query read timeout') : undefined));
+  };
+}
+
+/**
+ * Wrap a pool's connect and query to record acquire, query and hold times per call site
+ */
+export function instrumentPool(pool: Pool): void {
+  instrumentedPool = pool;
+
+  const connect = pool.connect.bind(pool) as (...args: any[]) => any;
+  (pool as any).connect = (callback?: (error: Error | undefined, client?: PoolClient, done?: unknown) => void) => {
+    const site = pendingSite || callSite();
+    const startedAt = process.hrtime.bigint();
+    const span = currentSpan() ? new Span('pg.connect', { kind: 'client', attributes: { 'db.call_site': site } }) : null;
+    const settle = (error?: Error) => {
+      if (span) {
+        if (error) {
+          span.recordError(error);
+        }
+        span.end();
+      }
+    };
+
+    if (callback) {
+      // pg-pool hands a released client to the next waiter from the releasing
+      // caller's context; bind the callback to keep the waiter's trace
+      const resume = AsyncResource.bind(callback);
+      return connect((error: Error | undefined, client?: PoolClient, done?: unknown) => {
+        settle(error);
+        if (!error && client) {
+          acquired(site, startedAt, client);
+          done = client.release;
+        }
+        resume(error, client, done);
+      });
+    }
+    return connect().then((client: PoolClient) => {
+      settle();
+      acquired(site, startedAt, client);
+      return client;
+    }, (error: Error) => {
+      settle(error);
+      throw error;
+    });
+  };
+
+  const query = pool.query.bind(pool) as (...args: any[]) => any;
+  (pool as any).query = (...args: any[]) => {
+    pendingSite = args[0] && typeof args[0].name === 'string' ? `statement:${args[0].name}` : callSite();
+    try {
+      return query(...args);
+    } finally {
+      pendingSite = null;
+    }
+  };
+
+  pool.on('release', (error: Error | undefined, client: PoolClient) => {
+    inTransaction.delete(client);
+    const checkout = checkouts.get(client);
+    if (!checkout) {
+      return;
+    }
+    checkouts.delete(client);
+    const heldMs = Date.now() - checkout.acquiredAt;
+    siteStats(checkout.site).holdTime.observe(heldMs);
+    if (checkout.flagged) {
+      console.warn(`Database client from ${checkout.site} released after ${heldMs}ms`);
+    }
+  });
+
+  // Flag each checkout once, while it is still held, so a leak is reported even if it never ends
+  const timer = setInterval(() => {
+    const now = Date.now();
+    for (const checkout of checkouts.values()) {
+      if (!checkout.flagged && now - checkout.acquiredAt > LEAK_THRESHOLD_MS) {
+        checkout.flagged = true;
+        siteStats(checkout.site).leaks += 1;
+        console.warn(`Database client from ${checkout.site} held for over ${LEAK_THRESHOLD_MS}ms`);
+      }
+    }
+  }, Math.min(1000, LEAK_THRESHOLD_MS));
+  timer.unref();
+}
+
+/**
+ * Pool occupancy and per-call-site acquire, query and hold latencies
+ */
+export function poolTelemetry() {
+  const bySite: Record<string, unknown> = {};
+  for (const [site, stats] of sites) {
+    bySite[site] = {
+      acquireWait: stats.acquireWait.snapshot(),
+      queryTime: stats.queryTime.snapshot(),
+      holdTime: stats.holdTime.snapshot(),
+      leaks: stats.leaks
+    };
+  }
+
+  return {
+    totalCount: instrumentedPool ? instrumentedPool.totalCount : 0,
+    idleCount: instrumentedPool ? instrumentedPool.idleCount : 0,
+    waitingCount: instrumentedPool ? instrumentedPool.waitingCount : 0,
+    heldCount: checkouts.size,
+    leakThresholdMs: LEAK_THRESHOLD_MS,
+    callSites: bySite
+  };
+}
@@ -0,0 +1,88 @@
+import { Counter } from './metrics';
+import { currentDeadline, Deadline } from './deadline';
+import { currentSpan } from './tracing';
+
+// Request coalescing for idempotent reads. While a load for a key is in
+// flight, identical requests wait for it and share its result instead of
+// running the same queries again, which is what bursts of clients asking for
+// the same balance or ledger page at once need. Keys name the route, its
+// parameters and the authorized user, so results never cross principals.
+// Nothing is kept once the load settles; caching stays with the balance cache.
+// This file is kept identical in every service that coalesces reads.
+
+const SINGLE_FLIGHT_ENABLED = process.env.SINGLE_FLIGHT_ENABLED !== 'false';
+
+interface RouteStats {
+  requests: number;
+  coalesced: number;
+}
+
+const requestsTotal = new Counter('singleflight_requests_total', 'Coalescable reads, by route');
+const coalescedTotal = new Counter('singleflight_coalesced_total', 'Reads answered by sharing a load already in flight, by route');
+
+interface Flight {
+  promise: Promise<unknown>;
+  // Deadline of the request that started the load, which bounds it
+  owner: Deadline | undefined;
+}
+
+const inFlight = new Map<string, Flight>();
+const routes = new Map<string, RouteStats>();
+
+function routeStats(route: string): RouteStats {
+  let stats = routes.get(route);
+  if (!stats) {
+    stats = { requests: 0, coalesced: 0 };
+    routes.set(route, stats);
+  }
+  return stats;
+}
+
+/**
+ * Run load, or join an identical load already in flight
+ * The result is shared between callers and must not be modified.
+ * @param route Name the read is counted under in the coalescing stats
+ * @param key Parameters and principal that make two reads identical
+ */
+export function singleFlight<T>(route: string, key: Array<string | number>, load: () => Promise<T>): Promise<T> {
+  if (!SINGLE_FLIGHT_ENABLED) {
+    return load();
+  }
+  const stats = routeStats(route);
+  stats.requests += 1;
+  requestsTotal.inc(1, { route });
+
+  const flightKey = `${route}|${key.join('|')}`;
+  const shared = inFlight.get(flightKey);
+  if (!shared) {
+    const promise = load().finally(() => inFlight.delete(flightKey));
+    inFlight.set(flightKey, { promise, owner: currentDeadline() });
+    return promise;
+  }
+
+  stats.coalesced += 1;
+  coalescedTotal.inc(1, { route });
+  currentSpan()?.setAttribute('singleflight.coalesced', true);
+  return (shared.promise as Promise<T>).catch((error) => {
+    // A load cut short because the request that started it was abandoned
+    // says nothing about this caller's read, which it then loads itself
+    if (shared.owner?.exceeded && !currentDeadline()?.exceeded) {
+      return load();
+    }
+    throw error;
+  });
+}
+
+/**
+ * Per-route share of reads that joined a load already in flight
+ */
+export function singleFlightStats() {
+  const result: Record<string, RouteStats & { coalescedRatio: number }> = {};
+  for (const [route, stats] of routes) {
+    result[route] = {
+      ...stats,
+      coalescedRatio: stats.requests > 0 ? Math.round((stats.coalesced / stats.requests) * 1000) / 1000 : 0
+    };
+  }
+  return { inFlight: inFlight.size, routes: result };
+}
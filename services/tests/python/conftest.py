@@ -3,7 +3,10 @@ pytest configuration and fixtures for fintech microservices tests
 """
 
 import pytest
+import json
 import os
+import shutil
+import subprocess
 import sys
 from unittest.mock import Mock, patch
 
@@ -14,6 +17,47 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'transfer
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'ledger', 'src'))
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'consumer', 'src'))
 
+SERVICES_DIR = os.path.join(os.path.dirname(__file__), '..', '..')
+# Module preloaded so node can require the services' TypeScript sources
+TS_NODE_REGISTER = os.environ.get('TS_NODE_REGISTER', 'ts-node/register/transpile-only')
+# Set in CI, where node and the npm dependencies are installed, so scripts
+# that cannot run fail instead of being skipped
+REQUIRE_SERVICE_SCRIPTS = os.environ.get('REQUIRE_SERVICE_SCRIPTS') == '1'
+
+@pytest.fixture
+def run_service_script():
+    """Run a Node.js script against a service's TypeScript sources
+
+    The script runs from the service directory, so it can require('./src/...'),
+    and prints its result as JSON on its last line of output. Skipped when
+    node, the service's npm dependencies or TS_NODE_REGISTER are not installed,
+    unless REQUIRE_SERVICE_SCRIPTS=1.
+    """
+    unavailable = pytest.fail if REQUIRE_SERVICE_SCRIPTS else pytest.skip
+    node = os.environ.get('NODE_BINARY') or shutil.which('node')
+    if not node:
+        unavailable('node is not installed')
+
+    def run(service, script, env=None, timeout=30):
+        service_dir = os.path.join(SERVICES_DIR, service)
+        if not os.path.isdir(os.path.join(service_dir, 'node_modules')):
+            unavailable(f'npm dependencies of {service} are not installed')
+        loads = subprocess.run([node, '-r', TS_NODE_REGISTER, '-e', ''], cwd=service_dir, capture_output=True)
+        if loads.returncode != 0:
+            unavailable(f'{TS_NODE_REGISTER} cannot be loaded in {service}')
+        completed = subprocess.run(
+            [node, '-r', TS_NODE_REGISTER, '-e', script],
+            cwd=service_dir,
+            env={**os.environ, **(env or {})},
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+        assert completed.returncode == 0, completed.stderr
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    return run
+
 @pytest.fixture
 def mock_request():
     """Create a mock HTTP request object"""
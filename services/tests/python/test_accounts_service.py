@@ -4,7 +4,7 @@ Unit tests for the Accounts Service
 
 import pytest
 from unittest.mock import Mock
-from .test_config import TestDataFactories, TestUtilities
+from .test_config import NodeScripts, TestDataFactories, TestUtilities
 
 
 class TestAccountsService:
@@ -58,6 +58,62 @@ class TestAccountsService:
         assert mock_response.status_code == 401
         assert mock_response.body['error'] == 'Access token required'
     
+    def test_verified_tokens_cached_by_signature(self, run_service_script):
+        """Test a cached signature only matches its own token and is re-verified after the cache TTL or the token's expiry"""
+        # Arrange: a 60s cache cap; the clock is advanced by hand
+        script = """
+const jwt = require('jsonwebtoken');
+const { authenticateToken, tokenCacheStats } = require('./src/middleware/auth');
+
+let now = Date.now();
+Date.now = () => now;
+
+function authenticate(token) {
+  const req = { headers: { authorization: `Bearer ${token}` } };
+  const res = { statusCode: 200, status(code) { this.statusCode = code; return this; }, json() { return this; } };
+  let userId = null;
+  authenticateToken(req, res, () => { userId = req.userId; });
+  return { status: res.statusCode, userId };
+}
+
+const longLived = jwt.sign({ userId: 1, email: 'a@example.com', roles: ['user'] }, 'test-secret', { expiresIn: '1h' });
+const shortLived = jwt.sign({ userId: 2, email: 'b@example.com', roles: ['user'] }, 'test-secret', { expiresIn: 30 });
+// Same signature segment, different payload
+const [, , signature] = longLived.split('.');
+const forgedPayload = Buffer.from(JSON.stringify({ userId: 99, email: 'x@example.com', roles: ['admin'] })).toString('base64url');
+const forged = `${longLived.split('.')[0]}.${forgedPayload}.${signature}`;
+
+const first = authenticate(longLived);
+const cached = authenticate(longLived);
+const forgedResult = authenticate(forged);
+const afterHits = tokenCacheStats();
+
+authenticate(shortLived);
+now += 45 * 1000;
+// Past the short token's exp but inside the cache cap
+const shortAfterExpiry = authenticate(shortLived);
+now += 30 * 1000;
+// Past the 60s cap, the long token is verified again and still accepted
+const longAfterCap = authenticate(longLived);
+console.log(JSON.stringify({ first, cached, forgedResult, afterHits, shortAfterExpiry, longAfterCap, stats: tokenCacheStats() }));
+"""
+
+        # Act
+        result = run_service_script('accounts', script, env={
+            'JWT_SECRET': 'test-secret',
+            'TOKEN_CACHE_MAX_TTL_SECONDS': '60'
+        })
+
+        # Assert
+        assert result['first'] == {'status': 200, 'userId': 1}
+        assert result['cached'] == {'status': 200, 'userId': 1}
+        assert result['forgedResult'] == {'status': 403, 'userId': None}
+        assert result['afterHits']['hits'] == 1
+        assert result['afterHits']['misses'] == 2
+        assert result['shortAfterExpiry'] == {'status': 403, 'userId': None}
+        assert result['longAfterCap'] == {'status': 200, 'userId': 1}
+        assert result['stats']['expirations'] == 2
+
     def test_get_account_balance_success(self, mock_request, mock_response, mock_db_pool):
         """Test successful retrieval of account balance"""
         # Arrange
@@ -81,6 +137,353 @@ class TestAccountsService:
         assert 'balance' in mock_response.body
         assert 'currency' in mock_response.body
     
+    def test_balance_cache_keeps_newest_version(self, run_service_script):
+        """Test cached balances are only ever replaced by newer versions, and L1 entries expire after BALANCE_L1_TTL_MS"""
+        # Arrange: the clock is advanced by hand
+        script = NodeScripts.FAKE_REDIS + """
+let now = Date.now();
+Date.now = () => now;
+
+(async () => {
+  process.env.REDIS_PORT = String(await startFakeRedis());
+  const { redisClient } = require('./src/config/redis');
+  const { cacheBalance, applyBalanceChange, getCachedBalance, balanceCacheStats } = require('./src/utils/balance-cache');
+  await redisClient.connect();
+  const stored = () => Object.fromEntries(redisKeys.get('balance:1').value);
+
+  await cacheBalance(1, { balance: '100', currency: 'USD', version: 5 });
+  // A slow writer still holding an older balance
+  await cacheBalance(1, { balance: 50, currency: 'USD', version: 4 });
+  const afterStaleWrite = stored();
+  await applyBalanceChange(1, '120.5', 6);
+  const afterChange = stored();
+  // Changes to accounts nobody cached are not cached either
+  await applyBalanceChange(2, 10, 3);
+
+  // Another instance caches a newer balance; this one keeps serving its L1 entry until it expires
+  redisKeys.get('balance:1').value.set('version', '7').set('balance', '130.00');
+  const fromL1 = await getCachedBalance(1);
+  now += 1001;
+  const afterL1Expiry = await getCachedBalance(1);
+
+  console.log(JSON.stringify({
+    afterStaleWrite,
+    afterChange,
+    uncachedAccount: redisKeys.has('balance:2'),
+    fromL1,
+    afterL1Expiry,
+    stats: balanceCacheStats()
+  }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('accounts', script, env={'BALANCE_L1_TTL_MS': '1000'})
+
+        # Assert
+        assert result['afterStaleWrite'] == {'version': '5', 'balance': '100.00', 'currency': 'USD'}
+        assert result['afterChange'] == {'version': '6', 'balance': '120.50', 'currency': 'USD'}
+        assert result['uncachedAccount'] is False
+        assert result['fromL1'] == {'balance': '120.50', 'currency': 'USD', 'version': 6}
+        assert result['afterL1Expiry'] == {'balance': '130.00', 'currency': 'USD', 'version': 7}
+        assert result['stats']['staleWritesRejected'] == 1
+        assert result['stats']['l1Hits'] == 1
+        assert result['stats']['redisHits'] == 1
+
+    def test_get_balances_batch(self, run_service_script):
+        """Test batch balance lookup deduplicates ids, refuses ids no account can have, and reports other users' accounts as not found"""
+        # Arrange: user 1 owns accounts 1 and 2, account 99 belongs to user 2
+        script = NodeScripts.FAKE_PG + """
+const express = require('express');
+const http = require('http');
+const { pool } = require('./src/config/database');
+const { accountsRouter } = require('./src/routes/accounts');
+
+const owners = { 1: 1, 2: 1, 99: 2 };
+useFakePostgres(pool, (query) => {
+  const [ids, userId] = query.values;
+  return ids.filter((id) => owners[id] === userId).map((id) => ({ id, balance: `${id}00.00`, currency: 'USD', version: '1' }));
+});
+
+const app = express();
+app.use(express.json());
+app.use((req, res, next) => {
+  req.userId = 1;
+  next();
+});
+app.use('/accounts', accountsRouter);
+
+function send(accountIds) {
+  return new Promise((resolve) => {
+    const body = JSON.stringify({ accountIds });
+    const headers = { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) };
+    http.request({ port: server.address().port, method: 'POST', path: '/accounts/balances', headers, agent: false }, (res) => {
+      let text = '';
+      res.on('data', (chunk) => text += chunk);
+      res.on('end', () => resolve({ status: res.statusCode, body: JSON.parse(text) }));
+    }).end(body);
+  });
+}
+
+const server = app.listen(0, async () => {
+  const mixed = await send([2, 1, 2, 99]);
+  const largestId = await send([2147483647]);
+  const outOfRange = await send([1, 2147483648]);
+  const notIntegers = await send([1, '2']);
+  const empty = await send([]);
+  // Duplicates do not count against the limit of 3
+  const repeated = await send([1, 1, 1, 1, 2]);
+  const overLimit = await send([1, 2, 3, 4]);
+  console.log(JSON.stringify({
+    mixed, largestId, outOfRange, notIntegers, empty, repeated, overLimit,
+    lookups: queries.map((query) => ({ name: query.name, values: query.values }))
+  }));
+  process.exit(0);
+});
+"""
+
+        # Act
+        result = run_service_script('accounts', script, env={'BALANCE_BATCH_MAX_ACCOUNTS': '3'})
+
+        # Assert
+        assert result['mixed'] == {'status': 200, 'body': {
+            'balances': [
+                {'id': 2, 'balance': '200.00', 'currency': 'USD'},
+                {'id': 1, 'balance': '100.00', 'currency': 'USD'}
+            ],
+            'notFound': [99]
+        }}
+        assert result['largestId'] == {'status': 200, 'body': {'balances': [], 'notFound': [2147483647]}}
+        for refused in ('outOfRange', 'notIntegers', 'empty', 'overLimit'):
+            assert result[refused]['status'] == 400
+        assert result['repeated']['status'] == 200
+        # One query per accepted request, with each id once
+        assert result['lookups'] == [
+            {'name': 'accounts.balances_by_ids', 'values': [[2, 1, 99], 1]},
+            {'name': 'accounts.balances_by_ids', 'values': [[2147483647], 1]},
+            {'name': 'accounts.balances_by_ids', 'values': [[1, 2], 1]}
+        ]
+
+    def test_account_owner_cached_only_while_listening(self, run_service_script):
+        """Test owners are cached while notifications arrive, a notification drops both tiers, and a lookup overlapping one caches nothing"""
+        # Arrange: account 1 belongs to user 7; lookups of account 3 wait until released
+        script = NodeScripts.FAKE_PG + NodeScripts.FAKE_REDIS + """
+const pg = require('pg');
+
+let listener = null;
+pg.Client = class ListenClient extends EventEmitter {
+  constructor() {
+    super();
+    listener = this;
+  }
+  connect() { return Promise.resolve(); }
+  query() { return Promise.resolve({ rows: [] }); }
+  end() { return Promise.resolve(); }
+};
+
+const owners = { 1: 7, 3: 7 };
+let releaseLookup = null;
+const tick = () => new Promise((resolve) => setTimeout(resolve, 50));
+const notify = async (accountId) => {
+  listener.emit('notification', { channel: 'account_owner_changed', payload: String(accountId) });
+  await tick();
+};
+
+(async () => {
+  process.env.REDIS_PORT = String(await startFakeRedis());
+  const { pool } = require('./src/config/database');
+  const { redisClient } = require('./src/config/redis');
+  const { resolveAccountOwner, startOwnershipListener, ownershipCacheStats } = require('./src/utils/account-ownership');
+  useFakePostgres(pool, async (query) => {
+    const [accountId] = query.values;
+    if (accountId === 3) await new Promise((resolve) => { releaseLookup = resolve; });
+    return owners[accountId] ? [{ user_id: owners[accountId] }] : [];
+  });
+  await redisClient.connect();
+  const ownerKeys = () => Array.from(redisKeys.keys()).filter((key) => key !== 'account:owner:generation').sort();
+  const lookups = () => queries.length;
+
+  // Not listening: nothing is read from or written to either tier
+  await resolveAccountOwner(1);
+  await resolveAccountOwner(1);
+  await tick();
+  const beforeListening = { lookups: lookups(), keys: ownerKeys() };
+
+  await startOwnershipListener();
+  await tick();
+  await resolveAccountOwner(1);
+  await resolveAccountOwner(2);
+  await tick();
+  await resolveAccountOwner(1);
+  const whileListening = { lookups: lookups(), keys: ownerKeys(), stats: ownershipCacheStats() };
+
+  owners[1] = 8;
+  await notify(1);
+  const afterNotification = { keys: ownerKeys(), owner: await resolveAccountOwner(1), lookups: lookups() };
+
+  // Account 3 is read before its owner changes and returned after the notification
+  const overlapping = resolveAccountOwner(3);
+  await tick();
+  await notify(3);
+  releaseLookup();
+  const overlappingOwner = await overlapping;
+  await tick();
+  const afterOverlap = { keys: ownerKeys(), lookups: lookups() };
+
+  // A dropped listener bypasses both tiers; reconnecting moves to a new generation
+  listener.emit('end');
+  await resolveAccountOwner(1);
+  const whileDropped = { lookups: lookups(), stats: ownershipCacheStats() };
+  await startOwnershipListener();
+  await tick();
+  await resolveAccountOwner(1);
+  await tick();
+  const afterReconnect = { lookups: lookups(), keys: ownerKeys(), stats: ownershipCacheStats() };
+
+  console.log(JSON.stringify({
+    beforeListening, whileListening, afterNotification, overlappingOwner, afterOverlap, whileDropped, afterReconnect
+  }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('accounts', script)
+
+        # Assert
+        assert result['beforeListening'] == {'lookups': 2, 'keys': []}
+        assert result['whileListening']['lookups'] == 4
+        assert result['whileListening']['keys'] == ['account:owner:1:1', 'account:owner:1:2']
+        assert result['whileListening']['stats']['generation'] == 1
+        assert result['whileListening']['stats']['l1Hits'] == 1
+        assert result['afterNotification'] == {'keys': ['account:owner:1:2'], 'owner': 8, 'lookups': 5}
+        assert result['overlappingOwner'] == 7
+        assert result['afterOverlap'] == {'keys': ['account:owner:1:1', 'account:owner:1:2'], 'lookups': 6}
+        assert result['whileDropped']['lookups'] == 7
+        assert result['whileDropped']['stats']['listening'] is False
+        assert result['whileDropped']['stats']['generation'] is None
+        assert result['afterReconnect']['lookups'] == 8
+        assert result['afterReconnect']['stats']['generation'] == 2
+        assert 'account:owner:2:1' in result['afterReconnect']['keys']
+
+    def test_get_account_balance_not_modified(self, run_service_script):
+        """Test If-None-Match is compared weakly, against each listed ETag or *, and each request is counted once"""
+        # Arrange
+        script = """
+const { notModified, weakEtag, conditionalGetStats } = require('./src/utils/etag');
+
+const etag = weakEtag('balance', 1, 7);
+function check(ifNoneMatch, etags = [etag]) {
+  const req = { headers: ifNoneMatch === undefined ? {} : { 'if-none-match': ifNoneMatch } };
+  const headers = {};
+  const res = { setHeader: (name, value) => { headers[name] = value; } };
+  const results = [];
+  for (const current of etags) {
+    results.push(notModified(req, res, 'GET /accounts/:id/balance', current));
+  }
+  return { results, etag: headers.ETag };
+}
+
+console.log(JSON.stringify({
+  etag,
+  same: check('W/"balance-1-7"'),
+  strong: check('"balance-1-7"'),
+  listed: check('"other", W/"balance-1-6" ,W/"balance-1-7"'),
+  any: check('*'),
+  older: check('W/"balance-1-6"'),
+  absent: check(undefined),
+  // The fingerprint is from before a change the rows read already include
+  twice: check('W/"balance-1-7"', [weakEtag('balance', 1, 6), etag]),
+  stats: conditionalGetStats()
+}));
+"""
+
+        # Act
+        result = run_service_script('accounts', script)
+
+        # Assert
+        assert result['etag'] == 'W/"balance-1-7"'
+        for name in ('same', 'strong', 'listed', 'any'):
+            assert result[name] == {'results': [True], 'etag': 'W/"balance-1-7"'}
+        assert result['older'] == {'results': [False], 'etag': 'W/"balance-1-7"'}
+        assert result['absent'] == {'results': [False], 'etag': 'W/"balance-1-7"'}
+        assert result['twice'] == {'results': [False, True], 'etag': 'W/"balance-1-7"'}
+        assert result['stats'] == {
+            'GET /accounts/:id/balance': {'requests': 7, 'notModified': 5, 'notModifiedRatio': 0.714}
+        }
+
+    def test_concurrent_balance_reads_share_one_query(self, run_service_script):
+        """Test identical concurrent reads share one load, other users and accounts load separately, and followers of an abandoned load retry it"""
+        # Arrange: loads settle after 20ms
+        script = """
+const { singleFlight, singleFlightStats } = require('./src/utils/single-flight');
+const { Deadline, runWithDeadline } = require('./src/utils/deadline');
+
+const route = 'GET /accounts/:id/balance';
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+const loads = [];
+const loader = (userId, accountId) => async () => {
+  loads.push(`${userId}:${accountId}`);
+  await sleep(20);
+  return { balance: `${accountId}00.00` };
+};
+const read = (userId, accountId) => singleFlight(route, [userId, accountId], loader(userId, accountId));
+
+(async () => {
+  const burst = await Promise.all([
+    ...Array.from({ length: 50 }, () => read(1, 1)),
+    read(2, 1),
+    read(1, 2)
+  ]);
+  const concurrentLoads = loads.splice(0);
+  // Nothing is kept once a load settles
+  await read(1, 1);
+  const laterLoads = loads.splice(0);
+
+  // The leader's request gives up after 10ms and its load fails with it
+  const abandoned = () => sleep(30).then(() => { throw new Error('Request deadline exceeded'); });
+  const leader = runWithDeadline(new Deadline(Date.now() + 10), () => singleFlight(route, [1, 3], abandoned))
+    .then(() => 'loaded', (error) => error.message);
+  const follower = singleFlight(route, [1, 3], loader(1, 3));
+  const expiredFollower = runWithDeadline(new Deadline(Date.now() + 10), () => singleFlight(route, [1, 3], loader(1, 3)))
+    .then(() => 'loaded', (error) => error.message);
+  // A load that fails for any other reason is not retried
+  const failing = singleFlight(route, [1, 4], () => sleep(20).then(() => { throw new Error('connection reset'); }));
+  const failingFollower = singleFlight(route, [1, 4], loader(1, 4)).then(() => 'loaded', (error) => error.message);
+
+  console.log(JSON.stringify({
+    burst: { results: new Set(burst).size, shared: burst[0] === burst[49] },
+    concurrentLoads,
+    laterLoads,
+    abandoned: { leader: await leader, follower: await follower, expiredFollower: await expiredFollower },
+    failing: { leader: await failing.catch((error) => error.message), follower: await failingFollower },
+    retryLoads: loads,
+    stats: singleFlightStats()
+  }));
+})();
+"""
+
+        # Act
+        result = run_service_script('accounts', script)
+
+        # Assert
+        assert result['burst'] == {'results': 3, 'shared': True}
+        assert sorted(result['concurrentLoads']) == ['1:1', '1:2', '2:1']
+        assert result['laterLoads'] == ['1:1']
+        assert result['abandoned'] == {
+            'leader': 'Request deadline exceeded',
+            'follower': {'balance': '300.00'},
+            'expiredFollower': 'Request deadline exceeded'
+        }
+        assert result['failing'] == {'leader': 'connection reset', 'follower': 'connection reset'}
+        # Only the follower still within its deadline loaded again
+        assert result['retryLoads'] == ['1:3']
+        assert result['stats']['inFlight'] == 0
+        assert result['stats']['routes']['GET /accounts/:id/balance'] == {
+            'requests': 58, 'coalesced': 52, 'coalescedRatio': 0.897
+        }
+
     def test_get_account_balance_not_found(self, mock_request, mock_response, mock_db_pool):
         """Test getting balance for non-existent account"""
         # Arrange
@@ -187,5 +590,94 @@ class TestAccountsService:
         assert mock_response.body['error'] == 'Insufficient funds'
 
 
+    def test_posting_outcomes(self, run_service_script):
+        """Test deposits and withdrawals run as one prepared statement each and map its row to posted, not_found or insufficient_funds"""
+        # Arrange: account 1 holds 100.00, account 2 does not exist
+        script = NodeScripts.FAKE_PG + """
+const { pool } = require('./src/config/database');
+const { postDeposit, postWithdrawal } = require('./src/utils/account-posting');
+
+useFakePostgres(pool, (query) => {
+  const [accountId, amount] = query.values;
+  if (accountId !== 1) {
+    return [{ account_exists: false, balance: null, currency: null, version: null, transaction_id: null, created_at: null }];
+  }
+  const balance = query.name === 'accounts.post_deposit' ? 100 + amount : 100 - amount;
+  if (balance < 0) {
+    return [{ account_exists: true, balance: null, currency: null, version: null, transaction_id: null, created_at: null }];
+  }
+  return [{ account_exists: true, balance: balance.toFixed(2), currency: 'USD', version: '8', transaction_id: 42, created_at: new Date(0) }];
+});
+
+(async () => {
+  const outcomes = {
+    deposit: await postDeposit(1, 25, 'Salary'),
+    withdrawal: await postWithdrawal(1, 40, 'Rent'),
+    overdrawn: await postWithdrawal(1, 500, 'Car'),
+    depositMissing: await postDeposit(2, 25, 'Salary'),
+    withdrawalMissing: await postWithdrawal(2, 25, 'Rent')
+  };
+  console.log(JSON.stringify({
+    outcomes,
+    statements: queries.map((query) => ({ name: query.name, values: query.values })),
+    fundsChecked: queries.map((query) => query.text.includes('AND balance >= $2::numeric'))
+  }));
+  pool.end();
+})();
+"""
+
+        # Act
+        result = run_service_script('accounts', script)
+
+        # Assert
+        outcomes = result['outcomes']
+        assert outcomes['deposit'] == {
+            'status': 'posted', 'balance': '125.00', 'currency': 'USD', 'version': '8',
+            'transactionId': 42, 'createdAt': '1970-01-01T00:00:00.000Z'
+        }
+        assert outcomes['withdrawal']['status'] == 'posted'
+        assert outcomes['withdrawal']['balance'] == '60.00'
+        assert outcomes['overdrawn'] == {'status': 'insufficient_funds'}
+        assert outcomes['depositMissing'] == {'status': 'not_found'}
+        assert outcomes['withdrawalMissing'] == {'status': 'not_found'}
+        # One round trip per posting, with the funds check only on withdrawals
+        assert [statement['name'] for statement in result['statements']] == [
+            'accounts.post_deposit', 'accounts.post_withdrawal', 'accounts.post_withdrawal',
+            'accounts.post_deposit', 'accounts.post_withdrawal'
+        ]
+        assert result['statements'][1]['values'] == [1, 40, 'Rent']
+        assert result['fundsChecked'] == [False, True, True, False, True]
+
+    def test_prepared_statement_names_unique(self, run_service_script):
+        """Test a statement name can be registered again with the same text, but not with different text"""
+        # Arrange
+        script = """
+const { prepare, prepared, preparedStatements } = require('./src/config/database');
+require('./src/routes/accounts');
+
+const text = 'SELECT balance, currency, version FROM accounts WHERE id = $1';
+const again = prepare('accounts.balance_by_id', text);
+let collision = null;
+try {
+  prepare('accounts.balance_by_id', 'SELECT balance FROM accounts WHERE id = $1');
+} catch (error) {
+  collision = error.message;
+}
+console.log(JSON.stringify({ again, query: prepared(again, [1]), collision, names: preparedStatements() }));
+"""
+
+        # Act
+        result = run_service_script('accounts', script)
+
+        # Assert
+        assert result['query'] == {
+            'name': 'accounts.balance_by_id',
+            'text': 'SELECT balance, currency, version FROM accounts WHERE id = $1',
+            'values': [1]
+        }
+        assert result['collision'] == 'Prepared statement accounts.balance_by_id is already registered with different text'
+        assert {'accounts.balance_by_id', 'accounts.balances_by_ids', 'accounts.post_deposit',
+                'accounts.post_withdrawal', 'ownership.owner_by_account'} <= set(result['names'])
+
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
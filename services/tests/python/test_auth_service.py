@@ -4,7 +4,7 @@ Unit tests for the Auth Service
 
 import pytest
 from unittest.mock import Mock
-from .test_config import TestDataFactories, TestUtilities
+from .test_config import NodeScripts, TestDataFactories, TestUtilities
 
 
 class TestAuthService:
@@ -138,6 +138,393 @@ class TestAuthService:
         assert mock_response.status_code == 401
         assert mock_response.body['error'] == 'Invalid credentials'
 
+    def test_login_attempts_limited_per_email_and_failing_ip(self, run_service_script):
+        """Test logins are refused past the per-email attempt limit and the per-IP failure limit"""
+        # Arrange: three attempts per email and two failures per IP within the window
+        script = NodeScripts.FAKE_REDIS + """
+(async () => {
+  process.env.REDIS_PORT = String(await startFakeRedis());
+  const { redisClient } = require('./src/config/redis');
+  const { checkLoginAttempts, recordLoginFailure, resetLoginAttempts } = require('./src/utils/login-admission');
+  await redisClient.connect();
+
+  const emailAttempts = [];
+  for (const email of ['user@example.com', 'User@Example.com', ' user@example.com', 'user@example.com']) {
+    emailAttempts.push(await checkLoginAttempts(email, '10.0.0.1'));
+  }
+  // Successful logins from the same address do not count against it
+  const otherUserSameIp = await checkLoginAttempts('other@example.com', '10.0.0.1');
+  await resetLoginAttempts('user@example.com');
+  const afterReset = await checkLoginAttempts('user@example.com', '10.0.0.1');
+
+  await recordLoginFailure('10.0.0.2');
+  const oneFailure = await checkLoginAttempts('third@example.com', '10.0.0.2');
+  await recordLoginFailure('10.0.0.2');
+  const twoFailures = await checkLoginAttempts('fourth@example.com', '10.0.0.2');
+  const otherIp = await checkLoginAttempts('fifth@example.com', '10.0.0.3');
+
+  console.log(JSON.stringify({ emailAttempts, otherUserSameIp, afterReset, oneFailure, twoFailures, otherIp }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('auth', script, env={
+            'LOGIN_MAX_ATTEMPTS_PER_EMAIL': '3',
+            'LOGIN_MAX_FAILURES_PER_IP': '2',
+            'LOGIN_ATTEMPT_WINDOW_SECONDS': '300'
+        })
+
+        # Assert
+        allowed = {'allowed': True, 'retryAfterSeconds': 0}
+        assert result['emailAttempts'][:3] == [allowed] * 3
+        assert result['emailAttempts'][3]['allowed'] is False
+        assert 299 <= result['emailAttempts'][3]['retryAfterSeconds'] <= 300
+        assert result['otherUserSameIp'] == allowed
+        assert result['afterReset'] == allowed
+        assert result['oneFailure'] == allowed
+        assert result['twoFailures']['allowed'] is False
+        assert 299 <= result['twoFailures']['retryAfterSeconds'] <= 300
+        assert result['otherIp'] == allowed
+
+    def test_login_attempts_fail_open_when_redis_slow(self, run_service_script):
+        """Test the attempt counters are skipped after their 50ms timeout, or when Redis is down, instead of refusing logins"""
+        # Arrange: Redis never answers the counters' transaction
+        script = NodeScripts.FAKE_REDIS + """
+(async () => {
+  const { redisClient } = require('./src/config/redis');
+  const { checkLoginAttempts } = require('./src/utils/login-admission');
+  const disconnected = await checkLoginAttempts('user@example.com', '10.0.0.1');
+
+  process.env.REDIS_PORT = String(await startFakeRedis(['EXEC']));
+  redisClient.options.socket.port = Number(process.env.REDIS_PORT);
+  await redisClient.connect();
+  const startedAt = Date.now();
+  const slow = await checkLoginAttempts('user@example.com', '10.0.0.1');
+  console.log(JSON.stringify({ disconnected, slow, elapsedMs: Date.now() - startedAt }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('auth', script)
+
+        # Assert
+        assert result['disconnected'] == {'allowed': True, 'retryAfterSeconds': 0}
+        assert result['slow'] == {'allowed': True, 'retryAfterSeconds': 0}
+        assert 50 <= result['elapsedMs'] < 500
+
+    def test_login_hashing_overloaded(self, run_service_script):
+        """Test password checks past the adaptive cap or the hashing queue limit are refused"""
+        # Arrange: a cap of two checks, and one hashing worker with room for two queued tasks
+        script = """
+const { hashConcurrency } = require('./src/utils/login-admission');
+const { verifyPassword, hasherStats } = require('./src/utils/password-hasher');
+
+(async () => {
+  const underCap = [hashConcurrency.tryAcquire(), hashConcurrency.tryAcquire(), hashConcurrency.tryAcquire()];
+  // A check slower than the target shrinks the cap from 2 to 1, which the remaining check already fills
+  hashConcurrency.release(500);
+  const afterSlowCheck = hashConcurrency.tryAcquire();
+  const shrunk = hashConcurrency.stats();
+  // A fast check while the cap is the constraint grows it back
+  hashConcurrency.release(5);
+  const afterRelease = hashConcurrency.tryAcquire();
+  hashConcurrency.release(5);
+
+  const hash = '$scrypt$N=1024,r=8,p=1$c2FsdHNhbHRzYWx0c2FsdA==$' + Buffer.alloc(64).toString('base64');
+  const outcomes = await Promise.all([1, 2, 3, 4].map(() => verifyPassword('password123', hash).then(
+    (valid) => ({ valid }),
+    (error) => ({ error: error.name })
+  )));
+  console.log(JSON.stringify({ underCap, afterSlowCheck, afterRelease, shrunk, grown: hashConcurrency.stats(), outcomes, hasher: hasherStats() }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('auth', script, env={
+            'LOGIN_HASH_CONCURRENCY_INITIAL': '2',
+            'LOGIN_HASH_CONCURRENCY_MIN': '1',
+            'LOGIN_HASH_LATENCY_TARGET_MS': '100',
+            'PASSWORD_HASH_WORKERS': '1',
+            'PASSWORD_HASH_QUEUE_LIMIT': '2'
+        })
+
+        # Assert
+        assert result['underCap'] == [True, True, False]
+        assert result['afterSlowCheck'] is False
+        assert result['afterRelease'] is True
+        assert result['shrunk']['limit'] == 1
+        assert result['shrunk']['rejected'] == 2
+        assert result['grown']['limit'] == 2
+        assert result['outcomes'] == [{'valid': False}] * 3 + [{'error': 'HasherBusyError'}]
+        assert result['hasher']['rejected'] == 1
+
+    def test_refresh_token_rotated_and_reuse_revokes_family(self, run_service_script):
+        """Test each refresh rotates the family's token, and presenting a rotated token revokes the whole family"""
+        # Arrange
+        script = NodeScripts.FAKE_REDIS + """
+(async () => {
+  process.env.REDIS_PORT = String(await startFakeRedis());
+  const { redisClient } = require('./src/config/redis');
+  const { createFamily, rotateToken, isFamilyRevoked } = require('./src/utils/session-store');
+  await redisClient.connect();
+
+  const { familyId, tokenId } = await createFamily(7);
+  const first = await rotateToken(familyId, tokenId);
+  const second = await rotateToken(familyId, first.tokenId);
+  // The first token was already rotated away: treated as stolen
+  const reused = await rotateToken(familyId, tokenId);
+  // The legitimate holder's latest token no longer works either
+  const latest = await rotateToken(familyId, second.tokenId);
+  const unknown = await rotateToken('no-such-family', tokenId);
+
+  console.log(JSON.stringify({
+    results: [first.result, second.result, reused.result, latest.result, unknown.result],
+    distinctTokens: new Set([tokenId, first.tokenId, second.tokenId]).size,
+    familyKeyLeft: redisKeys.has(`refresh:family:${familyId}`),
+    revokedMarker: redisKeys.get(`refresh:revoked:${familyId}`),
+    revoked: await isFamilyRevoked(familyId),
+    now: Date.now()
+  }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('auth', script, env={'REFRESH_TOKEN_EXPIRES_IN': '600'})
+
+        # Assert
+        assert result['results'] == ['rotated', 'rotated', 'reused', 'revoked', 'revoked']
+        assert result['distinctTokens'] == 3
+        assert result['familyKeyLeft'] is False
+        assert result['revokedMarker']['value'] == '1'
+        assert 0 < result['revokedMarker']['expiresAt'] - result['now'] <= 600 * 1000
+        assert result['revoked'] is True
+
+    def test_logout_revocation_checked_through_bloom_filter(self, run_service_script):
+        """Test families never revoked are answered locally, and only a logged-out family is confirmed in Redis"""
+        # Arrange
+        script = NodeScripts.FAKE_REDIS + """
+(async () => {
+  process.env.REDIS_PORT = String(await startFakeRedis());
+  const { redisClient } = require('./src/config/redis');
+  const { createFamily, revokeFamily, isFamilyRevoked, sessionStoreStats } = require('./src/utils/session-store');
+  await redisClient.connect();
+
+  const loggedOut = await createFamily(1);
+  const active = await createFamily(2);
+  const beforeLogout = await isFamilyRevoked(loggedOut.familyId);
+  await revokeFamily(loggedOut.familyId);
+  const afterLogout = await isFamilyRevoked(loggedOut.familyId);
+  const stillActive = await isFamilyRevoked(active.familyId);
+  const stats = sessionStoreStats();
+
+  // With Redis gone, the filter still clears the active family; the revoked one cannot be confirmed
+  await redisClient.disconnect();
+  const activeWithoutRedis = await isFamilyRevoked(active.familyId);
+  const loggedOutWithoutRedis = await isFamilyRevoked(loggedOut.familyId).then(String, (error) => error.name);
+
+  console.log(JSON.stringify({ beforeLogout, afterLogout, stillActive, stats, activeWithoutRedis, loggedOutWithoutRedis }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('auth', script)
+
+        # Assert
+        assert result['beforeLogout'] is False
+        assert result['afterLogout'] is True
+        assert result['stillActive'] is False
+        assert result['stats'] == {'revokedFamilies': 1, 'revocationChecks': 3, 'answeredLocally': 2}
+        assert result['activeWithoutRedis'] is False
+        assert result['loggedOutWithoutRedis'] == 'SessionStoreUnavailableError'
+
+    def test_password_hashed_and_verified_on_worker_pool(self, run_service_script):
+        """Test passwords are hashed with scrypt on the workers, legacy bcrypt hashes still verify and are flagged for rehash"""
+        # Arrange: a cheap scrypt cost keeps the test fast
+        script = """
+const bcrypt = require('bcryptjs');
+const { hashPassword, verifyPassword, needsRehash, hasherStats } = require('./src/utils/password-hasher');
+
+(async () => {
+  const hash = await hashPassword('correct horse');
+  const legacy = bcrypt.hashSync('correct horse', 4);
+  const checks = await Promise.all([
+    verifyPassword('correct horse', hash),
+    verifyPassword('wrong horse', hash),
+    verifyPassword('correct horse', legacy),
+    verifyPassword('wrong horse', legacy)
+  ]);
+  const malformed = await verifyPassword('correct horse', '$scrypt$garbage').then(() => null, (error) => error.message);
+  // The pool keeps serving after a task fails
+  const afterFailure = await verifyPassword('correct horse', hash);
+  console.log(JSON.stringify({
+    hash,
+    checks,
+    malformed,
+    afterFailure,
+    rehash: {
+      current: needsRehash(hash),
+      otherCost: needsRehash(hash.replace('N=1024', 'N=16384')),
+      bcrypt: needsRehash(legacy)
+    },
+    stats: hasherStats()
+  }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('auth', script, env={'SCRYPT_COST': '1024', 'PASSWORD_HASH_WORKERS': '2'})
+
+        # Assert
+        assert result['hash'].startswith('$scrypt$N=1024,r=8,p=1$')
+        assert result['checks'] == [True, False, True, False]
+        assert result['malformed'] is not None
+        assert result['afterFailure'] is True
+        assert result['rehash'] == {'current': False, 'otherCost': True, 'bcrypt': True}
+        assert result['stats']['algorithm'] == 'scrypt'
+        assert 1 <= result['stats']['workers'] <= 2
+        assert result['stats']['completed'] == 6
+        assert result['stats']['failed'] == 1
+
+    def test_bcrypt_hashes_rehashed_when_rounds_change(self, run_service_script):
+        """Test with bcrypt configured, hashes of another cost or algorithm need a rehash"""
+        # Arrange
+        script = """
+const bcrypt = require('bcryptjs');
+const { hashPassword, verifyPassword, needsRehash } = require('./src/utils/password-hasher');
+
+(async () => {
+  const hash = await hashPassword('correct horse');
+  console.log(JSON.stringify({
+    hash,
+    verified: await verifyPassword('correct horse', hash),
+    rehash: {
+      current: needsRehash(hash),
+      otherRounds: needsRehash(bcrypt.hashSync('correct horse', 5)),
+      scrypt: needsRehash('$scrypt$N=16384,r=8,p=1$c2FsdA==$a2V5'),
+      unknown: needsRehash('plaintext')
+    }
+  }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('auth', script, env={'PASSWORD_HASH_ALGORITHM': 'bcrypt', 'BCRYPT_ROUNDS': '4'})
+
+        # Assert
+        assert result['hash'].startswith(('$2a$04$', '$2b$04$'))
+        assert result['verified'] is True
+        assert result['rehash'] == {'current': False, 'otherRounds': True, 'scrypt': True, 'unknown': True}
+
+    def test_cluster_workers_share_pool_budget(self, run_service_script):
+        """Test each worker's pool is its share of DB_POOL_MAX"""
+        # Arrange
+        script = """
+const { pool } = require('./src/config/database');
+console.log(JSON.stringify({ max: pool.options.max }));
+"""
+
+        # Act
+        result = run_service_script('auth', script, env={'WEB_CONCURRENCY': '4', 'DB_POOL_MAX': '20'})
+
+        # Assert
+        assert result['max'] == 5
+
+    def test_pool_budget_below_two_per_worker_refused(self, run_service_script):
+        """Test a service refuses to start when a worker would get fewer than two pooled connections"""
+        # Arrange
+        script = """
+try {
+  require('./src/config/database');
+  console.log(JSON.stringify({ started: true }));
+} catch (error) {
+  console.log(JSON.stringify({ started: false, error: error.message }));
+}
+"""
+
+        # Act
+        result = run_service_script('auth', script, env={'WEB_CONCURRENCY': '16', 'DB_POOL_MAX': '20'})
+
+        # Assert
+        assert result['started'] is False
+        assert 'DB_POOL_MAX=20 leaves each of 16 workers a pool of 1 connections' in result['error']
+
+    def test_bulk_onboard_reports_every_row(self, run_service_script, tmp_path):
+        """Test bulk onboarding reports each row, retrying a failed chunk row by row so only the bad row fails"""
+        # Arrange: one duplicate and one malformed row, an email already registered,
+        # and a row the database refuses, which fails the whole chunk
+        users = tmp_path / 'users.csv'
+        users.write_text(
+            'email,password,roles\n'
+            'a@example.com,pw1,\n'
+            'taken@example.com,pw2,\n'
+            'a@example.com,pw3,\n'
+            'bad@example.com,pw4,admin;user\n'
+            'b@example.com,"pw,5",\n'
+            'not-an-email,pw6,\n'
+        )
+        report = tmp_path / 'report.jsonl'
+        script = NodeScripts.FAKE_PG + """
+const fs = require('fs');
+const { pool } = require('./src/config/database');
+
+let nextId = 100;
+useFakePostgres(pool, (query) => {
+  const [emails] = query.values;
+  if (emails.includes('bad@example.com')) {
+    throw new Error('value too long for type character varying(255)');
+  }
+  return emails.filter((email) => email !== 'taken@example.com')
+    .map((email) => ({ email, user_id: nextId++, account_number: `ACC${nextId}` }));
+});
+
+const end = pool.end.bind(pool);
+pool.end = () => end().then(() => {
+  const rows = fs.readFileSync(process.env.ONBOARD_REPORT, 'utf8').trim().split('\\n').map((line) => JSON.parse(line));
+  console.log(JSON.stringify({
+    rows,
+    inserts: queries.map((query) => query.values[0]),
+    roles: queries[0].values[2],
+    exitCode: process.exitCode
+  }));
+  process.exit(0);
+});
+
+process.argv = [process.argv[0], 'bulk-onboard', process.env.ONBOARD_CSV, '--report', process.env.ONBOARD_REPORT, '--chunk-size', '10'];
+require('./src/cli/bulk-onboard');
+"""
+
+        # Act
+        result = run_service_script('auth', script, env={
+            'ONBOARD_CSV': str(users),
+            'ONBOARD_REPORT': str(report),
+            'SCRYPT_COST': '1024'
+        })
+
+        # Assert
+        by_line = {row['line']: row for row in result['rows']}
+        assert sorted(by_line) == [2, 3, 4, 5, 6, 7]
+        assert by_line[2]['status'] == 'created'
+        assert by_line[2]['accountNumber'].startswith('ACC')
+        assert by_line[3] == {'line': 3, 'email': 'taken@example.com', 'status': 'error', 'error': 'User already exists'}
+        assert by_line[4]['error'] == 'Duplicate email in input'
+        assert by_line[5]['status'] == 'error'
+        assert 'value too long' in by_line[5]['error']
+        assert by_line[6]['status'] == 'created'
+        assert by_line[7]['error'] == 'Invalid email'
+        # The chunk, then each of its rows on its own
+        assert result['inserts'] == [
+            ['a@example.com', 'taken@example.com', 'bad@example.com', 'b@example.com'],
+            ['a@example.com'], ['taken@example.com'], ['bad@example.com'], ['b@example.com']
+        ]
+        assert result['roles'] == ['user', 'user', 'admin;user', 'user']
+        assert result['exitCode'] == 2
 
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
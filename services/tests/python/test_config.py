@@ -137,4 +137,255 @@ TEST_COVERAGE_TARGETS = {
     'branches': 80,
     'functions': 80,
     'lines': 80
-}
\ No newline at end of file
+}
+
+
+class NodeScripts:
+    """JavaScript prepended to scripts run with run_service_script"""
+
+    # Minimal Redis server keeping strings and hashes in memory, with expiry
+    # and MULTI/EXEC. EVAL runs a script by translating its Lua to JavaScript,
+    # which covers the subset the services' scripts use: locals, if/else,
+    # comparisons, tonumber and redis.call. Commands named in stall are never
+    # answered. redisKeys holds the data, e.g. to seed or inspect it.
+    FAKE_REDIS = r"""
+const net = require('net');
+
+const redisKeys = new Map();
+
+function parseCommand(buffer) {
+  let position = buffer.indexOf('\r\n');
+  if (buffer[0] !== '*' || position < 0) return null;
+  const count = parseInt(buffer.slice(1, position), 10);
+  const args = [];
+  position += 2;
+  for (let i = 0; i < count; i++) {
+    const end = buffer.indexOf('\r\n', position);
+    if (end < 0) return null;
+    const length = parseInt(buffer.slice(position + 1, end), 10);
+    if (buffer.length < end + 4 + length) return null;
+    args.push(buffer.slice(end + 2, end + 2 + length));
+    position = end + 4 + length;
+  }
+  return { args, rest: buffer.slice(position) };
+}
+
+class RedisError extends Error {}
+
+const OK = { status: 'OK' };
+
+function encodeReply(reply) {
+  if (reply instanceof RedisError) return `-ERR ${reply.message}\r\n`;
+  if (reply === null || reply === undefined) return '$-1\r\n';
+  if (reply.status) return `+${reply.status}\r\n`;
+  if (typeof reply === 'number') return `:${reply}\r\n`;
+  if (Array.isArray(reply)) return `*${reply.length}\r\n${reply.map(encodeReply).join('')}`;
+  const value = String(reply);
+  return `$${Buffer.byteLength(value, 'latin1')}\r\n${value}\r\n`;
+}
+
+function lookup(key) {
+  const entry = redisKeys.get(key);
+  if (entry && entry.expiresAt && entry.expiresAt <= Date.now()) {
+    redisKeys.delete(key);
+    return undefined;
+  }
+  return entry;
+}
+
+function hash(key) {
+  let entry = lookup(key);
+  if (!entry) {
+    entry = { value: new Map(), expiresAt: 0 };
+    redisKeys.set(key, entry);
+  }
+  return entry.value;
+}
+
+function globToRegExp(pattern) {
+  return new RegExp(`^${pattern.replace(/[.+^${}()|\[\]\\]/g, '\\$&').replace(/\*/g, '.*').replace(/\?/g, '.')}$`);
+}
+
+// Lua script to JavaScript, line by line; Lua arrays start at 1
+function luaToJavaScript(script) {
+  return script.split('\n').map((line) => line
+    .replace(/(KEYS|ARGV)\[(\d+)\]/g, (match, name, index) => `${name}[${index - 1}]`)
+    .replace(/\blocal\b/g, 'let')
+    .replace(/~=/g, '!==')
+    .replace(/([^=!<>])==([^=])/g, '$1===$2')
+    .replace(/\bnot\b/g, '!')
+    .replace(/\band\b/g, '&&')
+    .replace(/\bor\b/g, '||')
+    .replace(/\bnil\b/g, 'null')
+    .replace(/^(\s*)if (.*) then$/, '$1if ($2) {')
+    .replace(/^(\s*)elseif (.*) then$/, '$1} else if ($2) {')
+    .replace(/^(\s*)else$/, '$1} else {')
+    .replace(/^(\s*)end$/, '$1}')
+  ).join('\n');
+}
+
+// Lua numbers become integer replies, false and nil a null reply
+function luaReply(value) {
+  if (typeof value === 'number') return Math.trunc(value);
+  if (value === true) return 1;
+  if (value === false || value === undefined) return null;
+  return value;
+}
+
+const commands = {
+  PING: () => ({ status: 'PONG' }),
+  CLIENT: () => OK,
+  SELECT: () => OK,
+  GET: ([key]) => {
+    const entry = lookup(key);
+    return entry ? entry.value : null;
+  },
+  SET: ([key, value, ...options]) => {
+    const upper = options.map((option) => option.toUpperCase());
+    const exists = lookup(key) !== undefined;
+    if ((upper.includes('NX') && exists) || (upper.includes('XX') && !exists)) return null;
+    const ex = upper.indexOf('EX');
+    const px = upper.indexOf('PX');
+    const expiresAt = ex !== -1 ? Date.now() + Number(options[ex + 1]) * 1000 : px !== -1 ? Date.now() + Number(options[px + 1]) : 0;
+    redisKeys.set(key, { value, expiresAt });
+    return OK;
+  },
+  SETEX: ([key, seconds, value]) => commands.SET([key, value, 'EX', seconds]),
+  DEL: (keys) => keys.filter((key) => lookup(key) !== undefined && redisKeys.delete(key)).length,
+  EXISTS: (keys) => keys.filter((key) => lookup(key) !== undefined).length,
+  INCR: ([key]) => {
+    const entry = lookup(key);
+    const value = entry ? Number(entry.value) : 0;
+    if (!Number.isInteger(value)) return new RedisError('value is not an integer or out of range');
+    redisKeys.set(key, { value: String(value + 1), expiresAt: entry ? entry.expiresAt : 0 });
+    return value + 1;
+  },
+  EXPIRE: ([key, seconds, condition]) => {
+    const entry = lookup(key);
+    if (!entry || (condition && condition.toUpperCase() === 'NX' && entry.expiresAt)) return 0;
+    entry.expiresAt = Date.now() + Number(seconds) * 1000;
+    return 1;
+  },
+  TTL: ([key]) => {
+    const entry = lookup(key);
+    if (!entry) return -2;
+    return entry.expiresAt ? Math.round((entry.expiresAt - Date.now()) / 1000) : -1;
+  },
+  HGET: ([key, field]) => {
+    const entry = lookup(key);
+    return entry && entry.value.has(field) ? entry.value.get(field) : null;
+  },
+  HSET: ([key, ...pairs]) => {
+    const fields = hash(key);
+    let added = 0;
+    for (let i = 0; i < pairs.length; i += 2) {
+      added += fields.has(pairs[i]) ? 0 : 1;
+      fields.set(pairs[i], pairs[i + 1]);
+    }
+    return added;
+  },
+  HGETALL: ([key]) => {
+    const entry = lookup(key);
+    return entry ? Array.from(entry.value).flat() : [];
+  },
+  PUBLISH: () => 0,
+  SCAN: (args) => {
+    const match = args.findIndex((arg) => arg.toUpperCase() === 'MATCH');
+    const pattern = globToRegExp(match !== -1 ? args[match + 1] : '*');
+    return ['0', Array.from(redisKeys.keys()).filter((key) => lookup(key) !== undefined && pattern.test(key))];
+  },
+  EVAL: ([script, keyCount, ...rest]) => {
+    const keys = rest.slice(0, Number(keyCount));
+    const argv = rest.slice(Number(keyCount));
+    const redis = { call: (name, ...args) => runCommand([name, ...args.map(String)]) };
+    const tonumber = (value) => value === null || value === undefined ? null : Number(value);
+    return luaReply(new Function('redis', 'KEYS', 'ARGV', 'tonumber', luaToJavaScript(script))(redis, keys, argv, tonumber));
+  }
+};
+
+function runCommand(args) {
+  const command = commands[args[0].toUpperCase()];
+  return command ? command(args.slice(1)) : new RedisError(`unknown command '${args[0]}'`);
+}
+
+function startFakeRedis(stall = []) {
+  const server = net.createServer((socket) => {
+    // Replies are small writes; without this they can wait on the client's delayed ACK
+    socket.setNoDelay(true);
+    let buffer = '';
+    let transaction = null;
+    socket.on('data', (chunk) => {
+      buffer += chunk.toString('latin1');
+      let parsed;
+      while ((parsed = parseCommand(buffer))) {
+        buffer = parsed.rest;
+        const name = parsed.args[0].toUpperCase();
+        if (stall.includes(name)) continue;
+        let reply;
+        if (name === 'MULTI') {
+          transaction = [];
+          reply = OK;
+        } else if (name === 'EXEC') {
+          reply = transaction.map(runCommand);
+          transaction = null;
+        } else if (name === 'DISCARD') {
+          transaction = null;
+          reply = OK;
+        } else if (transaction) {
+          transaction.push(parsed.args);
+          reply = { status: 'QUEUED' };
+        } else {
+          reply = runCommand(parsed.args);
+        }
+        socket.write(encodeReply(reply), 'latin1');
+      }
+    });
+  });
+  return new Promise((resolve) => server.listen(0, '127.0.0.1', () => resolve(server.address().port)));
+}
+"""
+
+    # Stand-in for pg's Client on a service's pool. Every query is recorded in
+    # queries with the id of the client it ran on, and answered by respond(query)
+    # with rows, { rows, rowCount } or a thrown error
+    FAKE_PG = r"""
+const { EventEmitter } = require('events');
+
+const queries = [];
+
+function useFakePostgres(pool, respond) {
+  let clients = 0;
+  pool.Client = class FakeClient extends EventEmitter {
+    constructor() {
+      super();
+      this.processID = ++clients;
+    }
+    connect(callback) {
+      setImmediate(callback);
+    }
+    query(config, values, callback) {
+      if (typeof values === 'function') {
+        callback = values;
+        values = undefined;
+      }
+      const query = typeof config === 'string'
+        ? { text: config, values: values || [] }
+        : { name: config.name, text: config.text, values: config.values || values || [] };
+      query.client = this.processID;
+      queries.push(query);
+      const result = Promise.resolve().then(() => respond(query)).then((reply) => {
+        const rows = Array.isArray(reply) ? reply : (reply && reply.rows) || [];
+        return { rows, rowCount: reply && reply.rowCount !== undefined ? reply.rowCount : rows.length };
+      });
+      if (!callback) {
+        return result;
+      }
+      result.then((reply) => callback(null, reply), (error) => callback(error));
+    }
+    end(callback) {
+      if (callback) callback();
+      return Promise.resolve();
+    }
+  };
+}
+"""
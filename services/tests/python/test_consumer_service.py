@@ -0,0 +1,353 @@
+"""
+Unit tests for the Consumer Service
+"""
+
+import pytest
+from .test_config import NodeScripts
+
+
+class TestConsumerService:
+    """Test suite for consumer service"""
+
+    def test_redelivered_events_project_nothing(self, run_service_script, tmp_path):
+        """Test a batch is projected with its offset in one transaction and a second delivery inserts nothing"""
+        # Arrange: Postgres as a set of projected event ids and stored offsets, changed only on COMMIT
+        script = NodeScripts.FAKE_PG + """
+const { pool } = require('./src/config/database');
+const { createLedgerEventHandler } = require('./src/utils/event-processor');
+
+const committed = { events: new Set(), offsets: new Map() };
+const insertedCounts = [];
+let pending = null;
+useFakePostgres(pool, (query) => {
+  if (query.text === 'BEGIN') {
+    pending = { events: new Set(), offsets: new Map() };
+  } else if (query.text === 'COMMIT') {
+    pending.events.forEach((id) => committed.events.add(id));
+    pending.offsets.forEach((offset, key) => committed.offsets.set(key, offset));
+    pending = null;
+  } else if (query.text === 'ROLLBACK') {
+    pending = null;
+  } else if (query.name === 'consumer.project_events') {
+    // ON CONFLICT (event_id) DO NOTHING
+    const inserted = query.values[0].filter((id) => !committed.events.has(id) && !pending.events.has(id));
+    inserted.forEach((id) => pending.events.add(id));
+    insertedCounts.push(inserted.length);
+    return { rows: [], rowCount: inserted.length };
+  } else if (query.name === 'consumer.store_offset') {
+    const [, topic, partition, offset] = query.values;
+    pending.offsets.set(`${topic}:${partition}`, offset);
+  } else if (query.text.includes('FROM consumer_offsets')) {
+    return Array.from(committed.offsets, ([key, offset]) => {
+      const [topic, partition] = key.split(':');
+      return { topic, partition_id: Number(partition), committed_offset: offset };
+    });
+  }
+  return [];
+});
+
+function memberOfGroup() {
+  const listeners = {};
+  const consumer = {
+    seeks: [],
+    events: { GROUP_JOIN: 'consumer.group_join' },
+    on: (event, listener) => { listeners[event] = listener; },
+    seek: (position) => consumer.seeks.push(position),
+    join: (memberAssignment) => listeners['consumer.group_join']({ payload: { memberAssignment } })
+  };
+  return consumer;
+}
+
+function message(offset, eventId) {
+  const event = { eventType: 'DEPOSIT', accountId: 1, transactionId: 100 + offset, amount: 25 };
+  return { offset: String(offset), key: null, headers: eventId ? { 'event-id': Buffer.from(eventId) } : {}, value: Buffer.from(JSON.stringify(event)) };
+}
+
+async function deliver(handler, messages) {
+  const before = queries.length;
+  await handler({
+    batch: { topic: 'ledger-events', partition: 0, messages, lastOffset: () => messages[messages.length - 1].offset },
+    resolveOffset: () => {},
+    heartbeat: async () => {},
+    commitOffsetsIfNecessary: async () => {},
+    isRunning: () => true,
+    isStale: () => false,
+    pause: () => () => {}
+  });
+  return queries.slice(before);
+}
+
+(async () => {
+  const batch = [message(0, 'ledger:1'), message(1, 'ledger:2'), message(2)];
+
+  const member = memberOfGroup();
+  const handler = createLedgerEventHandler(member, 'ledger-events-group');
+  member.join({ 'ledger-events': [0] });
+  const first = await deliver(handler, batch);
+  const redelivered = await deliver(handler, batch);
+
+  // After a restart the member resumes past the stored offset; an event
+  // published twice shows up again at a new offset with the same id
+  const restarted = memberOfGroup();
+  const restartedHandler = createLedgerEventHandler(restarted, 'ledger-events-group');
+  restarted.join({ 'ledger-events': [0] });
+  const duplicate = await deliver(restartedHandler, [message(3, 'ledger:1')]);
+
+  const summary = (sent) => sent.map((query) => ({ client: query.client, statement: query.name || query.text.split(/\\s/)[0], values: query.values }));
+  console.log(JSON.stringify({
+    first: summary(first),
+    redelivered: summary(redelivered),
+    seeks: restarted.seeks,
+    duplicate: summary(duplicate),
+    insertedCounts,
+    projected: Array.from(committed.events),
+    offsets: Object.fromEntries(committed.offsets)
+  }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('consumer', script, env={'TRACE_FILE': str(tmp_path / 'traces.jsonl')})
+
+        # Assert: offsets are restored on joining, then the batch and its offset are written between BEGIN and COMMIT on one client
+        restore, begin, project, store, commit = result['first']
+        assert restore['statement'] == 'SELECT'
+        assert restore['values'] == ['ledger-events-group', ['ledger-events']]
+        assert [begin['statement'], project['statement'], store['statement'], commit['statement']] == \
+            ['BEGIN', 'consumer.project_events', 'consumer.store_offset', 'COMMIT']
+        assert len({begin['client'], project['client'], store['client'], commit['client']}) == 1
+        assert project['values'][0] == ['ledger:1', 'ledger:2', 'ledger-events:0:2']
+        assert store['values'] == ['ledger-events-group', 'ledger-events', 0, '2']
+        assert result['redelivered'] == []
+        assert result['seeks'] == [{'topic': 'ledger-events', 'partition': 0, 'offset': '3'}]
+        assert [query['statement'] for query in result['duplicate']] == \
+            ['SELECT', 'BEGIN', 'consumer.project_events', 'consumer.store_offset', 'COMMIT']
+        assert result['insertedCounts'] == [3, 0]
+        assert result['projected'] == ['ledger:1', 'ledger:2', 'ledger-events:0:2']
+        assert result['offsets'] == {'ledger-events:0': '3'}
+
+
+    def test_failed_event_forwarded_through_retry_tiers_to_dlq(self, run_service_script):
+        """Test a failing event moves through each retry tier with its delay, then to the dead-letter topic"""
+        # Arrange: two retry tiers; sent messages are captured instead of produced
+        script = """
+const { producer } = require('./src/config/kafka');
+const { forwardFailedEvent, replayMessage } = require('./src/utils/retry-pipeline');
+
+const sent = [];
+producer.send = async (record) => {
+  sent.push(record);
+};
+
+// The message as it is read back from the topic it was forwarded to
+function delivered(record, offset) {
+  const { key, value, headers } = record.messages[0];
+  return { offset, key, value, headers: Object.fromEntries(Object.entries(headers).map(([name, value]) => [name, Buffer.from(String(value))])) };
+}
+
+function describe(record) {
+  const headers = Object.fromEntries(Object.entries(record.messages[0].headers).map(([name, value]) => [name, String(value)]));
+  return { topic: record.topic, headers };
+}
+
+(async () => {
+  const original = { offset: '5', key: Buffer.from('1'), value: Buffer.from('{}'), headers: { 'event-id': Buffer.from('ledger:9') } };
+  const startedAt = Date.now();
+  const first = await forwardFailedEvent('ledger-events', 2, original, new Error('deadlock detected'));
+  const second = await forwardFailedEvent(first, 0, delivered(sent[0], '0'), new Error('deadlock detected'));
+  const last = await forwardFailedEvent(second, 0, delivered(sent[1], '0'), new Error('deadlock detected'));
+  const poison = await forwardFailedEvent('ledger-events', 2, original, new Error('Undecodable ledger event'), { poison: true });
+  const replayed = replayMessage(delivered(sent[2], '0'));
+  console.log(JSON.stringify({
+    topics: [first, second, last, poison],
+    forwarded: sent.map(describe),
+    startedAt,
+    replayed: { topic: replayed.topic, headers: Object.keys(replayed.headers) }
+  }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('consumer', script, env={'RETRY_DELAYS_MS': '1000,60000'})
+
+        # Assert
+        assert result['topics'] == ['ledger-events.retry.1', 'ledger-events.retry.2', 'ledger-events.dlq', 'ledger-events.dlq']
+        first, second, last, poison = [entry['headers'] for entry in result['forwarded']]
+        for headers, attempt in ((first, '1'), (second, '2'), (last, '3')):
+            assert headers['retry-attempt'] == attempt
+            assert headers['event-id'] == 'ledger:9'
+            assert (headers['original-topic'], headers['original-partition'], headers['original-offset']) == ('ledger-events', '2', '5')
+            assert headers['error-message'] == 'deadlock detected'
+        assert 1000 <= int(first['retry-not-before']) - result['startedAt'] < 2000
+        assert 60000 <= int(second['retry-not-before']) - result['startedAt'] < 61000
+        assert 'retry-not-before' not in last
+        assert poison['retry-attempt'] == '1'
+        assert 'retry-not-before' not in poison
+        assert result['replayed'] == {'topic': 'ledger-events', 'headers': ['event-id']}
+
+    def test_dlq_inspection_gives_up_and_deletes_its_group(self, run_service_script):
+        """Test dlq list stops at DLQ_READ_TIMEOUT_MS when a partition never reaches its end, and deletes its one-off group"""
+        # Arrange: partition 0 delivers its three dead letters; partition 1's last offset never arrives
+        prelude = """
+const { kafka, producer } = require('./src/config/kafka');
+
+const deletedGroups = [];
+const readers = [];
+const sent = [];
+kafka.admin = () => ({
+  connect: async () => {},
+  disconnect: async () => {},
+  fetchTopicOffsets: async () => [{ partition: 0, low: '0', high: '3' }, { partition: 1, low: '0', high: '1' }],
+  fetchOffsets: async () => [],
+  deleteGroups: async (groupIds) => {
+    deletedGroups.push(...groupIds);
+    return [];
+  }
+});
+kafka.consumer = ({ groupId }) => {
+  const reader = {
+    groupId,
+    disconnected: false,
+    connect: async () => {},
+    subscribe: async () => {},
+    run: async ({ eachBatch }) => {
+      const messages = [0, 1, 2].map((offset) => ({
+        offset: String(offset),
+        key: null,
+        value: Buffer.from(JSON.stringify({ eventId: `ledger:${offset}` })),
+        headers: { 'original-topic': Buffer.from('ledger-events'), 'retry-attempt': Buffer.from('3') }
+      }));
+      await eachBatch({ batch: { partition: 0, messages }, resolveOffset: () => {}, heartbeat: async () => {} });
+    },
+    disconnect: async () => {
+      reader.disconnected = true;
+    }
+  };
+  readers.push(reader);
+  return reader;
+};
+producer.connect = async () => {};
+producer.disconnect = async () => {};
+producer.send = async (record) => {
+  sent.push(record.topic);
+};
+
+function runCommand(...args) {
+  process.argv = [process.argv[0], 'dlq', ...args];
+  const lines = [];
+  const log = console.log;
+  console.log = (line) => lines.push(String(line));
+  const startedAt = Date.now();
+  require('./src/cli/dlq');
+  const done = setInterval(() => {
+    if (lines.some((line) => / [0-9]+ dead-lettered events$/.test(line))) {
+      clearInterval(done);
+      console.log = log;
+      console.log(JSON.stringify({ lines, elapsedMs: Date.now() - startedAt, readers, deletedGroups, sent }));
+      process.exit(0);
+    }
+  }, 10);
+}
+"""
+
+        # Act
+        listed = run_service_script('consumer', prelude + "runCommand('list');", env={'DLQ_READ_TIMEOUT_MS': '300'}, timeout=10)
+        replayed = run_service_script('consumer', prelude + "runCommand('replay');", env={'DLQ_READ_TIMEOUT_MS': '300'}, timeout=10)
+
+        # Assert: the inspection group is deleted after disconnecting; the replay group keeps its offsets
+        assert listed['lines'][-1] == 'Listed 3 dead-lettered events'
+        assert 300 <= listed['elapsedMs'] < 2000
+        [reader] = listed['readers']
+        assert reader['groupId'].startswith('ledger-events.dlq-inspect-')
+        assert reader['disconnected'] is True
+        assert listed['deletedGroups'] == [reader['groupId']]
+        assert replayed['lines'][-1] == 'Replayed 3 dead-lettered events'
+        assert replayed['readers'][0]['groupId'] == 'ledger-events.dlq-replay'
+        assert replayed['deletedGroups'] == []
+        assert replayed['sent'] == ['ledger-events'] * 3
+
+    def test_ledger_event_avro_round_trip(self, run_service_script):
+        """Test ledger-event v2 payloads decode to what was encoded, and malformed payloads are rejected"""
+        # Arrange
+        script = """
+const { encodeEvent, decodeEvent, latestVersion } = require('./src/utils/event-codec');
+const { decodeLedgerPayload } = require('./src/utils/ledger-projection');
+
+const full = {
+  eventId: 'ledger:42',
+  eventType: 'TRANSFER_DEBIT',
+  accountId: 7,
+  transactionId: 1234567,
+  amount: -125.5,
+  currency: 'EUR',
+  balanceAfter: 874.5,
+  timestamp: '2024-05-01T12:00:00.123Z',
+  version: 2 ** 40 + 3,
+  notInSchema: 'dropped'
+};
+// Optional fields left out take the null branch of their union
+const minimal = { eventId: 'ledger:43', eventType: 'DEPOSIT', accountId: 7, transactionId: 1, amount: '10.00', timestamp: Date.parse('2024-05-01T12:00:00Z') };
+
+function attempt(fn) {
+  try {
+    return { value: fn(), error: null };
+  } catch (error) {
+    return { value: null, error: error.message };
+  }
+}
+
+const encoded = encodeEvent('ledger-event', full);
+const encodedMinimal = encodeEvent('ledger-event', minimal);
+const fromDate = encodeEvent('ledger-event', { ...minimal, timestamp: new Date('2024-05-01T12:00:00Z') });
+console.log(JSON.stringify({
+  latest: latestVersion('ledger-event'),
+  headers: encoded.headers,
+  decoded: decodeEvent('ledger-event', 2, encoded.value),
+  decodedMinimal: decodeEvent('ledger-event', 2, encodedMinimal.value),
+  sameTimestamp: fromDate.value.equals(encodedMinimal.value),
+  versionBranch: encodedMinimal.value[encodedMinimal.value.length - 1],
+  throughHeaders: decodeLedgerPayload({ value: encoded.value, headers: encoded.headers }),
+  truncated: attempt(() => decodeEvent('ledger-event', 2, encoded.value.subarray(0, encoded.value.length - 1))),
+  trailing: attempt(() => decodeEvent('ledger-event', 2, Buffer.concat([encoded.value, Buffer.from([0])]))),
+  badBranch: attempt(() => decodeEvent('ledger-event', 2, Buffer.concat([encodedMinimal.value.subarray(0, encodedMinimal.value.length - 1), Buffer.from([4])]))),
+  truncatedThroughHeaders: decodeLedgerPayload({ value: encoded.value.subarray(0, 10), headers: encoded.headers }),
+  invalid: attempt(() => encodeEvent('ledger-event', { ...minimal, accountId: 'seven' })),
+  unknownVersion: attempt(() => decodeEvent('ledger-event', 9, encoded.value))
+}));
+"""
+
+        # Act
+        result = run_service_script('consumer', script)
+
+        # Assert
+        expected = {
+            'eventId': 'ledger:42', 'eventType': 'TRANSFER_DEBIT', 'accountId': 7, 'transactionId': 1234567,
+            'amount': -125.5, 'currency': 'EUR', 'balanceAfter': 874.5,
+            'timestamp': '2024-05-01T12:00:00.123Z', 'version': 2 ** 40 + 3
+        }
+        assert result['latest'] == 2
+        assert result['headers'] == {
+            'content-type': 'application/vnd.fintech.avro',
+            'schema-subject': 'ledger-event',
+            'schema-version': '2'
+        }
+        assert result['decoded'] == expected
+        assert result['throughHeaders'] == expected
+        assert result['decodedMinimal'] == {
+            'eventId': 'ledger:43', 'eventType': 'DEPOSIT', 'accountId': 7, 'transactionId': 1,
+            'amount': 10, 'timestamp': '2024-05-01T12:00:00.000Z'
+        }
+        assert result['sameTimestamp'] is True
+        # The last field, version, is a ["null", "long"] union written as branch 0
+        assert result['versionBranch'] == 0
+        assert result['truncated']['error'] == 'Truncated event payload'
+        assert result['trailing']['error'] == 'Trailing bytes after ledger-event v2 payload'
+        assert result['badBranch']['error'] == 'Invalid union branch in event payload'
+        assert result['truncatedThroughHeaders'] is None
+        assert result['invalid']['error'] == 'Invalid value for accountId'
+        assert result['unknownVersion']['error'] == 'Unknown schema ledger-event v9'
+
+if __name__ == '__main__':
+    pytest.main([__file__])
@@ -151,7 +151,59 @@ class TestLedgerService:
         assert 'transactions' in mock_response.body
         assert len(mock_response.body['transactions']) == 0
         assert mock_response.body['pagination']['totalCount'] == 0
+    
+    def test_metrics_labels_route_template(self, run_service_script):
+        """Test request metrics are labelled by route template, not by the raw path"""
+        # Arrange: a ledger router mounted under /ledger, as in the service
+        script = """
+const express = require('express');
+const http = require('http');
+const { httpMetrics, metricsHandler } = require('./src/utils/http-metrics');
+
+const ledger = express.Router();
+ledger.get('/accounts/:accountId', (req, res) => res.json({ accountId: req.params.accountId }));
+ledger.get('/broken', (req, res) => res.status(500).json({ error: 'Internal server error' }));
+
+const app = express();
+app.use(httpMetrics);
+app.get('/metrics', metricsHandler);
+app.use('/ledger', ledger);
 
+function get(path) {
+  return new Promise((resolve) => {
+    http.get({ port: server.address().port, path, agent: false }, (res) => {
+      let body = '';
+      res.on('data', (chunk) => body += chunk);
+      res.on('end', () => resolve(body));
+    });
+  });
+}
+
+const server = app.listen(0, async () => {
+  for (const path of ['/ledger/accounts/42', '/ledger/accounts/42', '/ledger/accounts/7', '/ledger/broken', '/ledger/accounts/42/extra']) {
+    await get(path);
+  }
+  const exposition = await get('/metrics');
+  console.log(JSON.stringify({
+    series: exposition.split('\\n').filter((line) => /^http_request(s|_errors)_total\\{/.test(line)).sort(),
+    durationCounts: exposition.split('\\n').filter((line) => line.startsWith('http_request_duration_seconds_count')).sort()
+  }));
+  process.exit(0);
+});
+"""
+
+        # Act
+        result = run_service_script('ledger', script)
+
+        # Assert
+        assert result['series'] == [
+            'http_request_errors_total{method="GET",route="/ledger/broken",status="500"} 1',
+            'http_requests_total{method="GET",route="/ledger/accounts/:accountId",status="200"} 3',
+            'http_requests_total{method="GET",route="/ledger/broken",status="500"} 1',
+            'http_requests_total{method="GET",route="unmatched",status="404"} 1'
+        ]
+        assert 'http_request_duration_seconds_count{method="GET",route="/ledger/accounts/:accountId",status="200"} 3' in result['durationCounts']
+        assert not any('42' in line or '/7' in line for line in result['series'] + result['durationCounts'])
 
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
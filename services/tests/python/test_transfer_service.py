@@ -2,9 +2,10 @@
 Unit tests for the Transfer Service
 """
 
+import json
 import pytest
 from unittest.mock import Mock
-from .test_config import TestDataFactories, TestUtilities
+from .test_config import NodeScripts, TestDataFactories, TestUtilities
 
 
 class TestTransferService:
@@ -56,6 +57,84 @@ class TestTransferService:
         assert 'fromTransactionId' in mock_response.body
         assert 'toTransactionId' in mock_response.body
     
+    def test_initiate_transfer_continues_trace(self, run_service_script, tmp_path):
+        """Test a request's traceparent becomes the parent of its server span, whose events carry the producer span on"""
+        # Arrange: the producer records messages instead of sending them
+        trace_file = tmp_path / 'traces.jsonl'
+        script = """
+const express = require('express');
+const http = require('http');
+const { Kafka } = require('kafkajs');
+
+const sent = [];
+Kafka.prototype.producer = () => ({
+  send: async (record) => { sent.push(record); return []; },
+  on: () => undefined,
+  events: { CONNECT: 'producer.connect', DISCONNECT: 'producer.disconnect' }
+});
+const { producer } = require('./src/config/kafka');
+const { requestTracing } = require('./src/utils/request-tracing');
+const { parseTraceparent } = require('./src/utils/tracing');
+
+const app = express();
+app.use(requestTracing);
+app.post('/transfers', async (req, res) => {
+  await producer.send({ topic: 'ledger-events', messages: [{ key: '1', value: '{}', headers: { 'event-id': 'ledger:1' } }] });
+  res.status(201).json({});
+});
+
+function send(traceparent) {
+  return new Promise((resolve) => {
+    http.request({ port: server.address().port, method: 'POST', path: '/transfers', headers: { traceparent }, agent: false }, (res) => {
+      res.resume();
+      res.on('end', resolve);
+    }).end();
+  });
+}
+
+const server = app.listen(0, async () => {
+  await send('00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01');
+  await send('00-00000000000000000000000000000000-b7ad6b7169203331-01');
+  await new Promise((resolve) => setTimeout(resolve, 100));
+  const spans = require('fs').readFileSync(process.env.TRACE_FILE, 'utf8').trim().split('\\n').map(JSON.parse);
+  console.log(JSON.stringify({
+    headers: sent.map((record) => record.messages[0].headers),
+    spans,
+    parsed: {
+      upperCase: parseTraceparent('00-0AF7651916CD43DD8448EB211C80319C-B7AD6B7169203331-01'),
+      zeroSpan: parseTraceparent('00-0af7651916cd43dd8448eb211c80319c-0000000000000000-01'),
+      padded: parseTraceparent(' 00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01 ')
+    }
+  }));
+  process.exit(0);
+});
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={
+            'TRACE_EXPORTER': 'file',
+            'TRACE_FILE': str(trace_file),
+            'TRACE_SAMPLE_RATIO': '1'
+        })
+
+        # Assert
+        trace_id = '0af7651916cd43dd8448eb211c80319c'
+        continued = [span for span in result['spans'] if span['traceId'] == trace_id]
+        server = next(span for span in continued if span['kind'] == 'server')
+        publish = next(span for span in continued if span['kind'] == 'producer')
+        assert server['parentSpanId'] == 'b7ad6b7169203331'
+        assert publish['parentSpanId'] == server['spanId']
+        assert result['headers'][0] == {'event-id': 'ledger:1', 'traceparent': f"00-{trace_id}-{publish['spanId']}-01"}
+        # An all-zero trace id is invalid, so that request starts a trace of its own
+        restarted = result['headers'][1]['traceparent'].split('-')
+        assert restarted[1] not in (trace_id, '0' * 32)
+        assert next(span for span in result['spans'] if span['traceId'] == restarted[1] and span['kind'] == 'server').get('parentSpanId') is None
+        assert result['parsed'] == {
+            'upperCase': None,
+            'zeroSpan': None,
+            'padded': {'traceId': trace_id, 'spanId': 'b7ad6b7169203331'}
+        }
+
     def test_initiate_transfer_insufficient_funds(self, mock_request, mock_response, mock_db_pool):
         """Test transfer with insufficient funds"""
         # Arrange
@@ -96,7 +175,317 @@ class TestTransferService:
         # Assert
         assert mock_response.status_code == 400
         assert mock_response.body['error'] == 'Idempotency-Key header is required'
+
+    def test_initiate_transfer_rejects_body_outside_schema(self, run_service_script):
+        """Test the validator generated from openapi.yaml rejects out-of-bound and wrongly typed bodies"""
+        # Arrange
+        bodies = {
+            'valid': {'fromAccountId': 1, 'toAccountId': 2, 'amount': 100.5},
+            'zero_account_id': {'fromAccountId': 0, 'toAccountId': 2, 'amount': 100},
+            'negative_account_id': {'fromAccountId': 1, 'toAccountId': -2, 'amount': 100},
+            'zero_amount': {'fromAccountId': 1, 'toAccountId': 2, 'amount': 0},
+            'negative_amount': {'fromAccountId': 1, 'toAccountId': 2, 'amount': -0.01},
+            'string_account_id': {'fromAccountId': '1', 'toAccountId': 2, 'amount': 100},
+            'fractional_account_id': {'fromAccountId': 1, 'toAccountId': 2.5, 'amount': 100},
+            'string_amount': {'fromAccountId': 1, 'toAccountId': 2, 'amount': '100'},
+            'null_amount': {'fromAccountId': 1, 'toAccountId': 2, 'amount': None},
+            'missing_amount': {'fromAccountId': 1, 'toAccountId': 2},
+            'array_body': [1, 2, 100],
+            'null_body': None,
+        }
+        script = """
+const { validateInitiateTransferRequest } = require('./src/generated/openapi');
+const bodies = %s;
+const results = {};
+for (const [name, body] of Object.entries(bodies)) {
+  results[name] = validateInitiateTransferRequest(body);
+}
+console.log(JSON.stringify(results));
+""" % json.dumps(bodies)
+
+        # Act
+        results = run_service_script('transfer', script)
+
+        # Assert
+        assert results.pop('valid') is True
+        assert results == {name: False for name in results}
+        assert len(results) == len(bodies) - 1
+
+    def test_initiate_transfer_shed_when_overloaded(self, run_service_script):
+        """Test requests over the admission limit get 503 with Retry-After, reads before transfers"""
+        # Arrange: a limit of 10, of which reads may fill 9; admitted requests hang until released
+        script = """
+const express = require('express');
+const http = require('http');
+const { admissionControl, admissionStats } = require('./src/utils/admission-control');
+
+const held = [];
+const app = express();
+app.use(admissionControl);
+app.get('/health', (req, res) => res.json({ status: 'UP' }));
+app.all('/transfers*', (req, res) => held.push(res));
+
+function send(method, path) {
+  return new Promise((resolve) => {
+    http.request({ port: server.address().port, method, path, agent: false }, (res) => {
+      res.resume();
+      res.on('end', () => resolve({ status: res.statusCode, retryAfter: res.headers['retry-after'] || null }));
+    }).end();
+  });
+}
+
+async function sendUntilHeld(method, path, count) {
+  const pending = [];
+  for (let i = 0; i < count; i++) {
+    pending.push(send(method, path));
+    while (held.length < pending.length) await new Promise((resolve) => setTimeout(resolve, 5));
+  }
+  return pending;
+}
+
+const server = app.listen(0, async () => {
+  const reads = await sendUntilHeld('GET', '/transfers/1', 9);
+  const shedRead = await send('GET', '/transfers/1');
+  const transfers = await sendUntilHeld('POST', '/transfers', 1);
+  const shedTransfer = await send('POST', '/transfers');
+  const health = await send('GET', '/health');
+  const stats = admissionStats();
+  held.forEach((res) => res.json({}));
+  const admitted = await Promise.all([...reads, ...transfers]);
+  console.log(JSON.stringify({ shedRead, shedTransfer, health, stats, admitted: admitted.map((res) => res.status) }));
+  process.exit(0);
+});
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={'ADMISSION_INITIAL_LIMIT': '10'})
+
+        # Assert
+        assert result['shedRead'] == {'status': 503, 'retryAfter': '1'}
+        assert result['shedTransfer'] == {'status': 503, 'retryAfter': '1'}
+        assert result['health']['status'] == 200
+        assert result['stats']['limit'] == 10
+        assert result['stats']['inFlight'] == 10
+        assert result['stats']['shed'] == 2
+        assert result['admitted'] == [200] * 10
     
+    def test_initiate_transfer_past_deadline(self, run_service_script):
+        """Test X-Request-Deadline can shorten but not extend the budget, and an expired request is not started"""
+        # Arrange: handlers report the budget left to them under the request's deadline
+        script = """
+const express = require('express');
+const http = require('http');
+const { requestDeadline } = require('./src/utils/request-deadline');
+const { currentDeadline, deadlineStats } = require('./src/utils/deadline');
+
+let handled = 0;
+const app = express();
+app.use(requestDeadline);
+app.post('/transfers', (req, res) => {
+  handled += 1;
+  res.status(201).json({ remainingMs: currentDeadline().remainingMs() });
+});
+
+function send(deadline) {
+  return new Promise((resolve) => {
+    const headers = deadline === undefined ? {} : { 'X-Request-Deadline': String(deadline) };
+    http.request({ port: server.address().port, method: 'POST', path: '/transfers', headers, agent: false }, (res) => {
+      let body = '';
+      res.on('data', (chunk) => body += chunk);
+      res.on('end', () => resolve({ status: res.statusCode, body: JSON.parse(body) }));
+    }).end();
+  });
+}
+
+const server = app.listen(0, async () => {
+  const byDefault = await send();
+  const extended = await send(Date.now() + 60000);
+  const shortened = await send(Date.now() + 1000);
+  const expired = await send(Date.now() - 1);
+  console.log(JSON.stringify({ byDefault, extended, shortened, expired, handled, stats: deadlineStats() }));
+  process.exit(0);
+});
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={'REQUEST_TIMEOUT_MS': '5000'})
+
+        # Assert
+        assert result['byDefault']['status'] == 201
+        assert 4000 < result['byDefault']['body']['remainingMs'] <= 5000
+        assert result['extended']['status'] == 201
+        assert 4000 < result['extended']['body']['remainingMs'] <= 5000
+        assert result['shortened']['status'] == 201
+        assert 0 < result['shortened']['body']['remainingMs'] <= 1000
+        assert result['expired'] == {'status': 504, 'body': {'error': 'Request deadline exceeded'}}
+        assert result['handled'] == 3
+        assert result['stats']['expired'] == 1
+    
+    def test_redis_command_recorded_as_span(self, run_service_script, tmp_path):
+        """Test a Redis command issued within a traced operation is exported as its child span"""
+        # Arrange
+        trace_file = tmp_path / 'traces.jsonl'
+        script = NodeScripts.FAKE_REDIS + """
+(async () => {
+  redisKeys.set('balance:1', { value: 'cached', expiresAt: 0 });
+  process.env.REDIS_PORT = String(await startFakeRedis());
+  const { redisClient } = require('./src/config/redis');
+  const { traceAsync } = require('./src/utils/tracing');
+  await redisClient.connect();
+  const value = await traceAsync('POST /transfers', { kind: 'server' }, () => redisClient.get('balance:1'));
+  await new Promise((resolve) => setTimeout(resolve, 100));
+  const spans = require('fs').readFileSync(process.env.TRACE_FILE, 'utf8').trim().split('\\n').map(JSON.parse);
+  console.log(JSON.stringify({ value, spans }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={
+            'TRACE_EXPORTER': 'file',
+            'TRACE_FILE': str(trace_file),
+            'TRACE_SAMPLE_RATIO': '1'
+        })
+
+        # Assert
+        spans = {span['name']: span for span in result['spans']}
+        assert result['value'] == 'cached'
+        assert spans['redis GET']['kind'] == 'client'
+        assert spans['redis GET']['attributes'] == {'db.system': 'redis'}
+        assert spans['redis GET']['parentSpanId'] == spans['POST /transfers']['spanId']
+
+    def test_redis_command_times_out(self, run_service_script):
+        """Test Redis commands and transactions the server never answers time out, sooner within a short deadline"""
+        # Arrange
+        script = NodeScripts.FAKE_REDIS + """
+(async () => {
+  process.env.REDIS_PORT = String(await startFakeRedis(['GET', 'EXEC']));
+  const { redisClient } = require('./src/config/redis');
+  const { Deadline, runWithDeadline } = require('./src/utils/deadline');
+  await redisClient.connect();
+
+  const timed = async (call) => {
+    const startedAt = Date.now();
+    try {
+      await call();
+      return { error: null, elapsedMs: Date.now() - startedAt };
+    } catch (error) {
+      return { error: error.message, elapsedMs: Date.now() - startedAt };
+    }
+  };
+  const command = await timed(() => redisClient.get('balance:1'));
+  const transaction = await timed(() => redisClient.multi().incr('counter').exec());
+  const withinDeadline = await timed(() => runWithDeadline(new Deadline(Date.now() + 50), () => redisClient.get('balance:1')));
+  console.log(JSON.stringify({ command, transaction, withinDeadline }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={'REDIS_COMMAND_TIMEOUT_MS': '200'})
+
+        # Assert
+        assert result['command']['error'] == 'Redis command timed out after 200ms'
+        assert 200 <= result['command']['elapsedMs'] < 1000
+        assert result['transaction']['error'] == 'Redis transaction timed out after 200ms'
+        assert result['withinDeadline']['error'].startswith('Redis command timed out after')
+        assert result['withinDeadline']['elapsedMs'] < 200
+
+    def test_ownership_listener_holds_no_pooled_connection(self, run_service_script):
+        """Test the ownership LISTEN connection is reserved outside the pool rather than taken from it"""
+        # Arrange: nothing listens on DB_PORT, so the listener fails to connect and retries later
+        script = """
+const { pool } = require('./src/config/database');
+const { startOwnershipListener, ownershipCacheStats } = require('./src/utils/account-ownership');
+let checkouts = 0;
+const connect = pool.connect.bind(pool);
+pool.connect = (...args) => { checkouts += 1; return connect(...args); };
+startOwnershipListener().then(() => {
+  console.log(JSON.stringify({ max: pool.options.max, checkouts, listening: ownershipCacheStats().listening }));
+  process.exit(0);
+});
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={'DB_POOL_MAX': '20', 'WEB_CONCURRENCY': '1', 'DB_PORT': '1'})
+
+        # Assert
+        assert result == {'max': 19, 'checkouts': 0, 'listening': False}
+
+    def test_rollback_after_deadline_expired(self, run_service_script):
+        """Test a statement timed out by the deadline is cancelled, ROLLBACK still runs and the client is destroyed"""
+        # Arrange: a pool whose clients never answer SELECTs, as when the idempotency lookup before BEGIN hangs
+        script = """
+const net = require('net');
+const { EventEmitter } = require('events');
+const { pool } = require('./src/config/database');
+const { Deadline, runWithDeadline } = require('./src/utils/deadline');
+
+// Receives the cancel request sent for a statement that timed out
+let cancelRequest = null;
+const cancelServer = net.createServer((socket) => socket.on('data', (data) => {
+  cancelRequest = { code: data.readInt32BE(4), processID: data.readInt32BE(8), secretKey: data.readInt32BE(12) };
+  socket.end();
+}));
+
+const sent = [];
+let ended = false;
+class FakeClient extends EventEmitter {
+  constructor() {
+    super();
+    Object.assign(this, { host: '127.0.0.1', port: cancelServer.address().port, processID: 42, secretKey: 7 });
+  }
+  connect(callback) {
+    setImmediate(callback);
+  }
+  query(config) {
+    const text = typeof config === 'string' ? config : config.text;
+    sent.push({ text, queryTimeout: config.query_timeout || null });
+    if (text.startsWith('SELECT')) {
+      return new Promise((resolve, reject) => setTimeout(() => reject(new Error('Query read timeout')), config.query_timeout));
+    }
+    return Promise.resolve({ rows: [] });
+  }
+  end(callback) {
+    ended = true;
+    if (callback) callback();
+    return Promise.resolve();
+  }
+}
+pool.Client = FakeClient;
+
+cancelServer.listen(0, '127.0.0.1', () => runWithDeadline(new Deadline(Date.now() + 50), async () => {
+  const result = { lookupError: null, rollbackError: null, refusedError: null };
+  const client = await pool.connect();
+  try {
+    await client.query({ text: 'SELECT id FROM transfers WHERE idempotency_key = $1', values: ['transfer-deadline'] });
+  } catch (error) {
+    result.lookupError = error.message;
+    await client.query('ROLLBACK').catch((error) => { result.rollbackError = error.message; });
+    await client.query('SELECT 1').catch((error) => { result.refusedError = error.message; });
+  } finally {
+    client.release();
+  }
+  await new Promise((resolve) => setTimeout(resolve, 100));
+  console.log(JSON.stringify({ ...result, sent, cancelRequest, ended, totalCount: pool.totalCount }));
+  process.exit(0);
+}));
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={'DB_POOL_MAX': '20', 'WEB_CONCURRENCY': '1'})
+
+        # Assert
+        lookup, rollback = result['sent']
+        assert result['lookupError'] == 'Query read timeout'
+        assert 0 < lookup['queryTimeout'] <= 50
+        assert rollback == {'text': 'ROLLBACK', 'queryTimeout': None}
+        assert result['rollbackError'] is None
+        assert result['refusedError'] == 'Request deadline exceeded'
+        assert result['cancelRequest'] == {'code': 80877102, 'processID': 42, 'secretKey': 7}
+        assert result['ended'] is True
+        assert result['totalCount'] == 0
+
     def test_get_transfer_status_success(self, mock_request, mock_response, mock_db_pool):
         """Test successful retrieval of transfer status"""
         # Arrange
@@ -138,7 +527,252 @@ class TestTransferService:
         # Assert
         assert mock_response.status_code == 404
         assert mock_response.body['error'] == 'Transfer not found'
+    
+    def test_health_reports_database_pool(self, run_service_script):
+        """Test pool telemetry counts waiters and held clients, and times acquires, queries and holds per call site"""
+        # Arrange: a pool of two clients, and a leak threshold a held client soon passes
+        script = NodeScripts.FAKE_PG + """
+const { pool } = require('./src/config/database');
+const { poolTelemetry } = require('./src/utils/pool-telemetry');
+useFakePostgres(pool, () => []);
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+(async () => {
+  await pool.query({ name: 'transfers.by_reference', text: 'SELECT 1', values: [] });
+  const first = await pool.connect();
+  const second = await pool.connect();
+  const third = pool.connect();
+  await sleep(10);
+  const saturated = poolTelemetry();
+
+  await first.query('SELECT 1');
+  await sleep(250);
+  first.release();
+  const waiter = await third;
+  waiter.release();
+  second.release();
+  console.log(JSON.stringify({ saturated, released: poolTelemetry() }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={
+            'DB_POOL_MAX': '3',
+            'WEB_CONCURRENCY': '1',
+            'DB_POOL_LEAK_THRESHOLD_MS': '100',
+            'DB_POOL_TRACK_CALL_SITES': 'false'
+        })
+
+        # Assert
+        saturated = result['saturated']
+        assert (saturated['totalCount'], saturated['idleCount'], saturated['waitingCount'], saturated['heldCount']) == (2, 0, 1, 2)
+        released = result['released']
+        assert (released['waitingCount'], released['heldCount']) == (0, 0)
+        statement = released['callSites']['statement:transfers.by_reference']
+        assert [statement[name]['count'] for name in ('acquireWait', 'queryTime', 'holdTime')] == [1, 1, 1]
+        assert statement['leaks'] == 0
+        checkouts = released['callSites']['pool']
+        assert [checkouts[name]['count'] for name in ('acquireWait', 'queryTime', 'holdTime')] == [3, 1, 3]
+        # The third client waited for the first, held past the threshold alongside the second
+        assert checkouts['acquireWait']['maxMs'] >= 240
+        assert checkouts['holdTime']['maxMs'] >= 250
+        assert checkouts['leaks'] == 2
+
+    def test_health_ready_while_payment_circuit_open(self, run_service_script):
+        """Test an open payment circuit degrades the service without taking it out of rotation"""
+        # Arrange: every other dependency answers, and the payment gateway refuses connections
+        script = NodeScripts.FAKE_PG + NodeScripts.FAKE_REDIS + """
+const express = require('express');
+const http = require('http');
+const { Kafka } = require('kafkajs');
+
+Kafka.prototype.producer = () => ({
+  send: async () => [],
+  on: (event, listener) => { if (event === 'producer.connect') listener(); },
+  events: { CONNECT: 'producer.connect', DISCONNECT: 'producer.disconnect' }
+});
+Kafka.prototype.admin = () => ({ connect: async () => undefined, describeCluster: async () => ({ brokers: [] }) });
+
+function get(path) {
+  return new Promise((resolve) => {
+    http.get({ port: server.address().port, path, agent: false }, (res) => {
+      let body = '';
+      res.on('data', (chunk) => { body += chunk; });
+      res.on('end', () => resolve({ status: res.statusCode, body: JSON.parse(body) }));
+    });
+  });
+}
+
+let server;
+(async () => {
+  process.env.REDIS_PORT = String(await startFakeRedis());
+  const { pool } = require('./src/config/database');
+  const { redisClient } = require('./src/config/redis');
+  const { processPayment } = require('./src/utils/external-services');
+  const { startHealthMonitor } = require('./src/utils/health-monitor');
+  const { healthRouter } = require('./src/routes/health');
+  useFakePostgres(pool, () => [{ '?column?': 1 }]);
+  await redisClient.connect();
+
+  const payment = await processPayment(100, 1).catch((error) => error.message);
+  startHealthMonitor();
+  await new Promise((resolve) => setTimeout(resolve, 100));
+
+  const app = express();
+  app.use('/health', healthRouter);
+  server = app.listen(0);
+  const ready = await get('/health/ready');
+  const health = await get('/health');
+  console.log(JSON.stringify({ payment, ready, health }));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={
+            'USE_VIRTUAL': 'true',
+            'PAYMENT_GATEWAY_URL': 'http://127.0.0.1:1',
+            'GATEWAY_BREAKER_FAILURE_THRESHOLD': '1'
+        })
+
+        # Assert
+        assert result['payment'] == 'Failed to process payment'
+        ready = result['ready']
+        assert ready['status'] == 200
+        assert ready['body']['status'] == 'READY'
+        payment = ready['body']['dependencies']['paymentGateway']
+        assert (payment['status'], payment['required'], payment['error']) == ('ERROR', False, 'payment circuit is open')
+        assert payment['circuit']['state'] == 'open'
+        assert ready['body']['dependencies']['otpGateway']['status'] == 'OK'
+        for name in ('database', 'redis', 'kafka'):
+            assert ready['body']['dependencies'][name]['status'] == 'OK'
+            assert ready['body']['dependencies'][name]['required'] is True
+        health = result['health']
+        assert (health['status'], health['body']['status']) == (200, 'UP')
+        assert health['body']['services']['paymentGateway'] == 'ERROR'
+
+    def test_gateway_circuit_breaker_opens_and_tries_once(self, run_service_script):
+        """Test the circuit opens at the failure threshold, lets one trial call through when half-open, and reopens when it fails"""
+        # Arrange: a threshold of 3, a reset of one second, and a clock the script moves
+        script = """
+let now = 1700000000000;
+Date.now = () => now;
+const { CircuitBreaker, CircuitOpenError } = require('./src/utils/circuit-breaker');
+
+const breaker = new CircuitBreaker('payment', (error) => error.message !== 'cancelled');
+let calls = 0;
+const gateway = (outcome) => () => {
+  calls += 1;
+  return outcome instanceof Promise ? outcome : outcome === 'ok' ? Promise.resolve('ok') : Promise.reject(new Error(outcome));
+};
+const attempt = (fn) => breaker.call(fn).then(
+  (value) => value,
+  (error) => error instanceof CircuitOpenError ? `open, retry in ${error.retryAfterMs}` : error.message
+);
+
+(async () => {
+  const results = {};
+  results.closed = [
+    await attempt(gateway('timeout')),
+    await attempt(gateway('timeout')),
+    await attempt(gateway('cancelled')),
+    breaker.stats()
+  ];
+  results.opened = [await attempt(gateway('timeout')), breaker.stats().state];
+  now += 400;
+  const callsBeforeRejected = calls;
+  results.rejected = [await attempt(gateway('ok')), calls - callsBeforeRejected];
+
+  now += 600;
+  let failTrial;
+  const trial = attempt(gateway(new Promise((resolve, reject) => { failTrial = reject; })));
+  results.halfOpen = [breaker.stats().state, await attempt(gateway('ok'))];
+  failTrial(new Error('timeout'));
+  results.trialFailed = [await trial, breaker.stats().state, await attempt(gateway('ok'))];
+
+  now += 1000;
+  results.trialSucceeded = [await attempt(gateway('ok')), breaker.stats()];
+  results.calls = calls;
+  console.log(JSON.stringify(results));
+})();
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={
+            'GATEWAY_BREAKER_FAILURE_THRESHOLD': '3',
+            'GATEWAY_BREAKER_RESET_MS': '1000'
+        })
+
+        # Assert: an error the caller caused does not count against the gateway
+        *errors, stats = result['closed']
+        assert errors == ['timeout', 'timeout', 'cancelled']
+        assert (stats['state'], stats['consecutiveFailures'], stats['failures']) == ('closed', 2, 2)
+        assert result['opened'] == ['timeout', 'open']
+        # While open, calls fail at once without reaching the gateway
+        assert result['rejected'] == ['open, retry in 600', 0]
+        # Half-open: the trial call is let through, and another call meanwhile is not
+        assert result['halfOpen'] == ['half-open', 'open, retry in 1000']
+        assert result['trialFailed'] == ['timeout', 'open', 'open, retry in 1000']
+        value, stats = result['trialSucceeded']
+        assert value == 'ok'
+        assert (stats['state'], stats['consecutiveFailures']) == ('closed', 0)
+        assert (stats['calls'], stats['failures'], stats['rejected'], stats['opened']) == (6, 4, 3, 2)
+        assert result['calls'] == 6
+
+    def test_health_checks_go_stale(self, run_service_script):
+        """Test a result older than three check intervals counts as unknown, and a hanging check as failed"""
+        # Arrange: checks every second given up after 100 ms, so results go stale after 3.1 s
+        script = """
+let now = 1700000000000;
+Date.now = () => now;
+const { registerDependency, startHealthMonitor, healthReport } = require('./src/utils/health-monitor');
+
+registerDependency({ name: 'database', required: true, check: async () => undefined });
+registerDependency({ name: 'cache', required: false, check: async () => false });
+registerDependency({ name: 'gateway', required: false, check: () => new Promise(() => undefined) });
+
+const summary = () => {
+  const { ready, services, dependencies } = healthReport();
+  return { ready, services, checkedAt: dependencies.database.checkedAt, gatewayError: dependencies.gateway.error || null };
+};
+
+(async () => {
+  const results = { unchecked: summary() };
+  startHealthMonitor();
+  await new Promise((resolve) => setTimeout(resolve, 200));
+  results.checked = summary();
+  now += 3100;
+  results.lastFresh = summary();
+  now += 1;
+  results.stale = summary();
+  console.log(JSON.stringify(results));
+  process.exit(0);
+})();
+"""
+
+        # Act
+        result = run_service_script('transfer', script, env={
+            'HEALTH_CHECK_INTERVAL_MS': '1000',
+            'HEALTH_CHECK_TIMEOUT_MS': '100'
+        })
 
+        # Assert: nothing is ready before the first checks
+        unchecked = result['unchecked']
+        assert unchecked['ready'] is False
+        assert set(unchecked['services'].values()) == {'UNKNOWN'}
+        assert unchecked['checkedAt'] is None
+        # Failed optional dependencies, one of them hanging, leave the service ready
+        checked = result['checked']
+        assert checked['ready'] is True
+        assert checked['services'] == {'database': 'OK', 'cache': 'ERROR', 'gateway': 'ERROR'}
+        assert checked['checkedAt'] == '2023-11-14T22:13:20.000Z'
+        assert 'timed out' in checked['gatewayError']
+        assert result['lastFresh']['ready'] is True
+        # Only a passing result goes stale; a failure stays a failure
+        stale = result['stale']
+        assert stale['ready'] is False
+        assert stale['services'] == {'database': 'UNKNOWN', 'cache': 'ERROR', 'gateway': 'ERROR'}
 
 if __name__ == '__main__':
     pytest.main([__file__])
\ No newline at end of file
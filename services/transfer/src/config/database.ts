@@ -1,17 +1,92 @@
-import { Pool } from 'pg';
+import { Client, Pool, QueryConfig } from 'pg';
 import dotenv from 'dotenv';
+import { instrumentPool } from '../utils/pool-telemetry';
+import { workerCount } from '../utils/cluster';
 
 dotenv.config();
 
-const pool = new Pool({
+// Pool sizing comes from the environment; the pools of every service instance
+// together must stay below Postgres' max_connections. DB_POOL_MAX is the
+// budget of an instance, shared by its cluster workers, and includes each
+// worker's ownership LISTEN connection, which is held outside the pool.
+const DB_POOL_MAX = parseInt(process.env.DB_POOL_MAX || '20', 10);
+// Connections each worker holds outside its pool
+const DEDICATED_CONNECTIONS = 1;
+// A worker with a single pooled connection stalls every request behind one transaction
+const MIN_POOL_SIZE = 2;
+
+const connectionConfig = {
   host: process.env.DB_HOST || 'localhost',
   port: parseInt(process.env.DB_PORT || '5432', 10),
   database: process.env.DB_NAME || 'fintech',
   user: process.env.DB_USER || 'postgres',
   password: process.env.DB_PASSWORD || 'postgres',
-  max: 20,
-  idleTimeoutMillis: 30000,
-  connectionTimeoutMillis: 2000,
+};
+
+// Also evaluated in the supervisor with the worker count it is about to fork,
+// so a budget that cannot be met stops the service before any worker starts
+const poolSize = Math.floor(DB_POOL_MAX / workerCount()) - DEDICATED_CONNECTIONS;
+if (poolSize < MIN_POOL_SIZE) {
+  throw new Error(
+    `DB_POOL_MAX=${DB_POOL_MAX} leaves each of ${workerCount()} workers a pool of ${poolSize} connections, ` +
+    `at least ${MIN_POOL_SIZE} are needed; raise DB_POOL_MAX or lower WEB_CONCURRENCY`
+  );
+}
+
+const pool = new Pool({
+  ...connectionConfig,
+  max: poolSize,
+  idleTimeoutMillis: parseInt(process.env.DB_POOL_IDLE_TIMEOUT_MS || '30000', 10),
+  connectionTimeoutMillis: parseInt(process.env.DB_POOL_CONNECTION_TIMEOUT_MS || '2000', 10),
+  // Ceiling for statements run outside a request's deadline
+  statement_timeout: parseInt(process.env.DB_STATEMENT_TIMEOUT_MS || '15000', 10),
 });
 
-export { pool };
\ No newline at end of file
+instrumentPool(pool);
+
+export interface PreparedStatement {
+  name: string;
+  text: string;
+}
+
+const statements = new Map<string, string>();
+
+/**
+ * Register a hot statement to run as a named prepared statement
+ * Each connection parses and plans it once, on first use, and afterwards only
+ * binds and executes it. Names are shared by every statement on a connection,
+ * so they are prefixed with the owning module.
+ * @throws When the name is already registered with different text
+ */
+export function prepare(name: string, text: string): PreparedStatement {
+  const registered = statements.get(name);
+  if (registered !== undefined && registered !== text) {
+    throw new Error(`Prepared statement ${name} is already registered with different text`);
+  }
+  statements.set(name, text);
+  return { name, text };
+}
+
+/**
+ * Query config executing a registered statement with the given values
+ */
+export function prepared(statement: PreparedStatement, values: unknown[]): QueryConfig {
+  return { name: statement.name, text: statement.text, values };
+}
+
+/**
+ * Names of the statements registered as prepared statements
+ */
+export function preparedStatements(): string[] {
+  return Array.from(statements.keys());
+}
+
+/**
+ * Connection outside the pool for a worker's LISTEN, held for its lifetime
+ * Counted in DEDICATED_CONNECTIONS, so it never takes a pooled connection.
+ */
+export function createDedicatedClient(): Client {
+  return new Client(connectionConfig);
+}
+
+export { pool };
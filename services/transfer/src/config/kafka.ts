@@ -1,5 +1,6 @@
-import { Kafka } from 'kafkajs';
+import { Kafka, ProducerRecord } from 'kafkajs';
 import dotenv from 'dotenv';
+import { currentSpan, traceAsync, traceparent } from '../utils/tracing';
 
 dotenv.config();
 
@@ -10,4 +11,53 @@ const kafka = new Kafka({
 
 const producer = kafka.producer();
 
-export { kafka, producer };
\ No newline at end of file
+// Sends within a traced operation get a producer span, and each message
+// carries its traceparent so consumers continue the trace
+const send = producer.send.bind(producer);
+producer.send = (record: ProducerRecord) => {
+  if (!currentSpan()) {
+    return send(record);
+  }
+  return traceAsync(`kafka publish ${record.topic}`, {
+    kind: 'producer',
+    attributes: { 'messaging.system': 'kafka', 'messaging.destination': record.topic, 'messaging.batch.message_count': record.messages.length }
+  }, (span) => send({
+    ...record,
+    messages: record.messages.map((message) => ({
+      ...message,
+      headers: { ...message.headers, traceparent: traceparent(span) }
+    }))
+  }));
+};
+
+// Whether the producer is connected, for readiness
+let producerConnected = false;
+producer.on(producer.events.CONNECT, () => {
+  producerConnected = true;
+});
+producer.on(producer.events.DISCONNECT, () => {
+  producerConnected = false;
+});
+
+// Cluster metadata requests time the round trip to the brokers for health checks
+const admin = kafka.admin();
+let adminConnection: Promise<void> | null = null;
+
+/**
+ * Resolves once the brokers answer a metadata request and the producer is connected
+ */
+async function pingKafka(): Promise<void> {
+  if (!adminConnection) {
+    adminConnection = admin.connect().catch((error) => {
+      adminConnection = null;
+      throw error;
+    });
+  }
+  await adminConnection;
+  await admin.describeCluster();
+  if (!producerConnected) {
+    throw new Error('Kafka producer is not connected');
+  }
+}
+
+export { kafka, producer, pingKafka };
\ No newline at end of file
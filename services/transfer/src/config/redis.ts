@@ -1,8 +1,13 @@
-import { createClient } from 'redis';
+import { commandOptions, createClient } from 'redis';
 import dotenv from 'dotenv';
+import { traceCall } from '../utils/tracing';
+import { withTimeout } from '../utils/deadline';
 
 dotenv.config();
 
+// Commands give up after this long, or sooner when a request's budget runs out
+const REDIS_COMMAND_TIMEOUT_MS = parseInt(process.env.REDIS_COMMAND_TIMEOUT_MS || '1000', 10);
+
 const redisClient = createClient({
   socket: {
     host: process.env.REDIS_HOST || 'localhost',
@@ -10,6 +15,37 @@ const redisClient = createClient({
   },
 });
 
+// Command methods the services call. node-redis binds its command methods to
+// RedisClient.prototype.commandsExecutor when the class is defined, so an
+// override on the client is never reached; these methods are wrapped on the
+// client itself instead.
+const COMMANDS = ['get', 'set', 'setEx', 'del', 'exists', 'eval', 'hGetAll', 'ping'];
+
+// Bound every command by a timeout and record commands issued within a
+// traced operation as spans. The abort signal drops a command still queued,
+// e.g. while reconnecting, once its caller has given up on it.
+for (const name of COMMANDS) {
+  const command = (redisClient as any)[name].bind(redisClient);
+  (redisClient as any)[name] = (...args: unknown[]) => {
+    return traceCall(`redis ${name.toUpperCase()}`, { 'db.system': 'redis' }, () => {
+      return withTimeout('Redis command', REDIS_COMMAND_TIMEOUT_MS, (signal) => command(commandOptions({ signal }), ...args));
+    });
+  };
+}
+
+// Transactions are bounded as a whole when they are executed
+const multi = redisClient.multi.bind(redisClient);
+(redisClient as any).multi = () => {
+  const transaction = multi();
+  const exec = transaction.exec.bind(transaction);
+  (transaction as any).exec = (...args: unknown[]) => {
+    return traceCall('redis MULTI', { 'db.system': 'redis' }, () => {
+      return withTimeout('Redis transaction', REDIS_COMMAND_TIMEOUT_MS, () => (exec as any)(...args));
+    });
+  };
+  return transaction;
+};
+
 redisClient.on('error', (err) => {
   console.error('Redis Client Error', err);
 });
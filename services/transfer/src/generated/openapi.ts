@@ -0,0 +1,201 @@
+// Generated by scripts/generate_openapi.js from openapi/openapi.yaml; do not edit.
+// Run `npm run generate-openapi` in scripts after changing the spec.
+
+export type TransferRequest = { fromAccountId: number; toAccountId: number; amount: number };
+export type TransferResponse = { message?: string; transferId?: number; fromTransactionId?: number; toTransactionId?: number; fraudRisk?: { score?: number; flags?: Array<string>; recommendation?: string } };
+export type InitiateTransferRequest = TransferRequest;
+export type InitiateTransferResponse200 = { message?: string; transferId?: number; status?: string };
+export type InitiateTransferResponse201 = TransferResponse;
+export type GetTransferStatusResponse = { status?: string; createdAt?: string | Date; updatedAt?: string | Date };
+
+// Strings without characters JSON must escape are written as they are
+const PLAIN_STRING = /^[\x20\x21\x23-\x5b\x5d-\x7e]*$/;
+
+function fallback(value: unknown): string {
+  const json = JSON.stringify(value);
+  return json === undefined ? 'null' : json;
+}
+
+function asString(value: unknown): string {
+  if (typeof value !== 'string') {
+    return fallback(value);
+  }
+  return value.length < 256 && PLAIN_STRING.test(value) ? '"' + value + '"' : JSON.stringify(value);
+}
+
+function asNumber(value: unknown): string {
+  return typeof value === 'number' && Number.isFinite(value) ? String(value) : fallback(value);
+}
+
+function asDateTime(value: unknown): string {
+  if (value instanceof Date && !Number.isNaN(value.getTime())) {
+    return '"' + value.toISOString() + '"';
+  }
+  return asString(value);
+}
+
+/**
+ * Whether a request body matches InitiateTransferRequest
+ */
+export function validateInitiateTransferRequest(data: unknown): data is InitiateTransferRequest {
+  if (typeof data !== 'object' || data === null || Array.isArray(data)) return false;
+  const o1 = data as Record<string, unknown>;
+  const v2 = o1["fromAccountId"];
+  if (v2 === undefined) return false;
+  if (typeof v2 !== 'number' || !Number.isInteger(v2)) return false;
+  if (v2 < 1) return false;
+  const v3 = o1["toAccountId"];
+  if (v3 === undefined) return false;
+  if (typeof v3 !== 'number' || !Number.isInteger(v3)) return false;
+  if (v3 < 1) return false;
+  const v4 = o1["amount"];
+  if (v4 === undefined) return false;
+  if (typeof v4 !== 'number' || !Number.isFinite(v4)) return false;
+  if (v4 <= 0) return false;
+  return true;
+}
+
+/**
+ * Response body of type InitiateTransferResponse200 as JSON
+ */
+export function serializeInitiateTransferResponse200(value: InitiateTransferResponse200): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["message"];
+    if (v3 !== undefined) {
+      json += s2 + "\"message\":";
+      s2 = ',';
+      json += asString(v3);
+    }
+    const v4 = o1["transferId"];
+    if (v4 !== undefined) {
+      json += s2 + "\"transferId\":";
+      s2 = ',';
+      json += asNumber(v4);
+    }
+    const v5 = o1["status"];
+    if (v5 !== undefined) {
+      json += s2 + "\"status\":";
+      s2 = ',';
+      json += asString(v5);
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
+
+/**
+ * Response body of type InitiateTransferResponse201 as JSON
+ */
+export function serializeInitiateTransferResponse201(value: InitiateTransferResponse201): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["message"];
+    if (v3 !== undefined) {
+      json += s2 + "\"message\":";
+      s2 = ',';
+      json += asString(v3);
+    }
+    const v4 = o1["transferId"];
+    if (v4 !== undefined) {
+      json += s2 + "\"transferId\":";
+      s2 = ',';
+      json += asNumber(v4);
+    }
+    const v5 = o1["fromTransactionId"];
+    if (v5 !== undefined) {
+      json += s2 + "\"fromTransactionId\":";
+      s2 = ',';
+      json += asNumber(v5);
+    }
+    const v6 = o1["toTransactionId"];
+    if (v6 !== undefined) {
+      json += s2 + "\"toTransactionId\":";
+      s2 = ',';
+      json += asNumber(v6);
+    }
+    const v7 = o1["fraudRisk"];
+    if (v7 !== undefined) {
+      json += s2 + "\"fraudRisk\":";
+      s2 = ',';
+      if (v7 !== null && typeof v7 === 'object') {
+        const o8 = v7 as Record<string, unknown>;
+        let s9 = '{';
+        const v10 = o8["score"];
+        if (v10 !== undefined) {
+          json += s9 + "\"score\":";
+          s9 = ',';
+          json += asNumber(v10);
+        }
+        const v11 = o8["flags"];
+        if (v11 !== undefined) {
+          json += s9 + "\"flags\":";
+          s9 = ',';
+          if (Array.isArray(v11)) {
+            json += '[';
+            for (let i12 = 0; i12 < v11.length; i12++) {
+              if (i12 > 0) json += ',';
+              const v13 = v11[i12];
+              json += asString(v13);
+            }
+            json += ']';
+          } else {
+            json += fallback(v11);
+          }
+        }
+        const v14 = o8["recommendation"];
+        if (v14 !== undefined) {
+          json += s9 + "\"recommendation\":";
+          s9 = ',';
+          json += asString(v14);
+        }
+        json += s9 === '{' ? '{}' : '}';
+      } else {
+        json += fallback(v7);
+      }
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
+
+/**
+ * Response body of type GetTransferStatusResponse as JSON
+ */
+export function serializeGetTransferStatusResponse(value: GetTransferStatusResponse): string {
+  let json = '';
+  if (value !== null && typeof value === 'object') {
+    const o1 = value as Record<string, unknown>;
+    let s2 = '{';
+    const v3 = o1["status"];
+    if (v3 !== undefined) {
+      json += s2 + "\"status\":";
+      s2 = ',';
+      json += asString(v3);
+    }
+    const v4 = o1["createdAt"];
+    if (v4 !== undefined) {
+      json += s2 + "\"createdAt\":";
+      s2 = ',';
+      json += asDateTime(v4);
+    }
+    const v5 = o1["updatedAt"];
+    if (v5 !== undefined) {
+      json += s2 + "\"updatedAt\":";
+      s2 = ',';
+      json += asDateTime(v5);
+    }
+    json += s2 === '{' ? '{}' : '}';
+  } else {
+    json += fallback(value);
+  }
+  return json;
+}
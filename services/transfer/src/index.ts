@@ -9,39 +9,71 @@ import { externalRouter } from './routes/external';
 import { documentsRouter } from './routes/documents';
 import { transactionsRouter } from './routes/transactions';
 import { adminRouter } from './routes/admin';
+import { authenticateToken } from './middleware/auth';
 import { redisClient } from './config/redis';
 import { producer } from './config/kafka';
+import { startOwnershipListener } from './utils/account-ownership';
+import { httpMetrics, metricsHandler } from './utils/http-metrics';
+import { startRuntimeMetrics } from './utils/runtime-metrics';
+import { requestTracing } from './utils/request-tracing';
+import { initTracing } from './utils/tracing';
+import { runClustered } from './utils/cluster';
+import { requestDeadline } from './utils/request-deadline';
+import { admissionControl } from './utils/admission-control';
+import { startHealthMonitor } from './utils/health-monitor';
 
 dotenv.config();
 
-const app = express();
-const PORT = process.env.PORT || 3003;
-
-// Connect to Redis
-redisClient.connect().catch(console.error);
-
-// Connect to Kafka
-producer.connect().catch(console.error);
-
-// Middleware
-app.use(helmet());
-app.use(cors());
-app.use(express.json());
-
-// Routes
-app.use('/transfer', transfersRouter);
-app.use('/health', healthRouter);
-app.use('/webhook', webhookRouter);
-app.use('/external', externalRouter);
-app.use('/documents', documentsRouter);
-app.use('/transactions', transactionsRouter);
-app.use('/admin', adminRouter);
-
-// Root endpoint
-app.get('/', (req: express.Request, res: express.Response) => {
-  res.json({ message: 'Transfer Service is running' });
-});
-
-app.listen(PORT, () => {
-  console.log(`Transfer service running on port ${PORT}`);
-});
\ No newline at end of file
+// Each worker, or the only process when WEB_CONCURRENCY is 1, runs the whole app
+function startWorker(): void {
+  const app = express();
+  const PORT = process.env.PORT || 3003;
+
+  // Connect to Redis
+  redisClient.connect().catch(console.error);
+
+  // Connect to Kafka
+  producer.connect().catch(console.error);
+
+  // Follow account ownership changes for the authorization cache
+  startOwnershipListener().catch(console.error);
+
+  // Event-loop, GC, memory and pool metrics for /metrics
+  startRuntimeMetrics();
+
+  // Check dependencies in the background; /health serves the last results
+  startHealthMonitor();
+
+  // Export tail-sampled traces under the service name
+  initTracing('transfer-service');
+
+  // Middleware
+  app.use(httpMetrics);
+  app.use(requestTracing);
+  app.use(requestDeadline);
+  app.use(admissionControl);
+  app.use(helmet());
+  app.use(cors());
+  app.use(express.json());
+
+  // Routes
+  app.use('/transfer', authenticateToken, transfersRouter);
+  app.use('/health', healthRouter);
+  app.get('/metrics', metricsHandler);
+  app.use('/webhook', webhookRouter);
+  app.use('/external', externalRouter);
+  app.use('/documents', documentsRouter);
+  app.use('/transactions', authenticateToken, transactionsRouter);
+  app.use('/admin', adminRouter);
+
+  // Root endpoint
+  app.get('/', (req: express.Request, res: express.Response) => {
+    res.json({ message: 'Transfer Service is running' });
+  });
+
+  app.listen(PORT, () => {
+    console.log(`Transfer service running on port ${PORT}`);
+  });
+}
+
+runClustered('transfer-service', startWorker);
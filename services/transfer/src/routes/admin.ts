@@ -15,7 +15,9 @@ router.get('/migrations', async (req: Request, res: Response) => {
       'transfers',
       'ledger_events',
       'audit_logs',
-      'documents'
+      'documents',
+      'consumer_offsets',
+      'backfill_checkpoints'
     ];
     
     const results = [];
@@ -1,43 +1,69 @@
 import { Router, Request, Response } from 'express';
 import { pool } from '../config/database';
+import { tokenCacheStats } from '../middleware/auth';
+import { ownershipCacheStats } from '../utils/account-ownership';
 import { redisClient } from '../config/redis';
+import { poolTelemetry } from '../utils/pool-telemetry';
+import { tracingStats } from '../utils/tracing';
+import { admissionStats } from '../utils/admission-control';
+import { deadlineStats } from '../utils/deadline';
+import { pingKafka } from '../config/kafka';
+import { gatewayStats } from '../utils/external-services';
+import { registerDependency, healthReport, livenessReport } from '../utils/health-monitor';
 
 const router = Router();
 
-router.get('/', async (req: Request, res: Response) => {
-  try {
-    // Check database connection
-    const dbResult = await pool.query('SELECT 1');
-    const dbStatus = dbResult.rowCount !== null ? 'OK' : 'ERROR';
-    
-    // Check Redis connection
-    let redisStatus = 'ERROR';
-    try {
-      await redisClient.ping();
-      redisStatus = 'OK';
-    } catch (error) {
-      // Redis status remains ERROR
-    }
-    
-    return res.json({
-      status: 'UP',
-      timestamp: new Date().toISOString(),
-      services: {
-        database: dbStatus,
-        redis: redisStatus
+// Checked in the background by the health monitor; requests read the last results
+registerDependency({ name: 'database', required: true, check: () => pool.query('SELECT 1') });
+// Rate limiting uses Redis, and every completed transfer is published to Kafka
+registerDependency({ name: 'redis', required: true, check: () => redisClient.ping() });
+registerDependency({ name: 'kafka', required: true, check: pingKafka });
+// The gateways are not called from here: their circuit breakers report what
+// transfers have seen. An open circuit only degrades the service, which fails
+// those transfers at once; taking every instance out of rotation for a
+// gateway they all share would turn away reads and status checks as well
+for (const gateway of ['otp', 'payment'] as const) {
+  registerDependency({
+    name: `${gateway}Gateway`,
+    required: false,
+    check: async () => {
+      if (gatewayStats()[gateway].state === 'open') {
+        throw new Error(`${gateway} circuit is open`);
       }
-    });
-  } catch (error) {
-    return res.status(500).json({
-      status: 'DOWN',
-      timestamp: new Date().toISOString(),
-      services: {
-        database: 'ERROR',
-        redis: 'ERROR'
-      },
-      error: error instanceof Error ? error.message : 'Unknown error'
-    });
-  }
+    },
+    details: () => ({ circuit: gatewayStats()[gateway] })
+  });
+}
+
+// Liveness: the process is running and serving requests
+router.get('/live', (req: Request, res: Response) => {
+  return res.json(livenessReport());
+});
+
+// Readiness: every required dependency passed its last check
+router.get('/ready', (req: Request, res: Response) => {
+  const { ready, dependencies } = healthReport();
+  return res.status(ready ? 200 : 503).json({
+    status: ready ? 'READY' : 'NOT_READY',
+    timestamp: new Date().toISOString(),
+    dependencies
+  });
+});
+
+router.get('/', (req: Request, res: Response) => {
+  const { ready, services, dependencies } = healthReport();
+  return res.status(ready ? 200 : 503).json({
+    status: ready ? 'UP' : 'DOWN',
+    timestamp: new Date().toISOString(),
+    services,
+    dependencies,
+    tokenCache: tokenCacheStats(),
+    ownershipCache: ownershipCacheStats(),
+    databasePool: poolTelemetry(),
+    tracing: tracingStats(),
+    admission: admissionStats(),
+    deadlines: deadlineStats()
+  });
 });
 
 export { router as healthRouter };
\ No newline at end of file
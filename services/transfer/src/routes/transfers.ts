@@ -1,28 +1,73 @@
 import { Router, Request, Response } from 'express';
-import { pool } from '../config/database';
+import { pool, prepare, prepared } from '../config/database';
 import { redisClient } from '../config/redis';
 import { producer } from '../config/kafka';
 import { verifyOTP, processPayment } from '../utils/external-services';
+import { CircuitOpenError } from '../utils/circuit-breaker';
 import { detectFraud } from '../utils/fraud-detection';
+import { ledgerEventMessage } from '../utils/ledger-events';
+import { cacheBalance } from '../utils/balance-cache';
+import { isAccountOwner } from '../utils/account-ownership';
+import { detachDeadline } from '../utils/deadline';
+import {
+  validateInitiateTransferRequest,
+  serializeInitiateTransferResponse200,
+  serializeInitiateTransferResponse201,
+  serializeGetTransferStatusResponse
+} from '../generated/openapi';
 
 const router = Router();
 
+// Statements on the transfer path, run as named prepared statements
+const TRANSFER_BY_REFERENCE = prepare('transfer.transfer_by_reference', 'SELECT id, status FROM transfers WHERE reference_id = $1');
+const LOCK_FROM_ACCOUNT = prepare('transfer.lock_from_account', 'SELECT balance FROM accounts WHERE id = $1 FOR UPDATE');
+const LOCK_TO_ACCOUNT = prepare('transfer.lock_to_account', 'SELECT id FROM accounts WHERE id = $1 FOR UPDATE');
+const INSERT_TRANSFER = prepare(
+  'transfer.insert_transfer',
+  `INSERT INTO transfers (from_account_id, to_account_id, amount, reference_id, status) 
+   VALUES ($1, $2, $3, $4, $5) 
+   RETURNING id`
+);
+const SET_TRANSFER_STATUS = prepare('transfer.set_transfer_status', 'UPDATE transfers SET status = $1 WHERE id = $2');
+const ACCOUNT_BALANCE = prepare('transfer.account_balance', 'SELECT balance FROM accounts WHERE id = $1');
+const SET_ACCOUNT_BALANCE = prepare(
+  'transfer.set_account_balance',
+  'UPDATE accounts SET balance = $1 WHERE id = $2 RETURNING balance, currency, version'
+);
+const INSERT_TRANSACTION = prepare(
+  'transfer.insert_transaction',
+  `INSERT INTO transactions (account_id, transaction_type, amount, description, reference_id, status) 
+   VALUES ($1, $2, $3, $4, $5, $6) 
+   RETURNING id`
+);
+const INSERT_LEDGER_ENTRY = prepare(
+  'transfer.insert_ledger_entry',
+  `INSERT INTO ledger (transaction_id, account_id, entry_type, amount, balance_after, description) 
+   VALUES ($1, $2, $3, $4, $5, $6) 
+   RETURNING id`
+);
+
 // Initiate fund transfer
 router.post('/', async (req: Request, res: Response) => {
   const client = await pool.connect();
   try {
-    const { fromAccountId, toAccountId, amount } = req.body;
     const idempotencyKey = req.header('Idempotency-Key');
     
-    // Validate input
-    if (!fromAccountId || !toAccountId || !amount || amount <= 0) {
+    // Validate input against the request schema in openapi.yaml
+    if (!validateInitiateTransferRequest(req.body)) {
       return res.status(400).json({ error: 'Valid fromAccountId, toAccountId, and amount are required' });
     }
+    const { fromAccountId, toAccountId, amount } = req.body;
     
     if (!idempotencyKey) {
       return res.status(400).json({ error: 'Idempotency-Key header is required' });
     }
     
+    // Only the owner may move money out of an account
+    if (!(await isAccountOwner(Number(fromAccountId), (req as any).userId))) {
+      return res.status(404).json({ error: 'From account not found' });
+    }
+    
     // Fraud detection
     const fraudRisk = detectFraud({
       amount,
@@ -78,37 +123,28 @@ router.post('/', async (req: Request, res: Response) => {
     await redisClient.setEx(rateLimitKey, 900, '1');
     
     // Check if transfer with this idempotency key already exists
-    const existingTransfer = await client.query(
-      'SELECT id, status FROM transfers WHERE reference_id = $1',
-      [idempotencyKey]
-    );
+    const existingTransfer = await client.query(prepared(TRANSFER_BY_REFERENCE, [idempotencyKey]));
     
     if (existingTransfer.rows.length > 0) {
-      return res.status(200).json({
+      return res.status(200).type('json').send(serializeInitiateTransferResponse200({
         message: 'Transfer already processed',
         transferId: existingTransfer.rows[0].id,
         status: existingTransfer.rows[0].status
-      });
+      }));
     }
     
     // Start database transaction
     await client.query('BEGIN');
     
     // Lock accounts to prevent concurrent transfers
-    const fromAccount = await client.query(
-      'SELECT balance FROM accounts WHERE id = $1 FOR UPDATE',
-      [fromAccountId]
-    );
+    const fromAccount = await client.query(prepared(LOCK_FROM_ACCOUNT, [fromAccountId]));
     
     if (fromAccount.rows.length === 0) {
       await client.query('ROLLBACK');
       return res.status(404).json({ error: 'From account not found' });
     }
     
-    const toAccount = await client.query(
-      'SELECT id FROM accounts WHERE id = $1 FOR UPDATE',
-      [toAccountId]
-    );
+    const toAccount = await client.query(prepared(LOCK_TO_ACCOUNT, [toAccountId]));
     
     if (toAccount.rows.length === 0) {
       await client.query('ROLLBACK');
@@ -122,22 +158,16 @@ router.post('/', async (req: Request, res: Response) => {
     }
     
     // Create pending transfer record
-    const transferResult = await client.query(
-      `INSERT INTO transfers (from_account_id, to_account_id, amount, reference_id, status) 
-       VALUES ($1, $2, $3, $4, $5) 
-       RETURNING id`,
-      [fromAccountId, toAccountId, amount, idempotencyKey, 'pending']
-    );
+    const transferResult = await client.query(prepared(INSERT_TRANSFER, [
+      fromAccountId, toAccountId, amount, idempotencyKey, 'pending'
+    ]));
     
     const transferId = transferResult.rows[0].id;
     
     // Verify OTP (in a real scenario, this would be provided by the client)
     const otpVerification = await verifyOTP('123456'); // Dummy OTP for demo
     if (!otpVerification.success) {
-      await client.query(
-        'UPDATE transfers SET status = $1 WHERE id = $2',
-        ['failed', transferId]
-      );
+      await client.query(prepared(SET_TRANSFER_STATUS, ['failed', transferId]));
       await client.query('COMMIT');
       return res.status(400).json({ error: 'OTP verification failed' });
     }
@@ -151,14 +181,15 @@ router.post('/', async (req: Request, res: Response) => {
     // Process payment
     const paymentResult = await processPayment(amount, fromAccountId);
     if (!paymentResult.success) {
-      await client.query(
-        'UPDATE transfers SET status = $1 WHERE id = $2',
-        ['failed', transferId]
-      );
+      await client.query(prepared(SET_TRANSFER_STATUS, ['failed', transferId]));
       await client.query('COMMIT');
       return res.status(400).json({ error: 'Payment processing failed' });
     }
     
+    // The payment is taken: record the transfer even if the caller has given up
+    detachDeadline();
+    await client.query('SET LOCAL statement_timeout TO DEFAULT');
+    
     // Mark payment as processed
     await client.query(
       'UPDATE transfers SET payment_processed = true WHERE id = $1',
@@ -167,95 +198,90 @@ router.post('/', async (req: Request, res: Response) => {
     
     // Update account balances
     const newFromBalance = currentBalance - amount;
-    const newToBalance = parseFloat((await client.query(
-      'SELECT balance FROM accounts WHERE id = $1',
-      [toAccountId]
-    )).rows[0].balance) + amount;
+    const newToBalance = parseFloat((await client.query(prepared(ACCOUNT_BALANCE, [toAccountId]))).rows[0].balance) + amount;
     
-    await client.query(
-      'UPDATE accounts SET balance = $1 WHERE id = $2',
-      [newFromBalance, fromAccountId]
-    );
+    const updatedFrom = await client.query(prepared(SET_ACCOUNT_BALANCE, [newFromBalance, fromAccountId]));
     
-    await client.query(
-      'UPDATE accounts SET balance = $1 WHERE id = $2',
-      [newToBalance, toAccountId]
-    );
+    const updatedTo = await client.query(prepared(SET_ACCOUNT_BALANCE, [newToBalance, toAccountId]));
     
     // Create transaction records
-    const fromTransaction = await client.query(
-      `INSERT INTO transactions (account_id, transaction_type, amount, description, reference_id, status) 
-       VALUES ($1, $2, $3, $4, $5, $6) 
-       RETURNING id`,
-      [fromAccountId, 'transfer', amount, `Transfer to account ${toAccountId}`, idempotencyKey, 'completed']
-    );
+    const fromTransaction = await client.query(prepared(INSERT_TRANSACTION, [
+      fromAccountId, 'transfer', amount, `Transfer to account ${toAccountId}`, idempotencyKey, 'completed'
+    ]));
     
-    const toTransaction = await client.query(
-      `INSERT INTO transactions (account_id, transaction_type, amount, description, reference_id, status) 
-       VALUES ($1, $2, $3, $4, $5, $6) 
-       RETURNING id`,
-      [toAccountId, 'transfer', amount, `Transfer from account ${fromAccountId}`, idempotencyKey, 'completed']
-    );
+    const toTransaction = await client.query(prepared(INSERT_TRANSACTION, [
+      toAccountId, 'transfer', amount, `Transfer from account ${fromAccountId}`, idempotencyKey, 'completed'
+    ]));
     
     // Create ledger entries
-    await client.query(
-      `INSERT INTO ledger (transaction_id, account_id, entry_type, amount, balance_after, description) 
-       VALUES ($1, $2, $3, $4, $5, $6)`,
-      [fromTransaction.rows[0].id, fromAccountId, 'debit', amount, newFromBalance, `Transfer to account ${toAccountId}`]
-    );
+    const fromEntry = await client.query(prepared(INSERT_LEDGER_ENTRY, [
+      fromTransaction.rows[0].id, fromAccountId, 'debit', amount, newFromBalance, `Transfer to account ${toAccountId}`
+    ]));
     
-    await client.query(
-      `INSERT INTO ledger (transaction_id, account_id, entry_type, amount, balance_after, description) 
-       VALUES ($1, $2, $3, $4, $5, $6)`,
-      [toTransaction.rows[0].id, toAccountId, 'credit', amount, newToBalance, `Transfer from account ${fromAccountId}`]
-    );
+    const toEntry = await client.query(prepared(INSERT_LEDGER_ENTRY, [
+      toTransaction.rows[0].id, toAccountId, 'credit', amount, newToBalance, `Transfer from account ${fromAccountId}`
+    ]));
     
     // Update transfer status to completed
-    await client.query(
-      'UPDATE transfers SET status = $1 WHERE id = $2',
-      ['completed', transferId]
-    );
+    await client.query(prepared(SET_TRANSFER_STATUS, ['completed', transferId]));
     
     await client.query('COMMIT');
     
+    // Write the committed balances through to the accounts service's cache
+    await Promise.all([
+      cacheBalance(fromAccountId, updatedFrom.rows[0]),
+      cacheBalance(toAccountId, updatedTo.rows[0])
+    ]);
+    
     // Publish LEDGER_UPDATED event to Kafka
+    // Event ids are derived from the ledger entry so redeliveries deduplicate downstream
+    const fromEventId = `ledger:${fromEntry.rows[0].id}`;
+    const toEventId = `ledger:${toEntry.rows[0].id}`;
     await producer.connect();
     await producer.send({
       topic: 'ledger-events',
       messages: [
-        {
-          value: JSON.stringify({
-            eventType: 'LEDGER_UPDATED',
-            accountId: fromAccountId,
-            transactionId: fromTransaction.rows[0].id,
-            amount: -amount, // Negative for debit
-            balanceAfter: newFromBalance,
-            timestamp: new Date().toISOString()
-          })
-        },
-        {
-          value: JSON.stringify({
-            eventType: 'LEDGER_UPDATED',
-            accountId: toAccountId,
-            transactionId: toTransaction.rows[0].id,
-            amount: amount, // Positive for credit
-            balanceAfter: newToBalance,
-            timestamp: new Date().toISOString()
-          })
-        }
+        ledgerEventMessage({
+          eventId: fromEventId,
+          eventType: 'LEDGER_UPDATED',
+          accountId: fromAccountId,
+          transactionId: fromTransaction.rows[0].id,
+          amount: -amount, // Negative for debit
+          balanceAfter: newFromBalance,
+          version: Number(updatedFrom.rows[0].version),
+          timestamp: new Date().toISOString()
+        }),
+        ledgerEventMessage({
+          eventId: toEventId,
+          eventType: 'LEDGER_UPDATED',
+          accountId: toAccountId,
+          transactionId: toTransaction.rows[0].id,
+          amount: amount, // Positive for credit
+          balanceAfter: newToBalance,
+          version: Number(updatedTo.rows[0].version),
+          timestamp: new Date().toISOString()
+        })
       ]
     });
     
-    return res.status(201).json({
+    return res.status(201).type('json').send(serializeInitiateTransferResponse201({
       message: 'Transfer completed successfully',
       transferId,
       fromTransactionId: fromTransaction.rows[0].id,
       toTransactionId: toTransaction.rows[0].id,
       fraudRisk // Include fraud risk in response for transparency
-    });
+    }));
   } catch (error) {
+    // The failure may have come before BEGIN, or from the connection itself
+    await client.query('ROLLBACK').catch((rollbackError) => {
+      console.error('Transfer rollback error:', rollbackError);
+    });
+    // A gateway known to be down fails the transfer at once; nothing was charged
+    if (error instanceof CircuitOpenError) {
+      res.set('Retry-After', String(Math.max(1, Math.ceil(error.retryAfterMs / 1000))));
+      return res.status(503).json({ error: 'Payment services unavailable, please retry' });
+    }
     console.error('Transfer error:', error);
-    await client.query('ROLLBACK');
     return res.status(500).json({ error: 'Internal server error' });
   } finally {
     client.release();
@@ -280,7 +306,7 @@ router.get('/:id/status', async (req: Request, res: Response) => {
       return res.status(404).json({ error: 'Transfer not found' });
     }
     
-    return res.json({ status: result.rows[0].status, createdAt: result.rows[0].created_at, updatedAt: result.rows[0].updated_at });
+    return res.type('json').send(serializeGetTransferStatusResponse({ status: result.rows[0].status, createdAt: result.rows[0].created_at, updatedAt: result.rows[0].updated_at }));
   } catch (error) {
     console.error('Error fetching transfer status:', error);
     return res.status(500).json({ error: 'Internal server error' });
@@ -0,0 +1,96 @@
+import { Counter, Gauge, registry } from './metrics';
+
+// Circuit breakers for the OTP and payment gateways. After
+// GATEWAY_BREAKER_FAILURE_THRESHOLD consecutive failures a gateway's circuit
+// opens and calls fail at once with CircuitOpenError instead of each waiting
+// out its timeout. After GATEWAY_BREAKER_RESET_MS one trial call is let
+// through: its success closes the circuit, its failure opens it again.
+
+const GATEWAY_BREAKER_FAILURE_THRESHOLD = parseInt(process.env.GATEWAY_BREAKER_FAILURE_THRESHOLD || '5', 10);
+const GATEWAY_BREAKER_RESET_MS = parseInt(process.env.GATEWAY_BREAKER_RESET_MS || '30000', 10);
+
+export type CircuitState = 'closed' | 'open' | 'half-open';
+
+const STATE_VALUES: Record<CircuitState, number> = { closed: 0, 'half-open': 1, open: 2 };
+
+const stateGauge = new Gauge('gateway_circuit_state', 'Circuit state of a gateway: 0 closed, 1 half-open, 2 open');
+const rejectedTotal = new Counter('gateway_circuit_rejected_total', 'Gateway calls failed at once because the circuit was open, by gateway');
+
+export class CircuitOpenError extends Error {
+  constructor(gateway: string, readonly retryAfterMs: number) {
+    super(`${gateway} circuit is open`);
+    this.name = 'CircuitOpenError';
+  }
+}
+
+export class CircuitBreaker {
+  private state: CircuitState = 'closed';
+  private consecutiveFailures = 0;
+  private openedAt = 0;
+  private trialInFlight = false;
+  private counts = { calls: 0, failures: 0, rejected: 0, opened: 0 };
+
+  /**
+   * @param isFailure Whether an error counts against the gateway; errors such
+   *   as the caller giving up say nothing about its health
+   */
+  constructor(readonly name: string, private isFailure: (error: unknown) => boolean = () => true) {
+    registry.onCollect(() => stateGauge.set(STATE_VALUES[this.currentState()], { gateway: this.name }));
+  }
+
+  currentState(): CircuitState {
+    if (this.state === 'open' && Date.now() - this.openedAt >= GATEWAY_BREAKER_RESET_MS) {
+      this.state = 'half-open';
+    }
+    return this.state;
+  }
+
+  /**
+   * Make a gateway call through the breaker
+   * @throws {CircuitOpenError} When the circuit is open, without calling the gateway
+   */
+  async call<T>(fn: () => Promise<T>): Promise<T> {
+    const state = this.currentState();
+    if (state === 'open' || (state === 'half-open' && this.trialInFlight)) {
+      this.counts.rejected += 1;
+      rejectedTotal.inc(1, { gateway: this.name });
+      const retryAfterMs = state === 'open' ? GATEWAY_BREAKER_RESET_MS - (Date.now() - this.openedAt) : GATEWAY_BREAKER_RESET_MS;
+      throw new CircuitOpenError(this.name, Math.max(0, retryAfterMs));
+    }
+
+    const trial = state === 'half-open';
+    this.trialInFlight = trial;
+    this.counts.calls += 1;
+    try {
+      const result = await fn();
+      this.consecutiveFailures = 0;
+      this.state = 'closed';
+      return result;
+    } catch (error) {
+      if (this.isFailure(error)) {
+        this.counts.failures += 1;
+        this.consecutiveFailures += 1;
+        if (trial || this.consecutiveFailures >= GATEWAY_BREAKER_FAILURE_THRESHOLD) {
+          this.open();
+        }
+      }
+      throw error;
+    } finally {
+      if (trial) {
+        this.trialInFlight = false;
+      }
+    }
+  }
+
+  private open(): void {
+    if (this.state !== 'open') {
+      this.counts.opened += 1;
+    }
+    this.state = 'open';
+    this.openedAt = Date.now();
+  }
+
+  stats() {
+    return { state: this.currentState(), consecutiveFailures: this.consecutiveFailures, ...this.counts };
+  }
+}
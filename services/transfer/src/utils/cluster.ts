@@ -0,0 +1,248 @@
+import cluster, { Worker } from 'cluster';
+import os from 'os';
+import { registry } from './metrics';
+
+// Runs the service on several cores: the primary process forks
+// WEB_CONCURRENCY workers that share the listening port and replaces workers
+// that exit. Workers learn their count from CLUSTER_WORKERS, which sizes
+// per-worker resources such as the database pool. Metrics are scraped from
+// whichever worker accepts the request, which gathers every worker's registry
+// through the primary and merges them.
+// This file is kept identical in every HTTP service.
+
+// A number of workers, or 'auto' for one per core; 1 runs without a primary
+const WEB_CONCURRENCY = process.env.WEB_CONCURRENCY || '1';
+// Workers that die sooner than this after starting are restarted with backoff
+const MIN_UPTIME_MS = 5000;
+const MAX_RESTART_DELAY_MS = 30000;
+const METRICS_TIMEOUT_MS = 1000;
+
+interface MetricsRequest {
+  type: 'metrics:collect' | 'metrics:render';
+  id: number;
+}
+
+interface MetricsReply {
+  type: 'metrics:snapshot' | 'metrics:merged';
+  id: number;
+  worker?: number;
+  text: string;
+}
+
+/**
+ * Number of workers the service runs as; 1 when it is not clustered
+ */
+export function workerCount(): number {
+  if (cluster.isWorker) {
+    return parseInt(process.env.CLUSTER_WORKERS || '1', 10);
+  }
+  const cores = typeof os.availableParallelism === 'function' ? os.availableParallelism() : os.cpus().length;
+  return WEB_CONCURRENCY === 'auto' ? cores : Math.max(1, parseInt(WEB_CONCURRENCY, 10) || 1);
+}
+
+/**
+ * Start the service, forking workers that each call startWorker when clustered
+ * @param name Service name used in supervisor log lines
+ */
+export function runClustered(name: string, startWorker: () => void): void {
+  const workers = workerCount();
+  if (cluster.isWorker || workers === 1) {
+    if (cluster.isWorker) {
+      answerMetricsRequests();
+    }
+    startWorker();
+    return;
+  }
+
+  console.log(`${name} supervisor starting ${workers} workers`);
+  const slots: Array<{ startedAt: number; restarts: number }> = [];
+  let stopping = false;
+
+  const fork = (index: number) => {
+    const worker = cluster.fork({ WORKER_INDEX: String(index), CLUSTER_WORKERS: String(workers) });
+    slots[index] = { startedAt: Date.now(), restarts: slots[index]?.restarts || 0 };
+    worker.on('message', (message: MetricsRequest) => {
+      if (message && message.type === 'metrics:collect') {
+        gatherMetrics(worker, message.id);
+      }
+    });
+    worker.on('exit', (code, signal) => {
+      if (stopping) {
+        return;
+      }
+      const slot = slots[index];
+      // A worker crashing right after start is likely to crash again; back off
+      slot.restarts = Date.now() - slot.startedAt < MIN_UPTIME_MS ? slot.restarts + 1 : 0;
+      const delay = slot.restarts > 0 ? Math.min(MAX_RESTART_DELAY_MS, 1000 * 2 ** (slot.restarts - 1)) : 0;
+      console.error(`${name} worker ${index} exited (${signal || code}), restarting in ${delay}ms`);
+      setTimeout(() => fork(index), delay);
+    });
+  };
+
+  for (let index = 0; index < workers; index++) {
+    fork(index);
+  }
+
+  const shutdown = (signal: NodeJS.Signals) => {
+    stopping = true;
+    console.log(`${name} supervisor received ${signal}, stopping workers`);
+    for (const worker of Object.values(cluster.workers || {})) {
+      worker?.kill(signal);
+    }
+    cluster.on('exit', () => {
+      if (Object.keys(cluster.workers || {}).length === 0) {
+        process.exit(0);
+      }
+    });
+  };
+  process.once('SIGTERM', shutdown);
+  process.once('SIGINT', shutdown);
+}
+
+// Primary: ask every worker for its metrics and send the merge to the requester
+function gatherMetrics(requester: Worker, id: number): void {
+  const workers = Object.values(cluster.workers || {}).filter((worker): worker is Worker => !!worker && worker.isConnected());
+  const snapshots: MetricsReply[] = [];
+  let done = false;
+
+  const reply = () => {
+    if (done) {
+      return;
+    }
+    done = true;
+    clearTimeout(timer);
+    for (const worker of workers) {
+      worker.off('message', collect);
+    }
+    if (requester.isConnected()) {
+      requester.send({ type: 'metrics:merged', id, text: mergeExpositions(snapshots) } as MetricsReply);
+    }
+  };
+  // Workers that do not answer in time, e.g. busy or restarting, are left out
+  const timer = setTimeout(reply, METRICS_TIMEOUT_MS);
+
+  function collect(message: MetricsReply) {
+    if (message && message.type === 'metrics:snapshot' && message.id === id) {
+      snapshots.push(message);
+      if (snapshots.length === workers.length) {
+        reply();
+      }
+    }
+  }
+
+  for (const worker of workers) {
+    worker.on('message', collect);
+    worker.send({ type: 'metrics:render', id } as MetricsRequest);
+  }
+}
+
+// Worker: answer the primary's requests for this worker's registry
+function answerMetricsRequests(): void {
+  process.on('message', (message: MetricsRequest) => {
+    if (message && message.type === 'metrics:render' && process.send) {
+      process.send({
+        type: 'metrics:snapshot',
+        id: message.id,
+        worker: parseInt(process.env.WORKER_INDEX || '0', 10),
+        text: registry.render()
+      } as MetricsReply);
+    }
+  });
+}
+
+let nextMetricsRequest = 0;
+const pendingMetrics = new Map<number, (text: string) => void>();
+
+/**
+ * Metrics in the Prometheus text format, merged across workers when clustered
+ */
+export function renderMetrics(): Promise<string> {
+  if (!cluster.isWorker || !process.send) {
+    return Promise.resolve(registry.render());
+  }
+
+  if (pendingMetrics.size === 0) {
+    process.on('message', resolveMetrics);
+  }
+  const id = nextMetricsRequest++;
+  return new Promise((resolve) => {
+    pendingMetrics.set(id, resolve);
+    process.send!({ type: 'metrics:collect', id } as MetricsRequest);
+    // The primary always answers, but never leave a scrape hanging if it is gone
+    setTimeout(() => {
+      if (pendingMetrics.delete(id)) {
+        resolve(registry.render());
+      }
+    }, METRICS_TIMEOUT_MS * 2).unref();
+  });
+}
+
+function resolveMetrics(message: MetricsReply): void {
+  if (message && message.type === 'metrics:merged') {
+    const resolve = pendingMetrics.get(message.id);
+    if (resolve) {
+      pendingMetrics.delete(message.id);
+      resolve(message.text);
+    }
+    if (pendingMetrics.size === 0) {
+      process.off('message', resolveMetrics);
+    }
+  }
+}
+
+/**
+ * Merge the registries of several workers
+ * Counter and histogram samples with the same name and labels are summed;
+ * gauges describe a single process, so each worker's keep a worker label.
+ */
+export function mergeExpositions(snapshots: Array<{ worker?: number; text: string }>): string {
+  const header = new Map<string, string[]>();
+  const types = new Map<string, string>();
+  const samples = new Map<string, Map<string, number>>();
+
+  for (const snapshot of snapshots) {
+    for (const line of snapshot.text.split('\n')) {
+      if (line.startsWith('# ')) {
+        const [, kind, name, ...rest] = line.split(' ');
+        if (!header.has(name)) {
+          header.set(name, []);
+          samples.set(name, new Map());
+        }
+        if (kind === 'TYPE') {
+          types.set(name, rest[0]);
+        }
+        const lines = header.get(name)!;
+        if (lines.length < 2) {
+          lines.push(line);
+        }
+        continue;
+      }
+      const match = /^([a-zA-Z_:][\w:]*)(\{.*\})? (\S+)$/.exec(line);
+      if (!match) {
+        continue;
+      }
+      const [, sampleName, labels = '', value] = match;
+      const family = samples.has(sampleName) ? sampleName : sampleName.replace(/_(bucket|sum|count)$/, '');
+      const series = samples.get(family);
+      if (!series) {
+        continue;
+      }
+
+      let key = `${sampleName}${labels}`;
+      if (types.get(family) === 'gauge') {
+        const workerLabel = `worker="${snapshot.worker ?? 0}"`;
+        key = labels ? `${sampleName}{${workerLabel},${labels.slice(1)}` : `${sampleName}{${workerLabel}}`;
+      }
+      series.set(key, (series.get(key) || 0) + Number(value));
+    }
+  }
+
+  const lines: string[] = [];
+  for (const [name, headerLines] of header) {
+    lines.push(...headerLines);
+    for (const [key, value] of samples.get(name)!) {
+      lines.push(`${key} ${value}`);
+    }
+  }
+  return lines.join('\n') + '\n';
+}
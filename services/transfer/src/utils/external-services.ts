@@ -1,23 +1,84 @@
-import axios from 'axios';
+import axios, { InternalAxiosRequestConfig } from 'axios';
 import dotenv from 'dotenv';
+import { currentSpan, Span, traceparent } from './tracing';
+import { budgetMs, currentDeadline, DeadlineExceededError } from './deadline';
+import { CircuitBreaker, CircuitOpenError } from './circuit-breaker';
 
 dotenv.config();
 
+// Gateway calls made within a traced operation are recorded as client spans
+// and carry the trace to the gateway in a traceparent header
+type TracedRequestConfig = InternalAxiosRequestConfig & { span?: Span };
+
+// Gateway calls made for a request are cut short when it is abandoned, and
+// pass its deadline on so the gateway can give up too
+axios.interceptors.request.use((config: TracedRequestConfig) => {
+  const deadline = currentDeadline();
+  if (deadline) {
+    config.signal = config.signal || deadline.signal;
+    config.headers.set('X-Request-Deadline', String(deadline.expiresAt));
+  }
+  if (!currentSpan()) {
+    return config;
+  }
+  const method = (config.method || 'get').toUpperCase();
+  config.span = new Span(`HTTP ${method}`, {
+    kind: 'client',
+    attributes: { 'http.method': method, 'http.url': config.url || '' }
+  });
+  config.headers.set('traceparent', traceparent(config.span));
+  return config;
+});
+
+axios.interceptors.response.use((response) => {
+  const span = (response.config as TracedRequestConfig).span;
+  if (span) {
+    span.setAttribute('http.status_code', response.status);
+    span.end();
+  }
+  return response;
+}, (error) => {
+  const span = (error.config as TracedRequestConfig | undefined)?.span;
+  if (span) {
+    if (error.response) {
+      span.setAttribute('http.status_code', error.response.status);
+    }
+    span.recordError(error);
+    span.end();
+  }
+  return Promise.reject(error);
+});
+
 const USE_VIRTUAL = process.env.USE_VIRTUAL === 'true';
 const OTP_SERVICE_URL = process.env.OTP_SERVICE_URL || 'http://localhost:8080/otp';
 const PAYMENT_GATEWAY_URL = process.env.PAYMENT_GATEWAY_URL || 'http://localhost:8080/payment';
 
+// A gateway that answered, even with a refusal, is up; a request abandoned by
+// its caller says nothing about the gateway either way
+function isGatewayFailure(error: unknown): boolean {
+  if (axios.isCancel(error) || error instanceof DeadlineExceededError) {
+    return false;
+  }
+  return !(axios.isAxiosError(error) && error.response && error.response.status < 500);
+}
+
+const otpBreaker = new CircuitBreaker('otp', isGatewayFailure);
+const paymentBreaker = new CircuitBreaker('payment', isGatewayFailure);
+
 // Verify OTP with external service
 export async function verifyOTP(otpCode: string): Promise<{ success: boolean; message: string }> {
   try {
     const url = USE_VIRTUAL ? `${OTP_SERVICE_URL}/verify` : 'http://internal-otp-service/verify';
     
-    const response = await axios.post(url, { otp: otpCode }, {
-      timeout: 5000 // 5 second timeout
-    });
+    const response = await otpBreaker.call(() => axios.post(url, { otp: otpCode }, {
+      timeout: budgetMs(5000) // 5 second timeout, less if the request's budget is shorter
+    }));
     
     return response.data;
   } catch (error) {
+    if (error instanceof CircuitOpenError) {
+      throw error;
+    }
     console.error('OTP verification error:', error);
     throw new Error('Failed to verify OTP');
   }
@@ -28,17 +89,27 @@ export async function processPayment(amount: number, accountId: number): Promise
   try {
     const url = USE_VIRTUAL ? `${PAYMENT_GATEWAY_URL}/process` : 'http://internal-payment-service/process';
     
-    const response = await axios.post(url, { 
+    const response = await paymentBreaker.call(() => axios.post(url, { 
       amount, 
       accountId,
       currency: 'USD'
     }, {
-      timeout: 10000 // 10 second timeout
-    });
+      timeout: budgetMs(10000) // 10 second timeout, less if the request's budget is shorter
+    }));
     
     return response.data;
   } catch (error) {
+    if (error instanceof CircuitOpenError) {
+      throw error;
+    }
     console.error('Payment processing error:', error);
     throw new Error('Failed to process payment');
   }
+}
+
+/**
+ * Circuit state and call counts of each gateway
+ */
+export function gatewayStats() {
+  return { otp: otpBreaker.stats(), payment: paymentBreaker.stats() };
 }
\ No newline at end of file
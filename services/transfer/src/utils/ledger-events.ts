@@ -0,0 +1,48 @@
+import { Message } from 'kafkajs';
+import { encodeEvent, JSON_CONTENT_TYPE, latestVersion } from './event-codec';
+
+// avro (default) or json; json lets producers roll back without a consumer release
+const LEDGER_EVENT_ENCODING = process.env.LEDGER_EVENT_ENCODING || 'avro';
+// Pin the schema version while consumers are still rolling out a newer one
+const LEDGER_EVENT_SCHEMA_VERSION = process.env.LEDGER_EVENT_SCHEMA_VERSION;
+
+export const LEDGER_EVENT_SUBJECT = 'ledger-event';
+
+export interface LedgerEventPayload {
+  eventId: string;
+  eventType: string;
+  accountId: number;
+  transactionId: number;
+  amount: number;
+  balanceAfter: number;
+  // Balance version of the account after this entry, ordering cache updates
+  version?: number;
+  timestamp: string;
+}
+
+/**
+ * Build the Kafka message for a ledger event
+ * Messages are keyed by account so each account's events stay ordered, and
+ * carry the encoding and schema version the consumer needs to decode them.
+ */
+export function ledgerEventMessage(event: LedgerEventPayload): Message {
+  const key = String(event.accountId);
+
+  if (LEDGER_EVENT_ENCODING === 'json') {
+    return {
+      key,
+      headers: { 'event-id': event.eventId, 'content-type': JSON_CONTENT_TYPE },
+      value: JSON.stringify(event)
+    };
+  }
+
+  const version = LEDGER_EVENT_SCHEMA_VERSION
+    ? parseInt(LEDGER_EVENT_SCHEMA_VERSION, 10)
+    : latestVersion(LEDGER_EVENT_SUBJECT);
+  const encoded = encodeEvent(LEDGER_EVENT_SUBJECT, { ...event }, version);
+  return {
+    key,
+    headers: { 'event-id': event.eventId, ...encoded.headers },
+    value: encoded.value
+  };
+}
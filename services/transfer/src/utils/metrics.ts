@@ -0,0 +1,221 @@
+// Minimal Prometheus metrics primitives rendered in the text exposition format.
+// This file is kept identical in every service.
+
+export type Labels = Record<string, string | number>;
+
+function escapeLabel(value: string | number): string {
+  return String(value).replace(/\\/g, '\\\\').replace(/\n/g, '\\n').replace(/"/g, '\\"');
+}
+
+function labelKey(labels: Labels): string {
+  return Object.keys(labels)
+    .sort()
+    .map((name) => `${name}="${escapeLabel(labels[name])}"`)
+    .join(',');
+}
+
+function withLabels(name: string, key: string, extra?: string): string {
+  const all = [key, extra].filter(Boolean).join(',');
+  return all ? `${name}{${all}}` : name;
+}
+
+interface Metric {
+  name: string;
+  help: string;
+  type: 'counter' | 'gauge' | 'histogram';
+  render(): string[];
+}
+
+export class Registry {
+  private metrics: Metric[] = [];
+  private collectors: Array<() => void> = [];
+
+  register<T extends Metric>(metric: T): T {
+    this.metrics.push(metric);
+    return metric;
+  }
+
+  /**
+   * Run a callback before each scrape, typically to refresh gauges
+   */
+  onCollect(collector: () => void): void {
+    this.collectors.push(collector);
+  }
+
+  render(): string {
+    for (const collector of this.collectors) {
+      collector();
+    }
+    const lines: string[] = [];
+    for (const metric of this.metrics) {
+      lines.push(`# HELP ${metric.name} ${metric.help}`);
+      lines.push(`# TYPE ${metric.name} ${metric.type}`);
+      lines.push(...metric.render());
+    }
+    return lines.join('\n') + '\n';
+  }
+}
+
+export const registry = new Registry();
+
+export class Counter implements Metric {
+  readonly type = 'counter';
+  private values = new Map<string, number>();
+
+  constructor(readonly name: string, readonly help: string, target: Registry = registry) {
+    target.register(this);
+  }
+
+  inc(value = 1, labels: Labels = {}): void {
+    const key = labelKey(labels);
+    this.values.set(key, (this.values.get(key) || 0) + value);
+  }
+
+  /**
+   * Counter for fixed label values, keyed once so hot paths skip building the label key
+   */
+  labels(labels: Labels): { inc(value?: number): void } {
+    const key = labelKey(labels);
+    return {
+      inc: (value = 1) => {
+        this.values.set(key, (this.values.get(key) || 0) + value);
+      }
+    };
+  }
+
+  get(labels: Labels = {}): number {
+    return this.values.get(labelKey(labels)) || 0;
+  }
+
+  render(): string[] {
+    return Array.from(this.values, ([key, value]) => `${withLabels(this.name, key)} ${value}`);
+  }
+}
+
+export class Gauge implements Metric {
+  readonly type = 'gauge';
+  private values = new Map<string, number>();
+
+  constructor(readonly name: string, readonly help: string, target: Registry = registry) {
+    target.register(this);
+  }
+
+  set(value: number, labels: Labels = {}): void {
+    this.values.set(labelKey(labels), value);
+  }
+
+  get(labels: Labels = {}): number {
+    return this.values.get(labelKey(labels)) || 0;
+  }
+
+  /**
+   * Stop reporting a series, e.g. for a partition no longer assigned
+   */
+  delete(labels: Labels = {}): void {
+    this.values.delete(labelKey(labels));
+  }
+
+  render(): string[] {
+    return Array.from(this.values, ([key, value]) => `${withLabels(this.name, key)} ${value}`);
+  }
+}
+
+interface HistogramSeries {
+  counts: number[];
+  sum: number;
+  count: number;
+}
+
+export class Histogram implements Metric {
+  readonly type = 'histogram';
+  private series = new Map<string, HistogramSeries>();
+
+  constructor(
+    readonly name: string,
+    readonly help: string,
+    readonly buckets: number[] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10],
+    target: Registry = registry
+  ) {
+    target.register(this);
+  }
+
+  private seriesFor(key: string): HistogramSeries {
+    let series = this.series.get(key);
+    if (!series) {
+      series = { counts: new Array(this.buckets.length).fill(0), sum: 0, count: 0 };
+      this.series.set(key, series);
+    }
+    return series;
+  }
+
+  observe(value: number, labels: Labels = {}): void {
+    this.record(this.seriesFor(labelKey(labels)), value);
+  }
+
+  /**
+   * Series for fixed label values, resolved once so hot paths skip building the label key
+   */
+  labels(labels: Labels): { observe(value: number): void } {
+    const series = this.seriesFor(labelKey(labels));
+    return { observe: (value: number) => this.record(series, value) };
+  }
+
+  private record(series: HistogramSeries, value: number): void {
+    for (let i = 0; i < this.buckets.length; i++) {
+      if (value <= this.buckets[i]) {
+        series.counts[i] += 1;
+        break;
+      }
+    }
+    series.sum += value;
+    series.count += 1;
+  }
+
+  render(): string[] {
+    const lines: string[] = [];
+    for (const [key, series] of this.series) {
+      let cumulative = 0;
+      this.buckets.forEach((bucket, i) => {
+        cumulative += series.counts[i];
+        lines.push(`${withLabels(`${this.name}_bucket`, key, `le="${bucket}"`)} ${cumulative}`);
+      });
+      lines.push(`${withLabels(`${this.name}_bucket`, key, 'le="+Inf"')} ${series.count}`);
+      lines.push(`${withLabels(`${this.name}_sum`, key)} ${series.sum}`);
+      lines.push(`${withLabels(`${this.name}_count`, key)} ${series.count}`);
+    }
+    return lines;
+  }
+}
+
+/**
+ * Events per second over a sliding window of one-second buckets
+ */
+export class RateMeter {
+  private buckets: number[];
+  private current = 0;
+  private currentSecond = Math.floor(Date.now() / 1000);
+
+  constructor(private windowSeconds = 10) {
+    this.buckets = new Array(windowSeconds).fill(0);
+  }
+
+  private advance(): void {
+    const second = Math.floor(Date.now() / 1000);
+    const elapsed = Math.min(second - this.currentSecond, this.windowSeconds);
+    for (let i = 0; i < elapsed; i++) {
+      this.current = (this.current + 1) % this.windowSeconds;
+      this.buckets[this.current] = 0;
+    }
+    this.currentSecond = second;
+  }
+
+  mark(count = 1): void {
+    this.advance();
+    this.buckets[this.current] += count;
+  }
+
+  rate(): number {
+    this.advance();
+    return this.buckets.reduce((total, count) => total + count, 0) / this.windowSeconds;
+  }
+}
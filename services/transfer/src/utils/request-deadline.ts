@@ -0,0 +1,31 @@
+import { Request, Response, NextFunction } from 'express';
+import { deadlineFromHeader, runWithDeadline } from './deadline';
+
+// Gives every request a deadline from its X-Request-Deadline header or the
+// default budget. The deadline is aborted when it passes or when the client
+// closes the connection before the response is sent, so the handler's next
+// Postgres, Redis or gateway call fails instead of running for nobody.
+// This file is kept identical in every Express service.
+
+/**
+ * Run every request under its deadline, rejecting requests that arrive already expired
+ */
+export function requestDeadline(req: Request, res: Response, next: NextFunction): void {
+  const deadline = deadlineFromHeader(req.header('X-Request-Deadline'));
+  if (deadline.remainingMs() === 0) {
+    deadline.abort('expired');
+    res.status(504).json({ error: 'Request deadline exceeded' });
+    return;
+  }
+
+  const timer = setTimeout(() => deadline.abort('expired'), deadline.remainingMs());
+  res.once('finish', () => clearTimeout(timer));
+  res.once('close', () => {
+    clearTimeout(timer);
+    if (!res.writableFinished) {
+      deadline.abort('disconnected');
+    }
+  });
+
+  runWithDeadline(deadline, next);
+}
@@ -0,0 +1,348 @@
+import { AsyncLocalStorage } from 'async_hooks';
+import { randomBytes } from 'crypto';
+import fs from 'fs';
+import http from 'http';
+import { performance } from 'perf_hooks';
+
+// Distributed tracing with W3C trace context. The active span follows async
+// calls through AsyncLocalStorage; incoming traceparent headers (HTTP and
+// Kafka) continue the caller's trace and outgoing calls carry it on.
+//
+// Sampling happens at the tail: a process buffers the spans of a trace until
+// its last local root span ends, then exports them if any span failed, a root
+// took at least TRACE_SLOW_MS, or the trace id falls within
+// TRACE_SAMPLE_RATIO. The ratio is derived from the trace id, so every
+// service keeps the same share of unremarkable traces.
+// This file is kept identical in every service.
+
+const TRACE_EXPORTER = process.env.TRACE_EXPORTER || 'file';
+const TRACE_FILE = process.env.TRACE_FILE || 'traces.jsonl';
+const TRACE_OTLP_ENDPOINT = process.env.TRACE_OTLP_ENDPOINT || 'http://localhost:4318/v1/traces';
+const TRACE_SLOW_MS = parseInt(process.env.TRACE_SLOW_MS || '200', 10);
+const TRACE_SAMPLE_RATIO = parseFloat(process.env.TRACE_SAMPLE_RATIO || '0.01');
+const TRACE_MAX_PENDING = parseInt(process.env.TRACE_MAX_PENDING || '5000', 10);
+const MAX_SPANS_PER_TRACE = 1000;
+const OTLP_BATCH_SIZE = 256;
+const OTLP_FLUSH_INTERVAL_MS = 2000;
+
+export type SpanKind = 'internal' | 'server' | 'client' | 'producer' | 'consumer';
+export type AttributeValue = string | number | boolean;
+
+export interface SpanContext {
+  traceId: string;
+  spanId: string;
+}
+
+export interface SpanOptions {
+  kind?: SpanKind;
+  attributes?: Record<string, AttributeValue>;
+  // Remote parent from a traceparent header; null starts a new trace.
+  // Defaults to the active span.
+  parent?: SpanContext | null;
+  links?: SpanContext[];
+}
+
+const OTLP_KINDS: Record<SpanKind, number> = { internal: 1, server: 2, client: 3, producer: 4, consumer: 5 };
+
+const storage = new AsyncLocalStorage<Span>();
+let serviceName = 'unknown';
+
+export class Span implements SpanContext {
+  readonly traceId: string;
+  readonly spanId = randomBytes(8).toString('hex');
+  readonly parentSpanId?: string;
+  readonly kind: SpanKind;
+  readonly attributes: Record<string, AttributeValue>;
+  readonly links: SpanContext[];
+  // Started without a parent in this process: a new trace or a remote caller's
+  readonly localRoot: boolean;
+  readonly startTime = performance.timeOrigin + performance.now();
+  endTime = 0;
+  status: 'ok' | 'error' = 'ok';
+  statusMessage?: string;
+
+  constructor(public name: string, options: SpanOptions = {}) {
+    const parent = options.parent === undefined ? storage.getStore() : options.parent;
+    this.traceId = parent ? parent.traceId : randomBytes(16).toString('hex');
+    this.parentSpanId = parent ? parent.spanId : undefined;
+    this.localRoot = !(parent instanceof Span);
+    this.kind = options.kind || 'internal';
+    this.attributes = { ...options.attributes };
+    this.links = options.links || [];
+    spanStarted(this);
+  }
+
+  get durationMs(): number {
+    return (this.endTime || performance.timeOrigin + performance.now()) - this.startTime;
+  }
+
+  setAttribute(name: string, value: AttributeValue): void {
+    this.attributes[name] = value;
+  }
+
+  recordError(error: unknown): void {
+    this.status = 'error';
+    this.statusMessage = error instanceof Error ? error.message : String(error);
+  }
+
+  end(): void {
+    if (this.endTime) {
+      return;
+    }
+    this.endTime = performance.timeOrigin + performance.now();
+    spanEnded(this);
+  }
+}
+
+/**
+ * Whether spans are recorded; with TRACE_EXPORTER=none instrumentation is skipped
+ */
+export function tracingEnabled(): boolean {
+  return TRACE_EXPORTER !== 'none';
+}
+
+/**
+ * Name this process's spans are exported under and start the exporter
+ */
+export function initTracing(name: string): void {
+  serviceName = name;
+  if (TRACE_EXPORTER === 'otlp') {
+    setInterval(flushOtlp, OTLP_FLUSH_INTERVAL_MS).unref();
+  }
+}
+
+/**
+ * The span of the work currently executing, if any
+ */
+export function currentSpan(): Span | undefined {
+  return storage.getStore();
+}
+
+/**
+ * Run a function with a span as the active span of everything it calls
+ */
+export function runInSpan<T>(span: Span, fn: () => T): T {
+  return storage.run(span, fn);
+}
+
+/**
+ * Run an async operation in a new span, ended when the operation settles
+ * Errors mark the span as failed and are rethrown.
+ */
+export async function traceAsync<T>(name: string, options: SpanOptions, fn: (span: Span) => Promise<T>): Promise<T> {
+  const span = new Span(name, options);
+  try {
+    return await storage.run(span, () => fn(span));
+  } catch (error) {
+    span.recordError(error);
+    throw error;
+  } finally {
+    span.end();
+  }
+}
+
+/**
+ * Trace a client call only when it is part of a traced operation
+ * Background work with no active span runs untraced, at no cost.
+ */
+export function traceCall<T>(name: string, attributes: Record<string, AttributeValue>, fn: () => Promise<T>): Promise<T> {
+  if (!storage.getStore()) {
+    return fn();
+  }
+  return traceAsync(name, { kind: 'client', attributes }, () => fn());
+}
+
+/**
+ * W3C traceparent header value for a span, the active one by default
+ */
+export function traceparent(span: SpanContext | undefined = storage.getStore()): string | undefined {
+  return span ? `00-${span.traceId}-${span.spanId}-01` : undefined;
+}
+
+/**
+ * Parse a W3C traceparent header value
+ * @returns The remote span context, or null when the header is absent or malformed
+ */
+export function parseTraceparent(value: string | Buffer | Array<string | Buffer> | undefined): SpanContext | null {
+  if (!value) {
+    return null;
+  }
+  const match = /^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$/.exec(String(value).trim());
+  if (!match || /^0+$/.test(match[1]) || /^0+$/.test(match[2])) {
+    return null;
+  }
+  return { traceId: match[1], spanId: match[2] };
+}
+
+// Tail sampling
+
+interface PendingTrace {
+  spans: Span[];
+  openRoots: number;
+  keep: boolean;
+}
+
+// Spans of traces still in progress in this process, in arrival order
+const pending = new Map<string, PendingTrace>();
+// Decisions for traces whose roots have ended, for spans that end after them
+const decided = new Map<string, boolean>();
+const stats = { started: 0, exported: 0, tracesKept: 0, tracesDropped: 0, evicted: 0, exportErrors: 0 };
+
+function spanStarted(span: Span): void {
+  stats.started += 1;
+  if (!span.localRoot) {
+    return;
+  }
+  let trace = pending.get(span.traceId);
+  if (!trace) {
+    trace = { spans: [], openRoots: 0, keep: false };
+    pending.set(span.traceId, trace);
+    if (pending.size > TRACE_MAX_PENDING) {
+      pending.delete(pending.keys().next().value as string);
+      stats.evicted += 1;
+    }
+  }
+  trace.openRoots += 1;
+}
+
+function sampledByRatio(traceId: string): boolean {
+  return parseInt(traceId.slice(-8), 16) / 0x100000000 < TRACE_SAMPLE_RATIO;
+}
+
+function spanEnded(span: Span): void {
+  const trace = pending.get(span.traceId);
+  if (!trace) {
+    // Ended after its trace was decided, or the trace was evicted
+    if (decided.get(span.traceId)) {
+      exportSpans([span]);
+    }
+    return;
+  }
+
+  if (trace.spans.length < MAX_SPANS_PER_TRACE) {
+    trace.spans.push(span);
+  }
+  if (span.status === 'error' || (span.localRoot && span.durationMs >= TRACE_SLOW_MS)) {
+    trace.keep = true;
+  }
+  if (!span.localRoot || --trace.openRoots > 0) {
+    return;
+  }
+
+  pending.delete(span.traceId);
+  const keep = trace.keep || sampledByRatio(span.traceId);
+  decided.set(span.traceId, keep);
+  if (decided.size > TRACE_MAX_PENDING) {
+    decided.delete(decided.keys().next().value as string);
+  }
+  if (keep) {
+    stats.tracesKept += 1;
+    exportSpans(trace.spans);
+  } else {
+    stats.tracesDropped += 1;
+  }
+}
+
+// Exporters
+
+let fileStream: fs.WriteStream | null = null;
+let otlpQueue: Span[] = [];
+
+function exportSpans(spans: Span[]): void {
+  stats.exported += spans.length;
+  if (TRACE_EXPORTER === 'file') {
+    if (!fileStream) {
+      fileStream = fs.createWriteStream(TRACE_FILE, { flags: 'a' });
+      fileStream.on('error', (error) => {
+        stats.exportErrors += 1;
+        console.error('Trace file export error:', error);
+      });
+    }
+    fileStream.write(spans.map((span) => JSON.stringify(spanRecord(span))).join('\n') + '\n');
+  } else if (TRACE_EXPORTER === 'otlp') {
+    otlpQueue.push(...spans);
+    if (otlpQueue.length >= OTLP_BATCH_SIZE) {
+      flushOtlp();
+    }
+  }
+}
+
+function spanRecord(span: Span) {
+  return {
+    service: serviceName,
+    traceId: span.traceId,
+    spanId: span.spanId,
+    parentSpanId: span.parentSpanId,
+    name: span.name,
+    kind: span.kind,
+    startTime: new Date(span.startTime).toISOString(),
+    durationMs: Math.round(span.durationMs * 1000) / 1000,
+    status: span.status,
+    statusMessage: span.statusMessage,
+    attributes: span.attributes,
+    links: span.links.length > 0 ? span.links : undefined
+  };
+}
+
+const unixNano = (ms: number) => (BigInt(Math.round(ms * 1000)) * 1000n).toString();
+
+function otlpAttributes(attributes: Record<string, AttributeValue>) {
+  return Object.entries(attributes).map(([key, value]) => ({
+    key,
+    value: typeof value === 'number'
+      ? (Number.isInteger(value) ? { intValue: value } : { doubleValue: value })
+      : typeof value === 'boolean' ? { boolValue: value } : { stringValue: value }
+  }));
+}
+
+// OTLP/HTTP with the JSON encoding, accepted by the OpenTelemetry collector and Jaeger
+function flushOtlp(): void {
+  if (otlpQueue.length === 0) {
+    return;
+  }
+  const spans = otlpQueue;
+  otlpQueue = [];
+
+  const body = JSON.stringify({
+    resourceSpans: [{
+      resource: { attributes: otlpAttributes({ 'service.name': serviceName }) },
+      scopeSpans: [{
+        scope: { name: 'fintech-tracing' },
+        spans: spans.map((span) => ({
+          traceId: span.traceId,
+          spanId: span.spanId,
+          parentSpanId: span.parentSpanId,
+          name: span.name,
+          kind: OTLP_KINDS[span.kind],
+          startTimeUnixNano: unixNano(span.startTime),
+          endTimeUnixNano: unixNano(span.endTime),
+          attributes: otlpAttributes(span.attributes),
+          links: span.links.map((link) => ({ traceId: link.traceId, spanId: link.spanId })),
+          status: span.status === 'error' ? { code: 2, message: span.statusMessage } : { code: 1 }
+        }))
+      }]
+    }]
+  });
+
+  const request = http.request(TRACE_OTLP_ENDPOINT, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json', 'Content-Length': Buffer.byteLength(body) }
+  }, (res) => {
+    res.resume();
+    if (res.statusCode && res.statusCode >= 300) {
+      stats.exportErrors += 1;
+    }
+  });
+  request.on('error', (error) => {
+    stats.exportErrors += 1;
+    console.error('Trace OTLP export error:', error.message);
+  });
+  request.end(body);
+}
+
+/**
+ * Span and trace counts, including how many traces tail sampling kept
+ */
+export function tracingStats() {
+  return { exporter: TRACE_EXPORTER, pendingTraces: pending.size, ...stats };
+}